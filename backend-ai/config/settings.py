@@ -36,6 +36,94 @@ class Settings(BaseSettings):
     # Logging
     LOG_LEVEL: str = "INFO"
     
+    # Recommendation Pagination
+    RECOMMENDATION_CURSOR_TTL_SECONDS: int = 300
+    RECOMMENDATION_CURSOR_MAX_ENTRIES: int = 10000
+    
+    # Recommendation Bundles
+    BUNDLE_BUDGET_BUCKETS: int = 1000
+    
+    # Candidate Retrieval (two-tower embeddings + IVF index; 0 candidates disables)
+    RETRIEVAL_CANDIDATES: int = 300
+    RETRIEVAL_NUM_LISTS: int = 0
+    RETRIEVAL_NPROBE: int = 8
+    RETRIEVAL_FACTOR_RANK: int = 16
+    RETRIEVAL_VECTOR_DTYPE: str = "float32"
+    
+    # Parallel Scoring (process pool for very large candidate sets; 0 workers disables)
+    PARALLEL_SCORING_WORKERS: int = 0
+    PARALLEL_SCORING_CHUNK_SIZE: int = 50000
+    PARALLEL_SCORING_MIN_ROWS: int = 100000
+    PARALLEL_SCORING_TOP_K: int = 500
+    
+    # Co-visitation ("booked together")
+    COVISITATION_TOP_N: int = 20
+    COVISITATION_CHUNK_SIZE: int = 10000
+    COVISITATION_MAX_PAIRS: int = 5000000
+    
+    # Similar Items (precomputed nearest neighbors; empty text model uses hashed words)
+    SIMILAR_ITEMS_TOP_N: int = 20
+    SIMILAR_ITEMS_TEXT_WEIGHT: float = 0.3
+    SIMILAR_ITEMS_TEXT_MODEL: str = ""
+    
+    # Trending (count-min sketch per time bucket)
+    TRENDING_WEIGHT_VIEW: float = 1.0
+    TRENDING_WEIGHT_BOOKING: float = 5.0
+    TRENDING_BUCKET_SECONDS: int = 3600
+    TRENDING_BUCKETS: int = 24
+    TRENDING_HALF_LIFE_BUCKETS: float = 6.0
+    TRENDING_SKETCH_WIDTH: int = 4096
+    TRENDING_SKETCH_DEPTH: int = 4
+    TRENDING_HEAVY_HITTERS: int = 50
+    TRENDING_RANKING_WEIGHT: float = 0.1
+    
+    # Interaction Store (0 keeps interactions in-process)
+    INTERACTION_SHARDS: int = 0
+    
+    # Implicit Feedback
+    IMPLICIT_WEIGHT_VIEW: float = 1.0
+    IMPLICIT_WEIGHT_WISHLIST: float = 4.0
+    IMPLICIT_WEIGHT_SEARCH: float = 0.5
+    IMPLICIT_FEEDBACK_HALF_LIFE_HOURS: float = 168.0
+    IMPLICIT_FEEDBACK_SATURATION: float = 5.0
+    IMPLICIT_FEEDBACK_REFRESH_SECONDS: int = 60
+    IMPLICIT_FEEDBACK_MIN_SCORE: float = 0.001
+    
+    # Event timestamps (seconds an event may be ahead of the server clock)
+    EVENT_MAX_CLOCK_SKEW_SECONDS: int = 300
+    
+    # Cache Snapshots (empty directory disables, interval 0 = only at shutdown)
+    CACHE_SNAPSHOT_DIR: str = ""
+    CACHE_SNAPSHOT_INTERVAL_SECONDS: int = 0
+    
+    # Sentiment Analysis
+    SENTIMENT_BATCH_SIZE: int = 64
+    
+    # Sentiment Model Backend (torch or onnx; onnx needs a local model directory)
+    SENTIMENT_MODEL_BACKEND: str = "torch"
+    SENTIMENT_MODEL_DIR: str = ""
+    SENTIMENT_ONNX_QUANTIZE: bool = False
+    SENTIMENT_ONNX_TOLERANCE: float = 0.02
+    
+    # Sentiment Embedding Cache (0 entries disables memory, empty path disables disk)
+    SENTIMENT_EMBEDDING_CACHE_SIZE: int = 50000
+    SENTIMENT_EMBEDDING_CACHE_PATH: str = ""
+    
+    # Sentiment Inference (threads running the model; full queue answers 503)
+    SENTIMENT_INFERENCE_WORKERS: int = 1
+    SENTIMENT_INFERENCE_QUEUE_SIZE: int = 32
+    
+    # Sentiment Micro-Batching (concurrent single reviews share a forward pass; 0 ms disables)
+    SENTIMENT_MICRO_BATCH_SIZE: int = 32
+    SENTIMENT_MICRO_BATCH_WAIT_MS: float = 5.0
+    
+    # Sentiment Streaming (reviews analyzed per chunk of an NDJSON upload; longer lines are rejected)
+    SENTIMENT_STREAM_CHUNK_SIZE: int = 64
+    SENTIMENT_STREAM_MAX_LINE_BYTES: int = 65536
+    
+    # Sentiment Aggregates (running scores per hotel/tour; empty path keeps them in memory)
+    SENTIMENT_AGGREGATES_PATH: str = ""
+    
     @property
     def cors_origins_list(self) -> List[str]:
         """Parse CORS origins string into list."""
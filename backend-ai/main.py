@@ -1,5 +1,6 @@
 """Main FastAPI application entry point."""
 
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from config.settings import settings
@@ -10,6 +11,8 @@ from routes import (
     health_router,
     itinerary_router
 )
+from routes.recommend import recommendation_engine
+from routes.analyze import sentiment_analyzer
 from utils.logger import logger
 
 # Create FastAPI application
@@ -38,12 +41,25 @@ app.include_router(analyze_router)
 app.include_router(itinerary_router)
 
 
+async def snapshot_caches_periodically():
+    """Snapshot recommendation caches every CACHE_SNAPSHOT_INTERVAL_SECONDS."""
+    while True:
+        await asyncio.sleep(settings.CACHE_SNAPSHOT_INTERVAL_SECONDS)
+        await recommendation_engine.save_cache_snapshot(settings.CACHE_SNAPSHOT_DIR)
+
+
 @app.on_event("startup")
 async def startup_event():
     """Execute on application startup."""
     logger.info("Starting DerLg AI Engine...")
     logger.info(f"Environment: {settings.ENVIRONMENT}")
     logger.info(f"Model: {'GPT-4' if settings.use_gpt else 'DeepSeek'}")
+    
+    if settings.CACHE_SNAPSHOT_DIR:
+        recommendation_engine.load_cache_snapshot(settings.CACHE_SNAPSHOT_DIR)
+        if settings.CACHE_SNAPSHOT_INTERVAL_SECONDS > 0:
+            app.state.snapshot_task = asyncio.create_task(snapshot_caches_periodically())
+    
     logger.info("AI Engine started successfully")
 
 
@@ -51,6 +67,15 @@ async def startup_event():
 async def shutdown_event():
     """Execute on application shutdown."""
     logger.info("Shutting down AI Engine...")
+    
+    if settings.CACHE_SNAPSHOT_DIR:
+        snapshot_task = getattr(app.state, "snapshot_task", None)
+        if snapshot_task:
+            snapshot_task.cancel()
+        await recommendation_engine.save_cache_snapshot(settings.CACHE_SNAPSHOT_DIR)
+    
+    recommendation_engine.close()
+    sentiment_analyzer.close()
 
 
 @app.get("/")
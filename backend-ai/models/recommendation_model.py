@@ -1,114 +1,1287 @@
 """Recommendation engine using collaborative and content-based filtering."""
 
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Iterator
+import asyncio
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 from datetime import datetime, timedelta
 import logging
+import threading
+import time
 from collections import defaultdict
 
+from config.settings import settings
+from utils.catalog import ItemCatalog
 from utils.feature_extractor import FeatureExtractor
 from utils.data_processor import DataProcessor
+from utils.ranking_cache import RankingCache
+from utils.bundle_optimizer import BundleOptimizer
+from utils.rating_matrix import RatingMatrix
+from utils.interaction_store import ShardedInteractionStore, shard_of
+from utils.implicit_feedback import ImplicitFeedbackStore
+from utils.cache_snapshot import CacheSnapshot
+from utils.covisitation import CoVisitationMatrix
+from utils.similar_items import SimilarItemsTable
+from utils.trending import TrendingCounter
+from utils.ann_index import IVFIndex
+from utils.quantization import QuantizedMatrix
+from utils.parallel_scoring import ParallelScorer, SharedArrays
+from utils import hybrid_scoring
 
 logger = logging.getLogger(__name__)
 
+# One ranked candidate: catalog row plus its scores
+RANKED_DTYPE = np.dtype([
+    ('row', np.int64),
+    ('recommendation_score', np.float64),
+    ('value_score', np.float64),
+    ('combined_score', np.float64),
+    ('event_boost', np.float64),
+    ('is_alternative', np.bool_),
+])
+
 
 class RecommendationEngine:
     """
     Hybrid recommendation system combining collaborative filtering
     and content-based filtering for personalized hotel and tour recommendations.
+    
+    Items are held in a columnar ItemCatalog; the scoring pipeline works on
+    catalog rows and RANKED_DTYPE arrays, and item dicts are only built for
+    the page being returned.
     """
     
-    def __init__(self):
-        """Initialize the recommendation engine."""
-        self.collaborative_weight = 0.6
-        self.content_weight = 0.4
-        self.feature_extractor = FeatureExtractor()
-        self.data_processor = DataProcessor()
+    # Item types that can be recommended together with item_type="all"
+    ITEM_TYPES = ("hotel", "tour")
+    
+    # Default slots per type in a mixed hotel+tour list
+    DEFAULT_TYPE_QUOTAS = {"hotel": 5, "tour": 5}
+    
+    def __init__(self):
+        """Initialize the recommendation engine."""
+        self.collaborative_weight = 0.6
+        self.content_weight = 0.4
+        self.max_recommendations = 10
+        self.feature_extractor = FeatureExtractor()
+        self.data_processor = DataProcessor()
+        
+        # Columnar catalog of hotels and tours
+        self.catalog = ItemCatalog()
+        
+        # Cache for user-item interactions
+        self.user_item_matrix = {}
+        self.explicit_ratings = {}
+        self.user_similarity_cache = {}
+        
+        # Views, wishlists and searches, decayed over time
+        self.implicit_feedback = ImplicitFeedbackStore(
+            weights={
+                'view': settings.IMPLICIT_WEIGHT_VIEW,
+                'wishlist': settings.IMPLICIT_WEIGHT_WISHLIST,
+                'search': settings.IMPLICIT_WEIGHT_SEARCH
+            },
+            half_life_hours=settings.IMPLICIT_FEEDBACK_HALF_LIFE_HOURS,
+            max_clock_skew=settings.EVENT_MAX_CLOCK_SKEW_SECONDS,
+            min_score=settings.IMPLICIT_FEEDBACK_MIN_SCORE
+        )
+        self._implicit_version = 0
+        self._implicit_merged_at = 0.0
+        
+        # Float32 CSR view of the user-item matrix
+        self.rating_matrix = None
+        self._rating_matrix_source = None
+        
+        # Interactions sharded across worker processes (INTERACTION_SHARDS > 0);
+        # the shards then replace user_item_matrix in the coordinator
+        self.interaction_store = None
+        if settings.INTERACTION_SHARDS > 0:
+            self.interaction_store = ShardedInteractionStore(num_shards=settings.INTERACTION_SHARDS)
+        self._interaction_store_lock = asyncio.Lock()
+        self._ratings_snapshot_dir = None
+        
+        # Popularity table: {item_id: (interaction_count, mean_rating)}
+        self.item_popularity = {}
+        
+        # Items booked in the same session or trip, built on first use
+        self.covisitation = None
+        
+        # Nearest neighbors of every item by features and description,
+        # repaired incrementally from the catalog's row revisions
+        self.similar_items = None
+        self._similar_catalog = None
+        self._similar_revision = 0
+        self._similar_revisions = np.zeros(0, dtype=np.uint64)
+        self._similar_lock = threading.Lock()
+        self._text_encoder = None
+        
+        # Two-tower retrieval indexes per item type, rebuilt when the
+        # catalog or rating matrix changes
+        self.retrieval_indexes = {}
+        
+        # Process pool for scoring very large candidate sets, plus the
+        # catalog columns it reads from shared memory
+        self.parallel_scorer = ParallelScorer(
+            workers=settings.PARALLEL_SCORING_WORKERS,
+            chunk_size=settings.PARALLEL_SCORING_CHUNK_SIZE,
+            min_rows=settings.PARALLEL_SCORING_MIN_ROWS
+        )
+        self._scoring_arrays = None
+        
+        # Recent views and bookings per item, in fixed memory
+        self.trending = TrendingCounter(
+            weights={
+                'view': settings.TRENDING_WEIGHT_VIEW,
+                'booking': settings.TRENDING_WEIGHT_BOOKING
+            },
+            bucket_seconds=settings.TRENDING_BUCKET_SECONDS,
+            num_buckets=settings.TRENDING_BUCKETS,
+            half_life_buckets=settings.TRENDING_HALF_LIFE_BUCKETS,
+            width=settings.TRENDING_SKETCH_WIDTH,
+            depth=settings.TRENDING_SKETCH_DEPTH,
+            heavy_hitters=settings.TRENDING_HEAVY_HITTERS,
+            max_clock_skew=settings.EVENT_MAX_CLOCK_SKEW_SECONDS
+        )
+        
+        # Ranked lists behind recommendation page cursors
+        self.ranking_cache = RankingCache(
+            ttl_seconds=settings.RECOMMENDATION_CURSOR_TTL_SECONDS,
+            max_entries=settings.RECOMMENDATION_CURSOR_MAX_ENTRIES
+        )
+        
+        # Hotel + tour/event bundle solver
+        self.bundle_optimizer = BundleOptimizer(
+            budget_buckets=settings.BUNDLE_BUDGET_BUCKETS
+        )
+    
+    async def get_recommendations(
+        self,
+        user_id: str,
+        budget: float,
+        preferences: Dict[str, Any],
+        dates: Dict[str, str],
+        item_type: str = "hotel",
+        type_quotas: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate personalized recommendations for a user.
+        
+        Args:
+            user_id: User identifier
+            budget: Maximum budget
+            preferences: User preferences (amenities, location, etc.)
+            dates: Check-in and check-out dates
+            item_type: Type of item to recommend ("hotel", "tour" or "all")
+            type_quotas: Per-type slots in the merged list when item_type is "all"
+            
+        Returns:
+            List of recommended hotels/tours with scores and confidence
+        """
+        try:
+            user_profile, events, ranked = await self._rank_request(
+                user_id=user_id,
+                budget=budget,
+                preferences=preferences,
+                dates=dates,
+                item_type=item_type,
+                type_quotas=type_quotas
+            )
+            
+            # Build dicts and explanations for the top items only
+            recommendations = self._add_recommendation_metadata(
+                self._materialize(ranked[:self.max_recommendations], budget, events),
+                user_profile,
+                preferences
+            )
+            
+            logger.info(f"Generated {len(recommendations)} recommendations")
+            return recommendations
+            
+        except Exception as e:
+            logger.error(f"Error generating recommendations: {str(e)}", exc_info=True)
+            return []
+    
+    async def get_recommendation_page(
+        self,
+        user_id: str,
+        budget: float,
+        preferences: Dict[str, Any],
+        dates: Dict[str, str],
+        item_type: str = "hotel",
+        type_quotas: Optional[Dict[str, int]] = None,
+        cursor: Optional[str] = None,
+        page_size: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Generate one page of recommendations with a cursor for the next page.
+        
+        The first request runs the full pipeline and caches the complete ranked
+        list (item ids and scores only) under a short-lived token. Requests with
+        a cursor slice that cached list and annotate only the requested page, so
+        ordering and scores stay stable across pages even if the model changes.
+        
+        Args:
+            user_id: User identifier
+            budget: Maximum budget
+            preferences: User preferences (amenities, location, etc.)
+            dates: Check-in and check-out dates
+            item_type: Type of item to recommend ("hotel", "tour" or "all")
+            type_quotas: Per-type slots in the merged list when item_type is "all"
+            cursor: Cursor returned with a previous page
+            page_size: Number of items per page
+            
+        Returns:
+            Dictionary with recommendations, next_cursor and total, or None if
+            the cursor is unknown, expired or belongs to another user
+        """
+        page_size = page_size or self.max_recommendations
+        
+        if cursor:
+            return await self._get_cached_page(user_id, cursor, page_size)
+        
+        user_profile, events, ranked = await self._rank_request(
+            user_id=user_id,
+            budget=budget,
+            preferences=preferences,
+            dates=dates,
+            item_type=item_type,
+            type_quotas=type_quotas
+        )
+        
+        return self._cache_ranking(
+            user_id=user_id,
+            budget=budget,
+            preferences=preferences,
+            dates=dates,
+            user_profile=user_profile,
+            events=events,
+            ranked=ranked,
+            page_size=page_size
+        )
+    
+    async def _get_cached_page(
+        self,
+        user_id: str,
+        cursor: str,
+        page_size: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Serve a page from a cached ranked list.
+        
+        Args:
+            user_id: User identifier (must match the user the list was built for)
+            cursor: Page cursor
+            page_size: Number of items per page
+            
+        Returns:
+            Page dictionary, or None if the cursor is invalid or expired
+        """
+        decoded = self.ranking_cache.decode_cursor(cursor)
+        if decoded is None:
+            return None
+        
+        token, offset = decoded
+        cached = self.ranking_cache.get(token)
+        if cached is None:
+            return None
+        
+        ranking, context = cached
+        if context['user_id'] != user_id:
+            return None
+        
+        page_slice = slice(offset, offset + page_size)
+        page_ids = ranking['ids'][page_slice]
+        
+        items_by_id, events = await asyncio.gather(
+            self._get_items_by_ids(list(page_ids)),
+            self._get_events_in_date_range(context['dates'])
+        )
+        
+        page = []
+        budget = context['budget']
+        for item_id, recommendation_score, final_score in zip(
+            page_ids,
+            ranking['recommendation_scores'][page_slice],
+            ranking['scores'][page_slice]
+        ):
+            item = items_by_id.get(item_id)
+            if item is None:
+                # Item was removed from the catalog since the list was ranked
+                continue
+            
+            rec = self._score_budget_fit(item, float(recommendation_score), budget)
+            if rec['price_usd'] > budget * 0.9:
+                rec['is_alternative'] = True
+                rec['budget_exceeded_by'] = rec['price_usd'] - budget * 0.9
+            
+            # Show event details without re-applying the boost already in the cached score
+            if events:
+                self._attach_event_details(rec, events)
+            else:
+                rec['has_events'] = False
+            rec['combined_score'] = float(final_score)
+            page.append(rec)
+        
+        recommendations = self._add_recommendation_metadata(
+            page,
+            context['user_profile'],
+            context['preferences']
+        )
+        
+        total = len(ranking['ids'])
+        next_offset = offset + page_size
+        next_cursor = None
+        if next_offset < total:
+            next_cursor = self.ranking_cache.encode_cursor(token, next_offset)
+        
+        return {
+            'recommendations': recommendations,
+            'next_cursor': next_cursor,
+            'total': total
+        }
+    
+    async def _rank_request(
+        self,
+        user_id: str,
+        budget: float,
+        preferences: Dict[str, Any],
+        dates: Dict[str, str],
+        item_type: str,
+        type_quotas: Optional[Dict[str, int]]
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]], np.ndarray]:
+        """
+        Run the recommendation pipeline and return the full ranked list.
+        
+        Returns:
+            Tuple of (user_profile, events, ranked RANKED_DTYPE array)
+        """
+        logger.info(f"Generating recommendations for user {user_id}, budget: {budget}, type: {item_type}")
+        
+        # 1. Get user profile, CF neighborhood and events once per request
+        user_profile, neighborhood, events = await asyncio.gather(
+            self._get_user_profile(user_id),
+            self._get_cf_neighborhood(user_id),
+            self._get_events_in_date_range(dates)
+        )
+        
+        item_types = self._resolve_item_types(item_type)
+        
+        # 2. Rank each item type concurrently from the shared profile and neighborhood
+        ranked_lists = await asyncio.gather(*[
+            self._rank_items(
+                user_id=user_id,
+                user_profile=user_profile,
+                neighborhood=neighborhood,
+                events=events,
+                budget=budget,
+                preferences=preferences,
+                dates=dates,
+                item_type=current_type
+            )
+            for current_type in item_types
+        ])
+        
+        ranked = self._merge_ranked_lists(item_type, item_types, ranked_lists, type_quotas)
+        return user_profile, events, ranked
+    
+    async def stream_recommendations(
+        self,
+        user_id: str,
+        budget: float,
+        preferences: Dict[str, Any],
+        dates: Dict[str, str],
+        item_type: str = "hotel",
+        type_quotas: Optional[Dict[str, int]] = None,
+        page_size: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generate recommendations progressively, refining them stage by stage.
+        
+        Stages:
+        1. "initial": popularity-ranked page, available before CF runs
+        2. "personalized": hybrid CF + CB scores with budget optimization
+        3. "final": event-boosted ranking, cached for cursor pagination
+        
+        Args:
+            user_id: User identifier
+            budget: Maximum budget
+            preferences: User preferences (amenities, location, etc.)
+            dates: Check-in and check-out dates
+            item_type: Type of item to recommend ("hotel", "tour" or "all")
+            type_quotas: Per-type slots in the merged list when item_type is "all"
+            page_size: Number of items per page
+            
+        Yields:
+            Dictionaries with stage, recommendations and total; the final stage
+            also carries next_cursor
+        """
+        page_size = page_size or self.max_recommendations
+        item_types = self._resolve_item_types(item_type)
+        
+        # Start the expensive lookups right away so they overlap the first page
+        neighborhood_task = asyncio.create_task(self._get_cf_neighborhood(user_id))
+        events_task = asyncio.create_task(self._get_events_in_date_range(dates))
+        
+        try:
+            user_profile, popularity, *available_rows = await asyncio.gather(
+                self._get_user_profile(user_id),
+                self._get_item_popularity(),
+                *[
+                    self._query_available_rows(
+                        budget=budget,
+                        dates=dates,
+                        item_type=current_type,
+                        preferences=preferences
+                    )
+                    for current_type in item_types
+                ]
+            )
+            
+            # 1. Cheap popularity-ranked page
+            initial_lists = [
+                self._budget_rank(rows, self._popularity_scores(rows, popularity), budget)
+                for rows in available_rows
+            ]
+            initial = self._merge_ranked_lists(item_type, item_types, initial_lists, type_quotas)
+            yield {
+                'stage': 'initial',
+                'recommendations': self._add_recommendation_metadata(
+                    self._materialize(initial[:page_size], budget),
+                    user_profile,
+                    preferences
+                ),
+                'total': len(initial)
+            }
+            
+            # 2. Personalized hybrid scores, each item type concurrently as in _rank_request
+            neighborhood = await neighborhood_task
+            scored_lists = await asyncio.gather(*[
+                self._score_items(user_id, user_profile, neighborhood, rows, budget)
+                for rows in available_rows
+            ])
+            scored = self._merge_ranked_lists(item_type, item_types, scored_lists, type_quotas)
+            yield {
+                'stage': 'personalized',
+                'recommendations': self._add_recommendation_metadata(
+                    self._materialize(scored[:page_size], budget),
+                    user_profile,
+                    preferences
+                ),
+                'total': len(scored)
+            }
+            
+            # 3. Event-boosted final ranking
+            events = await events_task
+            final_lists = [
+                self._apply_event_boosts(ranked, events)
+                for ranked in scored_lists
+            ]
+            final = self._merge_ranked_lists(item_type, item_types, final_lists, type_quotas)
+            page = self._cache_ranking(
+                user_id=user_id,
+                budget=budget,
+                preferences=preferences,
+                dates=dates,
+                user_profile=user_profile,
+                events=events,
+                ranked=final,
+                page_size=page_size
+            )
+            yield {'stage': 'final', **page}
+            
+        finally:
+            neighborhood_task.cancel()
+            events_task.cancel()
+    
+    async def get_bundle_recommendations(
+        self,
+        user_id: str,
+        budget: float,
+        preferences: Dict[str, Any],
+        dates: Dict[str, str],
+        nights: Optional[int] = None,
+        max_tours: int = 3,
+        max_bundles: int = 3
+    ) -> List[Dict[str, Any]]:
+        """
+        Recommend trip bundles: one hotel for the stay plus tours and events.
+        
+        Hotels and tours are scored with the hybrid pipeline (including event
+        boosts); the bundle optimizer then picks the hotel and up to max_tours
+        tours/events maximizing the total score within 90% of the budget.
+        Tours and events are only bundled with hotels in the same city, and
+        events without a price are left out.
+        
+        Args:
+            user_id: User identifier
+            budget: Maximum budget for the whole trip
+            preferences: User preferences (amenities, location, etc.)
+            dates: Check-in and check-out dates
+            nights: Number of hotel nights; derived from dates when omitted
+            max_tours: Maximum number of tours and events per bundle
+            max_bundles: Number of bundles to return, each with a different hotel
+            
+        Returns:
+            List of bundles sorted by bundle score
+        """
+        try:
+            if nights is None:
+                nights = 1
+                if dates.get('check_in') and dates.get('check_out'):
+                    nights = max(1, self.data_processor.calculate_date_range(
+                        dates['check_in'],
+                        dates['check_out']
+                    ))
+            
+            user_profile, neighborhood, events = await asyncio.gather(
+                self._get_user_profile(user_id),
+                self._get_cf_neighborhood(user_id),
+                self._get_events_in_date_range(dates)
+            )
+            
+            # Only items that fit the trip budget on their own can be in a bundle
+            budget_threshold = budget * 0.9
+            hotel_rows, tour_rows = await asyncio.gather(
+                self._query_available_rows(budget_threshold / nights, dates, 'hotel', preferences),
+                self._query_available_rows(budget_threshold, dates, 'tour', preferences)
+            )
+            
+            hotels, tours = await asyncio.gather(
+                self._bundle_candidates(user_id, user_profile, neighborhood, hotel_rows, events),
+                self._bundle_candidates(user_id, user_profile, neighborhood, tour_rows, events)
+            )
+            
+            # Events are add-ons scored like a same-city event boost; an
+            # event without a price cannot be costed, so it is not offered
+            events = [e for e in events if e.get('price') is not None]
+            event_scores = np.array([
+                min(0.25, 0.15 + (0.05 if e.get('event_type') == 'festival' else 0.0))
+                for e in events
+            ])
+            event_costs = np.array([
+                self.data_processor.normalize_price(float(e['price']), e.get('currency', 'USD'))
+                for e in events
+            ], dtype=np.float64)
+            event_cities = np.array([
+                self.catalog.location_key(e.get('location', {}).get('city', ''))
+                for e in events
+            ], dtype=np.int32)
+            
+            tour_costs = self.catalog.price_usd[tours['row']].astype(np.float64)
+            hotel_costs = self.catalog.price_usd[hotels['row']].astype(np.float64) * nights
+            
+            addon_costs = np.concatenate([tour_costs, event_costs])
+            addon_scores = np.concatenate([tours['combined_score'], event_scores])
+            addon_cities = np.concatenate([self.catalog.city_key[tours['row']], event_cities])
+            hotel_cities = self.catalog.city_key[hotels['row']]
+            
+            # One add-on DP per city; hotels without a known city get no add-ons
+            bundles = []
+            for city in np.unique(hotel_cities):
+                hotel_indices = np.flatnonzero(hotel_cities == city)
+                addon_indices = np.flatnonzero(addon_cities == city) if city >= 0 else np.zeros(0, dtype=np.int64)
+                
+                for bundle in self.bundle_optimizer.optimize(
+                    hotel_costs=hotel_costs[hotel_indices],
+                    hotel_scores=hotels['combined_score'][hotel_indices],
+                    addon_costs=addon_costs[addon_indices],
+                    addon_scores=addon_scores[addon_indices],
+                    budget=budget_threshold,
+                    max_addons=max_tours,
+                    max_bundles=max_bundles
+                ):
+                    bundle['hotel_index'] = int(hotel_indices[bundle['hotel_index']])
+                    bundle['addon_indices'] = [int(addon_indices[i]) for i in bundle['addon_indices']]
+                    bundles.append(bundle)
+            
+            bundles = sorted(bundles, key=lambda bundle: -bundle['score'])[:max_bundles]
+            
+            results = []
+            for bundle in bundles:
+                hotel_index = bundle['hotel_index']
+                hotel = self._bundle_item(hotels[hotel_index], hotel_costs[hotel_index])
+                hotel['nights'] = nights
+                
+                bundle_tours = []
+                bundle_events = []
+                for index in bundle['addon_indices']:
+                    if index < len(tours):
+                        bundle_tours.append(self._bundle_item(tours[index], tour_costs[index]))
+                    else:
+                        event = dict(events[index - len(tours)])
+                        event['cost_usd'] = float(event_costs[index - len(tours)])
+                        bundle_events.append(event)
+                
+                results.append({
+                    'hotel': hotel,
+                    'tours': bundle_tours,
+                    'events': bundle_events,
+                    'total_price_usd': round(bundle['cost'], 2),
+                    'remaining_budget': round(budget - bundle['cost'], 2),
+                    'bundle_score': bundle['score']
+                })
+            
+            logger.info(f"Generated {len(results)} bundles for user {user_id}")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error generating bundles: {str(e)}", exc_info=True)
+            return []
+    
+    async def _bundle_candidates(
+        self,
+        user_id: str,
+        user_profile: Dict[str, Any],
+        neighborhood: List[Tuple[str, float]],
+        rows: np.ndarray,
+        events: List[Dict[str, Any]]
+    ) -> np.ndarray:
+        """
+        Score bundle candidates without per-item budget filtering.
+        
+        Returns:
+            RANKED_DTYPE array in row order, with event-boosted combined scores
+        """
+        ranked = np.zeros(len(rows), dtype=RANKED_DTYPE)
+        if len(rows) == 0:
+            return ranked
+        
+        ranked['row'] = rows
+        ranked['recommendation_score'] = await self._hybrid_scores(user_id, user_profile, neighborhood, rows)
+        ranked['combined_score'] = ranked['recommendation_score']
+        
+        boosted = self._apply_event_boosts(ranked, events)
+        return boosted[np.argsort(boosted['row'], kind='stable')]
+    
+    def _bundle_item(self, entry: np.void, cost: float) -> Dict[str, Any]:
+        """Build the response dictionary for one bundle item."""
+        item = self.catalog.to_dict(int(entry['row']))
+        item['recommendation_score'] = float(entry['recommendation_score'])
+        item['combined_score'] = float(entry['combined_score'])
+        item['cost_usd'] = round(float(cost), 2)
+        return item
+    
+    def _resolve_item_types(self, item_type: str) -> List[str]:
+        """Expand a requested item type into the item types to rank."""
+        return list(self.ITEM_TYPES) if item_type == "all" else [item_type]
+    
+    def _merge_ranked_lists(
+        self,
+        item_type: str,
+        item_types: List[str],
+        ranked_lists: List[np.ndarray],
+        type_quotas: Optional[Dict[str, int]]
+    ) -> np.ndarray:
+        """Combine per-type ranked lists into the ranked list for the request."""
+        if item_type != "all":
+            return ranked_lists[0]
+        
+        return self._merge_with_quotas(
+            dict(zip(item_types, ranked_lists)),
+            type_quotas or self.DEFAULT_TYPE_QUOTAS,
+            limit=self.max_recommendations
+        )
+    
+    def _cache_ranking(
+        self,
+        user_id: str,
+        budget: float,
+        preferences: Dict[str, Any],
+        dates: Dict[str, str],
+        user_profile: Dict[str, Any],
+        events: List[Dict[str, Any]],
+        ranked: np.ndarray,
+        page_size: int
+    ) -> Dict[str, Any]:
+        """
+        Cache a full ranked list and build its first page.
+        
+        Returns:
+            Dictionary with recommendations, next_cursor and total
+        """
+        ids = np.empty(len(ranked), dtype=object)
+        ids[:] = [self.catalog.ids[row] for row in ranked['row']]
+        
+        ranking = {
+            'ids': ids,
+            'recommendation_scores': ranked['recommendation_score'].copy(),
+            'scores': ranked['combined_score'].copy()
+        }
+        token = self.ranking_cache.put(ranking, {
+            'user_id': user_id,
+            'budget': budget,
+            'preferences': preferences,
+            'dates': dates,
+            'user_profile': user_profile
+        })
+        
+        recommendations = self._add_recommendation_metadata(
+            self._materialize(ranked[:page_size], budget, events),
+            user_profile,
+            preferences
+        )
+        
+        next_cursor = None
+        if len(ranked) > page_size:
+            next_cursor = self.ranking_cache.encode_cursor(token, page_size)
+        
+        return {
+            'recommendations': recommendations,
+            'next_cursor': next_cursor,
+            'total': len(ranked)
+        }
+    
+    async def _rank_items(
+        self,
+        user_id: str,
+        user_profile: Dict[str, Any],
+        neighborhood: List[Tuple[str, float]],
+        events: List[Dict[str, Any]],
+        budget: float,
+        preferences: Dict[str, Any],
+        dates: Dict[str, str],
+        item_type: str
+    ) -> np.ndarray:
+        """
+        Score and rank the available items of a single type.
+        
+        Args:
+            user_id: User identifier
+            user_profile: Shared user profile
+            neighborhood: Shared list of (similar_user_id, similarity) tuples
+            events: Events happening during the travel dates
+            budget: Maximum budget
+            preferences: User preferences
+            dates: Travel dates
+            item_type: Type of item to rank ("hotel" or "tour")
+            
+        Returns:
+            Full ranked RANKED_DTYPE array including event boosts
+        """
+        # Get available items within date range and budget
+        rows = await self._query_available_rows(
+            budget=budget,
+            dates=dates,
+            item_type=item_type,
+            preferences=preferences
+        )
+        
+        if len(rows) == 0:
+            logger.warning(f"No available {item_type} items found for budget {budget}")
+            return np.zeros(0, dtype=RANKED_DTYPE)
+        
+        logger.info(f"Found {len(rows)} available {item_type} items")
+        
+        ranked = await self._score_items(user_id, user_profile, neighborhood, rows, budget)
+        
+        # Integrate real-time event data
+        return self._apply_event_boosts(ranked, events)
+    
+    async def _score_items(
+        self,
+        user_id: str,
+        user_profile: Dict[str, Any],
+        neighborhood: List[Tuple[str, float]],
+        rows: np.ndarray,
+        budget: float
+    ) -> np.ndarray:
+        """
+        Apply hybrid scoring and budget optimization to catalog rows.
+        
+        Returns:
+            Budget-optimized RANKED_DTYPE array ranked by combined score
+        """
+        if len(rows) == 0:
+            return np.zeros(0, dtype=RANKED_DTYPE)
+        
+        # Only re-rank the best embedding matches of large candidate sets
+        if 0 < settings.RETRIEVAL_CANDIDATES < len(rows):
+            rows = await self._retrieve_candidates(user_id, user_profile, rows)
+        
+        # Score the rest of very large sets in worker processes
+        if self.parallel_scorer.should_parallelize(len(rows)):
+            ranked = await self._parallel_score_items(user_id, user_profile, neighborhood, rows, budget)
+            if ranked is not None:
+                return ranked
+        
+        final_scores = await self._hybrid_scores(user_id, user_profile, neighborhood, rows)
+        
+        # Apply budget constraints and optimization
+        return self._budget_rank(rows, final_scores, budget)
+    
+    async def _parallel_score_items(
+        self,
+        user_id: str,
+        user_profile: Dict[str, Any],
+        neighborhood: List[Tuple[str, float]],
+        rows: np.ndarray,
+        budget: float
+    ) -> Optional[np.ndarray]:
+        """
+        Score a large candidate set in chunks across the process pool.
+        
+        Collaborative and trend scores are gathered here, since they read
+        engine state; workers compute content scores from catalog columns
+        in shared memory. A first pass finds the content score range over
+        all candidates, so the min-max normalization matches inline
+        scoring, and a second pass returns each chunk's best rows within
+        budget, merged into the top PARALLEL_SCORING_TOP_K.
+        
+        Returns:
+            RANKED_DTYPE array ranked by combined score, or None to score
+            inline (on failure, or when fewer than three rows fit the budget
+            and over-budget alternatives are needed)
+        """
+        scoring = None
+        try:
+            scoring = self._get_scoring_arrays()
+            scoring['requests'] += 1
+            request_arrays = {
+                'rows': rows,
+                'cf_scores': await self._collaborative_scores(user_id, self.catalog, rows, neighborhood),
+                'trend_scores': self._trend_scores(self.catalog, rows)
+            }
+            params = self._scoring_params(scoring, user_profile, budget, request_arrays['trend_scores'].any())
+            
+            request = SharedArrays(request_arrays)
+            try:
+                ranges = await self.parallel_scorer.map_chunks(
+                    hybrid_scoring.content_score_range, scoring['shared'], request, params, len(rows)
+                )
+                params['content_range'] = (min(low for low, _ in ranges), max(high for _, high in ranges))
+                
+                positions, _ = await self.parallel_scorer.top_k(
+                    hybrid_scoring.within_budget_scores, scoring['shared'], request, params,
+                    len(rows), settings.PARALLEL_SCORING_TOP_K
+                )
+            finally:
+                request.close()
+            
+            if len(positions) < 3:
+                return None
+            
+            # Rebuild the full score breakdown of the kept rows, in row order for stable ties
+            positions = np.sort(positions)
+            recommendation, values, combined = hybrid_scoring.hybrid_parts(
+                {**scoring['arrays'], **request_arrays}, params, positions
+            )
+            
+            ranked = np.zeros(len(positions), dtype=RANKED_DTYPE)
+            ranked['row'] = rows[positions]
+            ranked['recommendation_score'] = recommendation
+            ranked['value_score'] = values
+            ranked['combined_score'] = combined
+            
+            logger.info(f"Scored {len(rows)} candidates in parallel, kept {len(ranked)}")
+            return self._sort_ranked(ranked)
+            
+        except Exception as e:
+            logger.error(f"Error in parallel scoring: {str(e)}", exc_info=True)
+            return None
+        
+        finally:
+            if scoring is not None:
+                scoring['requests'] -= 1
+                # Columns replaced while this request used them are freed by the last user
+                if scoring['requests'] == 0 and scoring is not self._scoring_arrays:
+                    scoring['shared'].close()
+    
+    def _scoring_params(
+        self,
+        scoring: Dict[str, Any],
+        user_profile: Dict[str, Any],
+        budget: float,
+        has_trends: bool
+    ) -> Dict[str, Any]:
+        """Build the per-request parameters of the hybrid scoring kernels."""
+        user_vector = self.feature_extractor.extract_user_preferences(user_profile)
+        width = scoring['arrays']['content_units'].shape[1]
+        
+        # One user unit vector per item type, over that type's leading features
+        user_units = np.zeros((len(self.catalog.ITEM_TYPES), width), dtype=np.float32)
+        for code, dim in enumerate(scoring['content_dims']):
+            user_units[code, :dim] = self.feature_extractor.normalize_rows(user_vector[:dim])
+        
+        preferred_amenities = set(user_profile.get('preferred_amenities', []))
+        return {
+            'user_units': user_units,
+            'preferred_mask': self.catalog.tag_mask('amenities', preferred_amenities),
+            'num_preferred': len(preferred_amenities),
+            'user_budget': user_profile.get('budget', 100),
+            'budget': budget,
+            'collaborative_weight': self.collaborative_weight,
+            'content_weight': self.content_weight,
+            'trend_weight': settings.TRENDING_RANKING_WEIGHT if has_trends else 0.0
+        }
+    
+    def _get_scoring_arrays(self) -> Dict[str, Any]:
+        """
+        Get the catalog columns used by parallel scoring, republishing them
+        after catalog changes.
+        
+        Any row write bumps the catalog revision, so in-place updates such
+        as new prices are published too, not only added rows.
+        """
+        catalog = self.catalog
+        scoring = self._scoring_arrays
+        if scoring is not None and scoring['catalog'] is catalog and scoring['catalog_revision'] == catalog.revision:
+            return scoring
+        
+        revision = catalog.revision
+        user_dim = len(self.feature_extractor.extract_user_preferences({}))
+        content_units = np.zeros((len(catalog), user_dim), dtype=np.float32)
+        content_dims = []
+        
+        # Unit content vectors over the features each type shares with the user vector
+        for item_type in catalog.ITEM_TYPES:
+            rows = catalog.rows_of_type(item_type)
+            if item_type == 'hotel':
+                features = self.feature_extractor.extract_catalog_hotel_features(catalog, rows)
+            else:
+                features = self.feature_extractor.extract_catalog_tour_features(catalog, rows)
+            
+            dim = min(user_dim, features.shape[1])
+            content_units[rows, :dim] = self.feature_extractor.normalize_rows(features[:, :dim])
+            content_dims.append(dim)
+        
+        arrays = {
+            'content_units': content_units,
+            'item_type': catalog.item_type,
+            'amenity_mask': catalog.amenity_mask,
+            'price_usd': catalog.price_usd,
+            'rating': catalog.rating
+        }
+        
+        # Requests still scoring against the old columns release them when done
+        if scoring is not None and scoring['requests'] == 0:
+            scoring['shared'].close()
+        
+        shared = SharedArrays(arrays)
+        self._scoring_arrays = {
+            'arrays': arrays,
+            'shared': shared,
+            'content_dims': content_dims,
+            'catalog': catalog,
+            'catalog_revision': revision,
+            'requests': 0
+        }
+        logger.info(f"Published {shared.nbytes / 1e6:.1f} MB of scoring columns for {len(catalog)} items")
+        return self._scoring_arrays
+    
+    async def _retrieve_candidates(
+        self,
+        user_id: str,
+        user_profile: Dict[str, Any],
+        rows: np.ndarray
+    ) -> np.ndarray:
+        """
+        Narrow catalog rows down to the user's best two-tower matches.
+        
+        The user embedding is searched in the item type's IVF index,
+        restricted to the given rows, keeping RETRIEVAL_CANDIDATES rows per
+        item type for precise hybrid scoring. Items booked together with the
+        user's history are always kept, since the co-visitation fallback
+        can rank them highly.
+        
+        Args:
+            user_id: User identifier
+            user_profile: User preferences and history
+            rows: Available catalog rows
+            
+        Returns:
+            Retrieved rows in ascending order; all rows if retrieval fails
+        """
+        try:
+            limit = settings.RETRIEVAL_CANDIDATES
+            item_types = self.catalog.item_type[rows]
+            candidates = []
+            
+            for item_type in self.catalog.ITEM_TYPES:
+                type_rows = rows[item_types == self.catalog.type_code(item_type)]
+                if len(type_rows) <= limit:
+                    candidates.append(type_rows)
+                    continue
+                
+                retrieval = await self._get_retrieval_index(item_type)
+                positions = retrieval['position_of'][type_rows]
+                mask = np.zeros(len(retrieval['rows']), dtype=bool)
+                mask[positions[positions >= 0]] = True
+                
+                query = self._user_embedding(user_id, user_profile, retrieval)
+                found, _ = retrieval['index'].search(query, limit, mask)
+                candidates.append(retrieval['rows'][found])
+                candidates.append(np.intersect1d(await self._co_booked_rows(user_id), type_rows))
+            
+            retrieved = np.unique(np.concatenate(candidates))
+            logger.info(f"Retrieved {len(retrieved)} of {len(rows)} candidates for {user_id}")
+            return retrieved
+            
+        except Exception as e:
+            logger.error(f"Error retrieving candidates: {str(e)}", exc_info=True)
+            return rows
+    
+    async def _co_booked_rows(self, user_id: str) -> np.ndarray:
+        """Get catalog rows of items booked together with the user's history."""
+        history = await self._get_user_ratings(user_id)
+        if not history:
+            return np.zeros(0, dtype=np.int64)
+        
+        covisitation = await self._get_covisitation()
+        co_booked = [
+            neighbor_id
+            for item_id in history
+            for neighbor_id, _ in covisitation.neighbors(item_id)
+        ]
+        return self.catalog.rows_of(co_booked)
+    
+    async def _get_retrieval_index(self, item_type: str) -> Dict[str, Any]:
+        """Get the retrieval index of an item type, rebuilding it after changes."""
+        # Sharded ratings are not gathered to factorize them; the index then
+        # holds content features only and co-bookings add CF candidates
+        rating_matrix = None
+        if self.interaction_store is None:
+            user_item_matrix = await self._build_user_item_matrix()
+            rating_matrix = self._get_rating_matrix(user_item_matrix) if user_item_matrix else None
+        
+        # Any row write bumps the catalog revision, including in-place updates
+        retrieval = self.retrieval_indexes.get(item_type)
+        if (
+            retrieval is None
+            or retrieval['catalog'] is not self.catalog
+            or retrieval['catalog_revision'] != self.catalog.revision
+            or retrieval['rating_matrix'] is not rating_matrix
+        ):
+            retrieval = await asyncio.to_thread(self._build_retrieval_index, item_type, rating_matrix)
+            self.retrieval_indexes[item_type] = retrieval
+        return retrieval
+    
+    def _build_retrieval_index(
+        self,
+        item_type: str,
+        rating_matrix: Optional[RatingMatrix]
+    ) -> Dict[str, Any]:
+        """
+        Embed the items of one type and index them.
+        
+        The item tower concatenates the unit content feature vector and the
+        unit SVD item factor, scaled by the square roots of the CB and CF
+        weights, so the inner product with a user embedding built the same
+        way is the weighted sum of both cosines.
+        
+        Args:
+            item_type: Type of item to index ("hotel" or "tour")
+            rating_matrix: Ratings to factorize, or None for content only
+            
+        Returns:
+            Dictionary with the index, its catalog rows and the user factors
+        """
+        catalog = self.catalog
+        revision = catalog.revision
+        rows = catalog.rows_of_type(item_type)
+        
+        if item_type == 'hotel':
+            features = self.feature_extractor.extract_catalog_hotel_features(catalog, rows)
+        else:
+            features = self.feature_extractor.extract_catalog_tour_features(catalog, rows)
+        
+        # Compare the same leading features as the content scorer
+        content_dim = min(len(self.feature_extractor.extract_user_preferences({})), features.shape[1])
+        content = self.feature_extractor.normalize_rows(features[:, :content_dim])
+        
+        user_factors = None
+        item_factors = np.zeros((len(rows), 0), dtype=np.float32)
+        factors = rating_matrix.factors(settings.RETRIEVAL_FACTOR_RANK) if rating_matrix else None
+        if factors is not None:
+            user_factors, all_item_factors = factors
+            user_factors = QuantizedMatrix(
+                self.feature_extractor.normalize_rows(user_factors),
+                settings.RETRIEVAL_VECTOR_DTYPE
+            )
+            
+            # Items nobody rated get a zero factor
+            columns = np.array([rating_matrix.item_index.get(catalog.ids[row], -1) for row in rows], dtype=np.int64)
+            item_factors = np.where((columns >= 0)[:, None], all_item_factors[columns], 0.0)
+            item_factors = self.feature_extractor.normalize_rows(item_factors)
+        
+        embeddings = np.hstack([
+            np.sqrt(self.content_weight) * content,
+            np.sqrt(self.collaborative_weight) * item_factors
+        ])
+        
+        position_of = np.full(len(catalog), -1, dtype=np.int64)
+        position_of[rows] = np.arange(len(rows))
+        
+        index = IVFIndex(
+            num_lists=settings.RETRIEVAL_NUM_LISTS,
+            nprobe=settings.RETRIEVAL_NPROBE,
+            dtype=settings.RETRIEVAL_VECTOR_DTYPE
+        ).build(embeddings)
+        
+        return {
+            'index': index,
+            'rows': rows,
+            'position_of': position_of,
+            'content_dim': content_dim,
+            'factor_dim': item_factors.shape[1],
+            'user_factors': user_factors,
+            'rating_matrix': rating_matrix,
+            'catalog': catalog,
+            'catalog_revision': revision
+        }
+    
+    def _user_embedding(
+        self,
+        user_id: str,
+        user_profile: Dict[str, Any],
+        retrieval: Dict[str, Any]
+    ) -> np.ndarray:
+        """Build the user tower embedding matching a retrieval index."""
+        user_vector = self.feature_extractor.extract_user_preferences(user_profile)
+        content = self.feature_extractor.normalize_rows(user_vector[:retrieval['content_dim']])
+        
+        # Users without ratings only match on content
+        factor = np.zeros(retrieval['factor_dim'], dtype=np.float32)
+        if retrieval['user_factors'] is not None:
+            user_row = retrieval['rating_matrix'].user_index.get(user_id)
+            if user_row is not None:
+                factor = retrieval['user_factors'].rows(user_row)
+        
+        return np.concatenate([
+            np.sqrt(self.content_weight) * content,
+            np.sqrt(self.collaborative_weight) * factor
+        ]).astype(np.float32)
+    
+    async def _hybrid_scores(
+        self,
+        user_id: str,
+        user_profile: Dict[str, Any],
+        neighborhood: List[Tuple[str, float]],
+        rows: np.ndarray
+    ) -> np.ndarray:
+        """
+        Calculate hybrid CF + CB scores for catalog rows.
+        
+        Returns:
+            Array of scores for each row (0-1 range)
+        """
+        # Calculate collaborative filtering scores
+        cf_scores = await self._collaborative_scores(user_id, self.catalog, rows, neighborhood)
+        
+        # Calculate content-based filtering scores
+        cb_scores = self._content_scores(user_profile, self.catalog, rows)
+        
+        # Combine scores using hybrid approach (60% CF, 40% CB)
+        scores = (self.collaborative_weight * cf_scores + 
+                  self.content_weight * cb_scores)
+        
+        # Blend in what is trending once views or bookings have been recorded
+        trend_scores = self._trend_scores(self.catalog, rows)
+        if trend_scores.any():
+            weight = settings.TRENDING_RANKING_WEIGHT
+            scores = (1 - weight) * scores + weight * trend_scores
+        
+        return scores
+    
+    def _trend_scores(self, catalog: ItemCatalog, rows: np.ndarray) -> np.ndarray:
+        """
+        Get log-scaled trend scores for catalog rows.
+        
+        Returns:
+            Array of scores for each row (0-1 range, 1 for the most trending row)
+        """
+        raw = self.trending.scores([catalog.ids[row] for row in rows])
+        if len(raw) == 0 or raw.max() <= 0:
+            return np.zeros(len(rows))
+        return np.log1p(raw) / np.log1p(raw.max())
+    
+    def _merge_with_quotas(
+        self,
+        ranked_lists: Dict[str, np.ndarray],
+        quotas: Dict[str, int],
+        limit: int
+    ) -> np.ndarray:
+        """
+        Merge per-type ranked lists into one list honouring per-type quotas.
         
-        # Cache for user-item interactions
-        self.user_item_matrix = {}
-        self.user_similarity_cache = {}
+        Each type first fills its own quota of the first `limit` slots from the
+        top of its list; slots a type cannot fill are given to the best
+        remaining items of any type. Everything else follows in score order.
+        
+        Args:
+            ranked_lists: Ranked RANKED_DTYPE arrays keyed by item type
+            quotas: Number of slots reserved for each item type
+            limit: Number of leading slots governed by the quotas
+            
+        Returns:
+            Merged array; the first `limit` items are sorted by combined score
+        """
+        selected = []
+        leftovers = []
+        
+        for current_type, ranked in ranked_lists.items():
+            quota = max(0, quotas.get(current_type, 0))
+            selected.append(ranked[:quota])
+            leftovers.append(ranked[quota:])
+        
+        selected = self._sort_ranked(np.concatenate(selected))
+        leftovers = self._sort_ranked(np.concatenate(leftovers + [selected[limit:]]))
+        selected = selected[:limit]
+        
+        # Backfill slots that a type could not fill with the best remaining items
+        backfill = limit - len(selected)
+        if backfill > 0:
+            selected = self._sort_ranked(np.concatenate([selected, leftovers[:backfill]]))
+            leftovers = leftovers[backfill:]
+        
+        return np.concatenate([selected, leftovers])
     
-    async def get_recommendations(
+    @staticmethod
+    def _sort_ranked(ranked: np.ndarray) -> np.ndarray:
+        """Sort ranked items by combined score, keeping ties in order."""
+        return ranked[np.argsort(-ranked['combined_score'], kind='stable')]
+    
+    def _materialize(
         self,
-        user_id: str,
+        ranked: np.ndarray,
         budget: float,
-        preferences: Dict[str, Any],
-        dates: Dict[str, str],
-        item_type: str = "hotel"
+        events: Optional[List[Dict[str, Any]]] = None
     ) -> List[Dict[str, Any]]:
         """
-        Generate personalized recommendations for a user.
+        Build response dictionaries for ranked catalog rows.
         
         Args:
-            user_id: User identifier
+            ranked: RANKED_DTYPE array, already cut to the page being returned
             budget: Maximum budget
-            preferences: User preferences (amenities, location, etc.)
-            dates: Check-in and check-out dates
-            item_type: Type of item to recommend ("hotel" or "tour")
+            events: Events during the travel dates; None skips event details
             
         Returns:
-            List of recommended hotels/tours with scores and confidence
+            Item dictionaries with score, budget and event fields
         """
-        try:
-            logger.info(f"Generating recommendations for user {user_id}, budget: {budget}, type: {item_type}")
-            
-            # 1. Get user profile and history
-            user_profile = await self._get_user_profile(user_id)
-            
-            # 2. Get available items within date range and budget
-            available_items = await self._query_available_items(
-                budget=budget,
-                dates=dates,
-                item_type=item_type,
-                preferences=preferences
-            )
-            
-            if not available_items:
-                logger.warning(f"No available items found for budget {budget}")
-                return []
-            
-            logger.info(f"Found {len(available_items)} available items")
-            
-            # 3. Calculate collaborative filtering scores
-            cf_scores = await self.calculate_collaborative_score(user_id, available_items)
-            
-            # 4. Calculate content-based filtering scores
-            cb_scores = self.calculate_content_score(user_profile, available_items)
-            
-            # 5. Combine scores using hybrid approach (60% CF, 40% CB)
-            final_scores = (self.collaborative_weight * cf_scores + 
-                          self.content_weight * cb_scores)
-            
-            # 6. Apply budget constraints and optimization
-            optimized_items = self.apply_budget_optimization(
-                available_items,
-                final_scores,
-                budget
-            )
-            
-            # 7. Integrate real-time event data
-            enhanced_items = await self.integrate_events(optimized_items, dates)
+        recommendations = []
+        
+        for entry in ranked:
+            item = self.catalog.to_dict(int(entry['row']))
+            rec = self._score_budget_fit(item, float(entry['recommendation_score']), budget)
             
-            # 8. Add confidence scores and explanations
-            recommendations = self._add_recommendation_metadata(
-                enhanced_items,
-                user_profile,
-                preferences
-            )
+            if entry['is_alternative']:
+                rec['is_alternative'] = True
+                rec['budget_exceeded_by'] = rec['price_usd'] - budget * 0.9
             
-            logger.info(f"Generated {len(recommendations)} recommendations")
-            return recommendations[:10]  # Return top 10
+            if events is not None:
+                if events:
+                    self._attach_event_details(rec, events)
+                else:
+                    rec['has_events'] = False
             
-        except Exception as e:
-            logger.error(f"Error generating recommendations: {str(e)}", exc_info=True)
-            return []
+            rec['combined_score'] = float(entry['combined_score'])
+            recommendations.append(rec)
+        
+        return recommendations
     
     async def calculate_collaborative_score(
         self,
         user_id: str,
-        items: List[Dict[str, Any]]
+        items: List[Dict[str, Any]],
+        neighborhood: Optional[List[Tuple[str, float]]] = None
     ) -> np.ndarray:
         """
         Calculate collaborative filtering scores based on user-user similarity.
@@ -125,68 +1298,82 @@ class RecommendationEngine:
         Args:
             user_id: User identifier
             items: Available items to score
+            neighborhood: Precomputed similar users; looked up when omitted
             
         Returns:
             Array of scores for each item (0-1 range)
         """
-        try:
-            # Get user interaction history (bookings + ratings)
-            user_interactions = await self._get_user_interactions(user_id)
-            
-            if not user_interactions:
-                # Cold start: return neutral scores
-                logger.info(f"Cold start for user {user_id}, returning neutral scores")
-                return np.ones(len(items)) * 0.5
+        catalog = ItemCatalog.from_items(items)
+        return await self._collaborative_scores(
+            user_id,
+            catalog,
+            np.arange(len(items)),
+            neighborhood
+        )
+    
+    async def _collaborative_scores(
+        self,
+        user_id: str,
+        catalog: ItemCatalog,
+        rows: np.ndarray,
+        neighborhood: Optional[List[Tuple[str, float]]] = None
+    ) -> np.ndarray:
+        """
+        Calculate collaborative filtering scores for catalog rows.
+        
+        Neighbor ratings are summed per item with sparse matrix-vector
+        products over the float32 rating matrix.
+        
+        Args:
+            user_id: User identifier
+            catalog: Catalog holding the rows
+            rows: Catalog rows to score
+            neighborhood: Precomputed similar users; looked up when omitted
             
-            # Build user-item matrix for collaborative filtering
-            user_item_matrix = await self._build_user_item_matrix()
+        Returns:
+            Array of scores for each row (0-1 range)
+        """
+        try:
+            # Find similar users unless a shared neighborhood was provided
+            similar_users = neighborhood
+            if similar_users is None:
+                similar_users = await self._get_cf_neighborhood(user_id)
             
-            if not user_item_matrix or user_id not in user_item_matrix:
-                logger.info(f"User {user_id} not in interaction matrix")
-                return np.ones(len(items)) * 0.5
+            if not similar_users:
+                # No neighbors: fall back to items booked with the user's history
+                return await self._covisitation_scores(user_id, catalog, rows)
             
-            # Find similar users using cosine similarity
-            similar_users = await self._find_similar_users(
-                user_id,
-                user_item_matrix,
-                top_k=10
-            )
+            rating_matrix = await self._get_neighbor_rating_matrix(similar_users)
             
-            if not similar_users:
-                logger.info(f"No similar users found for {user_id}")
-                return np.ones(len(items)) * 0.5
+            # Weight each rating of the similar users by user similarity
+            user_weights = np.zeros(rating_matrix.num_users, dtype=np.float32)
+            for similar_user_id, similarity in similar_users:
+                user_row = rating_matrix.user_index.get(similar_user_id)
+                if user_row is not None:
+                    user_weights[user_row] = similarity
             
-            logger.info(f"Found {len(similar_users)} similar users for {user_id}")
+            item_scores, item_weights = rating_matrix.weighted_item_sums(user_weights)
             
-            # Calculate scores based on similar users' preferences
-            scores = np.zeros(len(items))
+            # Gather per-item sums for the rows; items nobody rated get zero weight
+            columns = np.array(
+                [rating_matrix.item_index.get(catalog.ids[row], -1) for row in rows],
+                dtype=np.int64
+            )
+            known = columns >= 0
+            weighted_score = np.where(known, item_scores[columns], 0.0).astype(np.float32)
+            total_weight = np.where(known, item_weights[columns], 0.0).astype(np.float32)
+            
+            # No data from similar users: use item popularity (average rating)
+            avg_rating = np.nan_to_num(catalog.rating[rows], nan=3.0)
+            has_data = total_weight > 0
+            predicted_rating = np.where(
+                has_data,
+                weighted_score / np.where(has_data, total_weight, 1.0),
+                avg_rating
+            )
             
-            for idx, item in enumerate(items):
-                item_id = item.get('id')
-                weighted_score = 0.0
-                total_weight = 0.0
-                
-                for similar_user_id, similarity in similar_users:
-                    # Check if similar user interacted with this item
-                    user_rating = await self._get_user_item_rating(
-                        similar_user_id,
-                        item_id
-                    )
-                    
-                    if user_rating is not None:
-                        # Weight the rating by user similarity
-                        weighted_score += similarity * user_rating
-                        total_weight += similarity
-                
-                # Calculate predicted rating
-                if total_weight > 0:
-                    predicted_rating = weighted_score / total_weight
-                    # Normalize to 0-1 range (assuming ratings are 1-5)
-                    scores[idx] = (predicted_rating - 1) / 4.0
-                else:
-                    # No data from similar users, use item popularity
-                    avg_rating = item.get('average_rating', 3.0)
-                    scores[idx] = (avg_rating - 1) / 4.0
+            # Normalize to 0-1 range (assuming ratings are 1-5)
+            scores = (predicted_rating - 1) / 4.0
             
             # Apply min-max normalization to ensure 0-1 range
             if scores.max() > scores.min():
@@ -196,7 +1383,261 @@ class RecommendationEngine:
             
         except Exception as e:
             logger.error(f"Error in collaborative filtering: {str(e)}", exc_info=True)
-            return np.ones(len(items)) * 0.5
+            return np.ones(len(rows)) * 0.5
+    
+    async def _covisitation_scores(
+        self,
+        user_id: str,
+        catalog: ItemCatalog,
+        rows: np.ndarray
+    ) -> np.ndarray:
+        """
+        Score catalog rows by how often they were booked together with the
+        items in the user's history.
+        
+        Items with co-bookings score between 0.5 and 1; everything else,
+        including users without history, gets the neutral 0.5.
+        
+        Args:
+            user_id: User identifier
+            catalog: Catalog holding the rows
+            rows: Catalog rows to score
+            
+        Returns:
+            Array of scores for each row (0.5-1 range)
+        """
+        neutral = np.ones(len(rows)) * 0.5
+        try:
+            history = await self._get_user_interactions(user_id)
+            if not history:
+                history = await self._get_user_ratings(user_id)
+            if not history:
+                return neutral
+            
+            covisitation = await self._get_covisitation()
+            co_bookings = covisitation.scores(history, [catalog.ids[row] for row in rows])
+            if not co_bookings.any():
+                return neutral
+            
+            return 0.5 + 0.5 * co_bookings / co_bookings.max()
+            
+        except Exception as e:
+            logger.error(f"Error in co-visitation fallback: {str(e)}", exc_info=True)
+            return neutral
+    
+    async def get_also_booked(self, item_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get the items travelers most often booked together with an item.
+        
+        Args:
+            item_id: Hotel or tour identifier
+            limit: Maximum number of items
+            
+        Returns:
+            Item dictionaries with a co_bookings count, most co-booked first
+        """
+        try:
+            covisitation = await self._get_covisitation()
+            neighbors = covisitation.neighbors(item_id)
+            items = await self._get_items_by_ids([neighbor_id for neighbor_id, _ in neighbors])
+            
+            also_booked = []
+            for neighbor_id, count in neighbors:
+                if neighbor_id in items:
+                    also_booked.append({**items[neighbor_id], 'co_bookings': int(count)})
+                    if len(also_booked) == limit:
+                        break
+            
+            return also_booked
+            
+        except Exception as e:
+            logger.error(f"Error getting also-booked items: {str(e)}", exc_info=True)
+            return []
+    
+    async def get_similar_items(self, item_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get the items most similar to an item, of the same type.
+        
+        Neighbors come from a precomputed table, so a lookup is an array
+        slice; the table is only repaired when catalog rows have changed.
+        
+        Args:
+            item_id: Hotel or tour identifier
+            limit: Maximum number of items
+            
+        Returns:
+            Item dictionaries with a similarity score, most similar first
+        """
+        try:
+            catalog = self._ensure_catalog()
+            table = self.similar_items
+            if self._similar_catalog is not catalog or self._similar_revision != catalog.revision:
+                table = await asyncio.to_thread(self._refresh_similar_items)
+            
+            row = catalog.row_of(item_id)
+            if row is None:
+                return []
+            
+            neighbors, scores = table.neighbors_of(row)
+            return [
+                {**item, 'similarity': round(float(score), 4)}
+                for item, score in zip(catalog.to_dicts(neighbors[:limit]), scores[:limit])
+            ]
+            
+        except Exception as e:
+            logger.error(f"Error getting similar items: {str(e)}", exc_info=True)
+            return []
+    
+    def _refresh_similar_items(self) -> SimilarItemsTable:
+        """Build the similar-items table, or update the rows written since the last refresh."""
+        with self._similar_lock:
+            catalog = self.catalog
+            revision = catalog.revision
+            revisions = catalog.row_revision.copy()
+            known = len(self._similar_revisions)
+            
+            if self._similar_catalog is not catalog or known > len(revisions):
+                vectors, groups = self._similarity_vectors(np.arange(len(catalog)))
+                self.similar_items = SimilarItemsTable(top_n=settings.SIMILAR_ITEMS_TOP_N).build(vectors, groups)
+            else:
+                changed = np.concatenate([
+                    np.flatnonzero(revisions[:known] != self._similar_revisions),
+                    np.arange(known, len(revisions))
+                ])
+                if len(changed):
+                    vectors, groups = self._similarity_vectors(changed)
+                    self.similar_items.update(changed, vectors, groups)
+            
+            self._similar_catalog = catalog
+            self._similar_revision = revision
+            self._similar_revisions = revisions
+            return self.similar_items
+    
+    def _similarity_vectors(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Embed catalog rows for the similar-items table.
+        
+        Unit feature vectors (padded to a common width) and unit
+        description embeddings are concatenated, scaled by the square roots
+        of 1 - SIMILAR_ITEMS_TEXT_WEIGHT and SIMILAR_ITEMS_TEXT_WEIGHT, so
+        the inner product is the weighted sum of both cosines.
+        
+        Returns:
+            Tuple of (vectors, item type codes)
+        """
+        catalog = self.catalog
+        item_types = catalog.item_type[rows].astype(np.int64)
+        
+        width = 4 + len(FeatureExtractor.STANDARD_AMENITIES)
+        features = np.zeros((len(rows), width), dtype=np.float32)
+        for item_type in catalog.ITEM_TYPES:
+            positions = np.flatnonzero(item_types == catalog.type_code(item_type))
+            if item_type == 'hotel':
+                type_features = self.feature_extractor.extract_catalog_hotel_features(catalog, rows[positions])
+            else:
+                type_features = self.feature_extractor.extract_catalog_tour_features(catalog, rows[positions])
+            features[positions, :type_features.shape[1]] = type_features
+        
+        texts = [
+            f"{catalog.names[row] or ''} {catalog.extras.get(row, {}).get('description', '')}"
+            for row in rows.tolist()
+        ]
+        
+        weight = settings.SIMILAR_ITEMS_TEXT_WEIGHT
+        vectors = np.hstack([
+            np.sqrt(1 - weight) * self.feature_extractor.normalize_rows(features),
+            np.sqrt(weight) * self._encode_descriptions(texts)
+        ])
+        return vectors.astype(np.float32), item_types
+    
+    def _encode_descriptions(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed item descriptions as unit vectors.
+        
+        Uses the SIMILAR_ITEMS_TEXT_MODEL sentence-transformers model when
+        configured and loadable, hashed bag-of-words vectors otherwise.
+        """
+        if settings.SIMILAR_ITEMS_TEXT_MODEL and self._text_encoder is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+                self._text_encoder = SentenceTransformer(settings.SIMILAR_ITEMS_TEXT_MODEL)
+            except Exception as e:
+                logger.warning(f"Failed to load text model, using hashed text features: {str(e)}")
+                self._text_encoder = False
+        
+        if self._text_encoder:
+            embeddings = self._text_encoder.encode(texts, batch_size=64, convert_to_numpy=True)
+            return self.feature_extractor.normalize_rows(embeddings)
+        return self.feature_extractor.extract_text_features(texts, dim=128)
+    
+    async def _get_covisitation(self) -> CoVisitationMatrix:
+        """Build the co-visitation matrix on first use."""
+        if self.covisitation is None:
+            await self._get_explicit_ratings()
+            self.covisitation = await asyncio.to_thread(
+                CoVisitationMatrix.build,
+                self._iter_booking_sessions(),
+                top_n=settings.COVISITATION_TOP_N,
+                chunk_size=settings.COVISITATION_CHUNK_SIZE,
+                max_pairs=settings.COVISITATION_MAX_PAIRS
+            )
+        return self.covisitation
+    
+    def _iter_booking_sessions(self) -> Iterator[List[str]]:
+        """Yield the item ids of each booking session or trip."""
+        # TODO: Page through bookings grouped by trip from the database
+        # For now, treat each user's rated items in the mock data as one trip
+        for items in self.explicit_ratings.values():
+            yield list(items)
+    
+    async def _get_cf_neighborhood(self, user_id: str) -> List[Tuple[str, float]]:
+        """
+        Find the collaborative filtering neighborhood of a user.
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            List of (user_id, similarity_score) tuples, empty on cold start
+        """
+        try:
+            # Get user interaction history (bookings + ratings)
+            user_interactions = await self._get_user_interactions(user_id)
+            
+            if not user_interactions:
+                # Cold start: callers fall back to neutral scores
+                logger.info(f"Cold start for user {user_id}, returning neutral scores")
+                return []
+            
+            if self.interaction_store is not None:
+                # Fan the similarity query out to the interaction shards
+                store = await self._get_interaction_store()
+                similar_users = await asyncio.to_thread(store.find_similar_users, user_id, 10)
+            else:
+                # Build user-item matrix for collaborative filtering
+                user_item_matrix = await self._build_user_item_matrix()
+                
+                if not user_item_matrix or user_id not in user_item_matrix:
+                    logger.info(f"User {user_id} not in interaction matrix")
+                    return []
+                
+                # Find similar users using cosine similarity
+                similar_users = await self._find_similar_users(
+                    user_id,
+                    user_item_matrix,
+                    top_k=10
+                )
+            
+            if not similar_users:
+                logger.info(f"No similar users found for {user_id}")
+                return []
+            
+            logger.info(f"Found {len(similar_users)} similar users for {user_id}")
+            return similar_users
+            
+        except Exception as e:
+            logger.error(f"Error finding CF neighborhood: {str(e)}", exc_info=True)
+            return []
     
     def calculate_content_score(
         self,
@@ -221,39 +1662,65 @@ class RecommendationEngine:
         Returns:
             Array of scores for each item (0-1 range)
         """
+        try:
+            catalog = ItemCatalog.from_items(items)
+            return self._content_scores(user_profile, catalog, np.arange(len(items)))
+            
+        except Exception as e:
+            logger.error(f"Error in content-based filtering: {str(e)}", exc_info=True)
+            return np.ones(len(items)) * 0.5
+    
+    def _content_scores(
+        self,
+        user_profile: Dict[str, Any],
+        catalog: ItemCatalog,
+        rows: np.ndarray
+    ) -> np.ndarray:
+        """
+        Calculate content-based scores for catalog rows.
+        
+        Feature vectors are extracted per item type as matrices, so the
+        similarity and feature scores are computed for all rows at once.
+        
+        Args:
+            user_profile: User preferences and history
+            catalog: Catalog holding the rows
+            rows: Catalog rows to score
+            
+        Returns:
+            Array of scores for each row (0-1 range)
+        """
         try:
             # Extract user preference vector
             user_vector = self.feature_extractor.extract_user_preferences(user_profile)
             
-            scores = np.zeros(len(items))
+            base_similarity = np.zeros(len(rows), dtype=np.float32)
+            item_types = catalog.item_type[rows]
             
-            for idx, item in enumerate(items):
-                # Extract item feature vector
-                item_type = item.get('type', 'hotel')
+            for item_type in catalog.ITEM_TYPES:
+                positions = np.flatnonzero(item_types == catalog.type_code(item_type))
+                if len(positions) == 0:
+                    continue
                 
+                # Extract item feature vectors
                 if item_type == 'hotel':
-                    item_vector = self.feature_extractor.extract_hotel_features(item)
+                    item_vectors = self.feature_extractor.extract_catalog_hotel_features(catalog, rows[positions])
                 else:
-                    item_vector = self.feature_extractor.extract_tour_features(item)
+                    item_vectors = self.feature_extractor.extract_catalog_tour_features(catalog, rows[positions])
                 
                 # Ensure vectors have same length
-                min_len = min(len(user_vector), len(item_vector))
-                user_vec_trimmed = user_vector[:min_len]
-                item_vec_trimmed = item_vector[:min_len]
-                
-                # Calculate base similarity
-                base_similarity = self.feature_extractor.calculate_similarity(
-                    user_vec_trimmed,
-                    item_vec_trimmed
-                )
+                min_len = min(len(user_vector), item_vectors.shape[1])
                 
-                # Apply feature-specific scoring
-                feature_score = self._calculate_feature_score(user_profile, item)
-                
-                # Combine base similarity with feature score (70% similarity, 30% features)
-                combined_score = 0.7 * base_similarity + 0.3 * feature_score
-                
-                scores[idx] = max(0.0, min(1.0, combined_score))
+                # Cosine similarity is one GEMV over pre-normalized float32 rows
+                user_unit = self.feature_extractor.normalize_rows(user_vector[:min_len])
+                item_units = self.feature_extractor.normalize_rows(item_vectors[:, :min_len])
+                base_similarity[positions] = item_units @ user_unit
+            
+            # Apply feature-specific scoring
+            feature_scores = self._feature_scores(user_profile, catalog, rows)
+            
+            # Combine base similarity with feature score (70% similarity, 30% features)
+            scores = np.clip(0.7 * base_similarity + 0.3 * feature_scores, 0.0, 1.0)
             
             # Apply min-max normalization
             if scores.max() > scores.min():
@@ -263,70 +1730,39 @@ class RecommendationEngine:
             
         except Exception as e:
             logger.error(f"Error in content-based filtering: {str(e)}", exc_info=True)
-            return np.ones(len(items)) * 0.5
+            return np.ones(len(rows)) * 0.5
     
-    def _calculate_feature_score(
+    def _feature_scores(
         self,
         user_profile: Dict[str, Any],
-        item: Dict[str, Any]
-    ) -> float:
+        catalog: ItemCatalog,
+        rows: np.ndarray
+    ) -> np.ndarray:
         """
-        Calculate feature-specific score for an item.
+        Calculate feature-specific scores for catalog rows.
         
         Args:
             user_profile: User preferences
-            item: Item to score
+            catalog: Catalog holding the rows
+            rows: Catalog rows to score
             
         Returns:
-            Feature score (0-1)
+            Feature scores (0-1)
         """
         try:
-            score = 0.0
-            
-            # Amenity matching (40% weight)
             preferred_amenities = set(user_profile.get('preferred_amenities', []))
-            item_amenities = set(item.get('amenities', []))
-            
-            if preferred_amenities:
-                amenity_match = len(preferred_amenities & item_amenities) / len(preferred_amenities)
-                score += 0.4 * amenity_match
-            else:
-                score += 0.2  # Neutral if no preferences
-            
-            # Price matching (30% weight)
-            user_budget = user_profile.get('budget', 100)
-            item_price = item.get('price_per_night', item.get('price_per_person', 0))
-            
-            # Normalize price to USD
-            currency = item.get('currency', 'USD')
-            item_price_usd = self.data_processor.normalize_price(item_price, currency)
-            
-            # Score based on how well price fits budget (prefer 60-80% of budget)
-            if item_price_usd <= user_budget:
-                price_ratio = item_price_usd / user_budget
-                # Optimal range is 0.6-0.8 of budget
-                if 0.6 <= price_ratio <= 0.8:
-                    price_score = 1.0
-                elif price_ratio < 0.6:
-                    price_score = 0.7 + (price_ratio / 0.6) * 0.3
-                else:
-                    price_score = 1.0 - ((price_ratio - 0.8) / 0.2) * 0.3
-                score += 0.3 * max(0.0, price_score)
-            
-            # Rating score (20% weight)
-            rating = item.get('average_rating', 3.0)
-            rating_score = rating / 5.0
-            score += 0.2 * rating_score
-            
-            # Location preference (10% weight)
-            # TODO: Implement location-based scoring when user location preferences are available
-            score += 0.1 * 0.5  # Neutral for now
-            
-            return min(1.0, score)
+            return hybrid_scoring.feature_scores(
+                catalog.amenity_mask[rows],
+                catalog.price_usd[rows],
+                catalog.rating[rows],
+                catalog.tag_mask('amenities', preferred_amenities),
+                len(preferred_amenities),
+                user_profile.get('budget', 100)
+            )
             
         except Exception as e:
             logger.error(f"Error calculating feature score: {str(e)}")
-            return 0.5
+            return np.ones(len(rows)) * 0.5
     
     def apply_budget_optimization(
         self,
@@ -354,72 +1790,130 @@ class RecommendationEngine:
             Filtered and ranked items within budget
         """
         try:
-            # Filter items within 90% of budget (requirement 31.1)
-            budget_threshold = budget * 0.9
-            
-            filtered_items = []
-            over_budget_items = []
+            catalog = ItemCatalog.from_items(items)
+            ranked = self._budget_rank(np.arange(len(items)), scores, budget, catalog)
             
-            for idx, item in enumerate(items):
-                price = item.get('price_per_night', item.get('price_per_person', 0))
-                
-                # Normalize price to USD if needed
-                currency = item.get('currency', 'USD')
-                price_usd = self.data_processor.normalize_price(price, currency)
-                
-                item_with_score = item.copy()
-                item_with_score['recommendation_score'] = float(scores[idx])
-                item_with_score['price_usd'] = price_usd
-                item_with_score['remaining_budget'] = budget - price_usd
-                
-                # Calculate value score (quality vs price ratio)
-                rating = item.get('average_rating', 3.0)
-                if price_usd > 0:
-                    # Higher rating and lower price = better value
-                    value_score = (rating / 5.0) / (price_usd / budget)
-                    # Normalize value score to 0-1 range
-                    value_score = min(1.0, value_score)
-                else:
-                    value_score = 0.0
-                
-                item_with_score['value_score'] = value_score
-                
-                # Calculate combined score (70% recommendation, 30% value)
-                combined_score = 0.7 * item_with_score['recommendation_score'] + 0.3 * value_score
-                item_with_score['combined_score'] = combined_score
-                
-                if price_usd <= budget_threshold:
-                    filtered_items.append(item_with_score)
-                else:
-                    over_budget_items.append(item_with_score)
+            optimized = []
+            for entry in ranked:
+                rec = self._score_budget_fit(items[entry['row']], float(entry['recommendation_score']), budget)
+                if entry['is_alternative']:
+                    rec['is_alternative'] = True
+                    rec['budget_exceeded_by'] = rec['price_usd'] - budget * 0.9
+                optimized.append(rec)
             
-            # Sort by combined score (recommendation + value)
-            filtered_items.sort(key=lambda x: x['combined_score'], reverse=True)
+            return optimized
             
-            # If insufficient options within budget, suggest alternatives
-            if len(filtered_items) < 3 and over_budget_items:
-                logger.info(f"Only {len(filtered_items)} items within budget, adding alternatives")
-                
-                # Sort over-budget items by how close they are to budget
-                over_budget_items.sort(key=lambda x: x['price_usd'])
-                
-                # Add closest over-budget items as alternatives
-                for item in over_budget_items[:2]:
-                    item['is_alternative'] = True
-                    item['budget_exceeded_by'] = item['price_usd'] - budget_threshold
-                    filtered_items.append(item)
+        except Exception as e:
+            logger.error(f"Error in budget optimization: {str(e)}", exc_info=True)
+            return []
+    
+    def _budget_rank(
+        self,
+        rows: np.ndarray,
+        scores: np.ndarray,
+        budget: float,
+        catalog: Optional[ItemCatalog] = None
+    ) -> np.ndarray:
+        """
+        Rank catalog rows by budget fit, as in apply_budget_optimization.
+        
+        Args:
+            rows: Catalog rows
+            scores: Recommendation score of each row
+            budget: Maximum budget
+            catalog: Catalog holding the rows (defaults to the engine catalog)
             
-            logger.info(f"Filtered to {len(filtered_items)} items within budget optimization")
-            return filtered_items
+        Returns:
+            RANKED_DTYPE array of rows within budget sorted by combined score,
+            followed by up to two over-budget alternatives
+        """
+        catalog = catalog if catalog is not None else self.catalog
+        
+        # Filter items within 90% of budget (requirement 31.1)
+        budget_threshold = budget * 0.9
+        
+        prices = catalog.price_usd[rows].astype(np.float64)
+        
+        # Calculate value score (quality vs price ratio); higher rating and lower price = better value
+        value_scores = hybrid_scoring.value_scores(catalog.price_usd[rows], catalog.rating[rows], budget)
+        
+        ranked = np.zeros(len(rows), dtype=RANKED_DTYPE)
+        ranked['row'] = rows
+        ranked['recommendation_score'] = scores
+        ranked['value_score'] = value_scores
+        
+        # Calculate combined score (70% recommendation, 30% value)
+        ranked['combined_score'] = 0.7 * ranked['recommendation_score'] + 0.3 * value_scores
+        
+        within = prices <= budget_threshold
+        filtered = self._sort_ranked(ranked[within])
+        
+        # If insufficient options within budget, suggest alternatives
+        over_budget = ranked[~within]
+        if len(filtered) < 3 and len(over_budget):
+            logger.info(f"Only {len(filtered)} items within budget, adding alternatives")
+            
+            # Add the over-budget items closest to the budget as alternatives
+            closest = np.argsort(prices[~within], kind='stable')[:2]
+            alternatives = over_budget[closest]
+            alternatives['is_alternative'] = True
+            filtered = np.concatenate([filtered, alternatives])
+        
+        logger.info(f"Filtered to {len(filtered)} items within budget optimization")
+        return filtered
+    
+    def _score_budget_fit(
+        self,
+        item: Dict[str, Any],
+        recommendation_score: float,
+        budget: float
+    ) -> Dict[str, Any]:
+        """
+        Copy an item and add its budget, value and combined scores.
+        
+        Args:
+            item: Item to score
+            recommendation_score: Hybrid recommendation score
+            budget: Maximum budget
             
-        except Exception as e:
-            logger.error(f"Error in budget optimization: {str(e)}", exc_info=True)
-            return []
+        Returns:
+            Copy of the item with price_usd, remaining_budget, value_score
+            and combined_score fields
+        """
+        price = item.get('price_per_night', item.get('price_per_person', 0))
+        
+        # Normalize price to USD if needed
+        currency = item.get('currency', 'USD')
+        price_usd = self.data_processor.normalize_price(price, currency)
+        
+        item_with_score = item.copy()
+        item_with_score['recommendation_score'] = recommendation_score
+        item_with_score['price_usd'] = price_usd
+        item_with_score['remaining_budget'] = budget - price_usd
+        
+        # Calculate value score (quality vs price ratio)
+        rating = item.get('average_rating', 3.0)
+        if price_usd > 0:
+            # Higher rating and lower price = better value
+            value_score = (rating / 5.0) / (price_usd / budget)
+            # Normalize value score to 0-1 range
+            value_score = min(1.0, value_score)
+        else:
+            value_score = 0.0
+        
+        item_with_score['value_score'] = value_score
+        
+        # Calculate combined score (70% recommendation, 30% value)
+        combined_score = 0.7 * item_with_score['recommendation_score'] + 0.3 * value_score
+        item_with_score['combined_score'] = combined_score
+        
+        return item_with_score
     
     async def integrate_events(
         self,
         recommendations: List[Dict[str, Any]],
-        dates: Dict[str, str]
+        dates: Dict[str, str],
+        events: Optional[List[Dict[str, Any]]] = None
     ) -> List[Dict[str, Any]]:
         """
         Enhance recommendations with real-time event data.
@@ -435,13 +1929,15 @@ class RecommendationEngine:
         Args:
             recommendations: Current recommendations
             dates: Travel dates
+            events: Events already fetched for these dates; queried when omitted
             
         Returns:
             Enhanced recommendations with event information
         """
         try:
             # Get events happening during travel dates
-            events = await self._get_events_in_date_range(dates)
+            if events is None:
+                events = await self._get_events_in_date_range(dates)
             
             if not events:
                 logger.info("No events found during travel dates")
@@ -453,65 +1949,12 @@ class RecommendationEngine:
             
             # Enhance recommendations with event data
             for rec in recommendations:
-                location = rec.get('location', {})
-                city = location.get('city', '')
-                province = location.get('province', '')
-                
-                # Find events in same city
-                same_city_events = [
-                    e for e in events
-                    if e.get('location', {}).get('city', '').lower() == city.lower()
-                ]
-                
-                # Find events in same province (nearby)
-                nearby_events = [
-                    e for e in events
-                    if e.get('location', {}).get('province', '').lower() == province.lower()
-                    and e not in same_city_events
-                ]
+                event_boost = self._attach_event_details(rec, events)
                 
-                if same_city_events or nearby_events:
-                    rec['nearby_events'] = same_city_events + nearby_events
-                    rec['has_events'] = True
-                    rec['event_count'] = len(same_city_events) + len(nearby_events)
-                    
-                    # Calculate event boost based on proximity and cultural significance
-                    event_boost = 0.0
-                    
-                    if same_city_events:
-                        # 15% boost for events in same city
-                        base_boost = 0.15
-                        
-                        # Additional boost for culturally significant events
-                        for event in same_city_events:
-                            if event.get('event_type') == 'festival':
-                                base_boost += 0.05
-                        
-                        event_boost = min(0.25, base_boost)  # Cap at 25%
-                    
-                    elif nearby_events:
-                        # 10% boost for nearby events
-                        event_boost = 0.10
-                    
+                if rec['has_events']:
                     # Apply boost to combined score
                     current_score = rec.get('combined_score', rec.get('recommendation_score', 0.5))
                     rec['combined_score'] = min(1.0, current_score + event_boost)
-                    rec['event_boost'] = event_boost
-                    rec['event_boost_applied'] = True
-                    
-                    # Add event details for display
-                    rec['event_highlights'] = [
-                        {
-                            'name': e.get('name'),
-                            'type': e.get('event_type'),
-                            'dates': f"{e.get('start_date')} to {e.get('end_date')}",
-                            'significance': e.get('cultural_significance', '')
-                        }
-                        for e in (same_city_events + nearby_events)[:3]  # Top 3 events
-                    ]
-                else:
-                    rec['has_events'] = False
-                    rec['event_count'] = 0
             
             # Re-sort after event boost using combined score
             recommendations.sort(
@@ -529,6 +1972,136 @@ class RecommendationEngine:
                 rec['has_events'] = False
             return recommendations
     
+    def _attach_event_details(
+        self,
+        rec: Dict[str, Any],
+        events: List[Dict[str, Any]]
+    ) -> float:
+        """
+        Attach matching event details to a recommendation.
+        
+        Args:
+            rec: Recommendation to annotate (modified in place)
+            events: Events happening during the travel dates
+            
+        Returns:
+            Event boost for the recommendation (0 when no events match)
+        """
+        location = rec.get('location', {})
+        city = location.get('city', '')
+        province = location.get('province', '')
+        
+        # Find events in same city
+        same_city_events = [
+            e for e in events
+            if e.get('location', {}).get('city', '').lower() == city.lower()
+        ]
+        
+        # Find events in same province (nearby)
+        nearby_events = [
+            e for e in events
+            if e.get('location', {}).get('province', '').lower() == province.lower()
+            and e not in same_city_events
+        ]
+        
+        if not (same_city_events or nearby_events):
+            rec['has_events'] = False
+            rec['event_count'] = 0
+            return 0.0
+        
+        rec['nearby_events'] = same_city_events + nearby_events
+        rec['has_events'] = True
+        rec['event_count'] = len(same_city_events) + len(nearby_events)
+        
+        # Calculate event boost based on proximity and cultural significance
+        event_boost = 0.0
+        
+        if same_city_events:
+            # 15% boost for events in same city
+            base_boost = 0.15
+            
+            # Additional boost for culturally significant events
+            for event in same_city_events:
+                if event.get('event_type') == 'festival':
+                    base_boost += 0.05
+            
+            event_boost = min(0.25, base_boost)  # Cap at 25%
+        
+        elif nearby_events:
+            # 10% boost for nearby events
+            event_boost = 0.10
+        
+        rec['event_boost'] = event_boost
+        rec['event_boost_applied'] = True
+        
+        # Add event details for display
+        rec['event_highlights'] = [
+            {
+                'name': e.get('name'),
+                'type': e.get('event_type'),
+                'dates': f"{e.get('start_date')} to {e.get('end_date')}",
+                'significance': e.get('cultural_significance', '')
+            }
+            for e in (same_city_events + nearby_events)[:3]  # Top 3 events
+        ]
+        
+        return event_boost
+    
+    def _apply_event_boosts(
+        self,
+        ranked: np.ndarray,
+        events: List[Dict[str, Any]]
+    ) -> np.ndarray:
+        """
+        Apply event proximity boosts to ranked catalog rows and re-rank.
+        
+        Uses the same matching rules as _attach_event_details, on interned
+        lower-cased city and province keys.
+        
+        Args:
+            ranked: RANKED_DTYPE array
+            events: Events happening during the travel dates
+            
+        Returns:
+            Boosted RANKED_DTYPE array sorted by combined score
+        """
+        if not events or len(ranked) == 0:
+            return ranked
+        
+        city_boosts = defaultdict(float)
+        province_keys = set()
+        for event in events:
+            location = event.get('location', {})
+            city_key = self.catalog.location_key(location.get('city', ''))
+            if city_key >= 0:
+                # 15% boost for events in same city, +5% per festival
+                city_boosts[city_key] = city_boosts[city_key] or 0.15
+                if event.get('event_type') == 'festival':
+                    city_boosts[city_key] += 0.05
+            province_keys.add(self.catalog.location_key(location.get('province', '')))
+        
+        rows = ranked['row']
+        boosts = np.zeros(len(ranked))
+        
+        # 10% boost for events in the same province (nearby)
+        nearby = np.isin(self.catalog.province_key[rows], list(province_keys))
+        boosts[nearby] = 0.10
+        
+        city_keys = self.catalog.city_key[rows]
+        for city_key, boost in city_boosts.items():
+            boosts[city_keys == city_key] = min(0.25, boost)  # Cap at 25%
+        
+        boosted = ranked.copy()
+        boosted['event_boost'] = boosts
+        boosted['combined_score'] = np.where(
+            boosts > 0,
+            np.minimum(1.0, boosted['combined_score'] + boosts),
+            boosted['combined_score']
+        )
+        
+        # Re-sort after event boost using combined score
+        return self._sort_ranked(boosted)
+    
     # Helper methods
     
     async def _get_user_profile(self, user_id: str) -> Dict[str, Any]:
@@ -543,21 +2116,29 @@ class RecommendationEngine:
             'booking_history': []
         }
     
-    async def _query_available_items(
+    async def _query_available_rows(
         self,
         budget: float,
         dates: Dict[str, str],
         item_type: str,
         preferences: Dict[str, Any]
-    ) -> List[Dict[str, Any]]:
-        """Query available hotels/tours from database."""
-        # TODO: Implement actual database query
-        # For now, return mock data
+    ) -> np.ndarray:
+        """Query catalog rows of available hotels/tours within a budget in USD."""
+        # TODO: Filter on availability for the requested dates
+        catalog = self._ensure_catalog()
         
-        if item_type == 'hotel':
-            return self._get_mock_hotels(budget)
-        else:
-            return self._get_mock_tours(budget)
+        rows = catalog.rows_of_type(item_type)
+        return rows[catalog.price_usd[rows] <= budget]
+    
+    def _ensure_catalog(self) -> ItemCatalog:
+        """Load the item catalog on first use."""
+        if len(self.catalog) == 0:
+            # TODO: Load hotels and tours from database
+            # For now, load the mock data
+            self.catalog.add_items(
+                self._get_mock_hotels(float('inf')) + self._get_mock_tours(float('inf'))
+            )
+        return self.catalog
     
     def _get_mock_hotels(self, budget: float) -> List[Dict[str, Any]]:
         """Generate mock hotel data for testing."""
@@ -627,46 +2208,60 @@ class RecommendationEngine:
         
         return [t for t in tours if t['price_per_person'] <= budget]
     
+    async def _get_items_by_ids(self, item_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get catalog items by id, ignoring budget and availability filters."""
+        catalog = self._ensure_catalog()
+        rows = catalog.rows_of(item_ids)
+        return {catalog.item_id(row): catalog.to_dict(row) for row in rows}
+    
     async def _get_user_interactions(self, user_id: str) -> Dict[str, float]:
         """Get user's past interactions (bookings, ratings)."""
         # TODO: Query from database
         return {}
     
-    async def _build_user_item_matrix(self) -> Dict[str, Dict[str, float]]:
+    async def _get_user_ratings(self, user_id: str) -> Dict[str, float]:
+        """Get a user's row of the interaction matrix, from its shard in sharded mode."""
+        if self.interaction_store is None:
+            return (await self._build_user_item_matrix()).get(user_id, {})
+        
+        store = await self._get_interaction_store()
+        return (await asyncio.to_thread(store.get_ratings, [user_id])).get(user_id, {})
+    
+    async def _build_user_item_matrix(self) -> RatingMatrix:
         """
-        Build user-item interaction matrix from booking history and ratings.
+        Build user-item interaction matrix from booking history, ratings and
+        time-decayed implicit feedback.
+        
+        Not used in sharded mode, where the interaction shards hold the
+        matrix (see _get_interaction_store).
         
         Returns:
-            Nested dictionary: {user_id: {item_id: rating}}
+            RatingMatrix, read as {user_id: {item_id: rating}}
         """
         try:
             # Check cache first
-            if self.user_item_matrix:
+            if self.user_item_matrix and not self._implicit_feedback_due():
                 return self.user_item_matrix
             
-            # TODO: Query from database
-            # For now, build from mock data
-            # In production, this would query:
-            # - Bookings table for completed bookings
-            # - Reviews table for explicit ratings
-            # - Wishlists for implicit positive signals
-            
-            matrix = defaultdict(dict)
-            
-            # Mock data for demonstration
-            # In production, replace with actual database queries
-            mock_interactions = {
-                'user-1': {'hotel-1': 5.0, 'hotel-2': 4.0, 'tour-1': 5.0},
-                'user-2': {'hotel-1': 4.0, 'hotel-3': 5.0, 'tour-2': 4.0},
-                'user-3': {'hotel-2': 3.0, 'hotel-3': 4.0, 'tour-1': 4.0},
-                'user-4': {'hotel-1': 5.0, 'hotel-3': 4.0, 'tour-2': 5.0},
-            }
+            explicit_ratings = await self._get_explicit_ratings()
+            
+            # Implicit signals fill in items the user has not rated explicitly
+            implicit_ratings = self.implicit_feedback.implicit_ratings(
+                saturation=settings.IMPLICIT_FEEDBACK_SATURATION
+            )
+            matrix = RatingMatrix.from_dict(explicit_ratings).fill_missing(implicit_ratings)
+            
+            self._implicit_version = self.implicit_feedback.version
+            self._implicit_merged_at = time.monotonic()
             
-            for user, items in mock_interactions.items():
-                matrix[user] = items
+            # Similarities and popularity depend on the matrix
+            self.user_similarity_cache.clear()
+            self.item_popularity = {}
             
-            # Cache the matrix
-            self.user_item_matrix = dict(matrix)
+            # Cache the matrix; it is also the similarity matrix
+            self.user_item_matrix = matrix
+            self.rating_matrix = matrix
+            self._rating_matrix_source = matrix
             
             return self.user_item_matrix
             
@@ -674,6 +2269,410 @@ class RecommendationEngine:
             logger.error(f"Error building user-item matrix: {str(e)}")
             return {}
     
+    def _implicit_feedback_due(self) -> bool:
+        """Check whether new implicit events should be merged into the matrix."""
+        return (
+            self.implicit_feedback.version != self._implicit_version
+            and time.monotonic() - self._implicit_merged_at >= settings.IMPLICIT_FEEDBACK_REFRESH_SECONDS
+        )
+    
+    async def _get_explicit_ratings(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get explicit ratings from bookings and reviews.
+        
+        Returns:
+            Nested dictionary: {user_id: {item_id: rating}}
+        """
+        try:
+            if self.explicit_ratings:
+                return self.explicit_ratings
+            
+            # Cache the ratings
+            self.explicit_ratings = {
+                user: items for _, user, items in await self._query_explicit_ratings()
+            }
+            
+            return self.explicit_ratings
+            
+        except Exception as e:
+            logger.error(f"Error loading explicit ratings: {str(e)}")
+            return {}
+    
+    async def _query_explicit_ratings(
+        self,
+        shard: Optional[int] = None,
+        num_shards: int = 1
+    ) -> List[Tuple[int, str, Dict[str, float]]]:
+        """
+        Query explicit ratings, optionally of one interaction shard's users only.
+        
+        Args:
+            shard: Only users owned by this shard (see shard_of); all users if None
+            num_shards: Number of interaction shards
+            
+        Returns:
+            Tuples of (sequence, user_id, {item_id: rating}), where the
+            sequence is the user's position among all users
+        """
+        # TODO: Query from database
+        # For now, build from mock data
+        # In production, this would query:
+        # - Bookings table for completed bookings
+        # - Reviews table for explicit ratings
+        # ordered by the user's first booking, filtering on the user's
+        # CRC32 partition when a shard is given
+        
+        # Mock data for demonstration
+        # In production, replace with actual database queries
+        mock_interactions = {
+            'user-1': {'hotel-1': 5.0, 'hotel-2': 4.0, 'tour-1': 5.0},
+            'user-2': {'hotel-1': 4.0, 'hotel-3': 5.0, 'tour-2': 4.0},
+            'user-3': {'hotel-2': 3.0, 'hotel-3': 4.0, 'tour-1': 4.0},
+            'user-4': {'hotel-1': 5.0, 'hotel-3': 4.0, 'tour-2': 5.0},
+        }
+        
+        return [
+            (sequence, user, dict(items))
+            for sequence, (user, items) in enumerate(mock_interactions.items())
+            if shard is None or shard_of(user, num_shards) == shard
+        ]
+    
+    def _get_rating_matrix(
+        self,
+        user_item_matrix: Dict[str, Dict[str, float]]
+    ) -> RatingMatrix:
+        """Get the sparse rating matrix for a user-item dictionary, building it once."""
+        if self.rating_matrix is None or self._rating_matrix_source is not user_item_matrix:
+            self.rating_matrix = RatingMatrix.from_dict(user_item_matrix)
+            self._rating_matrix_source = user_item_matrix
+        return self.rating_matrix
+    
+    async def _get_neighbor_rating_matrix(
+        self,
+        similar_users: List[Tuple[str, float]]
+    ) -> RatingMatrix:
+        """Get a rating matrix holding at least the ratings of the given users."""
+        if self.interaction_store is None:
+            return self._get_rating_matrix(await self._build_user_item_matrix())
+        
+        # Only fetch the neighbors' rows from their shards
+        store = await self._get_interaction_store()
+        neighbor_ratings = await asyncio.to_thread(
+            store.get_ratings,
+            [similar_user_id for similar_user_id, _ in similar_users]
+        )
+        return RatingMatrix.from_dict(neighbor_ratings)
+    
+    async def _get_interaction_store(self) -> ShardedInteractionStore:
+        """
+        Start the interaction shards and load them on first use, and merge
+        new implicit feedback into them.
+        
+        Each shard reads its own users from the cache snapshot when one was
+        loaded; otherwise explicit ratings are queried one partition at a
+        time, so the coordinator never holds every user's ratings.
+        """
+        store = self.interaction_store
+        async with self._interaction_store_lock:
+            if not store.started:
+                await asyncio.to_thread(store.start)
+                
+                loaded = False
+                if self._ratings_snapshot_dir:
+                    loaded = await asyncio.to_thread(store.load_snapshot, self._ratings_snapshot_dir)
+                if not loaded:
+                    for shard in range(store.num_shards):
+                        rows = await self._query_explicit_ratings(shard, store.num_shards)
+                        await asyncio.to_thread(store.load_partition, shard, rows)
+                
+                await self._merge_implicit_into_shards()
+                logger.info(f"Loaded interaction shards from {'snapshot' if loaded else 'database'}")
+            
+            elif self._implicit_feedback_due():
+                await self._merge_implicit_into_shards()
+        
+        return store
+    
+    async def _merge_implicit_into_shards(self) -> None:
+        """Replace the implicit feedback ratings held by the interaction shards."""
+        implicit_ratings = self.implicit_feedback.implicit_ratings(
+            saturation=settings.IMPLICIT_FEEDBACK_SATURATION
+        )
+        self._implicit_version = self.implicit_feedback.version
+        self._implicit_merged_at = time.monotonic()
+        self.user_similarity_cache.clear()
+        self.item_popularity = {}
+        
+        await asyncio.to_thread(self.interaction_store.set_implicit_ratings, implicit_ratings)
+    
+    def record_interactions(self, events: List[Dict[str, Any]]) -> int:
+        """
+        Record implicit feedback events (views, wishlists, searches, bookings).
+        
+        Events are merged into the user-item matrix at most every
+        IMPLICIT_FEEDBACK_REFRESH_SECONDS; views and bookings also feed the
+        trending counters.
+        
+        Args:
+            events: Dictionaries with user_id, item_id, event_type and an
+                optional timestamp (epoch seconds)
+            
+        Returns:
+            Number of events accepted
+        """
+        now = time.time()
+        user_ids = [event['user_id'] for event in events]
+        item_ids = [event['item_id'] for event in events]
+        event_types = [event['event_type'] for event in events]
+        timestamps = [
+            now if event.get('timestamp') is None else event['timestamp']
+            for event in events
+        ]
+        
+        self.implicit_feedback.add_event_arrays(user_ids, item_ids, event_types, timestamps)
+        
+        # Track trending items per city
+        catalog = self._ensure_catalog()
+        city_keys = catalog.city_key
+        cities = []
+        for item_id in item_ids:
+            row = catalog.row_of(item_id)
+            cities.append(int(city_keys[row]) if row is not None else None)
+        self.trending.add_events(item_ids, event_types, timestamps, cities)
+        
+        known_types = set(self.implicit_feedback.weights) | set(self.trending.weights)
+        return sum(1 for event_type in event_types if event_type in known_types)
+    
+    async def get_trending(
+        self,
+        city: Optional[str] = None,
+        item_type: Optional[str] = None,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the items with the most recent views and bookings.
+        
+        Args:
+            city: Only items in this city (case-insensitive); all cities if omitted
+            item_type: Only hotels or only tours; both if omitted
+            limit: Maximum number of items
+            
+        Returns:
+            Item dictionaries with a trend_score, most trending first
+        """
+        try:
+            catalog = self._ensure_catalog()
+            
+            group = None
+            if city:
+                group = catalog.location_key(city)
+                if group < 0:
+                    return []
+            
+            trending = []
+            for item_id, trend_score in self.trending.top(group, limit=self.trending.heavy_hitters):
+                row = catalog.row_of(item_id)
+                if row is None or (item_type and catalog.item_type_name(row) != item_type):
+                    continue
+                trending.append({**catalog.to_dict(row), 'trend_score': round(trend_score, 3)})
+                if len(trending) == limit:
+                    break
+            
+            return trending
+            
+        except Exception as e:
+            logger.error(f"Error getting trending items: {str(e)}", exc_info=True)
+            return []
+    
+    async def save_cache_snapshot(self, directory: str) -> Optional[str]:
+        """
+        Snapshot the interaction matrix, similarity cache, popularity table
+        and implicit feedback to disk.
+        
+        Arrays are collected on the calling thread; only the file writes
+        run in a worker thread.
+        
+        Args:
+            directory: Snapshot directory
+            
+        Returns:
+            Path of the written snapshot, or None if there was nothing to save
+        """
+        try:
+            if not (self.user_item_matrix or self.implicit_feedback.version):
+                return None
+            
+            arrays = {}
+            
+            if self.user_item_matrix:
+                rating_matrix = self._get_rating_matrix(self.user_item_matrix)
+                arrays.update(rating_matrix.to_arrays('ratings'))
+            
+            # Similarity cache as one flat neighbor list with offsets
+            keys = list(self.user_similarity_cache)
+            neighbors = [self.user_similarity_cache[key] for key in keys]
+            arrays['similarity_keys'] = np.array(keys, dtype=str)
+            arrays['similarity_offsets'] = np.cumsum([0] + [len(n) for n in neighbors]).astype(np.int64)
+            arrays['similarity_users'] = np.array([u for n in neighbors for u, _ in n], dtype=str)
+            arrays['similarity_scores'] = np.array([v for n in neighbors for _, v in n], dtype=np.float32)
+            
+            popularity = list(self.item_popularity.items())
+            arrays['popularity_items'] = np.array([item_id for item_id, _ in popularity], dtype=str)
+            arrays['popularity_counts'] = np.array([count for _, (count, _) in popularity], dtype=np.int64)
+            arrays['popularity_ratings'] = np.array([rating for _, (_, rating) in popularity], dtype=np.float64)
+            
+            arrays.update(self.implicit_feedback.to_arrays())
+            
+            snapshot = CacheSnapshot(directory)
+            path = await asyncio.to_thread(snapshot.save, arrays, {'format': 1})
+            logger.info(f"Saved recommendation cache snapshot to {path}")
+            return path
+            
+        except Exception as e:
+            logger.error(f"Error saving cache snapshot: {str(e)}", exc_info=True)
+            return None
+    
+    def load_cache_snapshot(self, directory: str) -> bool:
+        """
+        Warm the caches from the latest snapshot.
+        
+        The rating matrix is memory-mapped; similarity, popularity and
+        implicit feedback tables are rebuilt from their arrays.
+        
+        Args:
+            directory: Snapshot directory
+            
+        Returns:
+            True if a snapshot was loaded
+        """
+        try:
+            snapshot = CacheSnapshot(directory).load()
+            if snapshot is None:
+                logger.info(f"No cache snapshot in {directory}")
+                return False
+            
+            arrays, _ = snapshot
+            
+            if 'ratings_indptr' in arrays and self.interaction_store is not None:
+                # Each shard reads its own users' rows when it starts
+                self._ratings_snapshot_dir = directory
+            elif 'ratings_indptr' in arrays:
+                # Rows are read from the mapped CSR arrays as users are looked up
+                self.rating_matrix = RatingMatrix.from_arrays(arrays, 'ratings')
+                self.user_item_matrix = self.rating_matrix
+                self._rating_matrix_source = self.rating_matrix
+            
+            offsets = arrays['similarity_offsets']
+            users = arrays['similarity_users'].tolist()
+            scores = arrays['similarity_scores'].tolist()
+            self.user_similarity_cache = {
+                key: list(zip(users[offsets[i]:offsets[i + 1]], scores[offsets[i]:offsets[i + 1]]))
+                for i, key in enumerate(arrays['similarity_keys'].tolist())
+            }
+            
+            self.item_popularity = {
+                item_id: (int(count), float(rating))
+                for item_id, count, rating in zip(
+                    arrays['popularity_items'].tolist(),
+                    arrays['popularity_counts'],
+                    arrays['popularity_ratings']
+                )
+            }
+            
+            self.implicit_feedback.restore(arrays)
+            self._implicit_version = self.implicit_feedback.version
+            self._implicit_merged_at = time.monotonic()
+            
+            logger.info(
+                f"Loaded cache snapshot: {len(self.user_item_matrix)} users, "
+                f"{len(self.user_similarity_cache)} similarity lists, "
+                f"{len(self.item_popularity)} popular items"
+            )
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error loading cache snapshot: {str(e)}", exc_info=True)
+            return False
+    
+    def close(self) -> None:
+        """Release background resources such as interaction shard processes."""
+        if self.interaction_store is not None:
+            self.interaction_store.close()
+        self.parallel_scorer.close()
+        if self._scoring_arrays is not None:
+            self._scoring_arrays['shared'].close()
+            self._scoring_arrays = None
+    
+    async def _get_item_popularity(self) -> Dict[str, Tuple[int, float]]:
+        """
+        Build the item popularity table from the user-item matrix.
+        
+        Returns:
+            Dictionary: {item_id: (interaction_count, mean_rating)}
+        """
+        try:
+            if self.item_popularity:
+                return self.item_popularity
+            
+            if self.interaction_store is not None:
+                # Each shard totals its own users' ratings
+                store = await self._get_interaction_store()
+                self.item_popularity = await asyncio.to_thread(store.get_popularity)
+                return self.item_popularity
+            
+            user_item_matrix = await self._build_user_item_matrix()
+            
+            totals = defaultdict(lambda: [0, 0.0])
+            for ratings in user_item_matrix.values():
+                for item_id, rating in ratings.items():
+                    totals[item_id][0] += 1
+                    totals[item_id][1] += rating
+            
+            self.item_popularity = {
+                item_id: (count, rating_sum / count)
+                for item_id, (count, rating_sum) in totals.items()
+            }
+            return self.item_popularity
+            
+        except Exception as e:
+            logger.error(f"Error building item popularity: {str(e)}")
+            return {}
+    
+    def _popularity_scores(
+        self,
+        rows: np.ndarray,
+        popularity: Dict[str, Tuple[int, float]]
+    ) -> np.ndarray:
+        """
+        Score catalog rows by popularity without any personalization.
+        
+        Combines the item's rating (70%) with its interaction volume (30%).
+        
+        Args:
+            rows: Catalog rows to score
+            popularity: Popularity table from _get_item_popularity
+            
+        Returns:
+            Array of scores for each row (0-1 range)
+        """
+        if len(rows) == 0:
+            return np.zeros(0)
+        
+        max_count = max((count for count, _ in popularity.values()), default=0)
+        counts = np.zeros(len(rows))
+        ratings = self.catalog.rating[rows].astype(np.float64)
+        
+        for idx, row in enumerate(rows):
+            count, mean_rating = popularity.get(self.catalog.item_id(row), (0, None))
+            counts[idx] = count
+            if np.isnan(ratings[idx]):
+                ratings[idx] = mean_rating if mean_rating is not None else 3.0
+        
+        volume = np.log1p(counts) / np.log1p(max_count) if max_count > 0 else 0.0
+        scores = 0.7 * (ratings - 1) / 4.0 + 0.3 * volume
+        
+        return np.clip(scores, 0.0, 1.0)
+    
     async def _find_similar_users(
         self,
         user_id: str,
@@ -697,37 +2696,22 @@ class RecommendationEngine:
             if cache_key in self.user_similarity_cache:
                 return self.user_similarity_cache[cache_key]
             
-            target_user_items = user_item_matrix.get(user_id, {})
+            # Co-rated cosine similarity with all users at once
+            rating_matrix = self._get_rating_matrix(user_item_matrix)
+            similarities = rating_matrix.cosine_to(user_id)
             
-            if not target_user_items:
+            if similarities is None:
                 return []
             
-            # Calculate similarity with all other users
-            similarities = []
-            
-            for other_user_id, other_user_items in user_item_matrix.items():
-                if other_user_id == user_id:
-                    continue
-                
-                # Find common items
-                common_items = set(target_user_items.keys()) & set(other_user_items.keys())
-                
-                if not common_items:
-                    continue
-                
-                # Build vectors for common items
-                target_vector = np.array([target_user_items[item] for item in common_items])
-                other_vector = np.array([other_user_items[item] for item in common_items])
-                
-                # Calculate cosine similarity
-                similarity = self._calculate_cosine_similarity(target_vector, other_vector)
-                
-                if similarity > 0:
-                    similarities.append((other_user_id, similarity))
+            similarities[rating_matrix.user_index[user_id]] = 0.0
             
             # Sort by similarity and return top K
-            similarities.sort(key=lambda x: x[1], reverse=True)
-            result = similarities[:top_k]
+            order = np.argsort(-similarities, kind='stable')[:top_k]
+            result = [
+                (rating_matrix.user_ids[idx], float(similarities[idx]))
+                for idx in order
+                if similarities[idx] > 0
+            ]
             
             # Cache the result
             self.user_similarity_cache[cache_key] = result
@@ -739,38 +2723,6 @@ class RecommendationEngine:
             logger.error(f"Error finding similar users: {str(e)}", exc_info=True)
             return []
     
-    def _calculate_cosine_similarity(
-        self,
-        vector1: np.ndarray,
-        vector2: np.ndarray
-    ) -> float:
-        """
-        Calculate cosine similarity between two vectors.
-        
-        Args:
-            vector1: First vector
-            vector2: Second vector
-            
-        Returns:
-            Similarity score (0-1)
-        """
-        try:
-            dot_product = np.dot(vector1, vector2)
-            norm1 = np.linalg.norm(vector1)
-            norm2 = np.linalg.norm(vector2)
-            
-            if norm1 == 0 or norm2 == 0:
-                return 0.0
-            
-            similarity = dot_product / (norm1 * norm2)
-            
-            # Ensure result is in 0-1 range
-            return max(0.0, min(1.0, similarity))
-            
-        except Exception as e:
-            logger.error(f"Error calculating cosine similarity: {str(e)}")
-            return 0.0
-    
     async def _get_user_item_rating(
         self,
         user_id: str,
@@ -787,6 +2739,9 @@ class RecommendationEngine:
             Rating value (1-5) or None if no rating exists
         """
         try:
+            if self.interaction_store is not None:
+                return (await self._get_user_ratings(user_id)).get(item_id)
+            
             # Get from cached matrix first
             if self.user_item_matrix:
                 user_ratings = self.user_item_matrix.get(user_id, {})
@@ -1,10 +1,19 @@
 """Sentiment analysis model for review processing."""
 
-from typing import Dict, Any, List
+from typing import Dict, Any, AsyncIterable, AsyncIterator, List, Optional, Set, Tuple
 from sentence_transformers import SentenceTransformer
+import asyncio
 import numpy as np
 import re
 
+from config.settings import settings
+from utils.embedding_cache import EmbeddingCache
+from utils.inference_executor import InferenceExecutor
+from utils.keyword_matcher import KeywordMatcher
+from utils.micro_batcher import MicroBatcher
+from utils.padding_metrics import PaddingMetrics
+from utils.sentiment_aggregates import AggregateRows, SentimentAggregateStore
+
 
 class SentimentAnalyzer:
     """
@@ -34,25 +43,132 @@ class SentimentAnalyzer:
         "worst", "disgusting", "unacceptable", "dirty", "rude", "uncomfortable"
     ]
     
+    # All sentiment and topic keywords, matched as whole words in one pass
+    KEYWORD_MATCHER = KeywordMatcher({
+        "positive": POSITIVE_WORDS,
+        "negative": NEGATIVE_WORDS,
+        **TOPIC_KEYWORDS
+    })
+    
+    # Lightweight sentence-transformers model used for sentiment analysis
+    MODEL_NAME = "all-MiniLM-L6-v2"
+    
+    # Texts embedded by both backends to check the ONNX model against PyTorch
+    BACKEND_CHECK_TEXTS = [
+        "This is excellent, amazing, and wonderful",
+        "This is terrible, awful, and horrible",
+        "The staff were friendly and the room was spotless.",
+        "The wifi was slow and breakfast was overpriced, but the location is central.",
+        "Okay"
+    ]
+    
     def __init__(self):
         """Initialize the sentiment analyzer with sentence-transformers model."""
         try:
-            # Use a lightweight model for sentiment analysis
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            
-            # Pre-compute embeddings for sentiment anchors
-            self.positive_embedding = self.model.encode("This is excellent, amazing, and wonderful")
-            self.negative_embedding = self.model.encode("This is terrible, awful, and horrible")
-            self.neutral_embedding = self.model.encode("This is okay, average, and acceptable")
+            self.model, self.model_id = self._load_model()
             
         except Exception as e:
             print(f"Warning: Failed to load sentiment model: {e}")
-            self.model = None
+            self.model, self.model_id = None, self.MODEL_NAME
+        
+        # Embeddings of different backends differ slightly, so they are cached apart
+        self.embedding_cache = EmbeddingCache(
+            self.model_id,
+            max_entries=settings.SENTIMENT_EMBEDDING_CACHE_SIZE,
+            path=settings.SENTIMENT_EMBEDDING_CACHE_PATH
+        )
+        self.padding_metrics = PaddingMetrics()
+        self.executor = InferenceExecutor(
+            workers=settings.SENTIMENT_INFERENCE_WORKERS,
+            max_queue=settings.SENTIMENT_INFERENCE_QUEUE_SIZE,
+            name="sentiment"
+        )
+        self.micro_batcher = MicroBatcher(
+            self._run_batch,
+            max_batch_size=settings.SENTIMENT_MICRO_BATCH_SIZE,
+            max_wait_ms=settings.SENTIMENT_MICRO_BATCH_WAIT_MS
+        )
+        self.aggregates = SentimentAggregateStore(settings.SENTIMENT_AGGREGATES_PATH)
+        
+        if self.model is not None:
+            try:
+                self._load_anchors()
+            except Exception as e:
+                print(f"Warning: Failed to load sentiment model: {e}")
+                self.model = None
+    
+    def _load_model(self) -> Tuple[Any, str]:
+        """
+        Load the embedding model for the configured backend.
+        
+        The PyTorch model is loaded from SENTIMENT_MODEL_DIR when set (no
+        network access), otherwise by name. With SENTIMENT_MODEL_BACKEND
+        "onnx", the ONNX Runtime encoder of the same directory is used
+        instead if its embeddings are within SENTIMENT_ONNX_TOLERANCE
+        (cosine distance) of PyTorch's; otherwise PyTorch is kept.
+        
+        Returns:
+            Tuple of (model with an encode method, model id for the embedding cache)
+        """
+        model = SentenceTransformer(settings.SENTIMENT_MODEL_DIR or self.MODEL_NAME)
+        
+        if settings.SENTIMENT_MODEL_BACKEND.lower() != "onnx":
+            return model, self.MODEL_NAME
+        
+        if not settings.SENTIMENT_MODEL_DIR:
+            print("Warning: ONNX sentiment backend needs SENTIMENT_MODEL_DIR, using PyTorch")
+            return model, self.MODEL_NAME
+        
+        try:
+            from utils.onnx_encoder import OnnxSentenceEncoder, max_embedding_deviation
+            
+            onnx_model = OnnxSentenceEncoder(
+                settings.SENTIMENT_MODEL_DIR,
+                quantize=settings.SENTIMENT_ONNX_QUANTIZE,
+                max_seq_length=model.max_seq_length,
+                source_model=model
+            )
+            deviation = max_embedding_deviation(model, onnx_model, self.BACKEND_CHECK_TEXTS)
+            
+            if deviation > settings.SENTIMENT_ONNX_TOLERANCE:
+                print(
+                    f"Warning: {onnx_model.variant} embeddings deviate {deviation:.2e} from PyTorch "
+                    f"(tolerance {settings.SENTIMENT_ONNX_TOLERANCE}), using PyTorch"
+                )
+                return model, self.MODEL_NAME
+            
+            print(f"Using {onnx_model.variant} sentiment backend (deviation {deviation:.2e})")
+            return onnx_model, f"{self.MODEL_NAME}:{onnx_model.variant}"
+            
+        except Exception as e:
+            print(f"Warning: Failed to load ONNX sentiment backend, using PyTorch: {e}")
+            return model, self.MODEL_NAME
+    
+    def _load_anchors(self) -> None:
+        """Pre-compute the sentiment anchor embeddings with the current model."""
+        self.positive_embedding, self.negative_embedding, self.neutral_embedding = self.embedding_cache.encode(
+            self.model,
+            [
+                "This is excellent, amazing, and wonderful",
+                "This is terrible, awful, and horrible",
+                "This is okay, average, and acceptable"
+            ]
+        )
+        
+        # Unit anchors as rows (positive, negative, neutral) for batched similarities
+        self.anchor_matrix = self._normalize_rows(np.stack([
+            self.positive_embedding,
+            self.negative_embedding,
+            self.neutral_embedding
+        ]))
     
     async def analyze_review(self, review_text: str) -> Dict[str, Any]:
         """
         Analyze sentiment and extract topics from a review.
         
+        Concurrent calls are coalesced by the micro-batcher into one
+        batched model call.
+        
         Args:
             review_text: The review text to analyze
             
@@ -62,33 +178,11 @@ class SentimentAnalyzer:
                 - classification: positive/neutral/negative
                 - topics: Topic-specific sentiment scores
                 - flagged: Whether review is extremely negative (score < 0.3)
+            
+        Raises:
+            InferenceQueueFull: If the inference queue is full
         """
-        if not review_text or not review_text.strip():
-            return {
-                "score": 0.5,
-                "classification": "neutral",
-                "topics": {},
-                "flagged": False
-            }
-        
-        # Calculate overall sentiment score
-        score = self._calculate_sentiment_score(review_text)
-        
-        # Classify sentiment
-        classification = self._classify_sentiment(score)
-        
-        # Extract topic-specific sentiments
-        topics = self._extract_topic_sentiments(review_text)
-        
-        # Flag extremely negative reviews
-        flagged = score < 0.3
-        
-        return {
-            "score": round(score, 3),
-            "classification": classification,
-            "topics": topics,
-            "flagged": flagged
-        }
+        return await self.micro_batcher.submit(review_text)
     
     def _calculate_sentiment_score(self, text: str) -> float:
         """
@@ -100,41 +194,116 @@ class SentimentAnalyzer:
         Returns:
             Sentiment score between 0 (negative) and 1 (positive)
         """
-        if not self.model:
-            # Fallback to keyword-based analysis
-            return self._keyword_based_sentiment(text)
+        return float(self._score_texts([text])[0])
+    
+    def _score_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Calculate sentiment scores of many texts with one batched encode.
         
-        try:
-            # Get embedding for the review
-            review_embedding = self.model.encode(text)
-            
-            # Calculate cosine similarity with sentiment anchors
-            pos_similarity = self._cosine_similarity(review_embedding, self.positive_embedding)
-            neg_similarity = self._cosine_similarity(review_embedding, self.negative_embedding)
-            neu_similarity = self._cosine_similarity(review_embedding, self.neutral_embedding)
-            
-            # Normalize similarities to get a score
-            # Higher positive similarity = higher score
-            # Higher negative similarity = lower score
-            total_similarity = pos_similarity + neg_similarity + neu_similarity
-            
-            if total_similarity == 0:
-                return 0.5
-            
-            # Weight the similarities
-            score = (pos_similarity * 1.0 + neu_similarity * 0.5 + neg_similarity * 0.0) / total_similarity
-            
-            # Adjust with keyword analysis for better accuracy
-            keyword_score = self._keyword_based_sentiment(text)
+        Args:
+            texts: Texts to score
             
-            # Combine both approaches (70% semantic, 30% keyword)
-            final_score = 0.7 * score + 0.3 * keyword_score
+        Returns:
+            Array of sentiment scores between 0 (negative) and 1 (positive)
+        """
+        keyword_scores = np.array([self._keyword_based_sentiment(text) for text in texts])
+        return self._score_embeddings(self._encode_texts(texts), keyword_scores)
+    
+    def _encode_texts(self, texts: List[str]) -> Optional[np.ndarray]:
+        """
+        Encode texts in one batched model call.
+        
+        Texts already in the embedding cache are not encoded again.
+        
+        Args:
+            texts: Texts to encode
             
-            return max(0.0, min(1.0, final_score))
+        Returns:
+            Unit embeddings as rows, or None without a model or on failure
+        """
+        if not self.model or not texts:
+            return None
+        
+        try:
+            embeddings = self.embedding_cache.encode(
+                self.padding_metrics.bind(self.model),
+                texts,
+                batch_size=settings.SENTIMENT_BATCH_SIZE
+            )
+            return self._normalize_rows(embeddings)
             
         except Exception as e:
-            print(f"Error in sentiment calculation: {e}")
-            return self._keyword_based_sentiment(text)
+            print(f"Error in sentiment encoding: {e}")
+            return None
+    
+    def _score_embeddings(self, embeddings: Optional[np.ndarray], keyword_scores: np.ndarray) -> np.ndarray:
+        """
+        Score embeddings against the sentiment anchors.
+        
+        Every row is compared with the three anchors in a single matrix
+        product, then blended with the keyword score of its text. Rows need
+        not be unit length: the score only depends on the ratio of the
+        similarities, so a mean of sentence embeddings scores the same as
+        the mean of their anchor similarities.
+        
+        Args:
+            embeddings: Embeddings as rows, or None to use keywords only
+            keyword_scores: Keyword score of each row's text
+            
+        Returns:
+            Array of sentiment scores between 0 (negative) and 1 (positive)
+        """
+        keyword_scores = np.asarray(keyword_scores, dtype=np.float64)
+        
+        if embeddings is None:
+            # Fallback to keyword-based analysis
+            return keyword_scores
+        
+        # Similarity with the anchors: (rows, [positive, negative, neutral])
+        similarities = embeddings @ self.anchor_matrix.T
+        pos_similarity = similarities[:, 0]
+        neg_similarity = similarities[:, 1]
+        neu_similarity = similarities[:, 2]
+        
+        # Normalize similarities to get a score
+        # Higher positive similarity = higher score
+        # Higher negative similarity = lower score
+        total_similarity = pos_similarity + neg_similarity + neu_similarity
+        has_total = total_similarity != 0
+        
+        # Weight the similarities
+        score = (pos_similarity * 1.0 + neu_similarity * 0.5 + neg_similarity * 0.0) / np.where(has_total, total_similarity, 1.0)
+        
+        # Combine both approaches (70% semantic, 30% keyword)
+        final_scores = np.clip(0.7 * score + 0.3 * keyword_scores, 0.0, 1.0)
+        
+        return np.where(has_total, final_scores, 0.5)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get runtime metrics of the analyzer.
+        
+        Returns:
+            Dictionary with the embedding cache hit ratios, the inference
+            queue depth and wait times, micro-batch sizes, padding
+            efficiency of the encoder batches, and the number of items and
+            reviews in the aggregate store
+        """
+        return {
+            "model_loaded": self.model is not None,
+            "model_id": self.model_id,
+            "embedding_cache": self.embedding_cache.stats(),
+            "inference": self.executor.stats(),
+            "micro_batching": self.micro_batcher.stats(),
+            "padding": self.padding_metrics.stats(),
+            "aggregates": self.aggregates.stats()
+        }
+    
+    def close(self) -> None:
+        """Finish queued inference jobs and release the embedding cache and aggregate store."""
+        self.executor.close()
+        self.embedding_cache.close()
+        self.aggregates.close()
     
     def _keyword_based_sentiment(self, text: str) -> float:
         """
@@ -146,11 +315,21 @@ class SentimentAnalyzer:
         Returns:
             Sentiment score between 0 and 1
         """
-        text_lower = text.lower()
+        return self._keyword_score(self.KEYWORD_MATCHER.keywords(text))
+    
+    def _keyword_score(self, keywords: Set[str]) -> float:
+        """
+        Keyword-based sentiment of a text from the keywords found in it.
         
+        Args:
+            keywords: Distinct keywords found by KEYWORD_MATCHER
+            
+        Returns:
+            Sentiment score between 0 and 1
+        """
         # Count positive and negative words
-        positive_count = sum(1 for word in self.POSITIVE_WORDS if word in text_lower)
-        negative_count = sum(1 for word in self.NEGATIVE_WORDS if word in text_lower)
+        positive_count = self.KEYWORD_MATCHER.count(keywords, "positive")
+        negative_count = self.KEYWORD_MATCHER.count(keywords, "negative")
         
         # Calculate score
         total_sentiment_words = positive_count + negative_count
@@ -182,6 +361,13 @@ class SentimentAnalyzer:
         
         return dot_product / (norm1 * norm2)
     
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        """Scale rows to unit length as float32, leaving zero rows as they are."""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+    
     def _classify_sentiment(self, score: float) -> str:
         """
         Classify sentiment based on score.
@@ -209,24 +395,29 @@ class SentimentAnalyzer:
         Returns:
             Dictionary of topic-specific sentiment scores
         """
-        topics = {}
-        sentences = self._split_into_sentences(review_text)
+        return self._analyze_batch([review_text])[0]["topics"]
+    
+    def _topic_sentences(self, sentence_keywords: List[Set[str]]) -> Dict[str, List[int]]:
+        """
+        Find the sentences mentioning each topic.
         
-        for topic, keywords in self.TOPIC_KEYWORDS.items():
+        Args:
+            sentence_keywords: Keywords found in each sentence of a review
+            
+        Returns:
+            Dictionary of topic to the indices of its sentences, for topics mentioned
+        """
+        topic_sentences = {}
+        sentence_groups = [self.KEYWORD_MATCHER.groups(keywords) for keywords in sentence_keywords]
+        
+        for topic in self.TOPIC_KEYWORDS:
             # Find sentences mentioning this topic
-            topic_sentences = []
-            for sentence in sentences:
-                sentence_lower = sentence.lower()
-                if any(keyword in sentence_lower for keyword in keywords):
-                    topic_sentences.append(sentence)
-            
-            # Calculate sentiment for topic-specific sentences
-            if topic_sentences:
-                topic_text = " ".join(topic_sentences)
-                topic_score = self._calculate_sentiment_score(topic_text)
-                topics[topic] = round(topic_score, 3)
-        
-        return topics
+            matching = [i for i, groups in enumerate(sentence_groups) if topic in groups]
+            
+            if matching:
+                topic_sentences[topic] = matching
+        
+        return topic_sentences
     
     def _split_into_sentences(self, text: str) -> List[str]:
         """
@@ -260,13 +451,11 @@ class SentimentAnalyzer:
         if topic not in self.TOPIC_KEYWORDS:
             return ""
         
-        keywords = self.TOPIC_KEYWORDS[topic]
         sentences = self._split_into_sentences(review_text)
         
         topic_sentences = []
         for sentence in sentences:
-            sentence_lower = sentence.lower()
-            if any(keyword in sentence_lower for keyword in keywords):
+            if topic in self.KEYWORD_MATCHER.groups(self.KEYWORD_MATCHER.keywords(sentence)):
                 topic_sentences.append(sentence)
         
         return " ".join(topic_sentences)
@@ -278,14 +467,159 @@ class SentimentAnalyzer:
         """
         Analyze multiple reviews in batch for efficiency.
         
+        All reviews and their topic sentences are encoded together; see
+        _analyze_batch. Runs in the inference executor, off the event loop.
+        
         Args:
             reviews: List of review texts
             
         Returns:
             List of sentiment analysis results
+            
+        Raises:
+            InferenceQueueFull: If the inference queue is full
+        """
+        return await self._run_batch(reviews)
+    
+    async def rebuild_aggregates(
+        self,
+        reviews: AsyncIterable[Tuple[str, str, str]],
+        chunk_size: int = 64
+    ) -> AsyncIterator[Dict[str, int]]:
         """
+        Rebuild the aggregate store from historical reviews.
+        
+        Reviews are analyzed in chunks as they arrive and summed in memory
+        per item and topic, so memory grows with the number of items, not
+        reviews. The aggregates of the item types in the stream are
+        replaced in one transaction once it ends, together with the
+        reviews recorded live in the meantime; other item types are kept.
+        If the stream fails, the store is left as it was.
+        
+        Args:
+            reviews: Tuples of (item_type, item_id, review_text)
+            chunk_size: Reviews analyzed per batch
+            
+        Yields:
+            Progress after each chunk: reviews analyzed and items seen so far
+        """
+        rows: AggregateRows = {}
+        items = set()
+        analyzed = 0
+        chunk: List[Tuple[str, str, str]] = []
+        
+        async def flush() -> Dict[str, int]:
+            nonlocal analyzed
+            results = await self._run_batch([text for _, _, text in chunk])
+            for (item_type, item_id, _), result in zip(chunk, results):
+                self.aggregates.accumulate(rows, item_type, item_id, result)
+                items.add((item_type, item_id))
+            analyzed += len(chunk)
+            chunk.clear()
+            return {"reviews": analyzed, "items": len(items)}
+        
+        rebuild_id = await asyncio.to_thread(self.aggregates.begin_rebuild)
+        try:
+            async for review in reviews:
+                chunk.append(review)
+                if len(chunk) >= chunk_size:
+                    yield await flush()
+            
+            if chunk:
+                yield await flush()
+            
+            item_types = {item_type for item_type, _ in items}
+            await asyncio.to_thread(self.aggregates.replace, rows, item_types, rebuild_id)
+        finally:
+            await asyncio.to_thread(self.aggregates.end_rebuild, rebuild_id)
+    
+    async def _run_batch(self, reviews: List[str]) -> List[Dict[str, Any]]:
+        """Analyze reviews in the inference executor."""
+        return await self.executor.run(self._analyze_batch, reviews)
+    
+    def _analyze_batch(self, reviews: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analyze reviews with a single batched model call.
+        
+        Each review and each of its sentences that mentions a topic is
+        encoded once, de-duplicated across the batch. A topic's embedding is
+        the mean of its sentences' embeddings, so topics sharing a sentence
+        do not encode it again. Keywords are matched once per sentence; the
+        keywords of a review or topic are those of its sentences.
+        
+        Args:
+            reviews: List of review texts
+            
+        Returns:
+            List of results as returned by analyze_review, in input order
+        """
+        plans: List[Optional[Dict[str, List[int]]]] = []
+        text_index: Dict[str, int] = {}
+        review_rows = []
+        review_keyword_scores = []
+        topic_keys = []
+        topic_rows = []
+        topic_keyword_scores = []
+        
+        for position, review in enumerate(reviews):
+            if not review or not review.strip():
+                plans.append(None)
+                continue
+            
+            sentences = self._split_into_sentences(review)
+            sentence_keywords = [self.KEYWORD_MATCHER.keywords(sentence) for sentence in sentences]
+            topic_sentences = self._topic_sentences(sentence_keywords)
+            
+            review_rows.append(text_index.setdefault(review, len(text_index)))
+            review_keyword_scores.append(self._keyword_score(set().union(*sentence_keywords)))
+            
+            for topic, indices in topic_sentences.items():
+                topic_keys.append((position, topic))
+                topic_rows.append([text_index.setdefault(sentences[i], len(text_index)) for i in indices])
+                topic_keyword_scores.append(self._keyword_score(set().union(*(sentence_keywords[i] for i in indices))))
+            
+            plans.append(topic_sentences)
+        
+        embeddings = self._encode_texts(list(text_index))
+        
+        analyzed = [position for position, topic_plan in enumerate(plans) if topic_plan is not None]
+        review_scores = dict(zip(analyzed, self._score_embeddings(
+            embeddings[review_rows] if embeddings is not None else None,
+            review_keyword_scores
+        )))
+        
+        # Topic rows: pooled sentence embeddings
+        pooled = None
+        if embeddings is not None and topic_rows:
+            pooled = np.stack([embeddings[rows].mean(axis=0) for rows in topic_rows])
+        topic_scores = dict(zip(topic_keys, self._score_embeddings(pooled, topic_keyword_scores)))
+        
         results = []
-        for review in reviews:
-            result = await self.analyze_review(review)
-            results.append(result)
+        for position, topic_plan in enumerate(plans):
+            if topic_plan is None:
+                results.append({
+                    "score": 0.5,
+                    "classification": "neutral",
+                    "topics": {},
+                    "flagged": False
+                })
+                continue
+            
+            # Calculate overall sentiment score
+            score = float(review_scores[position])
+            
+            # Extract topic-specific sentiments
+            topics = {
+                topic: round(float(topic_scores[(position, topic)]), 3)
+                for topic in topic_plan
+            }
+            
+            results.append({
+                "score": round(score, 3),
+                "classification": self._classify_sentiment(score),
+                "topics": topics,
+                # Flag extremely negative reviews
+                "flagged": score < 0.3
+            })
+        
         return results
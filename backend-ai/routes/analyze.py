@@ -1,9 +1,15 @@
 """Sentiment analysis API routes."""
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Path, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+import asyncio
+import json
+from config.settings import settings
 from models.sentiment_model import SentimentAnalyzer
+from utils.inference_executor import InferenceQueueFull
+from utils.ndjson import read_ndjson
 
 router = APIRouter(prefix="/api", tags=["analysis"])
 
@@ -14,6 +20,11 @@ sentiment_analyzer = SentimentAnalyzer()
 class ReviewAnalysisRequest(BaseModel):
     """Request model for review analysis."""
     review_text: str = Field(..., description="Review text to analyze")
+    item_type: str = Field("hotel", pattern="^(hotel|tour)$", description="Type of the reviewed item")
+    item_id: Optional[str] = Field(
+        None,
+        description="Reviewed hotel or tour; when set, the result is added to its sentiment aggregates"
+    )
 
 
 class BatchReviewAnalysisRequest(BaseModel):
@@ -43,6 +54,34 @@ class BatchSentimentResponse(BaseModel):
     total: int
 
 
+class ScoreAggregate(BaseModel):
+    """Running statistics of a sentiment score."""
+    count: int = Field(..., description="Reviews counted")
+    mean: float = Field(..., description="Mean score (0-1)")
+    std: float = Field(..., description="Standard deviation of the score")
+
+
+class SentimentAggregateResponse(BaseModel):
+    """Response model for the sentiment aggregates of a hotel or tour."""
+    success: bool
+    item_type: str
+    item_id: str
+    review_count: int
+    flagged_count: int
+    flagged_ratio: float
+    score: ScoreAggregate = Field(..., description="Overall sentiment score")
+    topics: Dict[str, ScoreAggregate] = Field(
+        default_factory=dict,
+        description="Sentiment score per topic, over the reviews mentioning it"
+    )
+
+
+class SentimentMetricsResponse(BaseModel):
+    """Response model for sentiment analyzer metrics."""
+    success: bool
+    metrics: Dict[str, Any]
+
+
 @router.post("/analyze-review", response_model=SentimentResponse)
 async def analyze_review(request: ReviewAnalysisRequest):
     """
@@ -55,9 +94,16 @@ async def analyze_review(request: ReviewAnalysisRequest):
     - Flagged status for extremely negative reviews (score < 0.3)
     
     Reviews with score < 0.3 are flagged for admin attention.
+    
+    With item_id set, the result is added to the item's sentiment
+    aggregates (see GET /analyze/aggregates/{item_type}/{item_id}).
     """
     try:
         result = await sentiment_analyzer.analyze_review(request.review_text)
+        if request.item_id:
+            await asyncio.to_thread(
+                sentiment_analyzer.aggregates.add, request.item_type, request.item_id, result
+            )
         
         return SentimentResponse(
             success=True,
@@ -67,6 +113,13 @@ async def analyze_review(request: ReviewAnalysisRequest):
             flagged=result["flagged"]
         )
     
+    except InferenceQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+    
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -91,8 +144,224 @@ async def analyze_reviews_batch(request: BatchReviewAnalysisRequest):
             total=len(results)
         )
     
+    except InferenceQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+    
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Batch sentiment analysis failed: {str(e)}"
         )
+
+
+class UploadStreamingResponse(StreamingResponse):
+    """
+    Streaming response that may read the request body while it streams.
+    
+    StreamingResponse listens for the client disconnecting by reading
+    from the connection, which would swallow the request body chunks the
+    response is still consuming. Here a disconnect instead ends the body
+    stream, and a failed send ends the response.
+    """
+    
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        
+        if self.background is not None:
+            await self.background()
+
+
+@router.post("/analyze-reviews-stream")
+async def analyze_reviews_stream(request: Request):
+    """
+    Analyze an NDJSON stream of reviews, streaming NDJSON results back.
+    
+    Each input line is a JSON object {"review_text": "...", "id": ...}
+    ("id" is optional and echoed back) or a plain JSON string. Reviews
+    are analyzed in chunks of SENTIMENT_STREAM_CHUNK_SIZE through the
+    batched encoder, and each chunk's results are sent as soon as it
+    finishes while the next chunk is read, so memory stays constant
+    whatever the size of the upload.
+    
+    Each output line carries the input "line" number; lines that cannot
+    be analyzed get "success": false and an "error". If analysis fails,
+    an {"error": ...} line is sent last; the line numbers already
+    answered tell the client where to resume.
+    """
+    chunk_size = max(1, settings.SENTIMENT_STREAM_CHUNK_SIZE)
+    
+    async def analyze_chunk(chunk: List[Dict[str, Any]]) -> str:
+        reviews = [entry["review_text"] for entry in chunk if "review_text" in entry]
+        results = iter(await sentiment_analyzer.batch_analyze(reviews))
+        
+        lines = []
+        for entry in chunk:
+            line = {"line": entry["line"]}
+            if "id" in entry:
+                line["id"] = entry["id"]
+            if "error" in entry:
+                line.update(success=False, error=entry["error"])
+            else:
+                line.update(success=True, **next(results))
+            lines.append(json.dumps(line, default=str) + "\n")
+        return "".join(lines)
+    
+    async def ndjson_lines() -> AsyncIterator[str]:
+        # One chunk is analyzed while the next is read
+        pending: Optional[asyncio.Future] = None
+        chunk: List[Dict[str, Any]] = []
+        try:
+            async for line_number, value, error in read_ndjson(
+                request.stream(),
+                max_line_bytes=settings.SENTIMENT_STREAM_MAX_LINE_BYTES
+            ):
+                chunk.append(_stream_entry(line_number, value, error))
+                if len(chunk) < chunk_size:
+                    continue
+                
+                previous, pending = pending, asyncio.ensure_future(analyze_chunk(chunk))
+                chunk = []
+                if previous is not None:
+                    yield await previous
+            
+            if pending is not None:
+                yield await pending
+                pending = None
+            if chunk:
+                yield await analyze_chunk(chunk)
+        
+        except Exception as e:
+            yield json.dumps({
+                "error": f"Streaming sentiment analysis failed: {str(e)}"
+            }) + "\n"
+        
+        finally:
+            if pending is not None:
+                pending.cancel()
+    
+    return UploadStreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+@router.get("/analyze/aggregates/{item_type}/{item_id}", response_model=SentimentAggregateResponse)
+async def get_sentiment_aggregates(
+    item_type: str = Path(..., pattern="^(hotel|tour)$", description="hotel or tour"),
+    item_id: str = Path(..., description="Hotel or tour identifier")
+):
+    """
+    Get the running sentiment aggregates of a hotel or tour.
+    
+    Counts, mean and standard deviation of the overall score and of each
+    topic's score, and the number of flagged reviews, over the reviews
+    analyzed with this item_id. Read from the aggregate store, without
+    analyzing any review; an item without reviews has zero counts.
+    """
+    try:
+        return SentimentAggregateResponse(
+            success=True,
+            **await asyncio.to_thread(sentiment_analyzer.aggregates.get, item_type, item_id)
+        )
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get sentiment aggregates: {str(e)}"
+        )
+
+
+@router.post("/analyze/aggregates/rebuild")
+async def rebuild_sentiment_aggregates(request: Request):
+    """
+    Rebuild the sentiment aggregates from an NDJSON stream of historical reviews.
+    
+    Each input line is {"item_type": "hotel", "item_id": "...",
+    "review_text": "..."}; lines without an item_id or review_text are
+    skipped. Reviews are analyzed in chunks of SENTIMENT_STREAM_CHUNK_SIZE
+    as the upload arrives, and a progress line is streamed back after
+    each chunk. When the upload ends, the aggregates of the item types in
+    the upload are replaced at once, keeping reviews recorded through
+    analyze-review during the rebuild, and a final line with "done": true
+    is sent. If the rebuild fails, an {"error": ...} line is sent last and
+    the aggregates are unchanged.
+    """
+    skipped = 0
+    
+    async def reviews() -> AsyncIterator[Tuple[str, str, str]]:
+        nonlocal skipped
+        async for _, value, _ in read_ndjson(
+            request.stream(),
+            max_line_bytes=settings.SENTIMENT_STREAM_MAX_LINE_BYTES
+        ):
+            review = _aggregate_review(value)
+            if review is None:
+                skipped += 1
+            else:
+                yield review
+    
+    async def ndjson_lines() -> AsyncIterator[str]:
+        progress = {"reviews": 0, "items": 0}
+        try:
+            async for progress in sentiment_analyzer.rebuild_aggregates(
+                reviews(),
+                chunk_size=max(1, settings.SENTIMENT_STREAM_CHUNK_SIZE)
+            ):
+                yield json.dumps({**progress, "skipped": skipped}) + "\n"
+            
+            yield json.dumps({"done": True, **progress, "skipped": skipped}) + "\n"
+        
+        except Exception as e:
+            yield json.dumps({
+                "error": f"Rebuilding sentiment aggregates failed: {str(e)}"
+            }) + "\n"
+    
+    return UploadStreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+def _aggregate_review(value: Any) -> Optional[Tuple[str, str, str]]:
+    """Get (item_type, item_id, review_text) from a rebuild line, or None if unusable."""
+    if not isinstance(value, dict):
+        return None
+    
+    item_type = value.get("item_type", "hotel")
+    item_id = value.get("item_id")
+    review_text = value.get("review_text")
+    if item_type not in ("hotel", "tour") or item_id in (None, "") or not isinstance(review_text, str):
+        return None
+    return item_type, str(item_id), review_text
+
+
+def _stream_entry(line_number: int, value: Any, error: Optional[str]) -> Dict[str, Any]:
+    """Turn a parsed NDJSON line into a review to analyze, or an error to report."""
+    entry: Dict[str, Any] = {"line": line_number}
+    if error is not None:
+        entry["error"] = error
+        return entry
+    
+    if isinstance(value, dict):
+        if "id" in value:
+            entry["id"] = value["id"]
+        value = value.get("review_text")
+    
+    if isinstance(value, str):
+        entry["review_text"] = value
+    else:
+        entry["error"] = "Expected a JSON string or an object with a string \"review_text\""
+    return entry
+
+
+@router.get("/analyze/metrics", response_model=SentimentMetricsResponse)
+async def get_sentiment_metrics():
+    """
+    Get sentiment analyzer metrics.
+    
+    Includes embedding cache lookups and hit ratios per tier (memory, disk),
+    the inference queue depth and wait times, micro-batch sizes, and the
+    size of the aggregate store.
+    """
+    return SentimentMetricsResponse(
+        success=True,
+        metrics=sentiment_analyzer.get_metrics()
+    )
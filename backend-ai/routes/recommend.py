@@ -1,8 +1,12 @@
 """Recommendation API routes."""
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Dict, Any, Optional, AsyncIterator
+import json
+import time
+from config.settings import settings
 from models.recommendation_model import RecommendationEngine
 
 router = APIRouter(prefix="/api", tags=["recommendations"])
@@ -22,15 +26,127 @@ class RecommendationRequest(BaseModel):
         default_factory=dict,
         description="User preferences (amenities, location, etc.)"
     )
+    item_type: str = Field(
+        "hotel",
+        pattern="^(hotel|tour|all)$",
+        description="Type of items to recommend (hotel, tour, or all for a mixed list)"
+    )
+    type_quotas: Optional[Dict[str, int]] = Field(
+        None,
+        description="Slots per item type in a mixed list, e.g. {\"hotel\": 4, \"tour\": 6}"
+    )
+    cursor: Optional[str] = Field(
+        None,
+        description="Cursor from a previous response to fetch the next page"
+    )
+    page_size: int = Field(10, ge=1, le=50, description="Number of recommendations per page")
 
 
 class RecommendationResponse(BaseModel):
     """Response model for recommendations."""
     success: bool
     recommendations: List[Dict[str, Any]]
+    total: int = Field(..., description="Number of items in the whole ranked list, across all pages")
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Cursor for the next page, or null on the last page"
+    )
+
+
+class BundleRequest(BaseModel):
+    """Request model for hotel + tour bundle recommendations."""
+    user_id: str = Field(..., description="User identifier")
+    budget: float = Field(..., gt=0, description="Maximum budget for the whole trip in USD")
+    check_in: Optional[str] = Field(None, description="Check-in date (ISO format)")
+    check_out: Optional[str] = Field(None, description="Check-out date (ISO format)")
+    preferences: Optional[Dict[str, Any]] = Field(
+        default_factory=dict,
+        description="User preferences (amenities, location, etc.)"
+    )
+    nights: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Number of hotel nights (defaults to the nights between check-in and check-out)"
+    )
+    max_tours: int = Field(3, ge=0, le=10, description="Maximum number of tours and events per bundle")
+    max_bundles: int = Field(3, ge=1, le=10, description="Number of bundles to return")
+
+
+class BundleResponse(BaseModel):
+    """Response model for bundle recommendations."""
+    success: bool
+    bundles: List[Dict[str, Any]]
+    total: int
+
+
+class InteractionEvent(BaseModel):
+    """Implicit feedback event."""
+    user_id: str = Field(..., description="User identifier")
+    item_id: str = Field(..., description="Hotel or tour identifier")
+    event_type: str = Field(
+        ...,
+        pattern="^(view|wishlist|search|booking)$",
+        description="Event type (view, wishlist, search, or booking)"
+    )
+    timestamp: Optional[float] = Field(
+        None,
+        description="Event time in epoch seconds (defaults to now)"
+    )
+    
+    @field_validator("timestamp")
+    @classmethod
+    def timestamp_not_in_future(cls, value: Optional[float]) -> Optional[float]:
+        """Reject timestamps ahead of the server clock, e.g. milliseconds."""
+        if value is not None and value > time.time() + settings.EVENT_MAX_CLOCK_SKEW_SECONDS:
+            raise ValueError("timestamp is in the future; use epoch seconds")
+        return value
+
+
+class InteractionBatchRequest(BaseModel):
+    """Request model for implicit feedback ingestion."""
+    events: List[InteractionEvent] = Field(..., min_length=1, max_length=10000)
+
+
+class InteractionBatchResponse(BaseModel):
+    """Response model for implicit feedback ingestion."""
+    success: bool
+    accepted: int
+
+
+class AlsoBookedResponse(BaseModel):
+    """Response model for items booked together with an item."""
+    success: bool
+    item_id: str
+    recommendations: List[Dict[str, Any]]
     total: int
 
 
+class SimilarItemsResponse(BaseModel):
+    """Response model for items similar to an item."""
+    success: bool
+    item_id: str
+    items: List[Dict[str, Any]]
+    total: int
+
+
+class TrendingResponse(BaseModel):
+    """Response model for trending items."""
+    success: bool
+    city: Optional[str]
+    items: List[Dict[str, Any]]
+    total: int
+
+
+def _request_dates(request: BaseModel) -> Dict[str, str]:
+    """Build the travel dates dictionary from a recommendation request."""
+    if request.check_in and request.check_out:
+        return {
+            "check_in": request.check_in,
+            "check_out": request.check_out
+        }
+    return {}
+
+
 @router.post("/recommend", response_model=RecommendationResponse)
 async def get_recommendations(request: RecommendationRequest):
     """
@@ -41,24 +157,131 @@ async def get_recommendations(request: RecommendationRequest):
     - Content-based filtering (40%)
     - Budget optimization
     - Real-time event integration
+    
+    Use item_type="all" to get hotels and tours in one ranked list.
+    
+    Pass the returned next_cursor back to get the next page. Pages are served
+    from the ranked list cached by the first request, so they stay consistent.
     """
     try:
-        dates = {}
-        if request.check_in and request.check_out:
-            dates = {
-                "check_in": request.check_in,
-                "check_out": request.check_out
-            }
+        dates = _request_dates(request)
         
-        recommendations = await recommendation_engine.get_recommendations(
+        page = await recommendation_engine.get_recommendation_page(
             user_id=request.user_id,
             budget=request.budget,
             preferences=request.preferences,
-            dates=dates
+            dates=dates,
+            item_type=request.item_type,
+            type_quotas=request.type_quotas,
+            cursor=request.cursor,
+            page_size=request.page_size
         )
         
+        if page is None:
+            raise HTTPException(
+                status_code=410,
+                detail="Recommendation cursor is invalid or has expired"
+            )
+        
         return RecommendationResponse(
             success=True,
+            recommendations=page["recommendations"],
+            total=page["total"],
+            next_cursor=page["next_cursor"]
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate recommendations: {str(e)}"
+        )
+
+
+@router.post("/recommend/stream")
+async def stream_recommendations(request: RecommendationRequest):
+    """
+    Stream recommendations as NDJSON for progressive rendering.
+    
+    Each line is a JSON object with a "stage" field:
+    - initial: popularity-ranked page, sent before personalization
+    - personalized: hybrid collaborative + content-based ranking
+    - final: event-boosted ranking with next_cursor for pagination
+    
+    If generation fails mid-stream, an "error" stage line is sent last.
+    """
+    dates = _request_dates(request)
+    
+    async def ndjson_lines() -> AsyncIterator[str]:
+        try:
+            async for chunk in recommendation_engine.stream_recommendations(
+                user_id=request.user_id,
+                budget=request.budget,
+                preferences=request.preferences,
+                dates=dates,
+                item_type=request.item_type,
+                type_quotas=request.type_quotas,
+                page_size=request.page_size
+            ):
+                yield json.dumps(chunk, default=str) + "\n"
+        except Exception as e:
+            yield json.dumps({
+                "stage": "error",
+                "detail": f"Failed to generate recommendations: {str(e)}"
+            }) + "\n"
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+@router.post("/recommend/bundle", response_model=BundleResponse)
+async def get_bundle_recommendations(request: BundleRequest):
+    """
+    Recommend trip bundles of one hotel plus tours and events.
+    
+    Each bundle holds a hotel for the whole stay and up to max_tours tours
+    and events, chosen to maximize the combined recommendation score while
+    the total stays within 90% of the budget. Bundles use different hotels
+    and are sorted by bundle score.
+    """
+    try:
+        bundles = await recommendation_engine.get_bundle_recommendations(
+            user_id=request.user_id,
+            budget=request.budget,
+            preferences=request.preferences,
+            dates=_request_dates(request),
+            nights=request.nights,
+            max_tours=request.max_tours,
+            max_bundles=request.max_bundles
+        )
+        
+        return BundleResponse(
+            success=True,
+            bundles=bundles,
+            total=len(bundles)
+        )
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate bundles: {str(e)}"
+        )
+
+
+@router.get("/recommend/also-booked/{item_id}", response_model=AlsoBookedResponse)
+async def get_also_booked(item_id: str, limit: int = Query(10, ge=1, le=50)):
+    """
+    Get the hotels and tours travelers most often booked together with an item.
+    
+    Items are ordered by the number of booking sessions or trips that
+    contained both; each carries that count as co_bookings.
+    """
+    try:
+        recommendations = await recommendation_engine.get_also_booked(item_id, limit)
+        
+        return AlsoBookedResponse(
+            success=True,
+            item_id=item_id,
             recommendations=recommendations,
             total=len(recommendations)
         )
@@ -66,5 +289,84 @@ async def get_recommendations(request: RecommendationRequest):
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to generate recommendations: {str(e)}"
+            detail=f"Failed to get also-booked items: {str(e)}"
+        )
+
+
+@router.get("/similar/{item_id}", response_model=SimilarItemsResponse)
+async def get_similar_items(item_id: str, limit: int = Query(10, ge=1, le=50)):
+    """
+    Get the hotels or tours most like an item.
+    
+    Similarity combines item features (price, rating, amenities or
+    categories, location) with the name and description, and is read from
+    a precomputed neighbor table; each item carries its similarity (up to 1).
+    """
+    try:
+        items = await recommendation_engine.get_similar_items(item_id, limit)
+        
+        return SimilarItemsResponse(
+            success=True,
+            item_id=item_id,
+            items=items,
+            total=len(items)
+        )
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get similar items: {str(e)}"
+        )
+
+
+@router.get("/trending", response_model=TrendingResponse)
+async def get_trending(
+    city: Optional[str] = Query(None, description="City to get trending items for (all cities if omitted)"),
+    item_type: Optional[str] = Query(None, pattern="^(hotel|tour)$", description="Only hotels or only tours"),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """
+    Get the hotels and tours with the most recent views and bookings.
+    
+    Counts are approximate and decay over time (see TRENDING_* settings);
+    bookings weigh more than views.
+    """
+    try:
+        items = await recommendation_engine.get_trending(city, item_type, limit)
+        
+        return TrendingResponse(
+            success=True,
+            city=city,
+            items=items,
+            total=len(items)
+        )
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get trending items: {str(e)}"
+        )
+
+
+@router.post("/interactions", response_model=InteractionBatchResponse)
+async def record_interactions(request: InteractionBatchRequest):
+    """
+    Record implicit feedback events (views, wishlists, searches, bookings).
+    
+    Events are weighted by type and decay exponentially over time; they
+    feed collaborative filtering for items a user has not rated, and views
+    and bookings feed the trending counters. Send events in batches of up
+    to 10,000.
+    """
+    try:
+        accepted = recommendation_engine.record_interactions(
+            [event.model_dump() for event in request.events]
+        )
+        
+        return InteractionBatchResponse(success=True, accepted=accepted)
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to record interactions: {str(e)}"
         )
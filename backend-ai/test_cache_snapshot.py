@@ -0,0 +1,188 @@
+"""
+Test script for recommendation cache snapshots.
+Tests array round-trips, atomic snapshot switching and warm engine restarts.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+from utils.cache_snapshot import CacheSnapshot
+from utils.rating_matrix import RatingMatrix
+from models.recommendation_model import RecommendationEngine
+
+
+def make_ratings(num_users, num_items, seed=5):
+    """Generate a random user-item rating dictionary."""
+    rng = np.random.default_rng(seed)
+    return {
+        f'user-{u}': {
+            f'item-{i}': float(rng.integers(1, 6))
+            for i in rng.choice(num_items, size=rng.integers(5, 30), replace=False)
+        }
+        for u in range(num_users)
+    }
+
+
+def test_snapshot_round_trip():
+    """Test that arrays come back memory-mapped and unchanged."""
+    print("\n" + "="*80)
+    print("TEST 1: Snapshot Round Trip")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot = CacheSnapshot(directory)
+        assert snapshot.load() is None, "Empty directory should have no snapshot"
+
+        ratings = make_ratings(200, 100)
+        rating_matrix = RatingMatrix.from_dict(ratings)
+        snapshot.save(rating_matrix.to_arrays('ratings'), {'format': 1})
+
+        arrays, metadata = snapshot.load()
+        assert metadata == {'format': 1}
+        assert isinstance(arrays['ratings_data'], np.memmap), "Arrays should be memory-mapped"
+        assert not arrays['ratings_data'].flags['WRITEABLE'], "Arrays should be read-only"
+
+        restored = RatingMatrix.from_arrays(arrays, 'ratings')
+        assert restored.to_dict() == ratings, "Ratings changed in the round trip"
+        assert np.allclose(restored.cosine_to('user-0'), rating_matrix.cosine_to('user-0'))
+
+        # The squares and the rated mask are mapped too, sharing the index arrays
+        for matrix, name in ((restored.ratings, 'data'), (restored.squared, 'squared'), (restored.rated, 'rated')):
+            assert np.shares_memory(matrix.data, arrays[f'ratings_{name}']), f"{name} should not be copied"
+            assert np.shares_memory(matrix.indices, arrays['ratings_indices']), f"{name} indices should not be copied"
+
+        # Arrays saved before the squares were stored still load
+        old = {name: array for name, array in arrays.items() if not name.endswith(('_squared', '_rated'))}
+        assert np.allclose(RatingMatrix.from_arrays(old, 'ratings').cosine_to('user-0'), rating_matrix.cosine_to('user-0'))
+
+    print("\n✓ Snapshot round trip test passed")
+
+
+def test_atomic_switch():
+    """Test that CURRENT always names a complete snapshot and old ones are pruned."""
+    print("\n" + "="*80)
+    print("TEST 2: Atomic Snapshot Switch")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot = CacheSnapshot(directory, keep=2)
+        paths = [snapshot.save({'values': np.arange(n)}, {'n': n}) for n in range(1, 5)]
+
+        arrays, metadata = snapshot.load()
+        assert metadata == {'n': 4}, "Latest snapshot should be current"
+        assert arrays['values'].tolist() == [0, 1, 2, 3]
+
+        remaining = sorted(name for name in os.listdir(directory) if name.startswith('snapshot-'))
+        assert remaining == [os.path.basename(p) for p in paths[-2:]], f"Unexpected snapshots: {remaining}"
+        assert not os.path.exists(os.path.join(directory, 'CURRENT.tmp'))
+
+        # Concurrent writers each switch CURRENT through their own temporary file
+        def save_many(writer):
+            for n in range(20):
+                CacheSnapshot(directory, keep=50).save({'values': np.arange(n + 1)}, {'writer': writer, 'n': n})
+
+        threads = [threading.Thread(target=save_many, args=(writer,)) for writer in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        arrays, metadata = snapshot.load()
+        assert metadata['n'] == 19 and len(arrays['values']) == 20, metadata
+        leftovers = [name for name in os.listdir(directory) if name.endswith('.tmp')]
+        assert leftovers == [], f"Temporary files left behind: {leftovers}"
+
+    print("\n✓ Atomic switch test passed")
+
+
+async def test_warm_restart():
+    """Test that a restarted engine serves the same neighbors without rebuilding."""
+    print("\n" + "="*80)
+    print("TEST 3: Warm Engine Restart")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = RecommendationEngine()
+        engine.explicit_ratings = make_ratings(5000, 2000)
+        engine.implicit_feedback.add_events([
+            {'user_id': 'user-1', 'item_id': 'item-7', 'event_type': 'wishlist'},
+            {'user_id': 'user-new', 'item_id': 'item-3', 'event_type': 'view'},
+        ])
+
+        matrix = await engine._build_user_item_matrix()
+        neighbors = {
+            user_id: await engine._find_similar_users(user_id, matrix)
+            for user_id in ['user-0', 'user-1', 'user-2']
+        }
+        popularity = await engine._get_item_popularity()
+
+        start = time.perf_counter()
+        path = await engine.save_cache_snapshot(directory)
+        print(f"\nSaved snapshot in {(time.perf_counter() - start) * 1000:.1f} ms: {path}")
+        assert path is not None
+
+        restarted = RecommendationEngine()
+        start = time.perf_counter()
+        assert restarted.load_cache_snapshot(directory), "Snapshot should load"
+        print(f"Loaded snapshot in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        # Reads are served from the mapped CSR arrays, not an expanded dictionary
+        assert restarted.user_item_matrix is restarted.rating_matrix
+        assert isinstance(restarted.user_item_matrix, RatingMatrix) and not isinstance(restarted.user_item_matrix, dict)
+
+        # Ratings are stored as float32, like the scoring matrix
+        assert restarted.user_item_matrix.keys() == matrix.keys(), "Interaction matrix users differ"
+        for user_id, items in matrix.items():
+            restored = restarted.user_item_matrix[user_id]
+            assert restored.keys() == items.keys(), f"Items differ for {user_id}"
+            assert np.allclose([restored[i] for i in items], list(items.values())), f"Ratings differ for {user_id}"
+        assert restarted.item_popularity == popularity, "Popularity table differs"
+        assert restarted.implicit_feedback.scores().keys() == engine.implicit_feedback.scores().keys()
+
+        # Warm caches are used as-is: no rebuild, no similarity recomputation
+        async def no_rebuild():
+            raise AssertionError("Explicit ratings should not be reloaded")
+        restarted._get_explicit_ratings = no_rebuild
+
+        warm_matrix = await restarted._build_user_item_matrix()
+        assert warm_matrix is restarted.user_item_matrix
+        for user_id, expected in neighbors.items():
+            assert restarted.user_similarity_cache[f'{user_id}_10'] == expected
+            assert await restarted._find_similar_users(user_id, warm_matrix) == expected
+
+        # The memory-mapped rating matrix answers queries not in the cache
+        fresh = await restarted._find_similar_users('user-3', warm_matrix)
+        expected = await engine._find_similar_users('user-3', matrix)
+        assert fresh == expected, "Neighbors from the mapped matrix differ"
+
+    print("\n✓ Warm restart test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        test_snapshot_round_trip()
+        test_atomic_switch()
+        asyncio.run(test_warm_restart())
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Test script for the columnar item catalog.
+Tests dict round-trips, vectorized features, memory use and float32 accuracy.
+"""
+
+import sys
+import time
+import numpy as np
+from utils.catalog import ItemCatalog
+from utils.feature_extractor import FeatureExtractor
+from utils.rating_matrix import RatingMatrix
+from models.recommendation_model import RecommendationEngine
+from tests_support import make_hotels
+
+
+def test_round_trip():
+    """Test that catalog rows rebuild the original item dicts."""
+    print("\n" + "="*80)
+    print("TEST 1: Catalog Round Trip")
+    print("="*80)
+
+    engine = RecommendationEngine()
+    items = engine._get_mock_hotels(float('inf')) + engine._get_mock_tours(float('inf'))
+    catalog = ItemCatalog.from_items(items)
+
+    for row, item in enumerate(items):
+        rebuilt = catalog.to_dict(row)
+        assert set(rebuilt.get('amenities', [])) == set(item.get('amenities', [])), f"Amenities differ for {item['id']}"
+        assert set(rebuilt.get('category', [])) == set(item.get('category', [])), f"Categories differ for {item['id']}"
+        for key in ('id', 'name', 'type', 'currency', 'average_rating', 'location', 'duration', 'difficulty',
+                    'price_per_night', 'price_per_person'):
+            assert rebuilt.get(key) == item.get(key), f"{key} differs for {item['id']}"
+
+    # Replacing an id overwrites its row
+    catalog.add_items([{**items[0], 'average_rating': 2.5, 'amenities': []}])
+    assert len(catalog) == len(items), "Replacing an item should not add a row"
+    assert catalog.to_dict(0)['average_rating'] == 2.5
+    assert catalog.to_dict(0)['amenities'] == []
+
+    print("\n✓ Round trip test passed")
+
+
+def test_vectorized_features():
+    """Test that vectorized features match the per-item extractors."""
+    print("\n" + "="*80)
+    print("TEST 2: Vectorized Features")
+    print("="*80)
+
+    engine = RecommendationEngine()
+    hotels = make_hotels(500)
+    tours = engine._get_mock_tours(float('inf'))
+    catalog = ItemCatalog.from_items(hotels + tours)
+
+    hotel_rows = catalog.rows_of_type('hotel')
+    tour_rows = catalog.rows_of_type('tour')
+
+    hotel_matrix = FeatureExtractor.extract_catalog_hotel_features(catalog, hotel_rows)
+    expected = np.array([FeatureExtractor.extract_hotel_features(h) for h in hotels])
+    assert np.allclose(hotel_matrix, expected, atol=1e-5), "Hotel features differ"
+
+    tour_matrix = FeatureExtractor.extract_catalog_tour_features(catalog, tour_rows)
+    expected = np.array([FeatureExtractor.extract_tour_features(t) for t in tours])
+    assert np.allclose(tour_matrix, expected, atol=1e-5), "Tour features differ"
+
+    # Content scores over rows match the dict-based entry point
+    user_profile = {'budget': 120, 'preferred_amenities': ['wifi', 'pool'], 'travel_style': 'balanced'}
+    items = hotels + tours
+    scores = engine.calculate_content_score(user_profile, items)
+    row_scores = engine._content_scores(user_profile, catalog, np.arange(len(items)))
+    assert np.allclose(scores, row_scores), "Content scores differ"
+
+    print("\n✓ Vectorized feature test passed")
+
+
+def test_memory_footprint():
+    """Test catalog memory and scoring speed against item dicts."""
+    print("\n" + "="*80)
+    print("TEST 3: Memory Footprint")
+    print("="*80)
+
+    hotels = make_hotels(100000)
+    catalog = ItemCatalog.from_items(hotels)
+
+    print(f"\nNumeric columns for {len(catalog)} items: {catalog.nbytes / 1e6:.1f} MB")
+    print(f"Per item: {catalog.nbytes / len(catalog):.0f} bytes")
+    assert catalog.nbytes / len(catalog) < 100, "Columns should stay under 100 bytes per item"
+
+    engine = RecommendationEngine()
+    user_profile = {'budget': 120, 'preferred_amenities': ['wifi', 'pool'], 'travel_style': 'balanced'}
+
+    start = time.perf_counter()
+    scores = engine._content_scores(user_profile, catalog, np.arange(len(catalog)))
+    elapsed = time.perf_counter() - start
+    print(f"Content scores for {len(scores)} rows: {elapsed * 1000:.1f} ms")
+
+    assert len(scores) == len(hotels)
+    assert scores.min() >= 0.0 and scores.max() <= 1.0
+
+    print("\n✓ Memory footprint test passed")
+
+
+def test_float32_accuracy():
+    """Test that the float32 matrix path ranks like the float64 pairwise path."""
+    print("\n" + "="*80)
+    print("TEST 4: Float32 Accuracy")
+    print("="*80)
+
+    def ranks_match(scores32, scores64, tolerance=1e-5):
+        """float32 order must be non-increasing in float64 up to near-ties."""
+        ordered = scores64[np.argsort(-scores32, kind='stable')]
+        return bool(np.all(np.diff(ordered) <= tolerance))
+
+    # Content similarity: one GEMV vs per-pair float64 cosine
+    hotels = make_hotels(20000)
+    catalog = ItemCatalog.from_items(hotels)
+    user_profile = {'budget': 120, 'preferred_amenities': ['wifi', 'pool'], 'travel_style': 'balanced'}
+
+    user_vector = FeatureExtractor.extract_user_preferences(user_profile)
+    item_matrix = FeatureExtractor.extract_catalog_hotel_features(catalog, np.arange(len(catalog)))
+    assert item_matrix.dtype == np.float32 and item_matrix.flags['C_CONTIGUOUS']
+
+    similarity32 = FeatureExtractor.normalize_rows(item_matrix) @ FeatureExtractor.normalize_rows(user_vector)
+    similarity64 = np.array([
+        FeatureExtractor.calculate_similarity(
+            user_vector.astype(np.float64),
+            FeatureExtractor.extract_hotel_features(h).astype(np.float64)
+        )
+        for h in hotels
+    ])
+
+    drift = np.abs(similarity32 - similarity64).max()
+    top32 = set(np.argsort(-similarity32, kind='stable')[:100])
+    top64 = set(np.argsort(-similarity64, kind='stable')[:100])
+    print(f"\nContent cosine: max drift {drift:.2e}, top-100 overlap {len(top32 & top64)}%")
+    assert drift < 1e-6, "Content similarity drifted"
+    assert ranks_match(similarity32, similarity64), "Content ranking differs"
+
+    # Collaborative similarity: three sparse GEMVs vs per-pair co-rated cosine
+    rng = np.random.default_rng(11)
+    user_item_matrix = {
+        f'user-{u}': {
+            f'item-{i}': float(rng.integers(1, 6))
+            for i in rng.choice(300, size=rng.integers(5, 40), replace=False)
+        }
+        for u in range(500)
+    }
+    rating_matrix = RatingMatrix.from_dict(user_item_matrix)
+
+    for target in ['user-0', 'user-1', 'user-2']:
+        similarity32 = rating_matrix.cosine_to(target)
+        target_items = user_item_matrix[target]
+
+        similarity64 = np.zeros(rating_matrix.num_users)
+        for idx, other in enumerate(rating_matrix.user_ids):
+            common = set(target_items) & set(user_item_matrix[other])
+            if common:
+                a = np.array([target_items[i] for i in common])
+                b = np.array([user_item_matrix[other][i] for i in common])
+                similarity64[idx] = min(1.0, a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+        drift = np.abs(similarity32 - similarity64).max()
+        print(f"CF cosine for {target}: max drift {drift:.2e}")
+        assert drift < 1e-6, "CF similarity drifted"
+        assert ranks_match(similarity32, similarity64), "CF neighbor ranking differs"
+
+    print("\n✓ Float32 accuracy test passed")
+
+
+def test_wide_tag_vocabulary():
+    """Test catalogs with more amenities and categories than fit in one 64-bit word."""
+    print("\n" + "="*80)
+    print("TEST 5: Wide Tag Vocabulary")
+    print("="*80)
+
+    engine = RecommendationEngine()
+    hotels = make_hotels(300)
+    for i, hotel in enumerate(hotels):
+        hotel['amenities'] = hotel['amenities'] + [f'amenity-{(i + 50 * j) % 140}' for j in range(3)]
+    tours = [
+        {**tour, 'category': [f'category-{(i * 3 + j) % 90}' for j in range(3)]}
+        for i, tour in enumerate(engine._get_mock_tours(float('inf')) * 40)
+    ]
+
+    # Loaded in two steps, so existing rows are widened when new tags arrive
+    catalog = ItemCatalog.from_items(hotels[:50] + tours[:5])
+    catalog.add_items(hotels[50:] + tours[5:], replace=False)
+    assert len(catalog.amenities) > 128 and catalog.amenity_mask.shape[1] == 3
+    assert len(catalog.categories) > 64 and catalog.category_mask.shape[1] == 2
+
+    items = hotels[:50] + tours[:5] + hotels[50:] + tours[5:]
+    for row, item in enumerate(items):
+        rebuilt = catalog.to_dict(row)
+        assert set(rebuilt.get('amenities', [])) == set(item.get('amenities', []))
+        assert set(rebuilt.get('category', [])) == set(item.get('category', []))
+
+    # Tags past the first word still count for features and amenity matching
+    hotel_rows = catalog.rows_of_type('hotel')
+    hotels_in_rows = [items[row] for row in hotel_rows]
+    expected = np.array([FeatureExtractor.extract_hotel_features(h) for h in hotels_in_rows])
+    assert np.allclose(FeatureExtractor.extract_catalog_hotel_features(catalog, hotel_rows), expected, atol=1e-5)
+
+    user_profile = {'budget': 120, 'preferred_amenities': ['wifi', 'amenity-100', 'amenity-139'], 'travel_style': 'balanced'}
+    row_scores = engine._content_scores(user_profile, catalog, np.arange(len(items)))
+    assert np.allclose(engine.calculate_content_score(user_profile, items), row_scores), "Content scores differ"
+
+    wide = catalog.rows_of(['hotel-3'])[0]
+    flags = catalog.tag_flags('amenities', [wide], hotels[3]['amenities'] + ['unknown'])
+    assert flags.tolist() == [[1.0] * len(hotels[3]['amenities']) + [0.0]]
+
+    print(f"\n{len(catalog.amenities)} amenities in {catalog.amenity_mask.shape[1]} words, "
+          f"{len(catalog.categories)} categories in {catalog.category_mask.shape[1]} words")
+    print("\n✓ Wide tag vocabulary test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        test_round_trip()
+        test_vectorized_features()
+        test_memory_footprint()
+        test_float32_accuracy()
+        test_wide_tag_vocabulary()
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Test script for the co-visitation ("booked together") matrix.
+Tests counts against a brute-force count, chunked builds, lookups and the
+engine's also-booked list and CF fallback.
+"""
+
+import asyncio
+import sys
+import time
+from collections import Counter
+import numpy as np
+from utils.covisitation import CoVisitationMatrix
+from models.recommendation_model import RecommendationEngine
+
+
+def make_sessions(count, num_items=2000, seed=3):
+    """Generate booking sessions with a skewed item distribution."""
+    rng = np.random.default_rng(seed)
+    return [
+        [f'item-{i}' for i in rng.zipf(1.5, size=rng.integers(1, 7)) % num_items]
+        for _ in range(count)
+    ]
+
+
+def brute_force_counts(sessions):
+    """Count co-booked pairs with plain dictionaries."""
+    counts = Counter()
+    for session in sessions:
+        items = list(dict.fromkeys(session))
+        for a in items:
+            for b in items:
+                if a != b:
+                    counts[(a, b)] += 1
+    return counts
+
+
+def test_counts():
+    """Test that the kept neighbors are the true top-N by count."""
+    print("\n" + "="*80)
+    print("TEST 1: Co-visitation Counts")
+    print("="*80)
+
+    sessions = make_sessions(20000)
+    expected = brute_force_counts(sessions)
+    matrix = CoVisitationMatrix.build(sessions, top_n=10, chunk_size=1000)
+
+    by_item = {}
+    for (a, b), count in expected.items():
+        by_item.setdefault(a, []).append((b, count))
+
+    for item_id, neighbors in by_item.items():
+        kept = matrix.neighbors(item_id)
+        assert len(kept) == min(10, len(neighbors)), f"Wrong neighbor count for {item_id}"
+        assert all(expected[(item_id, other)] == count for other, count in kept), f"Wrong counts for {item_id}"
+
+        counts = [count for _, count in kept]
+        assert counts == sorted(counts, reverse=True), f"Neighbors of {item_id} are not sorted"
+        best = sorted((count for _, count in neighbors), reverse=True)[:10]
+        assert counts == best, f"Neighbors of {item_id} are not the top 10"
+
+    assert matrix.neighbors('item-unknown') == []
+    assert len(matrix.neighbors('item-1', limit=3)) == 3
+
+    print(f"\n{len(matrix)} items, {matrix.counts.nnz} kept pairs")
+    print("\n✓ Count test passed")
+
+
+def test_chunked_build():
+    """Test that chunk size and intermediate pruning do not change the result."""
+    print("\n" + "="*80)
+    print("TEST 2: Chunked Build")
+    print("="*80)
+
+    sessions = make_sessions(100000)
+
+    start = time.perf_counter()
+    reference = CoVisitationMatrix.build(iter(sessions), top_n=20, chunk_size=100000)
+    print(f"\nOne chunk: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    chunked = CoVisitationMatrix.build(iter(sessions), top_n=20, chunk_size=5000, max_pairs=50000)
+    print(f"5,000-session chunks, pruned above 50,000 pairs: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    for item_id in reference.item_ids[:500]:
+        assert reference.neighbors(item_id) == chunked.neighbors(item_id), f"Neighbors of {item_id} differ"
+
+    start = time.perf_counter()
+    for item_id in reference.item_ids[:1000]:
+        reference.neighbors(item_id, limit=10)
+    print(f"Lookup: {(time.perf_counter() - start) * 1000:.2f} us per item")
+
+    print("\n✓ Chunked build test passed")
+
+
+async def test_engine_integration():
+    """Test the also-booked list and the co-visitation CF fallback."""
+    print("\n" + "="*80)
+    print("TEST 3: Engine Integration")
+    print("="*80)
+
+    engine = RecommendationEngine()
+
+    also_booked = await engine.get_also_booked('hotel-1')
+    print(f"\nAlso booked with hotel-1: {[(i['id'], i['co_bookings']) for i in also_booked]}")
+    assert also_booked, "hotel-1 should have co-booked items"
+    assert all('name' in item for item in also_booked), "Items should be full catalog entries"
+    counts = [item['co_bookings'] for item in also_booked]
+    assert counts == sorted(counts, reverse=True)
+    assert 'hotel-1' not in [item['id'] for item in also_booked]
+    assert len(await engine.get_also_booked('hotel-1', limit=1)) == 1
+
+    # A user without neighbors falls back to items booked with their history
+    catalog = engine._ensure_catalog()
+    rows = catalog.rows_of(['hotel-1', 'hotel-2', 'hotel-3', 'tour-1', 'tour-2'])
+    scores = await engine._collaborative_scores('user-1', catalog, rows, neighborhood=[])
+    assert scores.min() >= 0.5 and scores.max() == 1.0, "Co-booked items should score above neutral"
+
+    cold_scores = await engine._collaborative_scores('user-unknown', catalog, rows, neighborhood=[])
+    assert np.all(cold_scores == 0.5), "Users without history should get neutral scores"
+
+    print("\n✓ Engine integration test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        test_counts()
+        test_chunked_build()
+        asyncio.run(test_engine_integration())
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
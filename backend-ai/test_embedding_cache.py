@@ -0,0 +1,173 @@
+"""
+Test script for the embedding cache.
+Tests keys and LRU eviction, the SQLite tier shared between processes,
+and cached encoding in the sentiment analyzer.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import zlib
+import numpy as np
+from utils.embedding_cache import EmbeddingCache
+from tests_support import CountingEncoder, make_analyzer, make_reviews, make_tiny_model
+
+
+class HashEncoder:
+    """Deterministic stand-in model: embeddings seeded by a text hash."""
+
+    def __init__(self, dim=16):
+        self.dim = dim
+        self.calls = 0
+        self.texts = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        self.texts += len(texts)
+        return np.stack([
+            np.random.default_rng(zlib.crc32(text.encode("utf-8"))).normal(size=self.dim)
+            for text in texts
+        ]).astype(np.float32)
+
+
+def encode_in_worker(path, texts):
+    """Encode texts through a fresh cache in another process."""
+    cache = EmbeddingCache("hash-model", path=path)
+    cache.encode(HashEncoder(), texts)
+    cache.close()
+
+
+def test_keys_and_lru():
+    """Test normalization, model-scoped keys and LRU eviction."""
+    print("\n" + "="*80)
+    print("TEST 1: Keys and LRU Tier")
+    print("="*80)
+
+    cache = EmbeddingCache("hash-model", max_entries=3)
+    model = HashEncoder()
+
+    first = cache.encode(model, ["Great location", "Staff  were friendly ", "Great location"])
+    assert model.calls == 1 and model.texts == 2, "Duplicates in a call are encoded once"
+    assert np.array_equal(first[0], first[2])
+
+    again = cache.encode(model, ["Staff were friendly", "Great   location"])
+    assert model.calls == 1, "Whitespace variants are the same entry"
+    assert np.array_equal(again[0], first[1])
+
+    assert cache.key("Great location") != EmbeddingCache("other-model").key("Great location")
+    assert cache.key("Great location") != cache.key("great location"), "Case is kept"
+
+    # Least recently used entries are evicted first
+    cache.encode(model, ["a", "b"])
+    assert len(cache) == 3
+    cache.encode(model, ["b"])
+    assert model.calls == 2, "Recent entry should still be cached"
+    cache.encode(model, ["Staff were friendly"])
+    assert model.calls == 3, "Evicted entry is encoded again"
+
+    stats = cache.stats()
+    print(f"\nStats: {stats}")
+    assert stats["lookups"] == 9 and stats["misses"] == 6 and stats["memory_hits"] == 3
+    assert stats["hit_ratio"] == round(3 / 9, 4) and stats["encode_calls"] == 3
+    assert cache.encode(model, []).shape == (0, 0)
+
+    print("\n✓ Keys and LRU test passed")
+
+
+def test_disk_tier_shared():
+    """Test that embeddings written by one process are disk hits in another."""
+    print("\n" + "="*80)
+    print("TEST 2: Disk Tier Shared by Workers")
+    print("="*80)
+
+    path = os.path.join(tempfile.mkdtemp(prefix="embedding-cache-"), "embeddings.sqlite")
+    texts = [f"Review number {i}" for i in range(2000)]
+
+    workers = [
+        multiprocessing.get_context("spawn").Process(target=encode_in_worker, args=(path, texts[i::2]))
+        for i in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0, "Worker failed"
+
+    cache = EmbeddingCache("hash-model", max_entries=100, path=path)
+    model = HashEncoder()
+    embeddings = cache.encode(model, texts)
+    stats = cache.stats()
+    print(f"\nAfter two workers: {stats['disk_hits']} disk hits, {stats['misses']} misses")
+    assert model.calls == 0, "Everything was encoded by the workers"
+    assert stats["disk_hits"] == 2000
+    assert np.allclose(embeddings, HashEncoder().encode(texts)), "Disk embeddings are exact"
+
+    # Disk hits are promoted to memory, up to its size
+    cache.encode(model, texts[-10:])
+    assert cache.stats()["memory_hits"] == 10
+    cache.close()
+
+    # A different model never reads these entries
+    other = EmbeddingCache("other-model", path=path)
+    other.encode(model, texts[:5])
+    assert model.texts == 5
+    other.close()
+
+    print("\n✓ Disk tier test passed")
+
+
+async def test_analyzer_cache():
+    """Test that repeated reviews and anchors are not encoded again."""
+    print("\n" + "="*80)
+    print("TEST 3: Cached Sentiment Encoding")
+    print("="*80)
+
+    encoder = CountingEncoder(make_tiny_model())
+    analyzer = make_analyzer(encoder)
+    reviews = make_reviews(100)
+
+    # Anchors come from the cache when the model is loaded again
+    encoder.calls = 0
+    analyzer._load_anchors()
+    assert encoder.calls == 0, "Anchor phrases should be cached"
+
+    first = await analyzer.batch_analyze(reviews)
+    calls = encoder.calls
+    second = await analyzer.batch_analyze(reviews)
+    single = await analyzer.analyze_review(reviews[3])
+
+    metrics = analyzer.get_metrics()["embedding_cache"]
+    print(f"\nMetrics: {metrics}")
+    assert first == second and single == first[3], "Cached embeddings give the same results"
+    assert encoder.calls == calls == 1, "Repeated reviews are served from the cache"
+    assert metrics["hit_ratio"] > 0.5
+
+    print("\n✓ Cached sentiment encoding test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        test_keys_and_lru()
+        test_disk_tier_shared()
+        asyncio.run(test_analyzer_cache())
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
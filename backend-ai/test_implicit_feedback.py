@@ -0,0 +1,252 @@
+"""
+Test script for time-decayed implicit feedback.
+Tests lazy decay, ingestion throughput, merging into the user-item matrix,
+rejection of future timestamps and pruning of decayed cells.
+"""
+
+import asyncio
+import sys
+import time
+import numpy as np
+from utils.implicit_feedback import ImplicitFeedbackStore
+from models.recommendation_model import RecommendationEngine
+
+
+WEIGHTS = {'view': 1.0, 'wishlist': 4.0, 'search': 0.5}
+
+
+def test_lazy_decay():
+    """Test decay through the stored landmark and global factor."""
+    print("\n" + "="*80)
+    print("TEST 1: Lazy Decay")
+    print("="*80)
+
+    # The skew allows the events of the simulated clock below, up to 100 hours ahead
+    store = ImplicitFeedbackStore(WEIGHTS, half_life_hours=1.0, max_clock_skew=200 * 3600)
+    now = store.landmark
+
+    store.add_events([
+        {'user_id': 'u1', 'item_id': 'hotel-1', 'event_type': 'view', 'timestamp': now},
+        {'user_id': 'u1', 'item_id': 'hotel-1', 'event_type': 'wishlist', 'timestamp': now},
+        {'user_id': 'u1', 'item_id': 'tour-1', 'event_type': 'search', 'timestamp': now - 3600},
+        {'user_id': 'u2', 'item_id': 'hotel-1', 'event_type': 'unknown', 'timestamp': now},
+    ])
+
+    scores = store.scores(now)
+    print(f"\nScores now: {scores}")
+    assert abs(scores['u1']['hotel-1'] - 5.0) < 1e-9, "Weights should add up"
+    assert abs(scores['u1']['tour-1'] - 0.25) < 1e-9, "One half-life should halve the score"
+    assert 'u2' not in scores, "Unknown event types should be skipped"
+
+    later = store.scores(now + 2 * 3600)
+    assert abs(later['u1']['hotel-1'] - 1.25) < 1e-9, "Two half-lives should quarter the score"
+
+    ratings = store.implicit_ratings(saturation=5.0, now=now)
+    assert 1.0 < ratings['u1']['tour-1'] < ratings['u1']['hotel-1'] < 5.0, "Ratings should stay within 1-5"
+    assert abs(ratings['u1']['hotel-1'] - (1.0 + 4.0 * (1.0 - np.exp(-1.0)))) < 1e-6
+
+    # Events far in the future move the landmark; older cells decayed to
+    # nothing at that time are dropped with their user, the rest are unchanged
+    store.add_events([
+        {'user_id': 'u3', 'item_id': 'hotel-2', 'event_type': 'view', 'timestamp': now + 100 * 3600},
+        {'user_id': 'u3', 'item_id': 'hotel-1', 'event_type': 'view', 'timestamp': now + 95 * 3600}
+    ])
+    assert store.landmark > now, "Landmark should move forward"
+    moved = store.scores(now + 100 * 3600)
+    assert abs(moved['u3']['hotel-2'] - 1.0) < 1e-9
+    assert abs(moved['u3']['hotel-1'] - 0.5 ** 5) < 1e-9, "Rescaling changed old values"
+    assert 'u1' not in moved and store.user_ids == ['u3'], "Decayed cells should be dropped"
+    assert sorted(store.item_ids) == ['hotel-1', 'hotel-2'], "Items without cells should be dropped"
+
+    print("\n✓ Lazy decay test passed")
+
+
+def test_ingestion_throughput():
+    """Test that ingestion sustains tens of thousands of events per second."""
+    print("\n" + "="*80)
+    print("TEST 2: Ingestion Throughput")
+    print("="*80)
+
+    store = ImplicitFeedbackStore(WEIGHTS)
+    rng = np.random.default_rng(5)
+    count = 100000
+    events = [
+        {'user_id': f'user-{u}', 'item_id': f'item-{i}', 'event_type': t}
+        for u, i, t in zip(
+            rng.integers(0, 10000, count),
+            rng.integers(0, 1000, count),
+            rng.choice(list(WEIGHTS), count)
+        )
+    ]
+
+    start = time.perf_counter()
+    for offset in range(0, count, 10000):
+        store.add_events(events[offset:offset + 10000])
+    cells = len(store)
+    elapsed = time.perf_counter() - start
+
+    rate = count / elapsed
+    print(f"\n{count} events into {cells} cells: {rate:,.0f} events/s")
+    assert rate > 20000, "Ingestion too slow"
+
+    # Ratings come from the CSR data, without a dictionary per user
+    start = time.perf_counter()
+    ratings = store.implicit_ratings(saturation=5.0)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"Ratings for {len(ratings)} users: {elapsed:.1f} ms")
+    assert ratings.ratings.nnz == cells and elapsed < 100, "Ratings too slow"
+
+    print("\n✓ Ingestion throughput test passed")
+
+
+async def test_engine_merge():
+    """Test implicit feedback merged into the user-item matrix."""
+    print("\n" + "="*80)
+    print("TEST 3: Engine Merge")
+    print("="*80)
+
+    engine = RecommendationEngine()
+    before = await engine._build_user_item_matrix()
+    assert 'user-9' not in before
+
+    accepted = engine.record_interactions([
+        {'user_id': 'user-9', 'item_id': 'hotel-1', 'event_type': 'wishlist'},
+        {'user_id': 'user-9', 'item_id': 'hotel-3', 'event_type': 'view'},
+        {'user_id': 'user-1', 'item_id': 'hotel-1', 'event_type': 'view'},
+        {'user_id': 'user-1', 'item_id': 'tour-2', 'event_type': 'wishlist'},
+    ])
+    assert accepted == 4
+
+    # Merges wait for the refresh interval
+    engine._implicit_merged_at = time.monotonic()
+    assert 'user-9' not in await engine._build_user_item_matrix(), "Merged before the refresh interval"
+
+    engine._implicit_merged_at = 0.0
+    matrix = await engine._build_user_item_matrix()
+    print(f"\nuser-9: {matrix['user-9']}")
+    print(f"user-1: {matrix['user-1']}")
+
+    assert matrix['user-9']['hotel-1'] > matrix['user-9']['hotel-3'], "Wishlists should outweigh views"
+    assert matrix['user-1']['hotel-1'] == 5.0, "Explicit ratings take precedence"
+    assert 'tour-2' in matrix['user-1'], "Implicit feedback should fill unrated items"
+
+    similar = await engine._find_similar_users('user-9', matrix)
+    assert similar, "Implicit-only users should get neighbors"
+
+    print("\n✓ Engine merge test passed")
+
+
+def test_future_timestamps():
+    """Test that future or millisecond timestamps cannot break decay."""
+    print("\n" + "="*80)
+    print("TEST 4: Future Timestamps")
+    print("="*80)
+
+    from pydantic import ValidationError
+    from routes.recommend import InteractionEvent
+
+    now = time.time()
+    store = ImplicitFeedbackStore(WEIGHTS, half_life_hours=1.0, max_clock_skew=300)
+    accepted = store.add_events([
+        {'user_id': 'u1', 'item_id': 'i1', 'event_type': 'view', 'timestamp': now * 1000},
+        {'user_id': 'u1', 'item_id': 'i2', 'event_type': 'view', 'timestamp': now + 86400},
+        {'user_id': 'u1', 'item_id': 'i3', 'event_type': 'view', 'timestamp': now + 60},
+        {'user_id': 'u2', 'item_id': 'i1', 'event_type': 'wishlist', 'timestamp': now}
+    ])
+    assert accepted == 2, "Events beyond the clock skew should be rejected"
+    assert store.landmark <= now + 300, "The landmark moved into the future"
+
+    # Events arriving later are still counted
+    store.add_events([{'user_id': 'u2', 'item_id': 'i2', 'event_type': 'view'}])
+    scores = store.scores()
+    assert set(scores) == {'u1', 'u2'} and set(scores['u1']) == {'i3'}
+    assert abs(scores['u2']['i1'] - 4.0) < 0.01 and abs(scores['u2']['i2'] - 1.0) < 0.01
+
+    # Reading long before the landmark stays finite
+    assert np.isfinite(store.decay_factor(now - 365 * 86400))
+    assert np.isfinite(store.matrix(now - 365 * 86400).data).all()
+
+    # A snapshot holding a landmark from a bad clock is moved back to now
+    arrays = store.to_arrays()
+    arrays['implicit_landmark'] = np.array([now * 1000])
+    restored = ImplicitFeedbackStore(WEIGHTS, half_life_hours=1.0)
+    restored.restore(arrays)
+    assert restored.landmark <= time.time() + 1
+    restored.add_events([{'user_id': 'u3', 'item_id': 'i1', 'event_type': 'view'}])
+    assert abs(restored.scores()['u3']['i1'] - 1.0) < 0.01, "New events lost after restore"
+
+    # The API rejects them before they reach the store
+    InteractionEvent(user_id='u', item_id='i', event_type='view', timestamp=now)
+    for timestamp in (now * 1000, now + 86400):
+        try:
+            InteractionEvent(user_id='u', item_id='i', event_type='view', timestamp=timestamp)
+        except ValidationError:
+            continue
+        raise AssertionError(f"Timestamp {timestamp} should be rejected")
+
+    print(f"\nLandmark {store.landmark - now:+.0f}s from now")
+    print("\n✓ Future timestamps test passed")
+
+
+def test_pruning():
+    """Test that cells decayed below min_score are dropped on read."""
+    print("\n" + "="*80)
+    print("TEST 5: Pruning Decayed Cells")
+    print("="*80)
+
+    now = time.time()
+    store = ImplicitFeedbackStore(WEIGHTS, half_life_hours=1.0, min_score=0.001)
+
+    # Nine half-lives leave 1/512 of a view: still kept; twelve drop below 0.001
+    rng = np.random.default_rng(9)
+    old = [
+        {'user_id': f'old-{u}', 'item_id': f'old-item-{u % 50}', 'event_type': 'view', 'timestamp': now - 12 * 3600}
+        for u in range(5000)
+    ]
+    store.add_events(old + [
+        {'user_id': 'u1', 'item_id': 'i1', 'event_type': 'view', 'timestamp': now - 9 * 3600},
+        {'user_id': 'u1', 'item_id': 'old-item-0', 'event_type': 'view', 'timestamp': now},
+        {'user_id': 'u2', 'item_id': 'i2', 'event_type': 'wishlist', 'timestamp': now - rng.random() * 3600}
+    ])
+
+    assert len(store) == 3, "Decayed cells should be dropped"
+    assert sorted(store.user_ids) == ['u1', 'u2'], "Users without cells should be dropped"
+    assert sorted(store.item_ids) == ['i1', 'i2', 'old-item-0'], "Items without cells should be dropped"
+    scores = store.scores()
+    assert abs(scores['u1']['i1'] - 1 / 512) < 1e-5 and abs(scores['u1']['old-item-0'] - 1.0) < 0.01
+
+    # New events after pruning land on the right users and items
+    store.add_events([{'user_id': 'u2', 'item_id': 'i1', 'event_type': 'view'}, {'user_id': 'u3', 'item_id': 'i2', 'event_type': 'view'}])
+    scores = store.scores()
+    assert set(scores) == {'u1', 'u2', 'u3'} and set(scores['u2']) == {'i1', 'i2'} and set(scores['u3']) == {'i2'}
+
+    print(f"\n{len(old) + 5} cells recorded, {len(store)} kept")
+    print("\n✓ Pruning test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        test_lazy_decay()
+        test_ingestion_throughput()
+        asyncio.run(test_engine_merge())
+        test_future_timestamps()
+        test_pruning()
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+Test script for the bounded inference executor.
+Tests that inference no longer blocks the event loop, the queue bound and
+its metrics, cancelled jobs freeing their slots, and the 503 answer of the
+analysis routes when it is full.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from fastapi import HTTPException
+from utils.inference_executor import InferenceExecutor, InferenceQueueFull
+from tests_support import make_analyzer, make_reviews, make_tiny_model
+
+
+class SlowEncoder:
+    """Wrap a model so every encode call also blocks for a while."""
+
+    def __init__(self, model, seconds):
+        self.model = model
+        self.seconds = seconds
+
+    def encode(self, texts, *args, **kwargs):
+        time.sleep(self.seconds)
+        return self.model.encode(texts, *args, **kwargs)
+
+
+async def measure_loop_lag(task):
+    """Await a task while ticking every 10 ms; returns (result, worst lag in ms)."""
+    worst = 0.0
+    task = asyncio.ensure_future(task)
+    while not task.done():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, (time.perf_counter() - start - 0.01) * 1000)
+    return task.result(), worst
+
+
+async def test_event_loop_not_blocked():
+    """Test that the event loop keeps running during inference."""
+    print("\n" + "="*80)
+    print("TEST 1: Event Loop Not Blocked")
+    print("="*80)
+
+    analyzer = make_analyzer(SlowEncoder(make_tiny_model(), 0.3))
+    reviews = make_reviews(50)
+
+    start = time.perf_counter()
+    analyzer._analyze_batch(reviews[:1])
+    blocking = (time.perf_counter() - start) * 1000
+
+    results, lag = await measure_loop_lag(analyzer.batch_analyze(reviews))
+    print(f"\nInference takes {blocking:.0f} ms; worst event loop lag meanwhile {lag:.1f} ms")
+    assert len(results) == 50
+    assert lag < 100, "The event loop should keep running during inference"
+
+    print("\n✓ Event loop test passed")
+
+
+async def test_queue_bound():
+    """Test that jobs beyond the queue bound are rejected and counted."""
+    print("\n" + "="*80)
+    print("TEST 2: Queue Bound and Metrics")
+    print("="*80)
+
+    executor = InferenceExecutor(workers=1, max_queue=2)
+    release = threading.Event()
+
+    jobs = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(3)]
+    await asyncio.sleep(0.05)
+
+    stats = executor.stats()
+    assert stats["running"] == 1 and stats["queue_depth"] == 2, "One running, two waiting"
+
+    try:
+        await executor.run(release.wait)
+        assert False, "A full queue should reject the job"
+    except InferenceQueueFull:
+        pass
+
+    await asyncio.sleep(0.05)
+    release.set()
+    assert await asyncio.gather(*jobs) == [True, True, True]
+
+    failing = executor.run(lambda: 1 / 0)
+    try:
+        await failing
+        assert False, "Errors should reach the caller"
+    except ZeroDivisionError:
+        pass
+
+    stats = executor.stats()
+    print(f"\nStats: {stats}")
+    assert stats["queue_depth"] == 0 and stats["running"] == 0
+    assert stats["completed"] == 4 and stats["failed"] == 1 and stats["rejected"] == 1
+    assert stats["wait_ms"]["max"] >= 40, "Queued jobs waited for the first one"
+    executor.close()
+
+    print("\n✓ Queue bound test passed")
+
+
+async def test_cancelled_jobs():
+    """Test that a job cancelled while queued frees its slot in the queue."""
+    print("\n" + "="*80)
+    print("TEST 3: Cancelled Jobs")
+    print("="*80)
+
+    executor = InferenceExecutor(workers=1, max_queue=1)
+    release = threading.Event()
+    ran = []
+
+    running = asyncio.ensure_future(executor.run(release.wait))
+    queued = asyncio.ensure_future(executor.run(ran.append, "queued"))
+    await asyncio.sleep(0.05)
+    assert executor.stats()["queue_depth"] == 1
+
+    queued.cancel()
+    await asyncio.sleep(0.05)
+    stats = executor.stats()
+    print(f"\nAfter cancelling the queued job: {stats['queue_depth']} waiting, {stats['cancelled']} cancelled")
+    assert stats["queue_depth"] == 0 and stats["cancelled"] == 1, "The slot should be free again"
+
+    # The freed slot takes a new job, and the cancelled one never runs
+    again = asyncio.ensure_future(executor.run(ran.append, "again"))
+    await asyncio.sleep(0.05)
+    release.set()
+    await asyncio.gather(running, again)
+    assert ran == ["again"]
+
+    stats = executor.stats()
+    assert stats["queue_depth"] == 0 and stats["running"] == 0 and stats["completed"] == 2
+    executor.close()
+
+    print("\n✓ Cancelled jobs test passed")
+
+
+async def test_routes_answer_503():
+    """Test that the analysis routes answer 503 while the queue is full."""
+    print("\n" + "="*80)
+    print("TEST 4: 503 When Full")
+    print("="*80)
+
+    from routes import analyze
+
+    # One job running and one waiting fill the queue
+    original = analyze.sentiment_analyzer.executor
+    executor = InferenceExecutor(workers=1, max_queue=1)
+    analyze.sentiment_analyzer.executor = executor
+    release = threading.Event()
+    busy = asyncio.gather(executor.run(release.wait), executor.run(release.wait))
+    await asyncio.sleep(0.05)
+
+    try:
+        for call in (
+            analyze.analyze_review(analyze.ReviewAnalysisRequest(review_text="Great hotel!")),
+            analyze.analyze_reviews_batch(analyze.BatchReviewAnalysisRequest(reviews=["Great hotel!"]))
+        ):
+            try:
+                await call
+                assert False, "Should have been rejected"
+            except HTTPException as e:
+                print(f"\n{e.status_code}: {e.detail} (Retry-After {e.headers['Retry-After']})")
+                assert e.status_code == 503
+
+        metrics = (await analyze.get_sentiment_metrics()).metrics
+        assert metrics["inference"]["rejected"] == 2
+    finally:
+        release.set()
+        await busy
+        analyze.sentiment_analyzer.executor = original
+        executor.close()
+
+    # With room in the queue the route works again
+    response = await analyze.analyze_review(analyze.ReviewAnalysisRequest(review_text="Great hotel!"))
+    assert response.success
+
+    print("\n✓ 503 test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        asyncio.run(test_event_loop_not_blocked())
+        asyncio.run(test_queue_bound())
+        asyncio.run(test_cancelled_jobs())
+        asyncio.run(test_routes_answer_503())
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
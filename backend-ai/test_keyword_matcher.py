@@ -0,0 +1,130 @@
+"""
+Test script for the compiled keyword matcher.
+Tests whole-word matching with inflections, keyword and topic scoring in
+the sentiment analyzer, and speed against per-keyword substring scans.
+"""
+
+import asyncio
+import sys
+import time
+from models.sentiment_model import SentimentAnalyzer
+from utils.keyword_matcher import KeywordMatcher
+from tests_support import make_analyzer, make_reviews
+
+
+def test_whole_words():
+    """Test word boundaries, inflections and groups."""
+    print("\n" + "="*80)
+    print("TEST 1: Whole-Word Matching")
+    print("="*80)
+
+    matcher = KeywordMatcher({
+        "cleanliness": ["clean", "mess"],
+        "comfort": ["room", "bed"],
+        "negative": ["bad", "dirty"],
+        "amenities": ["breakfast"],
+        "food": ["breakfast"]
+    })
+
+    cases = {
+        "The room was unclean": {"room"},
+        "Cleanliness was great and the rooms were cleaned daily": {"clean", "room"},
+        "We played badminton in the bathroom": set(),
+        "BAD beds, messy and DIRTY": {"bad", "bed", "mess", "dirty"},
+        "Breakfast!": {"breakfast"},
+        "bedroom, cleanse": set()
+    }
+    for text, expected in cases.items():
+        found = matcher.keywords(text)
+        print(f"\n{text!r}: {sorted(found)}")
+        assert found == expected, f"Expected {sorted(expected)}"
+
+    assert matcher.groups({"breakfast", "bad"}) == {"amenities", "food", "negative"}
+    assert matcher.count({"breakfast", "bad", "dirty"}, "negative") == 2
+    assert KeywordMatcher({"x": ["clean"]}, inflections=False).keywords("cleaned clean") == {"clean"}
+
+    print("\n✓ Whole-word matching test passed")
+
+
+async def test_analyzer_keywords():
+    """Test keyword sentiment and topics of the analyzer."""
+    print("\n" + "="*80)
+    print("TEST 2: Analyzer Keywords and Topics")
+    print("="*80)
+
+    analyzer = make_analyzer(None)
+
+    assert analyzer._keyword_based_sentiment("Excellent and amazing, but rude staff") == 2 / 3
+    assert analyzer._keyword_based_sentiment("Badminton court, great") == 1.0, "'bad' is not inside 'badminton'"
+    assert analyzer._keyword_based_sentiment("Nothing to say") == 0.5
+
+    result = await analyzer.analyze_review("The room was unclean. Staff were perfect!")
+    print(f"\nTopics: {result['topics']}")
+    assert set(result['topics']) == {"comfort", "service"}, "'unclean' is not about 'clean'"
+    assert result['topics']['service'] == 1.0
+
+    result = await analyzer.analyze_review("Cleanliness was terrible. Rooms were spacious.")
+    assert set(result['topics']) == {"cleanliness", "comfort"}
+    assert result['topics']['cleanliness'] == 0.0
+    assert analyzer._extract_topic_sentences("Cleanliness was terrible. Rooms were spacious.", "comfort") == "Rooms were spacious"
+
+    print("\n✓ Analyzer keywords test passed")
+
+
+def test_speed():
+    """Compare one compiled pass with per-keyword substring scans."""
+    print("\n" + "="*80)
+    print("TEST 3: Speed")
+    print("="*80)
+
+    matcher = SentimentAnalyzer.KEYWORD_MATCHER
+    sentences = [s for review in make_reviews(20000) for s in review.split(". ")]
+
+    def substring_scan(sentence):
+        lower = sentence.lower()
+        positive = sum(1 for word in SentimentAnalyzer.POSITIVE_WORDS if word in lower)
+        negative = sum(1 for word in SentimentAnalyzer.NEGATIVE_WORDS if word in lower)
+        topics = [t for t, words in SentimentAnalyzer.TOPIC_KEYWORDS.items() if any(w in lower for w in words)]
+        return positive, negative, topics
+
+    def compiled_pass(sentence):
+        keywords = matcher.keywords(sentence)
+        return matcher.count(keywords, "positive"), matcher.count(keywords, "negative"), matcher.groups(keywords)
+
+    timings = {}
+    for name, function in (("substring scans", substring_scan), ("compiled matcher", compiled_pass)):
+        start = time.perf_counter()
+        for sentence in sentences:
+            function(sentence)
+        timings[name] = time.perf_counter() - start
+        print(f"\n{name}: {len(sentences) / timings[name]:,.0f} sentences/s")
+
+    assert timings["compiled matcher"] < timings["substring scans"], "One pass should be faster"
+
+    print("\n✓ Speed test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        test_whole_words()
+        asyncio.run(test_analyzer_keywords())
+        test_speed()
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Test script for the micro-batching request coalescer.
+Tests batch sizes and timeouts, error fan-out, and concurrent
+analyze_review calls sharing batched model calls.
+"""
+
+import asyncio
+import sys
+import time
+from utils.inference_executor import InferenceExecutor
+from utils.micro_batcher import MicroBatcher
+from tests_support import CountingEncoder, make_analyzer, make_reviews, make_tiny_model
+
+
+async def test_coalescing():
+    """Test that concurrent items are processed in full or timed-out batches."""
+    print("\n" + "="*80)
+    print("TEST 1: Coalescing")
+    print("="*80)
+
+    sizes = []
+
+    async def double(items):
+        sizes.append(len(items))
+        await asyncio.sleep(0.01)
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(double, max_batch_size=32, max_wait_ms=20)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(100)))
+    print(f"\nBatch sizes for 100 concurrent items: {sizes}")
+    assert results == [i * 2 for i in range(100)], "Each caller gets its own result"
+    assert sizes == [32, 32, 32, 4]
+
+    # A lone item waits for max_wait_ms, then runs on its own
+    start = time.perf_counter()
+    assert await batcher.submit(21) == 42
+    waited = (time.perf_counter() - start) * 1000
+    print(f"Lone item answered after {waited:.0f} ms")
+    assert 20 <= waited < 200
+
+    stats = batcher.stats()
+    print(f"Stats: {stats}")
+    assert stats["items"] == 101 and stats["batches"] == 5
+    assert stats["full_batches"] == 3 and stats["timed_out_batches"] == 2 and stats["largest_batch"] == 32
+
+    # With no wait, every item is processed on its own
+    sizes.clear()
+    unbatched = MicroBatcher(double, max_wait_ms=0)
+    await asyncio.gather(*(unbatched.submit(i) for i in range(5)))
+    assert sizes == [1] * 5
+
+    print("\n✓ Coalescing test passed")
+
+
+async def test_errors():
+    """Test that a failing batch fails each of its callers, and only those."""
+    print("\n" + "="*80)
+    print("TEST 2: Error Fan-Out")
+    print("="*80)
+
+    async def fragile(items):
+        if "bad" in items:
+            raise ValueError("bad item")
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(fragile, max_batch_size=3, max_wait_ms=10)
+    results = await asyncio.gather(
+        *(batcher.submit(item) for item in ["a", "bad", "c", "d"]),
+        return_exceptions=True
+    )
+    print(f"\nResults: {results}")
+    assert all(isinstance(r, ValueError) for r in results[:3]), "The whole first batch fails"
+    assert results[3] == "D", "The next batch is unaffected"
+
+    async def short(items):
+        return items[:-1]
+
+    try:
+        await MicroBatcher(short).submit("x")
+        assert False, "Missing results should be reported"
+    except RuntimeError:
+        pass
+
+    print("\n✓ Error fan-out test passed")
+
+
+async def test_concurrent_reviews():
+    """Test that concurrent analyze_review calls share batched encodes."""
+    print("\n" + "="*80)
+    print("TEST 3: Concurrent analyze_review Calls")
+    print("="*80)
+
+    encoder = CountingEncoder(make_tiny_model())
+    analyzer = make_analyzer(encoder)
+    analyzer.micro_batcher = MicroBatcher(analyzer._run_batch, max_batch_size=32, max_wait_ms=5)
+    reviews = make_reviews(200, seed=4)
+
+    encoder.calls = 0
+    start = time.perf_counter()
+    results = await asyncio.gather(*(analyzer.analyze_review(review) for review in reviews))
+    batched_time = time.perf_counter() - start
+    batched_calls = encoder.calls
+
+    assert results == await analyzer.batch_analyze(reviews), "Same results as one batch"
+    assert analyzer.get_metrics()["micro_batching"]["largest_batch"] == 32
+
+    # The same load without coalescing, on a cold cache; every request needs its own queue slot
+    analyzer = make_analyzer(encoder)
+    analyzer.executor = InferenceExecutor(max_queue=len(reviews))
+    analyzer.micro_batcher = MicroBatcher(analyzer._run_batch, max_wait_ms=0)
+    encoder.calls = 0
+    start = time.perf_counter()
+    unbatched = await asyncio.gather(*(analyzer.analyze_review(review) for review in reviews))
+    single_time = time.perf_counter() - start
+
+    print(f"\n200 concurrent reviews: micro-batched {batched_calls} encode calls, {len(reviews) / batched_time:.0f} reviews/s; "
+          f"unbatched {encoder.calls} calls, {len(reviews) / single_time:.0f} reviews/s")
+    assert batched_calls <= 8, "Requests should share forward passes"
+    assert max(abs(a['score'] - b['score']) for a, b in zip(results, unbatched)) < 2e-3
+    assert batched_time < single_time
+
+    print("\n✓ Concurrent reviews test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        asyncio.run(test_coalescing())
+        asyncio.run(test_errors())
+        asyncio.run(test_concurrent_reviews())
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
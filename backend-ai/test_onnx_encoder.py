@@ -0,0 +1,136 @@
+"""
+Test script for the ONNX Runtime sentiment backend.
+Exports a tiny local sentence-transformers model (offline), checks float32
+and int8 embeddings against PyTorch, and selects the backend via settings.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from sentence_transformers import SentenceTransformer, models
+from config.settings import settings
+from models.sentiment_model import SentimentAnalyzer
+from utils.onnx_encoder import OnnxSentenceEncoder, max_embedding_deviation
+from tests_support import make_reviews, make_tiny_model
+
+
+def save_tiny_model(normalize=False):
+    """Save the tiny test model as a sentence-transformers directory."""
+    model = make_tiny_model()
+    if normalize:
+        model = SentenceTransformer(modules=[model[0], model[1], models.Normalize()], device="cpu")
+    directory = tempfile.mkdtemp(prefix="tiny-st-")
+    model.save(directory)
+    return directory
+
+
+def test_embeddings_match_pytorch():
+    """Test ONNX float32 and int8 embeddings against PyTorch."""
+    print("\n" + "="*80)
+    print("TEST 1: ONNX Embeddings vs PyTorch")
+    print("="*80)
+
+    directory = save_tiny_model()
+    torch_model = SentenceTransformer(directory, device="cpu")
+    texts = make_reviews(200)
+
+    onnx_model = OnnxSentenceEncoder(directory)
+    assert os.path.exists(os.path.join(directory, "onnx", "model.onnx")), "Export is kept next to the model"
+    int8_model = OnnxSentenceEncoder(directory, quantize=True)
+
+    fp32_deviation = max_embedding_deviation(torch_model, onnx_model, texts)
+    int8_deviation = max_embedding_deviation(torch_model, int8_model, texts)
+    print(f"\nMax cosine distance to PyTorch: float32 {fp32_deviation:.2e}, int8 {int8_deviation:.2e}")
+    assert fp32_deviation < 1e-5, "float32 ONNX should match PyTorch"
+    assert int8_deviation < settings.SENTIMENT_ONNX_TOLERANCE, "int8 should stay within the default tolerance"
+
+    assert onnx_model.encode("Great hotel").shape == (64,)
+    assert onnx_model.encode(texts[:5], batch_size=2).shape == (5, 64)
+    assert np.allclose(onnx_model.encode(texts[:5], batch_size=2), onnx_model.encode(texts[:5]), atol=1e-5)
+
+    for name, model in (("torch", torch_model), ("onnx", onnx_model), ("onnx-int8", int8_model)):
+        start = time.perf_counter()
+        model.encode(texts, batch_size=64)
+        print(f"{name}: {len(texts) / (time.perf_counter() - start):.0f} texts/s")
+
+    # A Normalize module in the model directory is applied too
+    normalized = save_tiny_model(normalize=True)
+    encoder = OnnxSentenceEncoder(normalized)
+    assert encoder.normalize and np.allclose(np.linalg.norm(encoder.encode(texts[:3]), axis=1), 1.0)
+    assert max_embedding_deviation(SentenceTransformer(normalized, device="cpu"), encoder, texts) < 1e-5
+
+    print("\n✓ ONNX embeddings test passed")
+
+
+async def test_backend_from_settings():
+    """Test selecting the backend and falling back outside the tolerance."""
+    print("\n" + "="*80)
+    print("TEST 2: Backend Selected by Settings")
+    print("="*80)
+
+    directory = save_tiny_model()
+    reviews = make_reviews(30)
+    original = (
+        settings.SENTIMENT_MODEL_BACKEND, settings.SENTIMENT_MODEL_DIR,
+        settings.SENTIMENT_ONNX_QUANTIZE, settings.SENTIMENT_ONNX_TOLERANCE
+    )
+
+    try:
+        settings.SENTIMENT_MODEL_DIR = directory
+        settings.SENTIMENT_MODEL_BACKEND = "torch"
+        torch_analyzer = SentimentAnalyzer()
+        assert isinstance(torch_analyzer.model, SentenceTransformer)
+
+        settings.SENTIMENT_MODEL_BACKEND = "onnx"
+        settings.SENTIMENT_ONNX_QUANTIZE = True
+        onnx_analyzer = SentimentAnalyzer()
+        print(f"\nBackend: {onnx_analyzer.model_id}")
+        assert isinstance(onnx_analyzer.model, OnnxSentenceEncoder)
+        assert onnx_analyzer.model_id == "all-MiniLM-L6-v2:onnx-int8", "Cached apart from PyTorch"
+
+        expected = await torch_analyzer.batch_analyze(reviews)
+        actual = await onnx_analyzer.batch_analyze(reviews)
+        worst = max(abs(a['score'] - e['score']) for a, e in zip(actual, expected))
+        print(f"Largest score difference to PyTorch: {worst:.4f}")
+        assert worst < 0.01
+        assert [a['classification'] for a in actual] == [e['classification'] for e in expected]
+
+        # Outside the tolerance, PyTorch is kept
+        settings.SENTIMENT_ONNX_TOLERANCE = 0.0
+        fallback = SentimentAnalyzer()
+        assert isinstance(fallback.model, SentenceTransformer) and fallback.model_id == "all-MiniLM-L6-v2"
+    finally:
+        (
+            settings.SENTIMENT_MODEL_BACKEND, settings.SENTIMENT_MODEL_DIR,
+            settings.SENTIMENT_ONNX_QUANTIZE, settings.SENTIMENT_ONNX_TOLERANCE
+        ) = original
+
+    print("\n✓ Backend selection test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        test_embeddings_match_pytorch()
+        asyncio.run(test_backend_from_settings())
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Test script for encoder padding metrics.
+Tests the padding counts of the encoder's own batches, counting by tokens
+rather than characters, sampling of encode calls, and the analyzer
+metrics.
+"""
+
+import asyncio
+import sys
+import numpy as np
+from utils.padding_metrics import PaddingMetrics
+from tests_support import CountingEncoder, WORDS, make_analyzer, make_tiny_model
+
+
+class WordCountEncoder:
+    """Encode a text as its word count; has no tokenizer."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        if isinstance(texts, str):
+            return self.encode([texts], batch_size, **kwargs)[0]
+        self.calls.append((list(texts), batch_size))
+        return np.array([[len(text.split())] for text in texts], dtype=np.float32)
+
+
+def make_corpus(count, seed=0):
+    """Reviews from three words to several paragraphs, in random order."""
+    rng = np.random.default_rng(seed)
+    lengths = np.where(rng.random(count) < 0.7, rng.integers(3, 15, count), rng.integers(40, 200, count))
+    return [" ".join(rng.choice(WORDS, size=length)) + "." for length in lengths]
+
+
+def test_padding_counts():
+    """Test that texts pass through in one call and padding is counted."""
+    print("\n" + "="*80)
+    print("TEST 1: Padding Counts")
+    print("="*80)
+
+    model = WordCountEncoder()
+    metrics = PaddingMetrics(sample_every=1)
+    texts = ["a b", "a b c d e f", "a", "a b c d e", "a b c"]
+
+    embeddings = metrics.bind(model).encode(texts, batch_size=2)
+    assert embeddings[:, 0].tolist() == [2, 6, 1, 5, 3], "Embeddings should be the model's"
+    assert model.calls == [(texts, 2)], "Texts should reach the model in one call, unchanged"
+
+    # Lengths are words + 2 special tokens: [4, 8, 3, 7, 5]; the encoder
+    # batches them longest first by characters
+    stats = metrics.stats()
+    print(f"\nMetrics: {stats}")
+    assert stats["calls"] == 1 and stats["sampled_calls"] == 1
+    assert stats["texts"] == 5 and stats["batches"] == 3
+    assert stats["real_tokens"] == 27
+    assert stats["padded_tokens"] == 2 * 8 + 2 * 5 + 3
+    assert stats["padding_efficiency"] == round(27 / 29, 4)
+    assert stats["arrival_order_padding_efficiency"] == round(27 / (2 * 8 + 2 * 7 + 5), 4)
+
+    assert metrics.bind(model).encode("a b c").tolist() == [3]
+    assert metrics.stats()["texts"] == 6
+
+    print("\n✓ Padding counts test passed")
+
+
+def test_token_lengths():
+    """Test that padding is counted in tokens, not characters."""
+    print("\n" + "="*80)
+    print("TEST 2: Token Lengths")
+    print("="*80)
+
+    model = make_tiny_model()
+    metrics = PaddingMetrics(sample_every=1)
+
+    # Unbroken foreign script is one unknown token however many characters it has
+    khmer = "សណ្ឋាគារស្អាតណាស់បុគ្គលិករួសរាយរាក់ទាក់" * 3
+    texts = [khmer, "the staff were friendly and helpful and the room was clean", "great pool", "a"]
+    lengths = metrics.token_lengths(model, texts)
+    print(f"\nCharacters: {[len(text) for text in texts]}, tokens: {lengths.tolist()}")
+    assert lengths[0] < lengths[1], "The long script string is short in tokens"
+
+    # Sentences longer than the model accepts are counted after truncation
+    assert metrics.token_lengths(model, ["good " * 1000])[0] == model.max_seq_length
+
+    expected = model.encode(texts, convert_to_numpy=True)
+    assert np.allclose(metrics.bind(model).encode(texts, convert_to_numpy=True), expected)
+
+    # Ordered by characters, the Khmer text is batched with the longest English one
+    metrics.bind(model).encode(texts, batch_size=2)
+    stats = metrics.stats()
+    print(f"Padding efficiency by the encoder's character order: {stats['padding_efficiency']:.0%}")
+    assert stats["padding_efficiency"] < 1.0
+
+    print("\n✓ Token lengths test passed")
+
+
+def test_sampling():
+    """Test that only one encode call in sample_every is tokenized."""
+    print("\n" + "="*80)
+    print("TEST 3: Sampling")
+    print("="*80)
+
+    class CountingTokenizer:
+        def __init__(self):
+            self.calls = 0
+
+        def __call__(self, texts, **kwargs):
+            self.calls += 1
+            return {"input_ids": [text.split() for text in texts]}
+
+    model = WordCountEncoder()
+    model.tokenizer = CountingTokenizer()
+    metrics = PaddingMetrics(sample_every=10)
+    texts = make_corpus(64)
+
+    for _ in range(25):
+        metrics.bind(model).encode(texts, batch_size=16)
+
+    stats = metrics.stats()
+    print(f"\n{stats['calls']} calls, {stats['sampled_calls']} sampled, {model.tokenizer.calls} tokenized")
+    assert len(model.calls) == 25, "Every call reaches the model once"
+    assert stats["calls"] == 25 and stats["sampled_calls"] == model.tokenizer.calls == 3
+    assert stats["texts"] == 3 * 64 and stats["batches"] == 3 * 4
+
+    print("\n✓ Sampling test passed")
+
+
+async def test_analyzer_metrics():
+    """Test that the analyzer encodes once per batch and reports padding."""
+    print("\n" + "="*80)
+    print("TEST 4: Analyzer Metrics")
+    print("="*80)
+
+    encoder = CountingEncoder(make_tiny_model())
+    analyzer = make_analyzer(encoder)
+    analyzer.padding_metrics = PaddingMetrics(sample_every=1)
+    encoder.calls = encoder.texts = 0
+
+    await analyzer.batch_analyze(make_corpus(100, seed=3))
+
+    metrics = analyzer.get_metrics()["padding"]
+    print(f"\nMetrics: {metrics}")
+    assert encoder.calls == 1, "The batch should be one encode call"
+    assert metrics["calls"] == 1 and metrics["texts"] == encoder.texts
+    assert metrics["padding_efficiency"] > metrics["arrival_order_padding_efficiency"]
+
+    print("\n✓ Analyzer metrics test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        test_padding_counts()
+        test_token_lengths()
+        test_sampling()
+        asyncio.run(test_analyzer_metrics())
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+Test script for parallel chunked scoring.
+Tests the merged top-k against scoring in one piece, parallel against inline
+engine rankings, and the inline fallback for small inputs.
+"""
+
+import asyncio
+import sys
+import time
+import numpy as np
+from utils import hybrid_scoring
+from utils.catalog import ItemCatalog
+from utils.parallel_scoring import ParallelScorer, SharedArrays
+from config.settings import settings
+from models.recommendation_model import RecommendationEngine
+from tests_support import make_hotels
+
+
+def make_arrays(count, seed=0):
+    """Generate random catalog columns and candidate scores."""
+    rng = np.random.default_rng(seed)
+    units = rng.normal(size=(count, 12)).astype(np.float32)
+    units /= np.linalg.norm(units, axis=1, keepdims=True)
+    catalog_arrays = {
+        'content_units': units,
+        'item_type': rng.integers(0, 2, count).astype(np.int8),
+        'amenity_mask': rng.integers(0, 256, (count, 1)).astype(np.uint64),
+        'price_usd': rng.uniform(10, 300, count).astype(np.float32),
+        'rating': rng.uniform(1, 5, count).astype(np.float32)
+    }
+    rows = np.sort(rng.choice(count, size=count // 2, replace=False))
+    request_arrays = {
+        'rows': rows,
+        'cf_scores': rng.random(len(rows)).astype(np.float32),
+        'trend_scores': np.zeros(len(rows))
+    }
+    params = {
+        'user_units': np.eye(2, 12, dtype=np.float32),
+        'preferred_mask': np.array([5], dtype=np.uint64),
+        'num_preferred': 2,
+        'user_budget': 150,
+        'budget': 200,
+        'collaborative_weight': 0.6,
+        'content_weight': 0.4,
+        'trend_weight': 0.0
+    }
+    return catalog_arrays, request_arrays, params
+
+
+async def test_chunked_top_k():
+    """Test that merged chunk results match scoring all rows at once."""
+    print("\n" + "="*80)
+    print("TEST 1: Chunked Top-K")
+    print("="*80)
+
+    catalog_arrays, request_arrays, params = make_arrays(200000)
+    arrays = {**catalog_arrays, **request_arrays}
+    positions = np.arange(len(request_arrays['rows']))
+
+    scores = hybrid_scoring.content_scores(arrays, params, positions)
+    params['content_range'] = (float(scores.min()), float(scores.max()))
+    expected = hybrid_scoring.within_budget_scores(arrays, params, positions)
+    expected_top = np.argsort(-expected, kind='stable')[:100]
+    del params['content_range']
+
+    scorer = ParallelScorer(workers=2, chunk_size=30000, min_rows=1000)
+    shared = SharedArrays(catalog_arrays)
+    request = SharedArrays(request_arrays)
+    try:
+        ranges = await scorer.map_chunks(
+            hybrid_scoring.content_score_range, shared, request, params, len(positions)
+        )
+        assert len(ranges) == 4, "100,000 candidates should make 4 chunks"
+        params['content_range'] = (min(r[0] for r in ranges), max(r[1] for r in ranges))
+        assert np.isclose(params['content_range'][0], scores.min())
+        assert np.isclose(params['content_range'][1], scores.max())
+
+        start = time.perf_counter()
+        top, top_scores = await scorer.top_k(
+            hybrid_scoring.within_budget_scores, shared, request, params, len(positions), 100
+        )
+        print(f"\nTop 100 of {len(positions)} candidates in {(time.perf_counter() - start) * 1000:.1f} ms")
+    finally:
+        request.close()
+        shared.close()
+        scorer.close()
+
+    assert np.all(np.diff(top_scores) <= 0), "Merged results should be sorted"
+    assert np.allclose(top_scores, expected[expected_top], atol=1e-6), "Merged top-k should match"
+    assert len(set(top) ^ set(expected_top)) <= 2, "Only near-ties may differ"
+
+    print("\n✓ Chunked top-k test passed")
+
+
+async def test_parallel_matches_inline():
+    """Test that parallel engine rankings match inline scoring."""
+    print("\n" + "="*80)
+    print("TEST 2: Parallel vs Inline Rankings")
+    print("="*80)
+
+    engine = RecommendationEngine()
+    engine.catalog = ItemCatalog.from_items(make_hotels(100000))
+    engine.parallel_scorer = ParallelScorer(workers=2, chunk_size=25000, min_rows=50000)
+    user_profile = {'budget': 300, 'preferred_amenities': ['wifi', 'pool']}
+
+    original = settings.RETRIEVAL_CANDIDATES
+    settings.RETRIEVAL_CANDIDATES = 0
+    try:
+        rows = await engine._query_available_rows(300, {}, 'hotel', {})
+        assert len(rows) >= 50000, "Enough rows to use the pool"
+
+        # First call starts the workers and publishes the catalog columns
+        await engine._score_items('user-1', user_profile, [], rows, 300)
+
+        start = time.perf_counter()
+        parallel = await engine._score_items('user-1', user_profile, [], rows, 300)
+        parallel_time = time.perf_counter() - start
+
+        engine.parallel_scorer.workers = 0
+        start = time.perf_counter()
+        inline = await engine._score_items('user-1', user_profile, [], rows, 300)
+        inline_time = time.perf_counter() - start
+
+        # An in-place price update republishes the columns the workers read
+        engine.parallel_scorer.workers = 2
+        published = engine._scoring_arrays
+        top_row = int(parallel['row'][0])
+        engine.catalog.add_items([{**engine.catalog.to_dict(top_row), 'price_per_night': 1.0}])
+        updated = await engine._score_items('user-1', user_profile, [], rows, 300)
+        assert engine._scoring_arrays is not published, "Scoring arrays should follow the catalog revision"
+        assert published['requests'] == 0 and published['shared']._shm is None, "Old columns should be freed"
+
+        engine.parallel_scorer.workers = 0
+        updated_inline = await engine._score_items('user-1', user_profile, [], rows, 300)
+        assert np.allclose(
+            updated['combined_score'], updated_inline['combined_score'][:len(updated)], atol=1e-6
+        ), "Parallel scores should use the new price"
+        assert not np.allclose(updated['combined_score'], parallel['combined_score']), "The price change should move scores"
+    finally:
+        settings.RETRIEVAL_CANDIDATES = original
+        engine.close()
+
+    print(f"\n{len(rows)} candidates: parallel {parallel_time * 1000:.1f} ms, inline {inline_time * 1000:.1f} ms")
+    assert len(parallel) == settings.PARALLEL_SCORING_TOP_K, "Parallel scoring keeps the top-k"
+    assert np.allclose(
+        parallel['combined_score'], inline['combined_score'][:len(parallel)], atol=1e-6
+    ), "Scores should match inline scoring"
+    overlap = len(set(parallel['row'][:10]) & set(inline['row'][:10]))
+    print(f"Top-10 overlap: {overlap}/10")
+    assert overlap >= 9, "Top 10 should match apart from near-ties"
+
+    print("\n✓ Parallel vs inline test passed")
+
+
+async def test_inline_fallback():
+    """Test that small inputs and tight budgets are scored inline."""
+    print("\n" + "="*80)
+    print("TEST 3: Inline Fallback")
+    print("="*80)
+
+    engine = RecommendationEngine()
+    engine.parallel_scorer = ParallelScorer(workers=2, min_rows=100000)
+
+    recommendations = await engine.get_recommendations('user-1', 200, {}, {})
+    assert recommendations, "Small lists should still be ranked"
+    assert engine.parallel_scorer._pool is None, "No workers should start for small inputs"
+
+    # With almost nothing in budget, inline scoring adds over-budget alternatives
+    engine.parallel_scorer = ParallelScorer(workers=1, min_rows=1)
+    try:
+        rows = engine._ensure_catalog().rows_of_type('hotel')
+        ranked = await engine._score_items('user-1', {'budget': 200}, [], rows, 1)
+        assert ranked['is_alternative'].any(), "Alternatives need the inline path"
+    finally:
+        engine.close()
+
+    print("\n✓ Inline fallback test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        asyncio.run(test_chunked_top_k())
+        asyncio.run(test_parallel_matches_inline())
+        asyncio.run(test_inline_fallback())
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Test script for quantized vector storage.
+Tests float16/int8 round trips, the recall and score-drift report against
+float32, and quantized retrieval indexes in the engine.
+"""
+
+import asyncio
+import sys
+import numpy as np
+from utils.quantization import QuantizedMatrix, quantization_report
+from utils.ann_index import IVFIndex
+from utils.catalog import ItemCatalog
+from config.settings import settings
+from models.recommendation_model import RecommendationEngine
+from tests_support import make_hotels, make_vectors
+
+
+def test_round_trip():
+    """Test dequantization error and storage size per type."""
+    print("\n" + "="*80)
+    print("TEST 1: Round Trip")
+    print("="*80)
+
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(size=(1000, 28)).astype(np.float32)
+    matrix[0] = 0.0
+    query = rng.normal(size=28).astype(np.float32)
+
+    for dtype, bytes_per_row in (('float32', 112), ('float16', 56), ('int8', 32)):
+        quantized = QuantizedMatrix(matrix, dtype)
+        restored = quantized.rows(slice(None))
+        error = np.abs(restored - matrix).max()
+        print(f"\n{dtype}: {quantized.nbytes / len(matrix):.0f} bytes per row, max error {error:.5f}")
+
+        assert quantized.nbytes == bytes_per_row * len(matrix), f"Unexpected {dtype} size"
+        assert np.all(restored[0] == 0), "Zero rows should stay zero"
+        assert np.allclose(quantized.dot(np.arange(10), query), restored[:10] @ query, atol=1e-4)
+        assert np.allclose(quantized.rows(5), restored[5]), "Single rows dequantize the same way"
+
+    # int8 error is at most half a step of each row's scale
+    quantized = QuantizedMatrix(matrix, 'int8')
+    step = np.abs(matrix).max(axis=1) / 127
+    assert np.all(np.abs(quantized.rows(slice(None)) - matrix) <= step[:, None] / 2 + 1e-6)
+
+    try:
+        QuantizedMatrix(matrix, 'int4')
+        assert False, "Unknown dtypes should be rejected"
+    except ValueError:
+        pass
+
+    print("\n✓ Round trip test passed")
+
+
+def test_drift_report():
+    """Test recall and score drift against float32 on retrieval-like embeddings."""
+    print("\n" + "="*80)
+    print("TEST 2: Recall and Score Drift Report")
+    print("="*80)
+
+    vectors = make_vectors(200000, dim=28)
+    rng = np.random.default_rng(3)
+    queries = vectors[rng.integers(len(vectors), size=50)] + 0.1 * rng.normal(size=(50, 28)).astype(np.float32)
+
+    report = quantization_report(vectors, queries, k=10)
+
+    print(f"\n{'dtype':<10}{'MB':>8}{'B/row':>8}{'recall@10':>12}{'mean drift':>14}{'max drift':>12}")
+    for dtype, row in report.items():
+        print(f"{dtype:<10}{row['bytes'] / 1e6:>8.1f}{row['bytes_per_row']:>8.0f}{row['recall_at_k']:>12.3f}"
+              f"{row['mean_abs_drift']:>14.2e}{row['max_abs_drift']:>12.2e}")
+
+    nationwide = 1000000 * report['int8']['bytes_per_row']
+    print(f"\n1M items at int8: {nationwide / 1e6:.0f} MB of vectors")
+
+    assert report['float32']['recall_at_k'] == 1.0 and report['float32']['max_abs_drift'] == 0.0
+    assert report['float16']['recall_at_k'] >= 0.98, "float16 should keep the exact top 10"
+    assert report['int8']['recall_at_k'] >= 0.9, "int8 should keep most of the exact top 10"
+    assert report['int8']['mean_abs_drift'] < 0.01, "int8 score drift should stay small"
+    assert report['int8']['bytes'] < report['float32']['bytes'] / 3, "int8 should be over 3x smaller"
+
+    print("\n✓ Drift report test passed")
+
+
+async def test_quantized_retrieval():
+    """Test IVF search and engine retrieval over int8 vectors."""
+    print("\n" + "="*80)
+    print("TEST 3: Quantized Retrieval")
+    print("="*80)
+
+    vectors = make_vectors(50000, dim=28)
+    full = IVFIndex(nprobe=8).build(vectors)
+    small = IVFIndex(nprobe=8, dtype='int8').build(vectors)
+    print(f"\nIndex size: float32 {full.nbytes / 1e6:.1f} MB, int8 {small.nbytes / 1e6:.1f} MB")
+    assert small.nbytes < full.nbytes / 2
+
+    rows, _ = full.search(vectors[7], 100)
+    quantized_rows, scores = small.search(vectors[7], 100)
+    overlap = len(set(rows) & set(quantized_rows)) / 100
+    print(f"Top-100 overlap with the float32 index: {overlap:.2f}")
+    assert overlap >= 0.9
+    assert np.all(np.diff(scores) <= 0)
+
+    catalog = ItemCatalog.from_items(make_hotels(20000))
+    results = {}
+    original = settings.RETRIEVAL_VECTOR_DTYPE
+    try:
+        for dtype in ('float32', 'int8'):
+            settings.RETRIEVAL_VECTOR_DTYPE = dtype
+            engine = RecommendationEngine()
+            engine.catalog = catalog
+            results[dtype] = [r['id'] for r in await engine.get_recommendations('user-1', 150, {}, {})]
+            assert engine.retrieval_indexes['hotel']['index'].dtype == dtype
+    finally:
+        settings.RETRIEVAL_VECTOR_DTYPE = original
+
+    overlap = len(set(results['float32']) & set(results['int8']))
+    print(f"Engine top-10 overlap, int8 vs float32: {overlap}/10")
+    assert overlap >= 8
+
+    print("\n✓ Quantized retrieval test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        test_round_trip()
+        test_drift_report()
+        asyncio.run(test_quantized_retrieval())
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,8 +4,12 @@ Tests collaborative filtering, content-based filtering, and hybrid approach.
 """
 
 import asyncio
+import itertools
 import sys
-from models.recommendation_model import RecommendationEngine
+import time
+import numpy as np
+from models.recommendation_model import RecommendationEngine, RANKED_DTYPE
+from utils.bundle_optimizer import BundleOptimizer
 import logging
 
 # Configure logging
@@ -306,6 +310,297 @@ async def test_weights_verification():
     print("\n✓ Weight verification test passed")
 
 
+async def test_mixed_recommendations():
+    """Test hotel+tour recommendations from a single request."""
+    print("\n" + "="*80)
+    print("TEST 7: Mixed Hotel + Tour Recommendations")
+    print("="*80)
+    
+    engine = RecommendationEngine()
+    
+    # Count shared lookups to verify they run once per request
+    calls = {'profile': 0, 'neighborhood': 0}
+    original_profile = engine._get_user_profile
+    original_neighborhood = engine._get_cf_neighborhood
+    
+    async def counting_profile(user_id):
+        calls['profile'] += 1
+        return await original_profile(user_id)
+    
+    async def counting_neighborhood(user_id):
+        calls['neighborhood'] += 1
+        return await original_neighborhood(user_id)
+    
+    engine._get_user_profile = counting_profile
+    engine._get_cf_neighborhood = counting_neighborhood
+    
+    recommendations = await engine.get_recommendations(
+        user_id="user-1",
+        budget=150,
+        preferences={'amenities': ['wifi', 'pool']},
+        dates={'check_in': '2025-12-01', 'check_out': '2025-12-05'},
+        item_type="all",
+        type_quotas={'hotel': 2, 'tour': 1}
+    )
+    
+    print(f"\nMixed Recommendations ({len(recommendations)} items):")
+    for rec in recommendations:
+        print(f"  [{rec['type']}] {rec['name']}: {rec['combined_score']:.3f}")
+    
+    types = [rec['type'] for rec in recommendations]
+    assert 'hotel' in types and 'tour' in types, "Should mix hotels and tours"
+    assert calls['profile'] == 1, "Profile should be fetched once"
+    assert calls['neighborhood'] == 1, "CF neighborhood should be computed once"
+    
+    scores = [rec['combined_score'] for rec in recommendations]
+    assert scores == sorted(scores, reverse=True), "Merged list should be ranked"
+    
+    # Quotas reserve slots but unused slots are backfilled up to the limit
+    def ranked(rows, scores):
+        entries = np.zeros(len(rows), dtype=RANKED_DTYPE)
+        entries['row'] = rows
+        entries['combined_score'] = scores
+        return entries
+    
+    merged = engine._merge_with_quotas(
+        {
+            'hotel': ranked(range(5), [0.9 - i * 0.1 for i in range(5)]),
+            'tour': ranked([10], [0.1])
+        },
+        {'hotel': 2, 'tour': 2},
+        limit=4
+    )
+    assert list(merged['row'][:4]) == [0, 1, 2, 10], "Quota merge mismatch"
+    assert list(merged['row'][4:]) == [3, 4], "Remaining items should follow by score"
+    
+    print("\n✓ Mixed recommendation test passed")
+
+
+async def test_cursor_pagination():
+    """Test cursor pagination over a cached ranked list."""
+    print("\n" + "="*80)
+    print("TEST 8: Cursor Pagination")
+    print("="*80)
+    
+    engine = RecommendationEngine()
+    request = {
+        'user_id': 'user-1',
+        'budget': 150,
+        'preferences': {'amenities': ['wifi', 'pool']},
+        'dates': {'check_in': '2025-04-14', 'check_out': '2025-04-16'},
+        'item_type': 'all'
+    }
+    
+    full = await engine.get_recommendations(**request)
+    
+    first = await engine.get_recommendation_page(**request, page_size=2)
+    pages = [first]
+    
+    # Refresh the model mid-session; cached pages must not change
+    engine.collaborative_weight, engine.content_weight = 0.1, 0.9
+    
+    while pages[-1]['next_cursor']:
+        page = await engine.get_recommendation_page(
+            **request,
+            cursor=pages[-1]['next_cursor'],
+            page_size=2
+        )
+        pages.append(page)
+    
+    paged = [rec for page in pages for rec in page['recommendations']]
+    
+    print(f"\nPages: {len(pages)}, total ranked: {first['total']}")
+    for rec in paged:
+        print(f"  {rec['id']}: {rec['combined_score']:.3f} ({rec['confidence']}%)")
+    
+    assert [r['id'] for r in paged] == [r['id'] for r in full], "Page order mismatch"
+    assert [r['combined_score'] for r in paged] == [r['combined_score'] for r in full], "Page scores changed"
+    assert all('recommendation_reasons' in r for r in paged), "Pages should be annotated"
+    assert all(page['total'] == len(paged) for page in pages), "Every page reports the whole ranked list's size"
+    
+    # Cursors are bound to the user and expire
+    other_user = await engine.get_recommendation_page(
+        **{**request, 'user_id': 'user-2'},
+        cursor=first['next_cursor']
+    )
+    assert other_user is None, "Cursor should not be usable by another user"
+    
+    engine.ranking_cache.ttl_seconds = -1
+    token = engine.ranking_cache.put(
+        {'ids': np.array(['hotel-1'], dtype=object), 'recommendation_scores': np.array([0.5]), 'scores': np.array([0.5])},
+        {'user_id': 'user-1'}
+    )
+    expired = await engine.get_recommendation_page(
+        **request,
+        cursor=engine.ranking_cache.encode_cursor(token, 0)
+    )
+    assert expired is None, "Expired cursor should not return a page"
+    
+    print("\n✓ Cursor pagination test passed")
+
+
+async def test_streaming_recommendations():
+    """Test progressive recommendation stages."""
+    print("\n" + "="*80)
+    print("TEST 9: Streaming Recommendations")
+    print("="*80)
+    
+    engine = RecommendationEngine()
+    
+    stages = []
+    async for chunk in engine.stream_recommendations(
+        user_id="user-1",
+        budget=150,
+        preferences={'amenities': ['wifi', 'pool']},
+        dates={'check_in': '2025-04-14', 'check_out': '2025-04-16'},
+        item_type="all",
+        page_size=3
+    ):
+        stages.append(chunk)
+        ids = [rec['id'] for rec in chunk['recommendations']]
+        print(f"  {chunk['stage']}: {ids}")
+    
+    assert [c['stage'] for c in stages] == ['initial', 'personalized', 'final'], "Unexpected stages"
+    assert all(len(c['recommendations']) <= 3 for c in stages), "Page size not respected"
+    assert all('confidence' in r for c in stages for r in c['recommendations']), "Missing metadata"
+    assert not any(r.get('has_events') for r in stages[0]['recommendations']), "Initial page should skip events"
+    
+    # The final stage matches the non-streaming pipeline and supports pagination
+    full = await engine.get_recommendations(
+        user_id="user-1",
+        budget=150,
+        preferences={'amenities': ['wifi', 'pool']},
+        dates={'check_in': '2025-04-14', 'check_out': '2025-04-16'},
+        item_type="all"
+    )
+    assert [r['id'] for r in stages[-1]['recommendations']] == [r['id'] for r in full[:3]], "Final stage mismatch"
+    assert stages[-1]['next_cursor'], "Final stage should carry a cursor"
+    
+    # Hotels and tours are scored concurrently, as in the non-streaming path
+    score_items = engine._score_items
+    in_flight = [0, 0]
+    
+    async def slow_score_items(*args):
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight)
+        await asyncio.sleep(0.05)
+        in_flight[0] -= 1
+        return await score_items(*args)
+    
+    engine._score_items = slow_score_items
+    async for chunk in engine.stream_recommendations(
+        user_id="user-1",
+        budget=150,
+        preferences={'amenities': ['wifi', 'pool']},
+        dates={'check_in': '2025-04-14', 'check_out': '2025-04-16'},
+        item_type="all",
+        page_size=3
+    ):
+        pass
+    assert in_flight[1] == 2, "Item types should be scored concurrently"
+    
+    print("\n✓ Streaming recommendation test passed")
+
+
+async def test_bundle_recommendations():
+    """Test hotel + tour bundle optimization."""
+    print("\n" + "="*80)
+    print("TEST 10: Bundle Recommendations")
+    print("="*80)
+    
+    # Solver matches brute force on small instances
+    rng = np.random.default_rng(7)
+    optimizer = BundleOptimizer(budget_buckets=1000)
+    for _ in range(20):
+        hotel_costs = rng.integers(20, 200, 5).astype(float)
+        hotel_scores = rng.random(5)
+        addon_costs = rng.integers(0, 100, 7).astype(float)
+        addon_scores = rng.random(7)
+        
+        best = optimizer.optimize(hotel_costs, hotel_scores, addon_costs, addon_scores, budget=300, max_addons=2)[0]
+        
+        expected = max(
+            hotel_scores[h] + sum(addon_scores[list(combo)])
+            for h in range(5)
+            for k in range(3)
+            for combo in itertools.combinations(range(7), k)
+            if hotel_costs[h] + sum(addon_costs[list(combo)]) <= 300
+        )
+        assert abs(best['score'] - expected) < 1e-9, "Bundle is not optimal"
+        assert best['cost'] <= 300, "Bundle exceeds budget"
+        assert len(best['addon_indices']) <= 2, "Too many add-ons"
+    
+    # Hundreds of candidates per category stay well under 50 ms
+    hotel_costs = rng.uniform(20, 300, 300)
+    addon_costs = rng.uniform(5, 150, 300)
+    start = time.perf_counter()
+    bundles = optimizer.optimize(
+        hotel_costs, rng.random(300), addon_costs, rng.random(300),
+        budget=1000, max_addons=3, max_bundles=3
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"\n300 hotels x 300 add-ons, K=3: {elapsed:.1f} ms")
+    assert len(bundles) == 3 and elapsed < 50, "Bundle optimization too slow"
+    
+    engine = RecommendationEngine()
+    bundles = await engine.get_bundle_recommendations(
+        user_id="user-1",
+        budget=400,
+        preferences={'amenities': ['wifi', 'pool']},
+        dates={'check_in': '2025-04-14', 'check_out': '2025-04-16'},
+        max_tours=2
+    )
+    
+    for bundle in bundles:
+        names = [t['name'] for t in bundle['tours']] + [e['name'] for e in bundle['events']]
+        print(f"  {bundle['hotel']['name']} + {names}: ${bundle['total_price_usd']} ({bundle['bundle_score']:.3f})")
+    
+    assert bundles, "Should recommend bundles"
+    assert len({b['hotel']['id'] for b in bundles}) == len(bundles), "Bundles should use different hotels"
+    assert all(b['hotel']['nights'] == 2 for b in bundles), "Nights should come from the dates"
+    assert all(b['total_price_usd'] <= 400 * 0.9 for b in bundles), "Bundles should stay within 90% of budget"
+    assert all(len(b['tours']) + len(b['events']) <= 2 for b in bundles), "Too many tours and events"
+    
+    # Add-ons stay in the hotel's city, and unpriced events are never free add-ons
+    async def priced_events(dates):
+        return [
+            {'id': 'event-1', 'name': 'Khmer New Year Festival', 'location': {'city': 'Siem Reap'}},
+            {'id': 'event-2', 'name': 'Water Festival', 'location': {'city': 'Siem Reap'},
+             'price': 20000, 'currency': 'KHR'},
+            {'id': 'event-3', 'name': 'Riverside Concert', 'location': {'city': 'Phnom Penh'}, 'price': 15}
+        ]
+    
+    engine._get_events_in_date_range = priced_events
+    bundles = await engine.get_bundle_recommendations(
+        user_id="user-1",
+        budget=400,
+        preferences={},
+        dates={'check_in': '2025-04-14', 'check_out': '2025-04-16'},
+        max_tours=3
+    )
+    for bundle in bundles:
+        city = bundle['hotel']['location']['city']
+        assert all(t['location']['city'] == city for t in bundle['tours']), "Tours should be in the hotel's city"
+        assert all(e['location']['city'] == city for e in bundle['events']), "Events should be in the hotel's city"
+        assert all(e['id'] != 'event-1' for e in bundle['events']), "Unpriced events should not be added"
+    
+    siem_reap = [b for b in bundles if b['hotel']['location']['city'] == 'Siem Reap']
+    phnom_penh = [b for b in bundles if b['hotel']['location']['city'] == 'Phnom Penh']
+    assert siem_reap and phnom_penh, "Hotels of both cities should get bundles"
+    assert any(e['id'] == 'event-2' and e['cost_usd'] == 5.0 for b in siem_reap for e in b['events'])
+    assert all(not b['tours'] and [e['id'] for e in b['events']] == ['event-3'] for b in phnom_penh)
+    
+    # Candidates are filtered on the USD price, as the optimizer costs them
+    engine.catalog.add_items([{
+        'id': 'hotel-khr', 'name': 'Riel Guesthouse', 'type': 'hotel',
+        'price_per_night': 120000, 'currency': 'KHR', 'location': {'city': 'Kampot'}
+    }])
+    rows = await engine._query_available_rows(50, {}, 'hotel', {})
+    assert engine.catalog.row_of('hotel-khr') in rows, "A $30 KHR-priced hotel fits a $50 budget"
+    
+    print("\n✓ Bundle recommendation test passed")
+
+
 async def main():
     """Run all tests."""
     print("\n" + "="*80)
@@ -319,6 +614,10 @@ async def main():
         await test_budget_optimization()
         await test_event_integration()
         await test_hybrid_recommendation()
+        await test_mixed_recommendations()
+        await test_cursor_pagination()
+        await test_streaming_recommendations()
+        await test_bundle_recommendations()
         
         print("\n" + "="*80)
         print("ALL TESTS PASSED ✓")
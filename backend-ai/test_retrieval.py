@@ -0,0 +1,141 @@
+"""
+Test script for two-tower candidate retrieval.
+Tests IVF recall against exact search, filtering, and retrieval + re-ranking
+against scoring the whole catalog.
+"""
+
+import asyncio
+import sys
+import time
+import numpy as np
+from utils.ann_index import IVFIndex
+from utils.catalog import ItemCatalog
+from config.settings import settings
+from models.recommendation_model import RecommendationEngine
+from tests_support import make_hotels, make_vectors
+
+
+def test_ivf_recall():
+    """Test IVF search against exact inner product search."""
+    print("\n" + "="*80)
+    print("TEST 1: IVF Recall")
+    print("="*80)
+
+    vectors = make_vectors(100000)
+    rng = np.random.default_rng(1)
+
+    start = time.perf_counter()
+    index = IVFIndex(nprobe=8).build(vectors)
+    print(f"\nBuilt index over {len(index)} vectors in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    recalls = []
+    search_time = 0.0
+    for _ in range(30):
+        query = vectors[rng.integers(len(vectors))] + 0.1 * rng.normal(size=vectors.shape[1]).astype(np.float32)
+        start = time.perf_counter()
+        rows, scores = index.search(query, 300)
+        search_time += time.perf_counter() - start
+
+        exact = np.argsort(-(vectors @ query))[:300]
+        recalls.append(len(set(rows) & set(exact)) / 300)
+        assert np.all(np.diff(scores) <= 0), "Results should be sorted by score"
+        assert np.allclose(scores, vectors[rows] @ query, atol=1e-5)
+
+    print(f"Recall@300: {np.mean(recalls):.3f}, {search_time / 30 * 1000:.2f} ms per query")
+    assert np.mean(recalls) > 0.9, "Recall should stay above 0.9"
+
+    # Filtered search keeps probing until it finds enough allowed rows
+    mask = rng.random(len(vectors)) < 0.005
+    rows, _ = index.search(vectors[0], 300, mask)
+    assert len(rows) == 300 and mask[rows].all(), "Filtered search should return allowed rows only"
+
+    rows, _ = index.search(vectors[0], 10, np.zeros(len(vectors), dtype=bool))
+    assert len(rows) == 0
+
+    print("\n✓ IVF recall test passed")
+
+
+async def test_retrieve_and_rerank():
+    """Test that retrieval + re-ranking matches full scoring at flat cost."""
+    print("\n" + "="*80)
+    print("TEST 2: Retrieve and Re-rank")
+    print("="*80)
+
+    for count in (10000, 100000):
+        engine = RecommendationEngine()
+        engine.catalog = ItemCatalog.from_items(make_hotels(count))
+
+        # First request builds the index
+        await engine.get_recommendations('user-1', 150, {}, {})
+
+        start = time.perf_counter()
+        retrieved = await engine.get_recommendations('user-1', 150, {}, {})
+        retrieval_time = time.perf_counter() - start
+
+        rows = await engine._query_available_rows(150, {}, 'hotel', {})
+        candidates = await engine._retrieve_candidates('user-1', await engine._get_user_profile('user-1'), rows)
+        assert len(candidates) <= settings.RETRIEVAL_CANDIDATES + 20, "Too many candidates"
+        assert np.isin(candidates, rows).all(), "Candidates must be available rows"
+
+        original = settings.RETRIEVAL_CANDIDATES
+        settings.RETRIEVAL_CANDIDATES = 0
+        try:
+            start = time.perf_counter()
+            full = await engine.get_recommendations('user-1', 150, {}, {})
+            full_time = time.perf_counter() - start
+        finally:
+            settings.RETRIEVAL_CANDIDATES = original
+
+        overlap = len({r['id'] for r in retrieved} & {r['id'] for r in full})
+        print(f"\n{count} hotels: retrieval {retrieval_time * 1000:.1f} ms, "
+              f"full scoring {full_time * 1000:.1f} ms, top-10 overlap {overlap}/10")
+        assert overlap >= 8, "Retrieval should keep most of the full top 10"
+
+    # Updating rows in place rebuilds the index with the new features
+    index = engine.retrieval_indexes['hotel']
+    assert (await engine._get_retrieval_index('hotel')) is index, "Unchanged catalog should reuse the index"
+    hotel = engine.catalog.to_dict(0)
+    engine.catalog.add_items([{**hotel, 'price_per_night': hotel['price_per_night'] * 3}])
+    rebuilt = await engine._get_retrieval_index('hotel')
+    assert rebuilt is not index and rebuilt['catalog_revision'] == engine.catalog.revision, "Stale index after a row update"
+
+    print("\n✓ Retrieve and re-rank test passed")
+
+
+async def test_small_catalog_unchanged():
+    """Test that lists under the candidate limit are scored in full."""
+    print("\n" + "="*80)
+    print("TEST 3: Small Catalogs Skip Retrieval")
+    print("="*80)
+
+    engine = RecommendationEngine()
+    await engine.get_recommendations('user-1', 200, {}, {}, item_type='all')
+    assert engine.retrieval_indexes == {}, "No index should be built for small lists"
+
+    print("\n✓ Small catalog test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        test_ivf_recall()
+        asyncio.run(test_retrieve_and_rerank())
+        asyncio.run(test_small_catalog_unchanged())
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+"""
+Test script for the per-hotel/tour sentiment aggregate store.
+Tests running statistics against a full recomputation, constant-time
+updates, the shared disk store, keeping live reviews during a rebuild,
+and the analyze, aggregates and rebuild routes.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from utils.sentiment_aggregates import SentimentAggregateStore
+from tests_support import make_analyzer, make_reviews, make_tiny_model, stream_route
+
+
+def random_results(count, seed=0):
+    """Generate analysis results with random scores and topics."""
+    rng = np.random.default_rng(seed)
+    topics = ["cleanliness", "service", "location", "value"]
+    results = []
+    for _ in range(count):
+        score = round(float(rng.random()), 3)
+        results.append({
+            "score": score,
+            "classification": "neutral",
+            "topics": {topic: round(float(rng.random()), 3) for topic in topics if rng.random() < 0.5},
+            "flagged": score < 0.3
+        })
+    return results
+
+
+def expected_aggregates(results):
+    """Recompute aggregates from all results with numpy."""
+    scores = np.array([result["score"] for result in results])
+    topics = {}
+    for result in results:
+        for topic, score in result["topics"].items():
+            topics.setdefault(topic, []).append(score)
+
+    return {
+        "review_count": len(results),
+        "flagged_count": sum(result["flagged"] for result in results),
+        "score": (len(scores), scores.mean(), scores.std()),
+        "topics": {topic: (len(values), np.mean(values), np.std(values)) for topic, values in topics.items()}
+    }
+
+
+def assert_matches(aggregates, results):
+    """Check stored aggregates against a recomputation."""
+    expected = expected_aggregates(results)
+    assert aggregates["review_count"] == expected["review_count"]
+    assert aggregates["flagged_count"] == expected["flagged_count"]
+
+    pairs = [(aggregates["score"], expected["score"])]
+    assert set(aggregates["topics"]) == set(expected["topics"])
+    pairs += [(aggregates["topics"][topic], expected["topics"][topic]) for topic in expected["topics"]]
+    for summary, (count, mean, std) in pairs:
+        assert summary["count"] == count
+        assert abs(summary["mean"] - mean) < 1e-4, (summary, mean)
+        assert abs(summary["std"] - std) < 1e-4, (summary, std)
+
+
+def test_running_statistics():
+    """Test that running sums give the same statistics as recomputing."""
+    print("\n" + "="*80)
+    print("TEST 1: Running Statistics")
+    print("="*80)
+
+    store = SentimentAggregateStore()
+    results = random_results(500)
+    for i, result in enumerate(results):
+        store.add("hotel", f"h{i % 3}", result)
+
+    for item in range(3):
+        assert_matches(store.get("hotel", f"h{item}"), results[item::3])
+
+    # Items are kept apart by type, and unknown items have zero counts
+    store.add_many([("tour", "h0", result) for result in results[:10]])
+    assert_matches(store.get("tour", "h0"), results[:10])
+    assert_matches(store.get("hotel", "h0"), results[0::3])
+
+    empty = store.get("hotel", "unknown")
+    assert empty["review_count"] == 0 and empty["score"]["count"] == 0 and empty["topics"] == {}
+    assert store.stats()["items"] == 4 and store.stats()["reviews"] == 510
+
+    print(f"\n{store.get('hotel', 'h0')['score']}")
+    print("\n✓ Running statistics test passed")
+
+
+def test_constant_time_updates():
+    """Test that recording a review does not slow down as reviews accumulate."""
+    print("\n" + "="*80)
+    print("TEST 2: Constant-Time Updates")
+    print("="*80)
+
+    store = SentimentAggregateStore()
+    results = random_results(1000, seed=1)
+
+    timings = []
+    for _ in range(20):
+        start = time.perf_counter()
+        for result in results:
+            store.add("hotel", "busy", result)
+        timings.append((time.perf_counter() - start) / len(results) * 1e6)
+
+    first, last = np.median(timings[:3]), np.median(timings[-3:])
+    print(f"\nFirst 3000 reviews: {first:.1f} µs/review; last 3000 of 20000: {last:.1f} µs/review")
+    assert last < first * 2, "Updates got slower with more reviews"
+    assert store.get("hotel", "busy")["review_count"] == 20000
+
+    print("\n✓ Constant-time test passed")
+
+
+def test_disk_store():
+    """Test that workers share aggregates on disk and that replace keeps other item types."""
+    print("\n" + "="*80)
+    print("TEST 3: Shared Disk Store")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "aggregates", "sentiment.sqlite")
+        first = SentimentAggregateStore(path)
+        second = SentimentAggregateStore(path)
+
+        results = random_results(100, seed=2)
+        first.add_many([("hotel", "h1", result) for result in results[:50]])
+        second.add_many([("hotel", "h1", result) for result in results[50:]])
+        assert_matches(first.get("hotel", "h1"), results)
+
+        rows = {}
+        for result in results[:7]:
+            SentimentAggregateStore.accumulate(rows, "tour", "t1", result)
+        second.replace(rows)
+        assert_matches(first.get("hotel", "h1"), results)
+        assert_matches(first.get("tour", "t1"), results[:7])
+
+        # Replacing with no rows clears only the item types asked for
+        second.replace({}, item_types=["hotel"])
+        assert first.get("hotel", "h1")["review_count"] == 0
+        assert_matches(first.get("tour", "t1"), results[:7])
+
+        first.close()
+        second.close()
+
+    print("\n✓ Disk store test passed")
+
+
+def test_live_reviews_during_rebuild():
+    """Test that results recorded by any worker during a rebuild are kept."""
+    print("\n" + "="*80)
+    print("TEST 4: Live Reviews During Rebuild")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sentiment.sqlite")
+        rebuilder = SentimentAggregateStore(path)
+        worker = SentimentAggregateStore(path)
+
+        history = random_results(40, seed=3)
+        live = random_results(20, seed=4)
+        worker.add_many([("hotel", "h1", result) for result in history[:30]])
+        worker.add_many([("tour", "t1", result) for result in live[:5]])
+
+        rebuild_id = rebuilder.begin_rebuild()
+        worker.add_many([("hotel", "h1", result) for result in live[:10]])
+        worker.add_many([("hotel", "h2", result) for result in live[10:15]])
+        worker.add_many([("tour", "t1", result) for result in live[15:]])
+
+        rows = {}
+        for result in history:
+            SentimentAggregateStore.accumulate(rows, "hotel", "h1", result)
+        rebuilder.replace(rows, ["hotel"], rebuild_id)
+
+        # Rebuilt history plus the reviews recorded since the rebuild began
+        assert_matches(rebuilder.get("hotel", "h1"), history + live[:10])
+        assert_matches(rebuilder.get("hotel", "h2"), live[10:15])
+        assert_matches(rebuilder.get("tour", "t1"), live[:5] + live[15:])
+
+        # Once no rebuild runs, results are no longer logged as deltas
+        worker.add_many([("hotel", "h2", result) for result in live[15:]])
+        connection = rebuilder._get_connection()
+        assert connection.execute("SELECT COUNT(*) FROM sentiment_deltas").fetchone()[0] == 0
+
+        # A failed rebuild leaves the store as it was
+        rebuild_id = rebuilder.begin_rebuild()
+        worker.add("hotel", "h2", live[0])
+        rebuilder.end_rebuild(rebuild_id)
+        assert_matches(rebuilder.get("hotel", "h2"), live[10:] + live[:1])
+        assert connection.execute("SELECT COUNT(*) FROM sentiment_rebuilds").fetchone()[0] == 0
+
+        rebuilder.close()
+        worker.close()
+
+    print("\n✓ Live reviews test passed")
+
+
+async def test_routes():
+    """Test recording through analyze-review, reading aggregates and rebuilding them."""
+    print("\n" + "="*80)
+    print("TEST 5: Routes")
+    print("="*80)
+
+    from routes import analyze
+
+    original = analyze.sentiment_analyzer, analyze.settings.SENTIMENT_STREAM_CHUNK_SIZE
+    analyzer = make_analyzer(make_tiny_model())
+    analyze.sentiment_analyzer = analyzer
+    analyze.settings.SENTIMENT_STREAM_CHUNK_SIZE = 16
+
+    try:
+        reviews = make_reviews(60, seed=5)
+        expected = await analyzer.batch_analyze(reviews)
+
+        # Only reviews with an item_id are recorded
+        for i, review in enumerate(reviews):
+            await analyze.analyze_review(analyze.ReviewAnalysisRequest(
+                review_text=review,
+                item_type="tour" if i % 2 else "hotel",
+                item_id=f"item{i % 4}" if i < 40 else None
+            ))
+
+        response = await analyze.get_sentiment_aggregates("hotel", "item0")
+        assert response.success
+        assert_matches(response.model_dump(), [expected[i] for i in range(0, 40, 4)])
+        print(f"\nhotel item0: {response.review_count} reviews, mean {response.score.mean}")
+
+        # Rebuild hotels from a history of all 60 reviews, with some unusable lines
+        def lines():
+            for i, review in enumerate(reviews):
+                if i == 30:
+                    # Another worker records a review while the rebuild runs
+                    analyzer.aggregates.add("hotel", "item0", expected[0])
+                yield json.dumps({"item_type": "hotel", "item_id": f"item{i % 4}", "review_text": review})
+            yield json.dumps({"review_text": "No item"})
+            yield "{broken"
+            yield json.dumps({"item_id": "x", "item_type": "bus", "review_text": "?"})
+
+        progress = []
+        await stream_route(analyze.rebuild_sentiment_aggregates, lines(), progress.append, chunk_bytes=500)
+
+        assert progress[-1] == {"done": True, "reviews": 60, "items": 4, "skipped": 3}, progress[-1]
+        assert [line["reviews"] for line in progress] == [16, 32, 48, 60, 60]
+        for item in range(4):
+            response = await analyze.get_sentiment_aggregates("hotel", f"item{item}")
+            assert_matches(response.model_dump(), expected[item::4] + expected[:1] * (item == 0))
+
+        # Tours were not in the upload and keep their aggregates
+        response = await analyze.get_sentiment_aggregates("tour", "item1")
+        assert_matches(response.model_dump(), [expected[i] for i in range(1, 40, 4)])
+
+        metrics = (await analyze.get_sentiment_metrics()).metrics
+        assert metrics["aggregates"]["items"] == 6 and metrics["aggregates"]["reviews"] == 81
+
+        print(f"Rebuild progress: {progress}")
+    finally:
+        analyze.sentiment_analyzer, analyze.settings.SENTIMENT_STREAM_CHUNK_SIZE = original
+        analyzer.executor.close()
+
+    print("\n✓ Routes test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        test_running_statistics()
+        test_constant_time_updates()
+        test_disk_store()
+        test_live_reviews_during_rebuild()
+        asyncio.run(test_routes())
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Test script for batched sentiment analysis.
+Runs a tiny randomly initialized BERT sentence-transformer built on the fly,
+so it works offline. Tests batched results against one-at-a-time encoding,
+the number of encode calls, sentence reuse across topics, and throughput.
+"""
+
+import asyncio
+import re
+import sys
+import time
+import numpy as np
+from tests_support import CountingEncoder, make_analyzer, make_reviews, make_tiny_model
+
+
+def topics_of(analyzer, sentence):
+    """Keyword groups (topics, positive, negative) mentioned in a sentence."""
+    matcher = analyzer.KEYWORD_MATCHER
+    return matcher.groups(matcher.keywords(sentence))
+
+
+def reference_analysis(analyzer, text):
+    """Score a review one text at a time: topics pool their sentence embeddings."""
+    def score(embedding, part):
+        sims = [analyzer._cosine_similarity(embedding, anchor) for anchor in
+                (analyzer.positive_embedding, analyzer.negative_embedding, analyzer.neutral_embedding)]
+        total = sum(sims)
+        if total == 0:
+            return 0.5
+        semantic = (sims[0] * 1.0 + sims[2] * 0.5) / total
+        return max(0.0, min(1.0, 0.7 * semantic + 0.3 * analyzer._keyword_based_sentiment(part)))
+
+    def unit(part):
+        embedding = analyzer.model.encode(part)
+        return embedding / np.linalg.norm(embedding)
+
+    topics = {}
+    sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
+    for topic in analyzer.TOPIC_KEYWORDS:
+        matching = [s for s in sentences if topic in topics_of(analyzer, s)]
+        if matching:
+            pooled = np.mean([unit(s) for s in matching], axis=0)
+            topics[topic] = score(pooled, " ".join(matching))
+    return score(analyzer.model.encode(text), text), topics
+
+
+async def test_batch_matches_single():
+    """Test that batched scores match encoding reviews one at a time."""
+    print("\n" + "="*80)
+    print("TEST 1: Batched vs One-at-a-Time Scores")
+    print("="*80)
+
+    analyzer = make_analyzer(make_tiny_model())
+    reviews = make_reviews(40)
+    results = await analyzer.batch_analyze(reviews)
+
+    worst = 0.0
+    for review, result in zip(reviews, results):
+        score, topics = reference_analysis(analyzer, review)
+        worst = max(worst, abs(result['score'] - score))
+        assert set(result['topics']) == set(topics), "Topics should be the same"
+        for topic, topic_score in topics.items():
+            worst = max(worst, abs(result['topics'][topic] - topic_score))
+        assert result['classification'] == analyzer._classify_sentiment(result['score'])
+
+    print(f"\nLargest difference from one-at-a-time encoding: {worst:.4f}")
+    assert worst < 2e-3, "Batched scores should match up to rounding"
+
+    single = await analyzer.analyze_review(reviews[0])
+    assert single == results[0], "analyze_review should use the same path"
+
+    print("\n✓ Batched vs single test passed")
+
+
+async def test_one_encode_per_batch():
+    """Test that a batch is encoded in one call over de-duplicated texts."""
+    print("\n" + "="*80)
+    print("TEST 2: One Encode per Batch")
+    print("="*80)
+
+    encoder = CountingEncoder(make_tiny_model())
+    analyzer = make_analyzer(encoder)
+    encoder.calls = encoder.texts = 0
+
+    reviews = make_reviews(100) * 2 + ["", "   "]
+    results = await analyzer.batch_analyze(reviews)
+
+    print(f"\n{len(reviews)} reviews: {encoder.calls} encode call(s), {encoder.texts} texts encoded")
+    assert encoder.calls == 1, "The whole batch should be one encode call"
+    assert results[:100] == results[100:200], "Duplicate reviews get identical results"
+    assert results[-1] == {"score": 0.5, "classification": "neutral", "topics": {}, "flagged": False}
+
+    # Each review and each distinct sentence mentioning a topic is encoded exactly once
+    sentences = {
+        s.strip() for review in reviews[:100] for s in re.split(r'[.!?]+', review)
+        if topics_of(analyzer, s) & set(analyzer.TOPIC_KEYWORDS)
+    }
+    assert encoder.texts == len(set(reviews[:100])) + len(sentences), "Texts should be encoded once"
+
+    encoder.calls = 0
+    assert await analyzer.batch_analyze(["", None]) == [results[-1], results[-1]]
+    assert encoder.calls == 0, "Nothing to encode for empty reviews"
+
+    # Without a model, keyword scoring still works
+    analyzer.model = None
+    fallback = await analyzer.batch_analyze(["Excellent staff. Dirty room."])
+    assert fallback[0]['topics'] == {'service': 1.0, 'cleanliness': 0.0, 'comfort': 0.0}
+
+    print("\n✓ One encode per batch test passed")
+
+
+async def test_sentences_encoded_once():
+    """Test that topics sharing sentences do not re-encode them."""
+    print("\n" + "="*80)
+    print("TEST 3: Sentences Encoded Once")
+    print("="*80)
+
+    encoder = CountingEncoder(make_tiny_model())
+    analyzer = make_analyzer(encoder)
+    encoder.calls = encoder.texts = 0
+
+    # "breakfast" is both amenities and food; "room" is cleanliness and comfort
+    review = "Breakfast was delicious. The room was dirty. Great location near the river."
+    result = await analyzer.analyze_review(review)
+
+    print(f"\nTopics: {result['topics']}")
+    print(f"Encoded {encoder.texts} texts in {encoder.calls} call(s)")
+    assert set(result['topics']) == {'amenities', 'food', 'cleanliness', 'comfort', 'location'}
+    assert encoder.calls == 1 and encoder.texts == 4, "The review and its three sentences only"
+    assert result['topics']['amenities'] == result['topics']['food'], "Same sentence, same score"
+
+    assert analyzer._extract_topic_sentiments(review) == result['topics']
+
+    print("\n✓ Sentences encoded once test passed")
+
+
+async def test_throughput():
+    """Compare batched analysis with the original per-review loop."""
+    print("\n" + "="*80)
+    print("TEST 4: Throughput")
+    print("="*80)
+
+    analyzer = make_analyzer(make_tiny_model())
+    reviews = make_reviews(300, seed=1)
+
+    start = time.perf_counter()
+    for review in reviews:
+        reference_analysis(analyzer, review)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await analyzer.batch_analyze(reviews)
+    batch_time = time.perf_counter() - start
+
+    print(f"\n{len(reviews)} reviews: per-review {len(reviews) / loop_time:.0f} reviews/s, "
+          f"batched {len(reviews) / batch_time:.0f} reviews/s ({loop_time / batch_time:.1f}x)")
+    assert batch_time < loop_time, "Batching should be faster"
+
+    print("\n✓ Throughput test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        asyncio.run(test_batch_matches_single())
+        asyncio.run(test_one_encode_per_batch())
+        asyncio.run(test_sentences_encoded_once())
+        asyncio.run(test_throughput())
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Test script for the streaming bulk review analysis endpoint.
+Tests incremental NDJSON parsing, results matching batch analysis,
+per-line errors, and constant memory whatever the upload size.
+"""
+
+import asyncio
+import json
+import sys
+import tracemalloc
+from utils.embedding_cache import EmbeddingCache
+from utils.ndjson import read_ndjson
+from tests_support import make_analyzer, make_reviews, make_tiny_model, stream_route
+
+
+async def collect(chunks, max_line_bytes=65536):
+    """Parse byte chunks and return all records."""
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+    return [record async for record in read_ndjson(stream(), max_line_bytes)]
+
+
+async def test_ndjson_parsing():
+    """Test line splitting across chunks, blank lines and bad lines."""
+    print("\n" + "="*80)
+    print("TEST 1: NDJSON Parsing")
+    print("="*80)
+
+    body = b'{"review_text": "Great"}\n\n"Clean room"\nnot json\n' + b'"' + b"x" * 100 + b'"\n{"id": 7}'
+    for size in (1, 3, 7, len(body)):
+        records = await collect([body[i:i + size] for i in range(0, len(body), size)], max_line_bytes=50)
+        assert [line for line, _, _ in records] == [1, 3, 4, 5, 6], records
+        assert records[0][1] == {"review_text": "Great"}
+        assert records[1][1] == "Clean room"
+        assert records[2][2].startswith("Invalid JSON")
+        assert records[3][2] == "Line longer than 50 bytes"
+        assert records[4][1] == {"id": 7}
+
+    # An over-long last line, and a body that is only blank lines
+    assert (await collect([b'"ok"\n', b"y" * 60]))[1][2].startswith("Invalid JSON")
+    assert (await collect([b'"ok"\n', b"y" * 60], max_line_bytes=50))[1] == (2, None, "Line longer than 50 bytes")
+    assert await collect([b"\n \n", b"\r\n"]) == []
+
+    print("\n✓ Parsing test passed")
+
+
+async def test_results_match_batch(analyze, analyzer):
+    """Test that streamed results match batch analysis, with ids and per-line errors."""
+    print("\n" + "="*80)
+    print("TEST 2: Results Match Batch Analysis")
+    print("="*80)
+
+    reviews = make_reviews(150, seed=4)
+    lines = []
+    for i, review in enumerate(reviews):
+        lines.append(json.dumps({"id": f"r{i}", "review_text": review}) if i % 2 else json.dumps(review))
+    lines[10] = "{broken"
+    lines[20] = json.dumps({"id": "no-text"})
+    lines[30] = ""
+
+    output = []
+    await stream_route(analyze.analyze_reviews_stream, lines, output.append, chunk_bytes=333)
+
+    expected = await analyzer.batch_analyze(reviews)
+    assert [line["line"] for line in output] == [i + 1 for i in range(len(lines)) if i != 30]
+
+    for result in output:
+        i = result["line"] - 1
+        if i == 10:
+            assert not result["success"] and result["error"].startswith("Invalid JSON")
+        elif i == 20:
+            assert not result["success"] and result["id"] == "no-text"
+        else:
+            assert result["success"]
+            assert result.get("id") == (f"r{i}" if i % 2 else None)
+            for key in ("score", "classification", "topics", "flagged"):
+                assert result[key] == expected[i][key], (i, key)
+
+    print(f"\n{len(output)} lines streamed back for {len(lines)} lines uploaded")
+    print("\n✓ Batch match test passed")
+
+
+async def test_constant_memory(analyze):
+    """Test that peak memory does not grow with the number of reviews."""
+    print("\n" + "="*80)
+    print("TEST 3: Constant Memory")
+    print("="*80)
+
+    peaks = {}
+    for count in (1000, 8000):
+        # Generated one at a time, so only the route holds reviews in memory
+        reviews = (make_reviews(1, seed=i)[0] for i in range(count))
+        lines = (json.dumps({"id": i, "review_text": review}) for i, review in enumerate(reviews))
+        answered = 0
+
+        def on_line(result):
+            nonlocal answered
+            assert result["success"], result
+            answered += 1
+
+        tracemalloc.start()
+        await stream_route(analyze.analyze_reviews_stream, lines, on_line)
+        peaks[count] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        assert answered == count
+        print(f"\n{count} reviews: peak {peaks[count] / 1024:.0f} KiB")
+
+    assert peaks[8000] < peaks[1000] * 1.5, peaks
+
+    print("\n✓ Memory test passed")
+
+
+async def run_route_tests():
+    """Run the route tests against an analyzer with a tiny model."""
+    from routes import analyze
+
+    original = analyze.sentiment_analyzer
+    analyzer = make_analyzer(make_tiny_model())
+    # Cached embeddings would grow with the input; they are bounded separately
+    analyzer.embedding_cache = EmbeddingCache(analyzer.model_id, max_entries=0)
+    analyze.sentiment_analyzer = analyzer
+    try:
+        await test_results_match_batch(analyze, analyzer)
+        await test_constant_memory(analyze)
+    finally:
+        analyze.sentiment_analyzer = original
+        analyzer.executor.close()
+
+
+def main():
+    """Run all tests."""
+    try:
+        asyncio.run(test_ndjson_parsing())
+        asyncio.run(run_route_tests())
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
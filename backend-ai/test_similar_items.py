@@ -0,0 +1,153 @@
+"""
+Test script for the similar-items table.
+Tests neighbors against brute force, incremental updates against a full
+rebuild, and the engine lookup for hotels and tours.
+"""
+
+import asyncio
+import sys
+import time
+import numpy as np
+from utils.similar_items import SimilarItemsTable
+from utils.catalog import ItemCatalog
+from models.recommendation_model import RecommendationEngine
+from tests_support import make_hotels, make_vectors
+
+
+def brute_force(vectors, groups, row, top_n):
+    """Exact most similar rows of one row within its group."""
+    similarity = vectors @ vectors[row]
+    similarity[(groups != groups[row])] = -np.inf
+    similarity[row] = -np.inf
+    order = np.argsort(-similarity, kind='stable')[:top_n]
+    return order[np.isfinite(similarity[order])]
+
+
+def test_table_matches_brute_force():
+    """Test that stored neighbors are the exact top-N within each group."""
+    print("\n" + "="*80)
+    print("TEST 1: Neighbors vs Brute Force")
+    print("="*80)
+
+    vectors = make_vectors(5000, dim=20)
+    groups = np.arange(5000) % 3
+    groups[:2] = 7
+
+    start = time.perf_counter()
+    table = SimilarItemsTable(top_n=10).build(vectors, groups)
+    print(f"\nBuilt table for {len(table)} rows in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    for row in (0, 5, 123, 4999):
+        neighbors, scores = table.neighbors_of(row)
+        assert set(neighbors) == set(brute_force(vectors, groups, row, 10)), f"Row {row} differs"
+        assert np.all(np.diff(scores) <= 0), "Neighbors should be sorted"
+        assert row not in neighbors, "A row is not its own neighbor"
+        assert np.all(groups[neighbors] == groups[row]), "Neighbors share the group"
+
+    # A group of two rows has only one neighbor each
+    assert list(table.neighbors_of(0)[0]) == [1]
+    assert len(table.neighbors_of(99999)[0]) == 0
+
+    print("\n✓ Brute force test passed")
+
+
+def test_incremental_update():
+    """Test that updating rows gives the same table as rebuilding it."""
+    print("\n" + "="*80)
+    print("TEST 2: Incremental Update")
+    print("="*80)
+
+    vectors = make_vectors(20000, dim=20)
+    groups = np.arange(20000) % 2
+    table = SimilarItemsTable(top_n=10).build(vectors[:19000], groups[:19000])
+
+    # Change some rows and append new ones
+    rng = np.random.default_rng(5)
+    changed = np.concatenate([rng.choice(19000, size=50, replace=False), np.arange(19000, 20000)])
+    vectors[changed[:50]] = make_vectors(50, dim=20, seed=9)
+
+    start = time.perf_counter()
+    recomputed = table.update(changed, vectors[changed], groups[changed])
+    update_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rebuilt = SimilarItemsTable(top_n=10).build(vectors, groups)
+    build_time = time.perf_counter() - start
+
+    print(f"\nUpdated {len(changed)} rows in {update_time * 1000:.0f} ms "
+          f"({recomputed} lists recomputed), full rebuild {build_time * 1000:.0f} ms")
+    assert len(table) == 20000
+    assert np.allclose(table.scores, rebuilt.scores, atol=1e-5), "Scores should match a rebuild"
+    assert np.array_equal(table.counts, rebuilt.counts)
+    assert (table.neighbors == rebuilt.neighbors).mean() > 0.999, "Only exact ties may differ"
+    assert recomputed < 5000, "Most lists should only be merged"
+
+    print("\n✓ Incremental update test passed")
+
+
+async def test_engine_similar_items():
+    """Test similar hotels and tours from the engine."""
+    print("\n" + "="*80)
+    print("TEST 3: Engine Similar Items")
+    print("="*80)
+
+    engine = RecommendationEngine()
+    similar = await engine.get_similar_items('hotel-1')
+    print(f"\nLike hotel-1: {[(i['id'], i['similarity']) for i in similar]}")
+    assert [i['id'] for i in similar][0] == 'hotel-3', "The other Siem Reap resort should be closest"
+    assert all(i['type'] == 'hotel' for i in similar)
+    assert all(i['type'] == 'tour' for i in await engine.get_similar_items('tour-1'))
+    assert await engine.get_similar_items('nope') == []
+    assert len(await engine.get_similar_items('hotel-1', limit=1)) == 1
+
+    # A described new hotel becomes a neighbor without a rebuild
+    table = engine.similar_items
+    engine.catalog.add_items([{
+        'id': 'hotel-4', 'name': 'Angkor Paradise Villas', 'type': 'hotel',
+        'price_per_night': 85, 'currency': 'USD', 'average_rating': 4.5,
+        'amenities': ['wifi', 'pool', 'breakfast', 'spa'],
+        'location': {'city': 'Siem Reap', 'latitude': 13.3671, 'longitude': 103.8448},
+        'description': 'Paradise villas a short ride from Angkor'
+    }])
+    similar = await engine.get_similar_items('hotel-1')
+    assert engine.similar_items is table, "The table should be updated in place"
+    assert similar[0]['id'] == 'hotel-4', "The near-identical hotel should lead"
+
+    # Large catalogs: lookups are a slice of the precomputed table
+    engine.catalog = ItemCatalog.from_items(make_hotels(10000))
+    start = time.perf_counter()
+    await engine.get_similar_items('hotel-1')
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(200):
+        await engine.get_similar_items(f'hotel-{i}')
+    print(f"10000 hotels: build {build_time * 1000:.0f} ms, lookup {(time.perf_counter() - start) / 200 * 1000:.2f} ms")
+
+    print("\n✓ Engine similar items test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        test_table_matches_brute_force()
+        test_incremental_update()
+        asyncio.run(test_engine_similar_items())
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Test script for the trending counters.
+Tests count-min accuracy, time decay, fixed memory, heavy hitters per city,
+the trend score as a ranking feature and timestamps ahead of the clock.
+"""
+
+import asyncio
+import sys
+import time
+from collections import Counter
+import numpy as np
+from utils.trending import TrendingCounter
+from models.recommendation_model import RecommendationEngine
+
+NOW = 1760000000.0
+
+
+def make_counter(**kwargs):
+    """Create a counter with view and booking weights."""
+    return TrendingCounter({'view': 1.0, 'booking': 5.0}, **kwargs)
+
+
+def test_sketch_accuracy():
+    """Test that estimates never undercount and stay close for heavy items."""
+    print("\n" + "="*80)
+    print("TEST 1: Count-Min Accuracy")
+    print("="*80)
+
+    rng = np.random.default_rng(1)
+    items = [f'item-{i}' for i in rng.zipf(1.3, size=200000) % 50000]
+    counter = make_counter(half_life_buckets=1e9)
+    counter.add_events(items, ['view'] * len(items), [NOW] * len(items), now=NOW)
+
+    exact = Counter(items)
+    item_ids = list(exact)
+    estimates = counter.scores(item_ids, NOW)
+    truth = np.array([exact[i] for i in item_ids], dtype=np.float32)
+
+    assert np.all(estimates >= truth - 1e-3), "Count-min must never undercount"
+    error = (estimates - truth).mean()
+    print(f"\n{len(item_ids)} distinct items, mean overestimate {error:.2f} views")
+    assert error < 200000 / counter.width, "Overestimate should stay near total / width"
+
+    top = [item_id for item_id, _ in counter.top(None, 10, NOW)]
+    expected = [item_id for item_id, _ in exact.most_common(10)]
+    assert top == expected, f"Heavy hitters differ: {top} vs {expected}"
+
+    print("\n✓ Accuracy test passed")
+
+
+def test_decay_and_window():
+    """Test bucket decay, booking weights and the end of the window."""
+    print("\n" + "="*80)
+    print("TEST 2: Decay and Window")
+    print("="*80)
+
+    counter = make_counter(bucket_seconds=3600, num_buckets=24, half_life_buckets=6)
+    counter.add_events(['a', 'a', 'b'], ['view', 'booking', 'search'], [NOW] * 3, now=NOW)
+
+    assert counter.scores(['a'], NOW)[0] == 6.0, "A view and a booking should weigh 1 + 5"
+    assert counter.scores(['b'], NOW)[0] == 0.0, "Unknown event types are not counted"
+    assert abs(counter.scores(['a'], NOW + 6 * 3600)[0] - 3.0) < 1e-5, "Score should halve after 6 buckets"
+    assert counter.scores(['a'], NOW + 24 * 3600)[0] == 0.0, "Events leave the window after 24 buckets"
+
+    # Newer events clear the buckets they replace
+    counter.add_events(['c'], ['view'], [NOW + 30 * 3600], now=NOW + 30 * 3600)
+    assert counter.scores(['a'], NOW + 30 * 3600)[0] == 0.0
+    assert counter.add_events(['a'], ['view'], [NOW], now=NOW + 30 * 3600) == 0, "Events older than the window are dropped"
+
+    # A fresh burst overtakes an item that was popular a day ago
+    counter = make_counter(heavy_hitters=2)
+    counter.add_events(['old'] * 50, ['view'] * 50, [NOW] * 50, now=NOW)
+    counter.add_events(['new'] * 20, ['view'] * 20, [NOW + 20 * 3600] * 20, now=NOW + 20 * 3600)
+    top = counter.top(None, 2, NOW + 20 * 3600)
+    assert top[0][0] == 'new', f"Recent burst should lead: {top}"
+
+    print("\n✓ Decay and window test passed")
+
+
+def test_fixed_memory():
+    """Test that memory does not grow with the number of distinct items."""
+    print("\n" + "="*80)
+    print("TEST 3: Fixed Memory")
+    print("="*80)
+
+    counter = make_counter(heavy_hitters=20)
+    before = counter.nbytes
+
+    rng = np.random.default_rng(2)
+    start = time.perf_counter()
+    for batch in range(50):
+        items = [f'item-{i}' for i in rng.integers(0, 10**7, size=10000)]
+        cities = [i % 5 for i in range(10000)]
+        counter.add_events(items, ['view'] * 10000, [NOW + batch * 60] * 10000, cities, now=NOW + batch * 60)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n500,000 events over ~500,000 distinct items: {500000 / elapsed:,.0f} events/s")
+    print(f"Sketch memory: {counter.nbytes / 1e6:.1f} MB")
+    assert counter.nbytes == before, "Sketch memory should be fixed"
+    assert all(len(c) <= 20 for c in counter._candidates.values()), "Heavy hitters should stay bounded"
+    assert len(counter._candidates) == 6, "One heavy-hitter table per city plus the global one"
+
+    print("\n✓ Fixed memory test passed")
+
+
+async def test_engine_trending():
+    """Test trending per city and the trend score in rankings."""
+    print("\n" + "="*80)
+    print("TEST 4: Engine Trending")
+    print("="*80)
+
+    engine = RecommendationEngine()
+    user_profile = {'budget': 200}
+
+    catalog = engine._ensure_catalog()
+    rows = catalog.rows_of_type('hotel')
+    baseline = await engine._hybrid_scores('user-9', user_profile, [], rows)
+
+    accepted = engine.record_interactions(
+        [{'user_id': f'user-{i}', 'item_id': 'hotel-2', 'event_type': 'view'} for i in range(30)]
+        + [{'user_id': 'user-1', 'item_id': 'hotel-1', 'event_type': 'booking'}]
+        + [{'user_id': 'user-1', 'item_id': 'tour-1', 'event_type': 'view'}]
+    )
+    assert accepted == 32
+
+    trending = await engine.get_trending()
+    print(f"\nTrending everywhere: {[(i['id'], i['trend_score']) for i in trending]}")
+    assert [i['id'] for i in trending] == ['hotel-2', 'hotel-1', 'tour-1']
+
+    siem_reap = await engine.get_trending(city='siem reap')
+    print(f"Trending in Siem Reap: {[(i['id'], i['trend_score']) for i in siem_reap]}")
+    assert all(i['location']['city'] == 'Siem Reap' for i in siem_reap)
+    assert 'hotel-2' not in [i['id'] for i in siem_reap]
+
+    assert [i['id'] for i in await engine.get_trending(item_type='tour')] == ['tour-1']
+    assert await engine.get_trending(city='Nowhere') == []
+
+    boosted = await engine._hybrid_scores('user-9', user_profile, [], rows)
+    hotel_2 = list(catalog.rows_of(['hotel-2']))[0]
+    position = list(rows).index(hotel_2)
+    assert np.argmax(boosted - baseline) == position, "The most trending hotel should gain the most"
+
+    print("\n✓ Engine trending test passed")
+
+
+def test_future_timestamps():
+    """Test that timestamps ahead of the clock cannot clear the window."""
+    print("\n" + "="*80)
+    print("TEST 5: Future Timestamps")
+    print("="*80)
+
+    counter = make_counter(bucket_seconds=3600, num_buckets=24, max_clock_skew=300)
+    counter.add_events(['a'] * 10, ['view'] * 10, [NOW - 3600] * 10, now=NOW)
+
+    # Milliseconds and far-future events are dropped and leave the buckets alone
+    accepted = counter.add_events(['b', 'b'], ['view', 'booking'], [NOW * 1000, NOW + 30 * 86400], now=NOW)
+    assert accepted == 0, "Events beyond the clock skew should be dropped"
+    assert counter._head == int(NOW // 3600), "The newest bucket should follow the clock"
+    assert counter.scores(['a'], NOW)[0] > 0, "Live buckets were cleared"
+
+    # Events within the skew count as now, and later events are still counted
+    assert counter.add_events(['c'], ['view'], [NOW + 200], now=NOW) == 1
+    assert counter.scores(['c'], NOW)[0] == 1.0
+    assert counter.add_events(['a'], ['booking'], [NOW + 60], now=NOW + 60) == 1
+    assert abs(counter.scores(['a'], NOW)[0] - (10 * 0.5 ** (1 / 6) + 5)) < 1e-4
+
+    # With the default wall clock
+    counter = make_counter()
+    assert counter.add_events(['x'], ['view'], [time.time() * 1000]) == 0
+    assert counter.add_events(['y'], ['view'], [time.time()]) == 1
+    assert [item_id for item_id, _ in counter.top()] == ['y']
+
+    print("\n✓ Future timestamps test passed")
+
+
+def main():
+    """Run all tests."""
+    try:
+        test_sketch_accuracy()
+        test_decay_and_window()
+        test_fixed_memory()
+        asyncio.run(test_engine_trending())
+        test_future_timestamps()
+
+        print("\n" + "="*80)
+        print("ALL TESTS PASSED ✓")
+        print("="*80)
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ TEST FAILED: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+Shared fakes and data factories for the test scripts.
+Not a test script itself: the scripts import what they need from here.
+"""
+
+import json
+import os
+import tempfile
+import numpy as np
+from starlette.requests import Request
+from models.sentiment_model import SentimentAnalyzer
+from utils.feature_extractor import FeatureExtractor
+from utils.embedding_cache import EmbeddingCache
+from utils.inference_executor import InferenceExecutor
+from utils.micro_batcher import MicroBatcher
+from utils.padding_metrics import PaddingMetrics
+from utils.sentiment_aggregates import SentimentAggregateStore
+
+
+WORDS = """
+the a an and or but was were is it this that very so too not no at in on of for with to from
+hotel room rooms staff service location breakfast pool wifi bed food restaurant price value
+clean dirty tidy mess spotless filthy unclean helpful friendly rude attentive professional
+convenient accessible nearby central expensive cheap affordable overpriced worth comfortable
+spacious cramped cozy uncomfortable gym parking facilities amenities meal dining delicious tasty
+excellent amazing wonderful great fantastic perfect beautiful lovely outstanding superb
+terrible awful horrible bad poor disappointing worst disgusting unacceptable okay average
+acceptable slow fast noisy quiet view river city centre center trip stay night nights would
+recommend again never ever place experience everything good nice small big old new
+""".split()
+
+REVIEW_PARTS = [
+    "The staff were friendly and helpful", "The room was dirty", "Great location near the river",
+    "Breakfast was delicious", "The wifi was slow", "Excellent value for the price",
+    "The bed was uncomfortable", "Spotless room with a lovely view", "Rude service at the restaurant",
+    "The pool was clean", "Would recommend this hotel", "Terrible experience", "Overpriced and noisy",
+    "Everything was okay", "The room was unclean and cramped", "Amazing stay"
+]
+
+
+def make_tiny_model(directory=None):
+    """Build and load a small random BERT sentence-transformer, fully offline."""
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import BertConfig, BertModel, BertTokenizer
+
+    directory = directory or tempfile.mkdtemp(prefix="tiny-minilm-")
+    os.makedirs(directory, exist_ok=True)
+    if not os.path.exists(os.path.join(directory, "config.json")):
+        vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + sorted(set(WORDS)) + [",", ".", "!", "?"]
+        vocab_file = os.path.join(directory, "vocab.txt")
+        with open(vocab_file, "w") as f:
+            f.write("\n".join(vocab))
+
+        config = BertConfig(
+            vocab_size=len(vocab), hidden_size=64, num_hidden_layers=2,
+            num_attention_heads=4, intermediate_size=128, max_position_embeddings=256
+        )
+        import torch
+        torch.manual_seed(0)
+        BertModel(config).save_pretrained(directory)
+        BertTokenizer(vocab_file).save_pretrained(directory)
+
+    transformer = models.Transformer(directory, max_seq_length=256)
+    pooling = models.Pooling(transformer.get_word_embedding_dimension(), pooling_mode="mean")
+    return SentenceTransformer(modules=[transformer, pooling], device="cpu")
+
+
+class CountingEncoder:
+    """Wrap a model to count encode calls and encoded texts."""
+
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+        self.texts = 0
+
+    def encode(self, texts, *args, **kwargs):
+        self.calls += 1
+        self.texts += 1 if isinstance(texts, str) else len(texts)
+        return self.model.encode(texts, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+def make_analyzer(model):
+    """Create an analyzer using the given model (None for keywords only) instead of downloading one."""
+    analyzer = SentimentAnalyzer.__new__(SentimentAnalyzer)
+    analyzer.model_id = "tiny-test-model"
+    analyzer.embedding_cache = EmbeddingCache(analyzer.model_id)
+    analyzer.padding_metrics = PaddingMetrics()
+    analyzer.executor = InferenceExecutor()
+    analyzer.micro_batcher = MicroBatcher(analyzer._run_batch)
+    analyzer.aggregates = SentimentAggregateStore()
+    analyzer.model = model
+    if model is not None:
+        analyzer._load_anchors()
+    return analyzer
+
+
+def make_reviews(count, seed=0):
+    """Generate reviews of 1-6 sentences from a fixed set of phrases."""
+    rng = np.random.default_rng(seed)
+    return [
+        ". ".join(rng.choice(REVIEW_PARTS, size=rng.integers(1, 7))) + "."
+        for _ in range(count)
+    ]
+
+
+async def stream_route(route, lines, on_line, chunk_bytes=1000):
+    """
+    Drive a streaming route with an upload of lines, passing each output line to on_line.
+
+    The body is produced lazily and split at arbitrary byte boundaries,
+    as a client upload would arrive.
+    """
+    def body():
+        pending = b""
+        for line in lines:
+            pending += line.encode("utf-8") + b"\n"
+            while len(pending) >= chunk_bytes:
+                yield pending[:chunk_bytes]
+                pending = pending[chunk_bytes:]
+        yield pending
+
+    chunks = body()
+
+    async def receive():
+        chunk = next(chunks, None)
+        if chunk is None:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    partial = b""
+
+    async def send(message):
+        nonlocal partial
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200
+            return
+        partial += message.get("body", b"")
+        *complete, partial = partial.split(b"\n")
+        for line in complete:
+            on_line(json.loads(line))
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/",
+        "headers": [(b"content-type", b"application/x-ndjson")],
+        "query_string": b""
+    }
+    request = Request(scope, receive)
+    response = await route(request)
+    await response(scope, receive, send)
+    assert partial == b"", "Response ended mid-line"
+
+
+def make_hotels(count):
+    """Generate synthetic hotels."""
+    amenities = FeatureExtractor.STANDARD_AMENITIES
+    cities = ['Siem Reap', 'Phnom Penh', 'Kampot', 'Kep', 'Battambang']
+    return [
+        {
+            'id': f'hotel-{i}',
+            'name': f'Hotel {i}',
+            'type': 'hotel',
+            'price_per_night': 20 + (i * 7) % 300,
+            'currency': 'KHR' if i % 10 == 0 else 'USD',
+            'average_rating': 3.0 + (i % 20) / 10,
+            'amenities': [a for j, a in enumerate(amenities) if (i >> j) & 1],
+            'location': {
+                'city': cities[i % len(cities)],
+                'province': cities[i % len(cities)],
+                'latitude': 11.0 + (i % 100) / 50,
+                'longitude': 103.0 + (i % 70) / 50
+            }
+        }
+        for i in range(count)
+    ]
+
+
+def make_vectors(count, dim=16, clusters=50, seed=0):
+    """Generate clustered unit vectors."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, count)] + 0.5 * rng.normal(size=(count, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
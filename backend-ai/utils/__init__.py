@@ -3,9 +3,15 @@
 from .data_processor import DataProcessor
 from .feature_extractor import FeatureExtractor
 from .logger import setup_logger
+from .ranking_cache import RankingCache
+from .catalog import ItemCatalog
+from .bundle_optimizer import BundleOptimizer
 
 __all__ = [
     "DataProcessor",
     "FeatureExtractor",
     "setup_logger",
+    "RankingCache",
+    "ItemCatalog",
+    "BundleOptimizer",
 ]
@@ -0,0 +1,177 @@
+"""In-process approximate nearest neighbor search (IVF with k-means)."""
+
+from typing import Optional, Tuple
+import logging
+
+import numpy as np
+
+from utils.quantization import QuantizedMatrix
+
+logger = logging.getLogger(__name__)
+
+
+class IVFIndex:
+    """
+    Inverted-file index for maximum inner product search.
+
+    Vectors are clustered with spherical k-means; each vector is stored in
+    the list of its closest centroid, lists laid out back to back. A query
+    scans only the lists of its nprobe closest centroids, so its cost grows
+    with about nprobe * n / num_lists instead of n.
+
+    Stored vectors can be kept as float16 or per-row int8 to shrink the
+    index; they are dequantized as lists are scanned.
+    """
+
+    # Rows per block when assigning vectors to centroids
+    ASSIGN_BLOCK = 65536
+
+    def __init__(
+        self,
+        num_lists: int = 0,
+        nprobe: int = 8,
+        iterations: int = 10,
+        seed: int = 0,
+        dtype: str = "float32"
+    ):
+        """
+        Initialize the index.
+
+        Args:
+            num_lists: Number of clusters; 0 picks about sqrt(n)
+            nprobe: Lists scanned per query
+            iterations: k-means iterations
+            seed: Random seed for k-means initialization
+            dtype: Storage type of the vectors ("float32", "float16" or "int8")
+        """
+        self.num_lists = num_lists
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self.dtype = dtype
+
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self._vectors = QuantizedMatrix(np.zeros((0, 0), dtype=np.float32), dtype)
+        self._positions = np.zeros(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the stored vectors, centroids and list layout."""
+        return self._vectors.nbytes + self.centroids.nbytes + self._positions.nbytes + self._offsets.nbytes
+
+    def build(self, vectors: np.ndarray) -> "IVFIndex":
+        """
+        Cluster and store vectors.
+
+        Args:
+            vectors: Matrix of shape (n, dim); search results refer to its rows
+
+        Returns:
+            The index itself
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        num_lists = self.num_lists or int(np.sqrt(len(vectors)))
+        num_lists = max(1, min(num_lists, len(vectors)))
+
+        self.centroids = self._kmeans(vectors, num_lists)
+        assignment = self._assign(vectors)
+
+        # Store each list contiguously so a probe is one slice
+        self._positions = np.argsort(assignment, kind="stable")
+        self._vectors = QuantizedMatrix(vectors[self._positions], self.dtype)
+        self._offsets = np.zeros(num_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=num_lists), out=self._offsets[1:])
+
+        logger.info(f"Built IVF index: {len(vectors)} vectors in {num_lists} lists")
+        return self
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k stored vectors with the largest inner product with a query.
+
+        Lists are probed from the closest centroid outwards: at least
+        nprobe lists, and more while fewer than k vectors pass the mask.
+
+        Args:
+            query: Query vector of shape (dim,)
+            k: Number of results
+            mask: Optional boolean array over the stored rows; rows where it
+                is False are never returned
+
+        Returns:
+            Tuple of (rows, scores), best first
+        """
+        if len(self) == 0 or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        query = np.asarray(query, dtype=np.float32)
+        list_order = np.argsort(-(self.centroids @ query), kind="stable")
+        sizes = np.diff(self._offsets)
+
+        probed = []
+        found = 0
+        for count, list_id in enumerate(list_order):
+            if count >= self.nprobe and found >= k:
+                break
+            start, end = self._offsets[list_id], self._offsets[list_id + 1]
+            if start == end:
+                continue
+            probed.append(np.arange(start, end))
+            found += sizes[list_id] if mask is None else int(mask[self._positions[start:end]].sum())
+
+        slots = np.concatenate(probed)
+        if mask is not None:
+            slots = slots[mask[self._positions[slots]]]
+
+        scores = self._vectors.dot(slots, query)
+        if len(slots) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+            slots, scores = slots[best], scores[best]
+
+        order = np.argsort(-scores, kind="stable")
+        return self._positions[slots[order]], scores[order]
+
+    def _kmeans(self, vectors: np.ndarray, num_lists: int) -> np.ndarray:
+        """Spherical k-means on a sample of the vectors."""
+        rng = np.random.default_rng(self.seed)
+
+        # A few hundred points per centroid are enough to place it
+        sample_size = min(len(vectors), 256 * num_lists)
+        sample = vectors[rng.choice(len(vectors), size=sample_size, replace=False)]
+        sample = self._normalize(sample)
+
+        centroids = sample[rng.choice(len(sample), size=num_lists, replace=False)].copy()
+        for _ in range(self.iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+
+            # Reseed empty clusters with random points
+            empty = np.flatnonzero(np.bincount(assignment, minlength=num_lists) == 0)
+            sums[empty] = sample[rng.choice(len(sample), size=len(empty))]
+            centroids = self._normalize(sums)
+
+        return centroids
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Get the closest centroid of each vector, in blocks to bound memory."""
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), self.ASSIGN_BLOCK):
+            block = vectors[start:start + self.ASSIGN_BLOCK]
+            assignment[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignment
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        """Scale rows to unit length, leaving zero rows as they are."""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
@@ -0,0 +1,143 @@
+"""Budget-constrained hotel + add-on bundle optimizer."""
+
+from typing import List, Dict, Any
+import numpy as np
+
+
+class BundleOptimizer:
+    """
+    Pick one hotel plus up to K add-ons (tours, events) maximizing the total
+    score under a budget.
+
+    This is a multi-choice knapsack: the hotel group must contribute exactly
+    one item, the add-on group at most K. Add-ons are solved once with a DP
+    over a discretized budget and an add-on count; every hotel then reads its
+    best add-on set from the DP at its leftover budget.
+    """
+
+    def __init__(self, budget_buckets: int = 1000):
+        """
+        Initialize the optimizer.
+
+        Args:
+            budget_buckets: Number of steps the budget is split into. Add-on
+                costs are rounded up to a step, so bundles never exceed the
+                budget but combinations within one step of it may be missed.
+        """
+        self.budget_buckets = budget_buckets
+
+    def optimize(
+        self,
+        hotel_costs: np.ndarray,
+        hotel_scores: np.ndarray,
+        addon_costs: np.ndarray,
+        addon_scores: np.ndarray,
+        budget: float,
+        max_addons: int,
+        max_bundles: int = 1
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the best bundles, one per hotel.
+
+        Args:
+            hotel_costs: Total cost of each hotel for the stay
+            hotel_scores: Score of each hotel
+            addon_costs: Cost of each add-on
+            addon_scores: Score of each add-on; non-positive add-ons are never picked
+            budget: Maximum total cost of a bundle
+            max_addons: Maximum number of add-ons per bundle
+            max_bundles: Number of bundles to return
+
+        Returns:
+            Bundles sorted by total score, each a dictionary with hotel_index,
+            addon_indices, cost and score
+        """
+        hotel_costs = np.asarray(hotel_costs, dtype=np.float64)
+        hotel_scores = np.asarray(hotel_scores, dtype=np.float64)
+        addon_costs = np.asarray(addon_costs, dtype=np.float64)
+        addon_scores = np.asarray(addon_scores, dtype=np.float64)
+
+        affordable = np.flatnonzero(hotel_costs <= budget)
+        if budget <= 0 or len(affordable) == 0:
+            return []
+
+        buckets = self.budget_buckets
+        unit = budget / buckets
+        max_addons = max(0, max_addons)
+
+        # Round add-on costs up so a DP solution never exceeds the real budget
+        addon_steps = np.ceil(addon_costs / unit - 1e-9).astype(np.int64)
+        candidates = np.flatnonzero((addon_scores > 0) & (addon_steps <= buckets))
+
+        best, taken = self._solve_addons(addon_steps[candidates], addon_scores[candidates], max_addons)
+
+        # Best add-on score for each hotel's leftover budget
+        leftover_steps = np.floor((budget - hotel_costs[affordable]) / unit + 1e-9).astype(np.int64)
+        leftover_steps = np.clip(leftover_steps, 0, buckets)
+        totals = hotel_scores[affordable] + best[max_addons, leftover_steps]
+
+        order = np.argsort(-totals, kind='stable')[:max_bundles]
+
+        bundles = []
+        for position in order:
+            hotel_index = int(affordable[position])
+            picked = self._backtrack(taken, addon_steps[candidates], max_addons, int(leftover_steps[position]))
+            addon_indices = [int(candidates[i]) for i in picked]
+
+            bundles.append({
+                'hotel_index': hotel_index,
+                'addon_indices': addon_indices,
+                'cost': float(hotel_costs[hotel_index] + addon_costs[addon_indices].sum()),
+                'score': float(totals[position])
+            })
+
+        return bundles
+
+    def _solve_addons(
+        self,
+        steps: np.ndarray,
+        scores: np.ndarray,
+        max_addons: int
+    ):
+        """
+        Run the add-on knapsack DP.
+
+        best[k, b] is the best score using at most k add-ons within b budget
+        steps; taken[i, k, b] records whether add-on i is in that solution.
+
+        Returns:
+            Tuple of (best, taken) arrays
+        """
+        width = self.budget_buckets + 1
+        best = np.zeros((max_addons + 1, width))
+        taken = np.zeros((len(steps), max_addons + 1, width), dtype=bool)
+
+        for i, (step, score) in enumerate(zip(steps, scores)):
+            # Descending k reads the previous item's row for k - 1
+            for k in range(max_addons, 0, -1):
+                candidate = best[k - 1, :width - step] + score
+                improved = candidate > best[k, step:]
+                best[k, step:] = np.where(improved, candidate, best[k, step:])
+                taken[i, k, step:] = improved
+
+        return best, taken
+
+    @staticmethod
+    def _backtrack(
+        taken: np.ndarray,
+        steps: np.ndarray,
+        max_addons: int,
+        budget_steps: int
+    ) -> List[int]:
+        """Recover the add-ons chosen for a budget from the DP decisions."""
+        picked = []
+        k, b = max_addons, budget_steps
+        for i in range(len(steps) - 1, -1, -1):
+            if k == 0:
+                break
+            if taken[i, k, b]:
+                picked.append(i)
+                k -= 1
+                b -= steps[i]
+        picked.reverse()
+        return picked
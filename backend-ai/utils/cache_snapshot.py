@@ -0,0 +1,106 @@
+"""On-disk snapshots of numpy arrays, memory-mapped on load."""
+
+from typing import Dict, Any, Optional, Tuple
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CacheSnapshot:
+    """
+    Store named numpy arrays as .npy files in a snapshot directory.
+
+    Each save writes a new snapshot-<timestamp> directory and then points
+    the CURRENT file at it with an atomic rename, so readers never see a
+    half-written snapshot. Loads memory-map the arrays read-only, so
+    startup cost does not grow with snapshot size.
+    """
+
+    CURRENT = "CURRENT"
+    MANIFEST = "manifest.json"
+
+    def __init__(self, directory: str, keep: int = 2):
+        """
+        Initialize the snapshot store.
+
+        Args:
+            directory: Directory holding the snapshots
+            keep: Number of snapshots kept on disk
+        """
+        self.directory = directory
+        self.keep = keep
+
+    def save(self, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]) -> str:
+        """
+        Write a snapshot.
+
+        Args:
+            arrays: Arrays to store, by name
+            metadata: JSON-serializable values stored with the arrays
+
+        Returns:
+            Path of the snapshot directory
+        """
+        os.makedirs(self.directory, exist_ok=True)
+
+        name = f"snapshot-{time.time_ns()}"
+        path = os.path.join(self.directory, name)
+        os.makedirs(path)
+
+        for array_name, array in arrays.items():
+            np.save(os.path.join(path, f"{array_name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+
+        with open(os.path.join(path, self.MANIFEST), "w") as f:
+            json.dump({"arrays": sorted(arrays), "metadata": metadata, "created_at": time.time()}, f)
+
+        # Switch readers to the new snapshot atomically; each writer uses
+        # its own temporary file so concurrent saves cannot interleave
+        fd, current_tmp = tempfile.mkstemp(prefix=f"{self.CURRENT}.", suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(name)
+            os.replace(current_tmp, os.path.join(self.directory, self.CURRENT))
+        except BaseException:
+            os.unlink(current_tmp)
+            raise
+
+        self._remove_old(name)
+        return path
+
+    def load(self) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+        """
+        Memory-map the current snapshot.
+
+        Returns:
+            Tuple of (arrays, metadata), or None if there is no snapshot
+        """
+        try:
+            with open(os.path.join(self.directory, self.CURRENT)) as f:
+                path = os.path.join(self.directory, f.read().strip())
+
+            with open(os.path.join(path, self.MANIFEST)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        arrays = {
+            array_name: np.load(os.path.join(path, f"{array_name}.npy"), mmap_mode="r", allow_pickle=False)
+            for array_name in manifest["arrays"]
+        }
+        return arrays, manifest["metadata"]
+
+    def _remove_old(self, current: str) -> None:
+        """Delete all but the newest snapshots."""
+        snapshots = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith("snapshot-") and name != current
+        )
+        for name in snapshots[:max(0, len(snapshots) - (self.keep - 1))]:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
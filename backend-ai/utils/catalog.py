@@ -0,0 +1,455 @@
+"""Columnar, array-backed catalog of hotels and tours."""
+
+from typing import List, Dict, Any, Optional, Iterable
+import numpy as np
+
+
+class StringTable:
+    """Intern strings to small integer ids."""
+
+    __slots__ = ("ids", "values")
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def intern(self, value: str) -> int:
+        """Get the id of a string, adding it if needed."""
+        key = self.ids.get(value)
+        if key is None:
+            key = len(self.values)
+            self.ids[value] = key
+            self.values.append(value)
+        return key
+
+    def lookup(self, value: str) -> int:
+        """Get the id of a string, or -1 if it was never interned."""
+        return self.ids.get(value, -1)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class ItemCatalog:
+    """
+    Array-backed catalog of hotels and tours.
+
+    Each item is one row across typed numpy columns: float32 prices and
+    ratings, interned city/province ids, and bitmasks for amenities and
+    tour categories, as many uint64 words per row as the vocabulary needs
+    (a word is added at the 65th, 129th... tag). Scoring code works on row
+    indices; item dicts are only rebuilt with to_dict() at the response
+    boundary.
+    """
+
+    ITEM_TYPES = ("hotel", "tour")
+
+    # Price field names, indexed by the price_key column
+    PRICE_KEYS = ("price_per_night", "price_per_person")
+
+    # Bitmask columns and the vocabulary each one indexes
+    TAG_COLUMNS = {"amenity_mask": "amenities", "category_mask": "categories"}
+    WORD_BITS = 64
+
+    # Bits of the "present" column, marking optional fields
+    HAS_RATING = 1
+    HAS_AMENITIES = 2
+    HAS_CATEGORY = 4
+    HAS_DURATION = 8
+    HAS_DIFFICULTY = 16
+    HAS_LOCATION = 32
+    HAS_PRICE = 64
+
+    COLUMNS = {
+        "item_type": (np.uint8, 0),
+        "price": (np.float32, 0.0),
+        "price_usd": (np.float32, 0.0),
+        "price_key": (np.uint8, 0),
+        "currency": (np.uint8, 0),
+        "rating": (np.float32, np.nan),
+        "amenity_mask": (np.uint64, 0),
+        "category_mask": (np.uint64, 0),
+        "city_id": (np.int32, -1),
+        "province_id": (np.int32, -1),
+        "city_key": (np.int32, -1),
+        "province_key": (np.int32, -1),
+        "latitude": (np.float64, np.nan),
+        "longitude": (np.float64, np.nan),
+        "duration_days": (np.int16, -1),
+        "duration_nights": (np.int16, -1),
+        "difficulty": (np.int8, -1),
+        "present": (np.uint8, 0),
+        "row_revision": (np.uint64, 0),
+    }
+
+    _KNOWN_KEYS = {
+        "id", "name", "type", "price_per_night", "price_per_person", "currency",
+        "average_rating", "amenities", "category", "duration", "difficulty", "location"
+    }
+    _LOCATION_KEYS = {"city", "province", "latitude", "longitude"}
+    _DURATION_KEYS = {"days", "nights"}
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Initialize an empty catalog.
+
+        Args:
+            capacity: Initial number of rows to allocate
+        """
+        self._size = 0
+        self._columns = {
+            name: np.full((capacity, 1) if name in self.TAG_COLUMNS else capacity, fill, dtype=dtype)
+            for name, (dtype, fill) in self.COLUMNS.items()
+        }
+
+        self.ids = []
+        self.names = []
+        self._row_by_id = {}
+
+        # Interned vocabularies
+        self.currencies = StringTable()
+        self.amenities = StringTable()
+        self.categories = StringTable()
+        self.places = StringTable()
+        self.difficulties = StringTable()
+
+        # Lower-cased location names, for case-insensitive matching
+        self.location_keys = StringTable()
+
+        # Rarely used fields that have no column, keyed by row
+        self.extras = {}
+
+        # Bumped on every row write; the row_revision column keeps each
+        # row's last value, so derived tables can find changed rows
+        self.revision = 0
+
+    @classmethod
+    def from_items(cls, items: List[Dict[str, Any]]) -> "ItemCatalog":
+        """
+        Build a catalog from item dictionaries.
+
+        Row i always holds items[i], even when ids repeat or are missing.
+        """
+        catalog = cls(capacity=max(len(items), 1))
+        catalog.add_items(items, replace=False)
+        return catalog
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        columns = self.__dict__.get("_columns")
+        if columns is not None and name in columns:
+            return columns[name][:self._size]
+        raise AttributeError(name)
+
+    def add_items(self, items: Iterable[Dict[str, Any]], replace: bool = True) -> np.ndarray:
+        """
+        Add items to the catalog.
+
+        Args:
+            items: Item dictionaries
+            replace: Overwrite the row of an existing id instead of appending
+
+        Returns:
+            Row index of each item
+        """
+        rows = []
+        for item in items:
+            item_id = item.get("id")
+            row = self._row_by_id.get(item_id) if replace else None
+            if row is None:
+                row = self._append_row(item_id, item.get("name"))
+            else:
+                self._reset_row(row)
+                self.names[row] = item.get("name")
+            self._write_row(row, item)
+            rows.append(row)
+        return np.asarray(rows, dtype=np.int64)
+
+    def row_of(self, item_id: str) -> Optional[int]:
+        """Get the row of an item id, or None if unknown."""
+        return self._row_by_id.get(item_id)
+
+    def rows_of(self, item_ids: Iterable[str]) -> np.ndarray:
+        """Get the rows of known item ids, skipping unknown ids."""
+        rows = [self._row_by_id.get(item_id) for item_id in item_ids]
+        return np.asarray([row for row in rows if row is not None], dtype=np.int64)
+
+    def rows_of_type(self, item_type: str) -> np.ndarray:
+        """Get all rows of an item type."""
+        return np.flatnonzero(self.item_type == self.type_code(item_type))
+
+    def type_code(self, item_type: str) -> int:
+        """Get the item_type column code for a type name."""
+        return self.ITEM_TYPES.index(item_type)
+
+    def tag_mask(self, kind: str, names: Iterable[str]) -> np.ndarray:
+        """
+        Build a bitmask for amenity or category names.
+
+        Args:
+            kind: "amenities" or "categories"
+            names: Tag names; names never seen in the catalog are ignored
+
+        Returns:
+            uint64 words of the bitmask, as wide as a row of the kind's column
+        """
+        table = getattr(self, kind)
+        mask = 0
+        for name in names:
+            bit = table.lookup(name)
+            if bit >= 0:
+                mask |= 1 << bit
+        return self._mask_to_words(mask, self._columns[self._tag_column(kind)].shape[1])
+
+    def tag_flags(self, kind: str, rows: np.ndarray, names: List[str]) -> np.ndarray:
+        """
+        Get a 0/1 matrix telling which rows have each tag.
+
+        Args:
+            kind: "amenities" or "categories"
+            rows: Row indices
+            names: Tag names, one output column each
+
+        Returns:
+            Float32 matrix of shape (len(rows), len(names))
+        """
+        masks = getattr(self, self._tag_column(kind))[rows]
+        table = getattr(self, kind)
+
+        flags = np.zeros((len(rows), len(names)), dtype=np.float32)
+        for idx, name in enumerate(names):
+            bit = table.lookup(name)
+            if bit >= 0:
+                word, offset = divmod(bit, self.WORD_BITS)
+                flags[:, idx] = (masks[:, word] >> np.uint64(offset)) & np.uint64(1)
+        return flags
+
+    @staticmethod
+    def popcount(masks: np.ndarray) -> np.ndarray:
+        """Count set bits in each mask, given as one uint64 or a row of uint64 words."""
+        masks = np.ascontiguousarray(masks, dtype=np.uint64)
+        if masks.ndim == 1:
+            masks = masks[:, None]
+        return np.unpackbits(masks.view(np.uint8), axis=1).sum(axis=1)
+
+    def location_key(self, name: str) -> int:
+        """Get the id of a lower-cased city/province name, or -1 if unknown."""
+        return self.location_keys.lookup((name or "").lower())
+
+    def item_id(self, row: int) -> str:
+        """Get the item id stored in a row."""
+        return self.ids[row]
+
+    def item_type_name(self, row: int) -> str:
+        """Get the item type name stored in a row."""
+        return self.ITEM_TYPES[self._columns["item_type"][row]]
+
+    def to_dict(self, row: int) -> Dict[str, Any]:
+        """
+        Rebuild the item dictionary stored in a row.
+
+        Args:
+            row: Row index
+
+        Returns:
+            Item dictionary in the shape the API returns
+        """
+        columns = self._columns
+        present = int(columns["present"][row])
+        item_type = self.ITEM_TYPES[columns["item_type"][row]]
+
+        item = {"id": self.ids[row], "name": self.names[row], "type": item_type}
+
+        if present & self.HAS_PRICE:
+            price_key = self.PRICE_KEYS[columns["price_key"][row]]
+            item[price_key] = round(float(columns["price"][row]), 2)
+        item["currency"] = self.currencies.values[columns["currency"][row]]
+
+        if present & self.HAS_RATING:
+            item["average_rating"] = round(float(columns["rating"][row]), 2)
+        if present & self.HAS_AMENITIES:
+            item["amenities"] = self._mask_to_tags(self.amenities, columns["amenity_mask"][row])
+        if present & self.HAS_DURATION:
+            duration = {}
+            if columns["duration_days"][row] >= 0:
+                duration["days"] = int(columns["duration_days"][row])
+            if columns["duration_nights"][row] >= 0:
+                duration["nights"] = int(columns["duration_nights"][row])
+            item["duration"] = duration
+        if present & self.HAS_DIFFICULTY:
+            item["difficulty"] = self.difficulties.values[columns["difficulty"][row]]
+        if present & self.HAS_CATEGORY:
+            item["category"] = self._mask_to_tags(self.categories, columns["category_mask"][row])
+        if present & self.HAS_LOCATION:
+            location = {}
+            if columns["city_id"][row] >= 0:
+                location["city"] = self.places.values[columns["city_id"][row]]
+            if columns["province_id"][row] >= 0:
+                location["province"] = self.places.values[columns["province_id"][row]]
+            if not np.isnan(columns["latitude"][row]):
+                location["latitude"] = round(float(columns["latitude"][row]), 6)
+            if not np.isnan(columns["longitude"][row]):
+                location["longitude"] = round(float(columns["longitude"][row]), 6)
+            item["location"] = location
+
+        extras = self.extras.get(row)
+        if extras:
+            item.update(extras)
+
+        return item
+
+    def to_dicts(self, rows: Iterable[int]) -> List[Dict[str, Any]]:
+        """Rebuild the item dictionaries stored in several rows."""
+        return [self.to_dict(int(row)) for row in rows]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate bytes held by the numeric columns."""
+        return sum(column[:self._size].nbytes for column in self._columns.values())
+
+    # Internal helpers
+
+    def _append_row(self, item_id: str, name: Optional[str]) -> int:
+        """Allocate a new row, growing the columns if needed."""
+        row = self._size
+        capacity = len(self._columns["item_type"])
+        if row >= capacity:
+            new_capacity = max(capacity * 2, 16)
+            for column_name, (dtype, fill) in self.COLUMNS.items():
+                column = self._columns[column_name]
+                grown = np.full((new_capacity,) + column.shape[1:], fill, dtype=dtype)
+                grown[:capacity] = column
+                self._columns[column_name] = grown
+
+        self._size += 1
+        self.ids.append(item_id)
+        self.names.append(name)
+        self._row_by_id[item_id] = row
+        return row
+
+    def _reset_row(self, row: int) -> None:
+        """Restore a row's columns to their empty values."""
+        for column_name, (_, fill) in self.COLUMNS.items():
+            self._columns[column_name][row] = fill
+        self.extras.pop(row, None)
+
+    def _write_row(self, row: int, item: Dict[str, Any]) -> None:
+        """Store an item dictionary in a row."""
+        columns = self._columns
+        present = 0
+
+        self.revision += 1
+        columns["row_revision"][row] = self.revision
+
+        item_type = item.get("type", "hotel")
+        columns["item_type"][row] = self.type_code(item_type if item_type in self.ITEM_TYPES else "hotel")
+
+        for key_index, price_key in enumerate(self.PRICE_KEYS):
+            if price_key in item:
+                columns["price"][row] = item[price_key]
+                columns["price_key"][row] = key_index
+                present |= self.HAS_PRICE
+                break
+
+        currency = item.get("currency", "USD")
+        columns["currency"][row] = self.currencies.intern(currency)
+
+        # Keep the same USD conversion as DataProcessor.normalize_price
+        price = float(columns["price"][row])
+        columns["price_usd"][row] = price / 4000 if currency == "KHR" else price
+
+        if "average_rating" in item:
+            columns["rating"][row] = item["average_rating"]
+            present |= self.HAS_RATING
+
+        if "amenities" in item:
+            self._write_mask("amenity_mask", row, item["amenities"])
+            present |= self.HAS_AMENITIES
+
+        if "category" in item:
+            self._write_mask("category_mask", row, item["category"])
+            present |= self.HAS_CATEGORY
+
+        if "difficulty" in item:
+            columns["difficulty"][row] = self.difficulties.intern(item["difficulty"])
+            present |= self.HAS_DIFFICULTY
+
+        extras = {key: value for key, value in item.items() if key not in self._KNOWN_KEYS}
+
+        duration = item.get("duration")
+        if isinstance(duration, dict):
+            present |= self.HAS_DURATION
+            if "days" in duration:
+                columns["duration_days"][row] = duration["days"]
+            if "nights" in duration:
+                columns["duration_nights"][row] = duration["nights"]
+            if set(duration) - self._DURATION_KEYS:
+                extras["duration"] = duration
+        elif "duration" in item:
+            extras["duration"] = duration
+
+        location = item.get("location")
+        if isinstance(location, dict):
+            present |= self.HAS_LOCATION
+            city = location.get("city")
+            province = location.get("province")
+            if city is not None:
+                columns["city_id"][row] = self.places.intern(city)
+            if province is not None:
+                columns["province_id"][row] = self.places.intern(province)
+
+            # Missing names match as "" like the dict-based event matching
+            columns["city_key"][row] = self.location_keys.intern((city or "").lower())
+            columns["province_key"][row] = self.location_keys.intern((province or "").lower())
+
+            if location.get("latitude") is not None:
+                columns["latitude"][row] = location["latitude"]
+            if location.get("longitude") is not None:
+                columns["longitude"][row] = location["longitude"]
+            if set(location) - self._LOCATION_KEYS:
+                extras["location"] = location
+        else:
+            columns["city_key"][row] = self.location_keys.intern("")
+            columns["province_key"][row] = self.location_keys.intern("")
+            if "location" in item:
+                extras["location"] = location
+
+        columns["present"][row] = present
+        if extras:
+            self.extras[row] = extras
+
+    def _tag_column(self, kind: str) -> str:
+        """Get the bitmask column of "amenities" or "categories"."""
+        return "amenity_mask" if kind == "amenities" else "category_mask"
+
+    def _write_mask(self, column_name: str, row: int, tags: Iterable[str]) -> None:
+        """Intern tags and store their bitmask in a row, widening the column if needed."""
+        table = getattr(self, self.TAG_COLUMNS[column_name])
+        mask = 0
+        for tag in tags:
+            mask |= 1 << table.intern(tag)
+
+        column = self._columns[column_name]
+        words = -(-len(table) // self.WORD_BITS)
+        if words > column.shape[1]:
+            widened = np.zeros((len(column), words), dtype=column.dtype)
+            widened[:, :column.shape[1]] = column
+            self._columns[column_name] = column = widened
+
+        column[row] = self._mask_to_words(mask, column.shape[1])
+
+    @classmethod
+    def _mask_to_words(cls, mask: int, words: int) -> np.ndarray:
+        """Split an integer bitmask into uint64 words, lowest bits first."""
+        word_mask = (1 << cls.WORD_BITS) - 1
+        return np.array([(mask >> (cls.WORD_BITS * word)) & word_mask for word in range(words)], dtype=np.uint64)
+
+    @classmethod
+    def _mask_to_tags(cls, table: StringTable, words: np.ndarray) -> List[str]:
+        """Expand a bitmask row back into tag names."""
+        mask = 0
+        for word, value in enumerate(words):
+            mask |= int(value) << (cls.WORD_BITS * word)
+        return [value for bit, value in enumerate(table.values) if mask >> bit & 1]
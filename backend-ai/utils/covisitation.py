@@ -0,0 +1,202 @@
+"""Item co-visitation ("booked together") counts as a pruned CSR matrix."""
+
+from typing import List, Dict, Iterable, Tuple, Optional
+import itertools
+import logging
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+
+class CoVisitationMatrix:
+    """
+    Item x item counts of how often two items were booked in the same
+    session or trip, keeping only the top-N neighbors of each item.
+
+    Rows are stored as CSR sorted by count, so the neighbors of an item are
+    the slice indptr[row]:indptr[row + 1] and lookups cost O(N).
+    """
+
+    def __init__(self, item_ids: List[str], counts: sparse.csr_matrix):
+        """
+        Initialize the matrix.
+
+        Args:
+            item_ids: Item id of each row and column
+            counts: Pruned CSR matrix with each row sorted by descending count
+        """
+        self.item_ids = item_ids
+        self.item_index = {item_id: idx for idx, item_id in enumerate(item_ids)}
+        self.counts = counts
+
+    @classmethod
+    def build(
+        cls,
+        sessions: Iterable[List[str]],
+        top_n: int = 20,
+        chunk_size: int = 10000,
+        max_session_items: int = 50,
+        max_pairs: int = 5000000
+    ) -> "CoVisitationMatrix":
+        """
+        Count co-booked item pairs over a stream of sessions.
+
+        Sessions are consumed chunk by chunk; each chunk's pairs are summed
+        into the running matrix, so at most one chunk of pairs is held at a
+        time. If the running matrix grows past max_pairs entries, its rows
+        are cut to their strongest 4 * top_n candidates.
+
+        Args:
+            sessions: Item ids booked together, one list per session or trip
+            top_n: Neighbors kept per item
+            chunk_size: Sessions per chunk
+            max_session_items: Longer sessions are truncated, bounding the
+                pairs one session can add
+            max_pairs: Entries the running matrix may hold before pruning
+
+        Returns:
+            The pruned co-visitation matrix
+        """
+        item_index = {}
+        counts = sparse.csr_matrix((0, 0), dtype=np.float32)
+        num_sessions = 0
+
+        iterator = iter(sessions)
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_size))
+            if not chunk:
+                break
+            num_sessions += len(chunk)
+
+            # Item indices of the chunk's sessions, back to back
+            flat, lengths = [], []
+            for session in chunk:
+                # Count each pair once per session
+                items = list(dict.fromkeys(session))[:max_session_items]
+                if len(items) < 2:
+                    continue
+                flat.extend(item_index.setdefault(item_id, len(item_index)) for item_id in items)
+                lengths.append(len(items))
+
+            size = len(item_index)
+            counts.resize((size, size))
+            if lengths:
+                rows, cols = cls._session_pairs(np.array(flat, dtype=np.int32), np.array(lengths))
+                chunk_counts = sparse.csr_matrix(
+                    (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                    shape=(size, size)
+                )
+                counts = (counts + chunk_counts).tocsr()
+
+            if counts.nnz > max_pairs:
+                counts = cls._top_per_row(counts, 4 * top_n)
+
+        counts = cls._top_per_row(counts, top_n)
+        logger.info(
+            f"Built co-visitation matrix from {num_sessions} sessions: "
+            f"{len(item_index)} items, {counts.nnz} pairs"
+        )
+        return cls(list(item_index), counts)
+
+    @staticmethod
+    def _session_pairs(flat: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get all ordered pairs of distinct positions within each session.
+
+        Args:
+            flat: Item indices of all sessions, back to back
+            lengths: Number of items in each session
+
+        Returns:
+            Tuple of (first item, second item) index arrays
+        """
+        starts = np.cumsum(lengths) - lengths
+
+        # Each position pairs with every position of its session
+        block_lengths = np.repeat(lengths, lengths)
+        block_starts = np.cumsum(block_lengths) - block_lengths
+        first = np.repeat(np.arange(len(flat)), block_lengths)
+        second = (
+            np.repeat(np.repeat(starts, lengths), block_lengths)
+            + np.arange(len(first)) - np.repeat(block_starts, block_lengths)
+        )
+
+        distinct = first != second
+        return flat[first[distinct]], flat[second[distinct]]
+
+    @staticmethod
+    def _top_per_row(counts: sparse.csr_matrix, top_n: int) -> sparse.csr_matrix:
+        """Keep the top_n largest entries of each row, sorted by descending count."""
+        counts.sum_duplicates()
+        row_of = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+
+        # Sort by row, then count descending, then column for stable ties
+        order = np.lexsort((counts.indices, -counts.data, row_of))
+        rank = np.arange(len(order)) - counts.indptr[row_of[order]]
+        keep = order[rank < top_n]
+
+        indptr = np.zeros(counts.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_of[keep], minlength=counts.shape[0]), out=indptr[1:])
+
+        # The (data, indices, indptr) form keeps the per-row count order
+        return sparse.csr_matrix(
+            (counts.data[keep], counts.indices[keep], indptr),
+            shape=counts.shape
+        )
+
+    def __len__(self) -> int:
+        """Number of items with co-visitation data."""
+        return len(self.item_ids)
+
+    def neighbors(self, item_id: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Get the items most often booked together with an item.
+
+        Args:
+            item_id: Item identifier
+            limit: Maximum number of neighbors (defaults to all kept)
+
+        Returns:
+            List of (item_id, count) tuples by descending count
+        """
+        row = self.item_index.get(item_id)
+        if row is None:
+            return []
+
+        start, end = self.counts.indptr[row], self.counts.indptr[row + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        return [
+            (self.item_ids[column], float(count))
+            for column, count in zip(self.counts.indices[start:end], self.counts.data[start:end])
+        ]
+
+    def scores(self, history: Dict[str, float], item_ids: List[str]) -> np.ndarray:
+        """
+        Score items by co-visitation with a user's history.
+
+        Sums the neighbor rows of the history items, weighted by the
+        user's rating or interaction strength for each.
+
+        Args:
+            history: User's items as {item_id: weight}
+            item_ids: Items to score
+
+        Returns:
+            Float32 array of summed counts per item, 0 without co-visits
+        """
+        if not self.item_ids:
+            return np.zeros(len(item_ids), dtype=np.float32)
+
+        totals = np.zeros(len(self.item_ids), dtype=np.float32)
+        for item_id, weight in history.items():
+            row = self.item_index.get(item_id)
+            if row is None:
+                continue
+            start, end = self.counts.indptr[row], self.counts.indptr[row + 1]
+            totals[self.counts.indices[start:end]] += weight * self.counts.data[start:end]
+
+        columns = np.array([self.item_index.get(item_id, -1) for item_id in item_ids], dtype=np.int64)
+        return np.where(columns >= 0, totals[columns], 0.0).astype(np.float32)
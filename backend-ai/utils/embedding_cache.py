@@ -0,0 +1,232 @@
+"""Content-addressed cache of text embeddings, in memory and on disk."""
+
+from typing import Any, Dict, List
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import unicodedata
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by a hash of the model name and the normalized text.
+
+    Lookups go to an in-memory LRU tier first, then to an optional SQLite
+    file. The file runs in WAL mode, so several worker processes can share
+    it: an embedding computed by one worker is a disk hit for the others.
+    Texts are normalized (Unicode NFC, whitespace collapsed) before
+    hashing, so trivially different spellings of the same text share an
+    entry.
+    """
+
+    # Keys per SELECT, below SQLite's bound-parameter limit
+    LOOKUP_CHUNK = 500
+
+    def __init__(self, model_name: str, max_entries: int = 50000, path: str = ""):
+        """
+        Initialize the cache.
+
+        Args:
+            model_name: Name of the model producing the embeddings; part of every key
+            max_entries: Embeddings kept in memory (0 disables the memory tier)
+            path: SQLite file for the disk tier (empty disables it)
+        """
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "encode_calls": 0}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize text before hashing."""
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def key(self, text: str) -> bytes:
+        """Get the cache key of a text for this model."""
+        content = f"{self.model_name}\0{self.normalize(text)}".encode("utf-8")
+        return hashlib.blake2b(content, digest_size=16).digest()
+
+    def encode(self, model: Any, texts: List[str], **encode_kwargs) -> np.ndarray:
+        """
+        Get the embeddings of texts, encoding only the ones not cached.
+
+        Missing texts are de-duplicated and encoded in one model.encode
+        call, then stored in both tiers.
+
+        Args:
+            model: Object with a sentence-transformers style encode(texts, **kwargs)
+            texts: Texts to embed
+            **encode_kwargs: Passed to model.encode
+
+        Returns:
+            float32 array of shape (len(texts), dim), in input order
+        """
+        keys = [self.key(text) for text in texts]
+        found = self.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        if missing:
+            encode_kwargs.setdefault("convert_to_numpy", True)
+            embeddings = np.asarray(model.encode(list(missing.values()), **encode_kwargs), dtype=np.float32)
+            computed = dict(zip(missing, embeddings))
+            self.put_many(computed)
+            found.update(computed)
+            with self._lock:
+                self._counts["encode_calls"] += 1
+
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """
+        Look up embeddings by key.
+
+        Every key counts once towards the hit-ratio metrics. Disk hits are
+        promoted to the memory tier.
+
+        Returns:
+            Dictionary of key to embedding, for the keys found
+        """
+        found = {}
+        with self._lock:
+            for key in keys:
+                embedding = self._entries.get(key)
+                if embedding is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = embedding
+            memory_hits = sum(1 for key in keys if key in found)
+
+        disk = self._read_disk([key for key in dict.fromkeys(keys) if key not in found])
+        if disk:
+            self._remember(disk)
+            found.update(disk)
+
+        with self._lock:
+            self._counts["memory_hits"] += memory_hits
+            self._counts["disk_hits"] += sum(1 for key in keys if key in disk)
+            self._counts["misses"] += sum(1 for key in keys if key not in found)
+
+        return found
+
+    def put_many(self, embeddings: Dict[bytes, np.ndarray]) -> None:
+        """Store embeddings by key in both tiers."""
+        self._remember(embeddings)
+        self._write_disk(embeddings)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hit-ratio metrics.
+
+        Returns:
+            Dictionary with lookup counts per tier, hit ratios and sizes
+        """
+        with self._lock:
+            counts = dict(self._counts)
+            entries = len(self._entries)
+
+        lookups = counts["memory_hits"] + counts["disk_hits"] + counts["misses"]
+        return {
+            "model": self.model_name,
+            "lookups": lookups,
+            **counts,
+            "hit_ratio": round((counts["memory_hits"] + counts["disk_hits"]) / lookups, 4) if lookups else 0.0,
+            "memory_hit_ratio": round(counts["memory_hits"] / lookups, 4) if lookups else 0.0,
+            "memory_entries": entries,
+            "max_entries": self.max_entries,
+            "disk_path": self.path or None
+        }
+
+    def close(self) -> None:
+        """Close the disk tier's connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, embeddings: Dict[bytes, np.ndarray]) -> None:
+        """Add embeddings to the memory tier, evicting the least recently used."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            for key, embedding in embeddings.items():
+                self._entries[key] = embedding
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _read_disk(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """Look up keys in the disk tier."""
+        if not self.path or not keys:
+            return {}
+
+        found = {}
+        try:
+            with self._lock:
+                connection = self._get_connection()
+                for start in range(0, len(keys), self.LOOKUP_CHUNK):
+                    chunk = keys[start:start + self.LOOKUP_CHUNK]
+                    rows = connection.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall()
+                    for key, vector in rows:
+                        found[bytes(key)] = np.frombuffer(vector, dtype=np.float32)
+        except sqlite3.Error as e:
+            logger.error(f"Error reading embedding cache {self.path}: {e}", exc_info=True)
+
+        # In request order, so the most recently requested stay in memory
+        return {key: found[key] for key in keys if key in found}
+
+    def _write_disk(self, embeddings: Dict[bytes, np.ndarray]) -> None:
+        """Store embeddings in the disk tier; existing keys are kept."""
+        if not self.path or not embeddings:
+            return
+
+        rows = [
+            (key, np.ascontiguousarray(embedding, dtype=np.float32).tobytes())
+            for key, embedding in embeddings.items()
+        ]
+        try:
+            with self._lock:
+                connection = self._get_connection()
+                with connection:
+                    connection.executemany("INSERT OR IGNORE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+        except sqlite3.Error as e:
+            logger.error(f"Error writing embedding cache {self.path}: {e}", exc_info=True)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Open the disk tier in this process; callers hold the lock."""
+        # Connections must not be shared with forked children
+        if self._connection is None or self._connection_pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)")
+            connection.commit()
+
+            self._connection = connection
+            self._connection_pid = os.getpid()
+        return self._connection
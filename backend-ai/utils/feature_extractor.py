@@ -1,12 +1,25 @@
 """Feature extraction utilities for ML models."""
 
 from typing import List, Dict, Any
+import re
+import zlib
 import numpy as np
 
 
 class FeatureExtractor:
     """Extract features from raw data for machine learning models."""
     
+    STANDARD_AMENITIES = [
+        "wifi", "parking", "pool", "gym", "spa",
+        "restaurant", "bar", "breakfast"
+    ]
+    
+    STANDARD_CATEGORIES = [
+        "cultural", "adventure", "nature", "food", "history"
+    ]
+    
+    DIFFICULTY_MAP = {"easy": 0.33, "moderate": 0.66, "challenging": 1.0}
+    
     @staticmethod
     def extract_hotel_features(hotel: Dict[str, Any]) -> np.ndarray:
         """
@@ -30,11 +43,7 @@ class FeatureExtractor:
         
         # Amenity features (binary)
         amenities = hotel.get("amenities", [])
-        standard_amenities = [
-            "wifi", "parking", "pool", "gym", "spa",
-            "restaurant", "bar", "breakfast"
-        ]
-        for amenity in standard_amenities:
+        for amenity in FeatureExtractor.STANDARD_AMENITIES:
             features.append(1.0 if amenity in amenities else 0.0)
         
         # Location features (if available)
@@ -47,7 +56,7 @@ class FeatureExtractor:
         else:
             features.extend([0.0, 0.0])
         
-        return np.array(features)
+        return np.array(features, dtype=np.float32)
     
     @staticmethod
     def extract_user_preferences(
@@ -70,11 +79,7 @@ class FeatureExtractor:
         
         # Preferred amenities
         preferred_amenities = user_data.get("preferred_amenities", [])
-        standard_amenities = [
-            "wifi", "parking", "pool", "gym", "spa",
-            "restaurant", "bar", "breakfast"
-        ]
-        for amenity in standard_amenities:
+        for amenity in FeatureExtractor.STANDARD_AMENITIES:
             features.append(1.0 if amenity in preferred_amenities else 0.0)
         
         # Travel style (if available)
@@ -86,7 +91,7 @@ class FeatureExtractor:
         }
         features.extend(style_encoding.get(travel_style, [0.0, 1.0, 0.0]))
         
-        return np.array(features)
+        return np.array(features, dtype=np.float32)
     
     @staticmethod
     def extract_tour_features(tour: Dict[str, Any]) -> np.ndarray:
@@ -111,19 +116,135 @@ class FeatureExtractor:
         features.append(min(days / 7, 1.0))  # Normalize to week
         
         # Difficulty feature
-        difficulty_map = {"easy": 0.33, "moderate": 0.66, "challenging": 1.0}
         difficulty = tour.get("difficulty", "moderate")
-        features.append(difficulty_map.get(difficulty, 0.66))
+        features.append(FeatureExtractor.DIFFICULTY_MAP.get(difficulty, 0.66))
         
         # Category features
         categories = tour.get("category", [])
-        standard_categories = [
-            "cultural", "adventure", "nature", "food", "history"
-        ]
-        for category in standard_categories:
+        for category in FeatureExtractor.STANDARD_CATEGORIES:
             features.append(1.0 if category in categories else 0.0)
         
-        return np.array(features)
+        return np.array(features, dtype=np.float32)
+    
+    @staticmethod
+    def extract_catalog_hotel_features(catalog, rows: np.ndarray) -> np.ndarray:
+        """
+        Extract hotel feature vectors for catalog rows in one pass.
+        
+        Produces the same features as extract_hotel_features, one row each.
+        
+        Args:
+            catalog: ItemCatalog holding the hotels
+            rows: Catalog row indices
+            
+        Returns:
+            Feature matrix of shape (len(rows), 12)
+        """
+        n = len(rows)
+        features = np.zeros((n, 4 + len(FeatureExtractor.STANDARD_AMENITIES)), dtype=np.float32)
+        
+        # Price feature (normalized); only price_per_night counts for hotels
+        has_price = (catalog.present[rows] & catalog.HAS_PRICE) > 0
+        is_nightly = catalog.price_key[rows] == catalog.PRICE_KEYS.index("price_per_night")
+        features[:, 0] = np.where(has_price & is_nightly, catalog.price[rows], 0.0) / 1000
+        
+        # Rating feature
+        features[:, 1] = np.nan_to_num(catalog.rating[rows], nan=0.0) / 5.0
+        
+        # Amenity features (binary)
+        features[:, 2:-2] = catalog.tag_flags("amenities", rows, FeatureExtractor.STANDARD_AMENITIES)
+        
+        # Location features (if both coordinates are set and non-zero)
+        lat = np.nan_to_num(catalog.latitude[rows], nan=0.0)
+        lng = np.nan_to_num(catalog.longitude[rows], nan=0.0)
+        has_coords = (lat != 0) & (lng != 0)
+        features[:, -2] = np.where(has_coords, (lat - 10) / 5, 0.0)
+        features[:, -1] = np.where(has_coords, (lng - 102) / 5, 0.0)
+        
+        return features
+    
+    @staticmethod
+    def extract_catalog_tour_features(catalog, rows: np.ndarray) -> np.ndarray:
+        """
+        Extract tour feature vectors for catalog rows in one pass.
+        
+        Produces the same features as extract_tour_features, one row each.
+        
+        Args:
+            catalog: ItemCatalog holding the tours
+            rows: Catalog row indices
+            
+        Returns:
+            Feature matrix of shape (len(rows), 8)
+        """
+        n = len(rows)
+        features = np.zeros((n, 3 + len(FeatureExtractor.STANDARD_CATEGORIES)), dtype=np.float32)
+        
+        # Price feature; only price_per_person counts for tours
+        has_price = (catalog.present[rows] & catalog.HAS_PRICE) > 0
+        is_per_person = catalog.price_key[rows] == catalog.PRICE_KEYS.index("price_per_person")
+        features[:, 0] = np.where(has_price & is_per_person, catalog.price[rows], 0.0) / 500
+        
+        # Duration feature (defaults to one day)
+        days = catalog.duration_days[rows].astype(np.float32)
+        days = np.where(days >= 0, days, 1.0)
+        features[:, 1] = np.minimum(days / 7, 1.0)
+        
+        # Difficulty feature (defaults to moderate); missing (-1) picks the trailing default
+        difficulty_values = np.array([
+            FeatureExtractor.DIFFICULTY_MAP.get(name, 0.66)
+            for name in catalog.difficulties.values
+        ] + [0.66], dtype=np.float32)
+        features[:, 2] = difficulty_values[catalog.difficulty[rows]]
+        
+        # Category features
+        features[:, 3:] = catalog.tag_flags("categories", rows, FeatureExtractor.STANDARD_CATEGORIES)
+        
+        return features
+    
+    @staticmethod
+    def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        """
+        Scale each row to unit L2 norm as a contiguous float32 matrix.
+        
+        Cosine similarity against normalized rows is a plain matrix product.
+        All-zero rows stay zero.
+        
+        Args:
+            matrix: Feature matrix (or a single vector)
+            
+        Returns:
+            C-ordered float32 array of the same shape
+        """
+        matrix = np.array(matrix, dtype=np.float32, order="C")
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+    
+    @staticmethod
+    def extract_text_features(texts: List[str], dim: int = 256) -> np.ndarray:
+        """
+        Embed texts as hashed bag-of-words vectors.
+        
+        Each lower-cased word and word pair adds +1 or -1 to one of dim
+        buckets chosen by its hash, so texts sharing words point the same
+        way. Used when no sentence embedding model is available.
+        
+        Args:
+            texts: Texts to embed
+            dim: Number of hash buckets
+            
+        Returns:
+            Float32 matrix of shape (len(texts), dim), rows of unit length
+            (zero for texts without words)
+        """
+        features = np.zeros((len(texts), dim), dtype=np.float32)
+        for idx, text in enumerate(texts):
+            words = re.findall(r"\w+", (text or "").lower())
+            for term in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                hashed = zlib.crc32(term.encode("utf-8"))
+                features[idx, hashed % dim] += 1.0 if hashed & 0x80000000 else -1.0
+        return FeatureExtractor.normalize_rows(features)
     
     @staticmethod
     def calculate_similarity(
@@ -0,0 +1,169 @@
+"""Array kernels for hybrid scoring, shared by inline and parallel scoring."""
+
+from typing import Dict, Any, Tuple
+
+import numpy as np
+
+from utils.catalog import ItemCatalog
+
+
+def feature_scores(
+    amenity_mask: np.ndarray,
+    price_usd: np.ndarray,
+    rating: np.ndarray,
+    preferred_mask: np.ndarray,
+    num_preferred: int,
+    user_budget: float
+) -> np.ndarray:
+    """
+    Calculate feature-specific scores from catalog columns.
+
+    Args:
+        amenity_mask: Amenity bitmask words of each item, one row per item
+        price_usd: Price of each item in USD
+        rating: Rating of each item (NaN if unknown)
+        preferred_mask: Bitmask words of the user's preferred amenities
+        num_preferred: Number of preferred amenities (0 for none)
+        user_budget: Budget from the user profile
+
+    Returns:
+        Feature scores (0-1)
+    """
+    scores = np.zeros(len(price_usd), dtype=np.float32)
+
+    # Amenity matching (40% weight)
+    if num_preferred:
+        matches = ItemCatalog.popcount(amenity_mask & preferred_mask)
+        scores += 0.4 * matches / num_preferred
+    else:
+        scores += 0.2  # Neutral if no preferences
+
+    # Price matching (30% weight), on prices already normalized to USD
+    price_ratio = price_usd / np.float32(user_budget)
+
+    # Score based on how well price fits budget (optimal range is 0.6-0.8 of budget)
+    price_scores = np.where(
+        price_ratio < 0.6,
+        0.7 + (price_ratio / 0.6) * 0.3,
+        np.where(price_ratio <= 0.8, 1.0, 1.0 - ((price_ratio - 0.8) / 0.2) * 0.3)
+    )
+    scores += np.where(price_ratio <= 1.0, 0.3 * np.maximum(0.0, price_scores), 0.0)
+
+    # Rating score (20% weight)
+    ratings = np.nan_to_num(rating, nan=3.0)
+    scores += 0.2 * ratings / 5.0
+
+    # Location preference (10% weight)
+    # TODO: Implement location-based scoring when user location preferences are available
+    scores += 0.1 * 0.5  # Neutral for now
+
+    return np.minimum(1.0, scores)
+
+
+def value_scores(price_usd: np.ndarray, rating: np.ndarray, budget: float) -> np.ndarray:
+    """
+    Calculate value scores (quality vs price ratio).
+
+    Higher rating and lower price = better value; unpriced items score 0.
+
+    Returns:
+        Float64 value scores (0-1)
+    """
+    prices = price_usd.astype(np.float64)
+    ratings = np.nan_to_num(rating.astype(np.float64), nan=3.0)
+    safe_prices = np.where(prices > 0, prices, 1.0)
+    return np.where(prices > 0, np.minimum(1.0, (ratings / 5.0) / (safe_prices / budget)), 0.0)
+
+
+def content_scores(
+    arrays: Dict[str, np.ndarray],
+    params: Dict[str, Any],
+    positions: np.ndarray
+) -> np.ndarray:
+    """
+    Calculate content scores before min-max normalization.
+
+    Args:
+        arrays: Catalog columns ("content_units", "item_type", "amenity_mask",
+            "price_usd", "rating") and the candidate "rows"
+        params: User unit vector per item type code ("user_units"), amenity
+            preferences and profile budget
+        positions: Positions in the candidate rows to score
+
+    Returns:
+        Float32 scores (0-1)
+    """
+    rows = arrays['rows'][positions]
+
+    # Each item type compares its own leading features with the user vector
+    user_units = np.asarray(params['user_units'], dtype=np.float32)[arrays['item_type'][rows]]
+    base_similarity = np.einsum('ij,ij->i', arrays['content_units'][rows], user_units)
+
+    features = feature_scores(
+        arrays['amenity_mask'][rows],
+        arrays['price_usd'][rows],
+        arrays['rating'][rows],
+        params['preferred_mask'],
+        params['num_preferred'],
+        params['user_budget']
+    )
+    return np.clip(0.7 * base_similarity + 0.3 * features, 0.0, 1.0)
+
+
+def content_score_range(
+    arrays: Dict[str, np.ndarray],
+    params: Dict[str, Any],
+    positions: np.ndarray
+) -> Tuple[float, float]:
+    """Get the minimum and maximum content score of some positions."""
+    scores = content_scores(arrays, params, positions)
+    return float(scores.min()), float(scores.max())
+
+
+def hybrid_parts(
+    arrays: Dict[str, np.ndarray],
+    params: Dict[str, Any],
+    positions: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Calculate recommendation, value and combined scores.
+
+    Content scores are min-max normalized with params["content_range"],
+    the range over all candidates. Collaborative and trend scores arrive
+    already normalized in arrays["cf_scores"] and arrays["trend_scores"].
+
+    Returns:
+        Tuple of (recommendation_scores, value_scores, combined_scores)
+    """
+    cb_scores = content_scores(arrays, params, positions)
+    low, high = np.float32(params['content_range'][0]), np.float32(params['content_range'][1])
+    if high > low:
+        cb_scores = (cb_scores - low) / (high - low)
+
+    scores = (params['collaborative_weight'] * arrays['cf_scores'][positions] +
+              params['content_weight'] * cb_scores)
+
+    weight = params['trend_weight']
+    if weight:
+        scores = (1 - weight) * scores + weight * arrays['trend_scores'][positions]
+
+    rows = arrays['rows'][positions]
+    values = value_scores(arrays['price_usd'][rows], arrays['rating'][rows], params['budget'])
+    recommendation = scores.astype(np.float64)
+    return recommendation, values, 0.7 * recommendation + 0.3 * values
+
+
+def within_budget_scores(
+    arrays: Dict[str, np.ndarray],
+    params: Dict[str, Any],
+    positions: np.ndarray
+) -> np.ndarray:
+    """
+    Get combined scores, -inf for items over 90% of the budget.
+
+    Returns:
+        Float64 combined scores
+    """
+    _, _, combined = hybrid_parts(arrays, params, positions)
+    prices = arrays['price_usd'][arrays['rows'][positions]].astype(np.float64)
+    return np.where(prices <= params['budget'] * 0.9, combined, -np.inf)
@@ -0,0 +1,339 @@
+"""Time-decayed implicit feedback (views, wishlists, searches)."""
+
+from typing import List, Dict, Any, Optional, Iterable
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+
+from utils.rating_matrix import RatingMatrix
+
+logger = logging.getLogger(__name__)
+
+
+class ImplicitFeedbackStore:
+    """
+    Accumulate weighted implicit events per (user, item) with exponential
+    time decay.
+
+    Decay is applied lazily: each event is stored already scaled by
+    exp(rate * (t - landmark)), so reading at time `now` only multiplies by
+    one global factor exp(-rate * (now - landmark)). Cells are never
+    rewritten as time passes; the landmark is only moved forward (one pass
+    over the data) when the stored scale grows too large.
+
+    Events are appended to flat buffers and folded into a CSR matrix on
+    read, so ingestion is a few dictionary lookups per event. Events
+    timestamped later than now + max_clock_skew are rejected, so a bad
+    client clock cannot push the landmark into the future.
+
+    Cells whose decayed score falls below min_score are dropped when
+    events are folded in and when the landmark moves, together with users
+    and items left without cells, so the matrix tracks recent activity
+    rather than every pair ever seen.
+    """
+
+    # Move the landmark once stored values exceed exp(MAX_EXPONENT)
+    MAX_EXPONENT = 50.0
+
+    def __init__(
+        self,
+        weights: Dict[str, float],
+        half_life_hours: float = 168.0,
+        max_clock_skew: float = 300.0,
+        min_score: float = 0.001
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            weights: Weight of each event type, e.g. {"view": 1.0}
+            half_life_hours: Time for an event's contribution to halve
+            max_clock_skew: Seconds an event timestamp may be ahead of now
+            min_score: Decayed score below which a cell is dropped
+        """
+        self.weights = dict(weights)
+        self.decay_rate = math.log(2) / (half_life_hours * 3600)
+        self.max_clock_skew = max_clock_skew
+        self.min_score = min_score
+        self.landmark = time.time()
+
+        self.user_ids = []
+        self.item_ids = []
+        self.user_index = {}
+        self.item_index = {}
+
+        self.version = 0
+        self._matrix = sparse.csr_matrix((0, 0), dtype=np.float64)
+        self._pending_users = []
+        self._pending_items = []
+        self._pending_values = []
+        self._max_timestamp = self.landmark
+        self._lock = threading.Lock()
+
+    def add_events(self, events: Iterable[Dict[str, Any]]) -> int:
+        """
+        Record implicit events.
+
+        Args:
+            events: Dictionaries with user_id, item_id, event_type and an
+                optional timestamp (epoch seconds, defaults to now)
+
+        Returns:
+            Number of events accepted; unknown event types are skipped
+        """
+        now = time.time()
+        user_ids, item_ids, event_types, timestamps = [], [], [], []
+        for event in events:
+            user_ids.append(event["user_id"])
+            item_ids.append(event["item_id"])
+            event_types.append(event["event_type"])
+            timestamp = event.get("timestamp")
+            timestamps.append(now if timestamp is None else timestamp)
+
+        return self.add_event_arrays(user_ids, item_ids, event_types, timestamps)
+
+    def add_event_arrays(
+        self,
+        user_ids: List[str],
+        item_ids: List[str],
+        event_types: List[str],
+        timestamps: Iterable[float]
+    ) -> int:
+        """
+        Record implicit events given as parallel columns.
+
+        Returns:
+            Number of events accepted; unknown event types and events
+            later than now + max_clock_skew are skipped
+        """
+        weights = np.array([self.weights.get(t, 0.0) for t in event_types], dtype=np.float64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        accepted = (weights > 0) & (timestamps <= time.time() + self.max_clock_skew)
+
+        with self._lock:
+            if accepted.any():
+                self._max_timestamp = max(self._max_timestamp, float(timestamps[accepted].max()))
+            if self.decay_rate * (self._max_timestamp - self.landmark) > self.MAX_EXPONENT:
+                self._move_landmark(self._max_timestamp)
+
+            # Store each event pre-scaled relative to the landmark
+            values = np.zeros(len(timestamps), dtype=np.float64)
+            values[accepted] = weights[accepted] * np.exp(self.decay_rate * (timestamps[accepted] - self.landmark))
+
+            user_index, item_index = self.user_index, self.item_index
+            for position in np.flatnonzero(accepted):
+                user_id = user_ids[position]
+                item_id = item_ids[position]
+
+                user = user_index.get(user_id)
+                if user is None:
+                    user = user_index[user_id] = len(self.user_ids)
+                    self.user_ids.append(user_id)
+                item = item_index.get(item_id)
+                if item is None:
+                    item = item_index[item_id] = len(self.item_ids)
+                    self.item_ids.append(item_id)
+
+                self._pending_users.append(user)
+                self._pending_items.append(item)
+
+            if accepted.any():
+                self._pending_values.append(values[accepted])
+                self.version += 1
+
+        return int(accepted.sum())
+
+    def decay_factor(self, now: Optional[float] = None) -> float:
+        """
+        Get the factor turning stored values into values decayed to `now`.
+
+        Reading at a time before the landmark scales up by at most
+        exp(MAX_EXPONENT), so the factor never overflows.
+        """
+        now = time.time() if now is None else now
+        return math.exp(min(-self.decay_rate * (now - self.landmark), self.MAX_EXPONENT))
+
+    def matrix(self, now: Optional[float] = None) -> sparse.csr_matrix:
+        """
+        Get decayed scores as a CSR matrix of users x items.
+
+        Args:
+            now: Time to decay to (epoch seconds, defaults to now)
+        """
+        with self._lock:
+            self._flush()
+            return self._matrix * self.decay_factor(now)
+
+    def scores(self, now: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Get decayed scores as {user_id: {item_id: score}}.
+
+        Args:
+            now: Time to decay to (epoch seconds, defaults to now)
+        """
+        matrix = self.matrix(now)
+        result = {}
+        for user in range(matrix.shape[0]):
+            start, end = matrix.indptr[user], matrix.indptr[user + 1]
+            if start == end:
+                continue
+            result[self.user_ids[user]] = {
+                self.item_ids[item]: float(value)
+                for item, value in zip(matrix.indices[start:end], matrix.data[start:end])
+            }
+        return result
+
+    def implicit_ratings(
+        self,
+        saturation: float,
+        now: Optional[float] = None
+    ) -> RatingMatrix:
+        """
+        Map decayed scores onto the 1-5 rating scale.
+
+        A score s becomes 1 + 4 * (1 - exp(-s / saturation)), so a few
+        strong signals approach 5 but never exceed it.
+
+        Args:
+            saturation: Score giving about 63% of the rating range
+            now: Time to decay to (epoch seconds, defaults to now)
+
+        Returns:
+            RatingMatrix of the ratings, computed on the CSR data
+        """
+        with self._lock:
+            self._flush()
+            user_ids, item_ids = list(self.user_ids), list(self.item_ids)
+            ratings = self._matrix * self.decay_factor(now)
+
+        ratings.data = 1.0 - 4.0 * np.expm1(-ratings.data / saturation)
+        return RatingMatrix(user_ids, item_ids, ratings)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Get the stored (undecayed) matrix and ids as arrays for snapshots."""
+        with self._lock:
+            self._flush()
+            return {
+                "implicit_users": np.array(self.user_ids, dtype=str),
+                "implicit_items": np.array(self.item_ids, dtype=str),
+                "implicit_indptr": self._matrix.indptr,
+                "implicit_indices": self._matrix.indices,
+                "implicit_data": self._matrix.data,
+                "implicit_landmark": np.array([self.landmark]),
+            }
+
+    def restore(self, arrays: Dict[str, np.ndarray]) -> None:
+        """Replace the store's contents with arrays written by to_arrays()."""
+        with self._lock:
+            self.user_ids = arrays["implicit_users"].tolist()
+            self.item_ids = arrays["implicit_items"].tolist()
+            self.user_index = {user_id: idx for idx, user_id in enumerate(self.user_ids)}
+            self.item_index = {item_id: idx for idx, item_id in enumerate(self.item_ids)}
+
+            # Copy so later events can be added to the matrix
+            self._matrix = sparse.csr_matrix(
+                (
+                    np.array(arrays["implicit_data"], dtype=np.float64),
+                    np.array(arrays["implicit_indices"]),
+                    np.array(arrays["implicit_indptr"])
+                ),
+                shape=(len(self.user_ids), len(self.item_ids))
+            )
+            self.landmark = float(arrays["implicit_landmark"][0])
+
+            # Snapshots written before future events were rejected can hold
+            # a landmark ahead of the clock; later events would underflow to 0
+            now = time.time()
+            if self.landmark > now + self.max_clock_skew:
+                logger.warning(f"Implicit feedback landmark is {self.landmark - now:.0f}s in the future, moving it to now")
+                self._move_landmark(now)
+            self._max_timestamp = self.landmark
+            self._pending_users = []
+            self._pending_items = []
+            self._pending_values = []
+            self.version += 1
+
+    def __len__(self) -> int:
+        """Number of (user, item) cells with feedback."""
+        with self._lock:
+            self._flush()
+            return self._matrix.nnz
+
+    def _flush(self) -> None:
+        """Fold buffered events into the CSR matrix. Callers must hold the lock."""
+        if not self._pending_users:
+            if self._matrix.shape != (len(self.user_ids), len(self.item_ids)):
+                self._matrix.resize((len(self.user_ids), len(self.item_ids)))
+            self._prune(time.time())
+            return
+
+        shape = (len(self.user_ids), len(self.item_ids))
+        pending = sparse.coo_matrix(
+            (
+                np.concatenate(self._pending_values),
+                (np.asarray(self._pending_users), np.asarray(self._pending_items))
+            ),
+            shape=shape
+        ).tocsr()
+
+        self._matrix.resize(shape)
+        self._matrix = (self._matrix + pending).tocsr()
+
+        self._pending_users = []
+        self._pending_items = []
+        self._pending_values = []
+        self._prune(time.time())
+
+    def _prune(self, now: float) -> None:
+        """
+        Drop cells decayed below min_score at `now`, and users and items
+        left without cells. Callers must hold the lock with nothing pending.
+        """
+        matrix = self._matrix
+        # Scores are read at the latest event time at the earliest
+        threshold = self.min_score / self.decay_factor(max(now, self.landmark))
+        if matrix.nnz == 0 or matrix.data.min() >= threshold:
+            return
+
+        # Copied, since snapshots may still be writing the arrays of to_arrays()
+        matrix = matrix.copy()
+        matrix.data[matrix.data < threshold] = 0.0
+        matrix.eliminate_zeros()
+
+        users = np.flatnonzero(np.diff(matrix.indptr))
+        items = np.unique(matrix.indices)
+        if len(users) < matrix.shape[0] or len(items) < matrix.shape[1]:
+            # Columns keep their order, so relabelling them keeps indices sorted
+            columns = np.full(matrix.shape[1], -1, dtype=matrix.indices.dtype)
+            columns[items] = np.arange(len(items), dtype=matrix.indices.dtype)
+            matrix = matrix[users]
+            matrix = sparse.csr_matrix(
+                (matrix.data, columns[matrix.indices], matrix.indptr),
+                shape=(len(users), len(items))
+            )
+
+            self.user_ids = [self.user_ids[user] for user in users.tolist()]
+            self.item_ids = [self.item_ids[item] for item in items.tolist()]
+            self.user_index = {user_id: idx for idx, user_id in enumerate(self.user_ids)}
+            self.item_index = {item_id: idx for idx, item_id in enumerate(self.item_ids)}
+
+        self._matrix = matrix
+
+    def _move_landmark(self, landmark: float) -> None:
+        """
+        Rescale stored values to a new landmark. Callers must hold the lock.
+
+        Moving the landmark back scales values up; the scale and the
+        results are capped at exp(MAX_EXPONENT) so they stay finite.
+        """
+        self._flush()
+        exponent = min(-self.decay_rate * (landmark - self.landmark), self.MAX_EXPONENT)
+        self._matrix = self._matrix * math.exp(exponent)
+        if exponent > 0:
+            np.minimum(self._matrix.data, math.exp(self.MAX_EXPONENT), out=self._matrix.data)
+        self.landmark = landmark
+        self._prune(time.time())
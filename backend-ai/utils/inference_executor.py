@@ -0,0 +1,148 @@
+"""Bounded thread pool for running model inference off the event loop."""
+
+from typing import Any, Callable, Dict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceQueueFull(RuntimeError):
+    """Raised when an inference job is submitted while the queue is full."""
+
+
+class InferenceExecutor:
+    """
+    Run blocking inference calls in a dedicated thread pool.
+
+    Jobs wait in a queue of at most max_queue entries for one of the
+    workers; submitting to a full queue raises InferenceQueueFull right
+    away instead of piling up requests. PyTorch releases the GIL during
+    forward passes, so threads keep the event loop responsive without
+    loading the model into every process.
+    """
+
+    # Recent jobs kept for the wait and run time percentiles
+    WINDOW = 1000
+
+    def __init__(self, workers: int = 1, max_queue: int = 32, name: str = "inference"):
+        """
+        Initialize the executor.
+
+        Args:
+            workers: Threads running jobs concurrently
+            max_queue: Jobs allowed to wait for a worker
+            name: Prefix of the worker thread names
+        """
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._cancelled = 0
+        self._wait_ms = deque(maxlen=self.WINDOW)
+        self._run_ms = deque(maxlen=self.WINDOW)
+
+    async def run(self, function: Callable[..., Any], *args) -> Any:
+        """
+        Run a function in the pool and wait for its result.
+
+        Args:
+            function: Blocking function to run
+            *args: Arguments of the function
+
+        Returns:
+            The function's return value
+
+        Raises:
+            InferenceQueueFull: If max_queue jobs are already waiting
+        """
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise InferenceQueueFull(f"Inference queue is full ({self.max_queue} jobs waiting)")
+            self._queued += 1
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._wait_ms.append((started - submitted) * 1000)
+
+            failed = False
+            try:
+                return function(*args)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._failed += failed
+                    self._run_ms.append((time.perf_counter() - started) * 1000)
+
+        try:
+            future = self._pool.submit(job)
+        except RuntimeError:
+            with self._lock:
+                self._queued -= 1
+            raise
+
+        def release(done):
+            # A job cancelled while queued never runs, so its slot is freed here
+            if done.cancelled():
+                with self._lock:
+                    self._queued -= 1
+                    self._cancelled += 1
+
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get queue depth and timing metrics.
+
+        Returns:
+            Dictionary with queue depth, job counts and wait/run time
+            percentiles in milliseconds over the last WINDOW jobs
+        """
+        with self._lock:
+            wait_ms = np.array(self._wait_ms)
+            run_ms = np.array(self._run_ms)
+            stats = {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "cancelled": self._cancelled
+            }
+
+        for name, values in (("wait_ms", wait_ms), ("run_ms", run_ms)):
+            stats[name] = {
+                "mean": round(float(values.mean()), 3) if len(values) else 0.0,
+                "p50": round(float(np.percentile(values, 50)), 3) if len(values) else 0.0,
+                "p95": round(float(np.percentile(values, 95)), 3) if len(values) else 0.0,
+                "max": round(float(values.max()), 3) if len(values) else 0.0
+            }
+        return stats
+
+    def close(self) -> None:
+        """Stop the workers after the jobs already submitted."""
+        self._pool.shutdown(wait=True)
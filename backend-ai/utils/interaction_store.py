@@ -0,0 +1,480 @@
+"""User-item interaction store hash-partitioned across worker processes."""
+
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+import heapq
+import logging
+import multiprocessing
+import threading
+import zlib
+
+import numpy as np
+
+from utils.cache_snapshot import CacheSnapshot
+from utils.rating_matrix import RatingMatrix
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of(user_id: str, num_shards: int) -> int:
+    """
+    Get the shard owning a user.
+
+    Uses CRC32 rather than hash() so the mapping is the same in every
+    process and across restarts.
+    """
+    return zlib.crc32(user_id.encode("utf-8")) % num_shards
+
+
+class _Shard:
+    """
+    Interactions of the users owned by one worker process.
+
+    Explicit ratings and implicit feedback ratings are kept apart so the
+    implicit layer can be replaced as it decays; explicit ratings win
+    where a user has both for an item.
+    """
+
+    def __init__(self):
+        self.ratings = {}
+        self.implicit = {}
+        self.sequence = {}
+        self._matrix = None
+
+    def add(self, rows: List[Tuple[int, str, Dict[str, float]]]) -> int:
+        """Merge user ratings into the shard; returns the number of users."""
+        for sequence, user_id, item_ratings in rows:
+            self.sequence.setdefault(user_id, sequence)
+            self.ratings.setdefault(user_id, {}).update(item_ratings)
+        self._matrix = None
+        return len(self.ratings)
+
+    def set_implicit(self, rows: List[Tuple[int, str, Dict[str, float]]]) -> List[Tuple[int, str]]:
+        """
+        Replace the shard's implicit feedback ratings.
+
+        Rows are (position, user_id, {item_id: rating}), the position being
+        the row's place in the refresh. Returns (position, user_id) of the
+        users the shard has no sequence for yet.
+        """
+        self.implicit = {}
+        new_users = []
+        for position, user_id, item_ratings in rows:
+            if user_id not in self.sequence:
+                new_users.append((position, user_id))
+            self.implicit[user_id] = item_ratings
+        self._matrix = None
+        return new_users
+
+    def set_sequences(self, rows: List[Tuple[int, str]]) -> int:
+        """Give users without one a sequence; returns the number of users."""
+        for sequence, user_id in rows:
+            self.sequence.setdefault(user_id, sequence)
+        return len(self.sequence)
+
+    def load_snapshot(self, directory: str, prefix: str, shard: int, num_shards: int) -> Optional[int]:
+        """
+        Add the shard's users from the rating arrays of a cache snapshot.
+
+        Only the CSR rows of this shard's users are read from the
+        memory-mapped arrays; a user's row number is their sequence.
+
+        Returns:
+            Number of users in the whole snapshot, or None if the snapshot
+            has no ratings
+        """
+        snapshot = CacheSnapshot(directory).load()
+        if snapshot is None or f"{prefix}_indptr" not in snapshot[0]:
+            return None
+
+        arrays = snapshot[0]
+        user_ids = arrays[f"{prefix}_users"].tolist()
+        item_ids = arrays[f"{prefix}_items"]
+        indptr, indices, data = arrays[f"{prefix}_indptr"], arrays[f"{prefix}_indices"], arrays[f"{prefix}_data"]
+
+        rows = []
+        for row, user_id in enumerate(user_ids):
+            if shard_of(user_id, num_shards) == shard:
+                start, end = indptr[row], indptr[row + 1]
+                rows.append((row, user_id, dict(zip(item_ids[indices[start:end]].tolist(), data[start:end].tolist()))))
+        self.add(rows)
+        return len(user_ids)
+
+    def get(self, user_ids: List[str]) -> Dict[str, Dict[str, float]]:
+        """Get the ratings of the requested users held by this shard."""
+        return {
+            user_id: self._ratings_of(user_id)
+            for user_id in user_ids
+            if user_id in self.ratings or user_id in self.implicit
+        }
+
+    def popularity(self) -> Dict[str, Tuple[int, float]]:
+        """Get the number of ratings and their sum per item."""
+        totals = {}
+        for user_id in self.sequence:
+            for item_id, rating in self._ratings_of(user_id).items():
+                count, total = totals.get(item_id, (0, 0.0))
+                totals[item_id] = (count + 1, total + rating)
+        return totals
+
+    def similar(
+        self,
+        item_ratings: Dict[str, float],
+        exclude: str,
+        top_k: int
+    ) -> List[Tuple[float, int, str]]:
+        """
+        Find the shard's top-k users most similar to a rating vector.
+
+        Returns:
+            List of (similarity, sequence, user_id) tuples
+        """
+        matrix = self._get_matrix()
+        if matrix.num_users == 0:
+            return []
+
+        similarities = matrix.cosine_to_ratings(item_ratings)
+        exclude_row = matrix.user_index.get(exclude)
+        if exclude_row is not None:
+            similarities[exclude_row] = 0.0
+
+        candidates = np.flatnonzero(similarities > 0)
+        best = heapq.nsmallest(
+            top_k,
+            candidates,
+            key=lambda row: (-similarities[row], self.sequence[matrix.user_ids[row]])
+        )
+        return [
+            (float(similarities[row]), self.sequence[matrix.user_ids[row]], matrix.user_ids[row])
+            for row in best
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        """Get the shard's size."""
+        matrix = self._get_matrix()
+        return {
+            "users": matrix.num_users,
+            "items": len(matrix.item_ids),
+            "ratings": int(matrix.ratings.nnz),
+            "bytes": int(
+                matrix.ratings.data.nbytes
+                + matrix.ratings.indices.nbytes
+                + matrix.ratings.indptr.nbytes
+            )
+        }
+
+    def _ratings_of(self, user_id: str) -> Dict[str, float]:
+        """Get a user's implicit ratings overlaid with their explicit ratings."""
+        return {**self.implicit.get(user_id, {}), **self.ratings.get(user_id, {})}
+
+    def _get_matrix(self) -> RatingMatrix:
+        """Build the shard's rating matrix after changes."""
+        if self._matrix is None:
+            self._matrix = RatingMatrix.from_dict({
+                user_id: self._ratings_of(user_id)
+                for user_id in self.sequence
+                if user_id in self.ratings or user_id in self.implicit
+            })
+        return self._matrix
+
+
+def _shard_worker(connection) -> None:
+    """Serve requests for one shard until told to stop."""
+    shard = _Shard()
+    handlers = {
+        "add": shard.add,
+        "implicit": shard.set_implicit,
+        "sequences": shard.set_sequences,
+        "load_snapshot": shard.load_snapshot,
+        "get": shard.get,
+        "popularity": shard.popularity,
+        "similar": shard.similar,
+        "stats": shard.stats,
+    }
+
+    while True:
+        try:
+            command, args = connection.recv()
+        except EOFError:
+            break
+
+        if command == "stop":
+            connection.send(("ok", None))
+            break
+
+        try:
+            connection.send(("ok", handlers[command](*args)))
+        except Exception as e:
+            connection.send(("error", f"{type(e).__name__}: {e}"))
+
+    connection.close()
+
+
+class ShardedInteractionStore:
+    """
+    Coordinator for user-item interactions spread over worker processes.
+
+    Users are hash-partitioned across shards, each owned by one process
+    holding only its users' ratings. Shards are loaded partition by
+    partition, or read their own partition of a cache snapshot, so the
+    coordinator never holds every user's ratings. Similarity queries are
+    fanned out to every shard and the per-shard top-k lists are merged.
+    """
+
+    def __init__(self, num_shards: int = 4, start_method: str = "spawn"):
+        """
+        Initialize the store.
+
+        Args:
+            num_shards: Number of worker processes
+            start_method: multiprocessing start method; "spawn" is safe
+                to use from threaded servers
+        """
+        self.num_shards = num_shards
+        self.start_method = start_method
+        self._connections = []
+        self._processes = []
+        self._lock = threading.Lock()
+        self._next_sequence = 0
+
+    def start(self) -> None:
+        """Start the shard worker processes."""
+        if self._processes:
+            return
+
+        context = multiprocessing.get_context(self.start_method)
+        for shard in range(self.num_shards):
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_shard_worker,
+                args=(child,),
+                name=f"interaction-shard-{shard}",
+                daemon=True
+            )
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+        logger.info(f"Started {self.num_shards} interaction shards")
+
+    def close(self) -> None:
+        """Stop the shard worker processes."""
+        with self._lock:
+            for connection in self._connections:
+                try:
+                    connection.send(("stop", ()))
+                    connection.recv()
+                except (EOFError, OSError, BrokenPipeError):
+                    pass
+                connection.close()
+
+            for process in self._processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+
+            self._connections = []
+            self._processes = []
+
+    def __enter__(self) -> "ShardedInteractionStore":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def started(self) -> bool:
+        return bool(self._processes)
+
+    def add_interactions(self, user_item_matrix: Dict[str, Dict[str, float]]) -> None:
+        """
+        Add or update user ratings.
+
+        Args:
+            user_item_matrix: Nested dictionary {user_id: {item_id: rating}}
+        """
+        batches = [[] for _ in range(self.num_shards)]
+
+        with self._lock:
+            for user_id, item_ratings in user_item_matrix.items():
+                batches[shard_of(user_id, self.num_shards)].append(
+                    (self._next_sequence, user_id, dict(item_ratings))
+                )
+                self._next_sequence += 1
+
+            self._request_all(
+                {shard: ("add", (batch,)) for shard, batch in enumerate(batches) if batch}
+            )
+
+    def load_partition(self, shard: int, rows: List[Tuple[int, str, Dict[str, float]]]) -> None:
+        """
+        Add the ratings of one shard's users, as read from the source.
+
+        Args:
+            shard: Shard the users belong to (see shard_of)
+            rows: Tuples of (sequence, user_id, {item_id: rating}); the
+                sequence is the user's position in the whole source and
+                breaks similarity ties
+        """
+        with self._lock:
+            self._request_all({shard: ("add", (rows,))})
+            if rows:
+                self._next_sequence = max(self._next_sequence, max(row[0] for row in rows) + 1)
+
+    def load_snapshot(self, directory: str, prefix: str = "ratings") -> bool:
+        """
+        Let every shard read its users' rows from the current cache snapshot.
+
+        Args:
+            directory: Snapshot directory (see CacheSnapshot)
+            prefix: Name prefix of the rating arrays (see RatingMatrix.to_arrays)
+
+        Returns:
+            True if the snapshot had ratings
+        """
+        with self._lock:
+            replies = self._request_all({
+                shard: ("load_snapshot", (directory, prefix, shard, self.num_shards))
+                for shard in range(self.num_shards)
+            })
+            totals = [total for total in replies.values() if total is not None]
+            if totals:
+                self._next_sequence = max(self._next_sequence, max(totals))
+        return len(totals) == self.num_shards
+
+    def set_implicit_ratings(self, user_item_matrix: Dict[str, Dict[str, float]]) -> None:
+        """
+        Replace the implicit feedback ratings of all users.
+
+        Only users seen for the first time are given a sequence, so
+        refreshing unchanged users does not advance the sequence.
+
+        Args:
+            user_item_matrix: Nested dictionary {user_id: {item_id: rating}};
+                users left out no longer have implicit ratings
+        """
+        batches = [[] for _ in range(self.num_shards)]
+        for position, (user_id, item_ratings) in enumerate(user_item_matrix.items()):
+            batches[shard_of(user_id, self.num_shards)].append(
+                (position, user_id, dict(item_ratings))
+            )
+
+        with self._lock:
+            replies = self._request_all({shard: ("implicit", (batch,)) for shard, batch in enumerate(batches)})
+
+            new_users = sorted(row for rows in replies.values() for row in rows)
+            if not new_users:
+                return
+
+            sequences = [[] for _ in range(self.num_shards)]
+            for _, user_id in new_users:
+                sequences[shard_of(user_id, self.num_shards)].append((self._next_sequence, user_id))
+                self._next_sequence += 1
+
+            self._request_all(
+                {shard: ("sequences", (rows,)) for shard, rows in enumerate(sequences) if rows}
+            )
+
+    def get_popularity(self) -> Dict[str, Tuple[int, float]]:
+        """
+        Get the number of ratings and mean rating of every rated item.
+
+        Returns:
+            Dictionary: {item_id: (interaction_count, mean_rating)}
+        """
+        with self._lock:
+            replies = self._request_all({
+                shard: ("popularity", ()) for shard in range(self.num_shards)
+            })
+
+        totals = {}
+        for reply in replies.values():
+            for item_id, (count, total) in reply.items():
+                merged = totals.get(item_id, (0, 0.0))
+                totals[item_id] = (merged[0] + count, merged[1] + total)
+        return {item_id: (count, total / count) for item_id, (count, total) in totals.items()}
+
+    def get_ratings(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, float]]:
+        """
+        Get the ratings of several users from their shards.
+
+        Returns:
+            Nested dictionary {user_id: {item_id: rating}} of known users
+        """
+        by_shard = {}
+        for user_id in user_ids:
+            by_shard.setdefault(shard_of(user_id, self.num_shards), []).append(user_id)
+
+        with self._lock:
+            replies = self._request_all(
+                {shard: ("get", (ids,)) for shard, ids in by_shard.items()}
+            )
+
+        ratings = {}
+        for reply in replies.values():
+            ratings.update(reply)
+        return ratings
+
+    def find_similar_users(self, user_id: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Find the top-k users most similar to a user across all shards.
+
+        Args:
+            user_id: Target user id
+            top_k: Number of similar users to return
+
+        Returns:
+            List of (user_id, similarity) tuples sorted by similarity, ties
+            in insertion order
+        """
+        target = self.get_ratings([user_id]).get(user_id)
+        if not target:
+            return []
+
+        with self._lock:
+            replies = self._request_all({
+                shard: ("similar", (target, user_id, top_k))
+                for shard in range(self.num_shards)
+            })
+
+        merged = heapq.nsmallest(
+            top_k,
+            (candidate for reply in replies.values() for candidate in reply),
+            key=lambda candidate: (-candidate[0], candidate[1])
+        )
+        return [(other_id, similarity) for similarity, _, other_id in merged]
+
+    def stats(self) -> List[Dict[str, int]]:
+        """Get the size of each shard."""
+        with self._lock:
+            replies = self._request_all({
+                shard: ("stats", ()) for shard in range(self.num_shards)
+            })
+        return [replies[shard] for shard in range(self.num_shards)]
+
+    def _request_all(self, requests: Dict[int, Tuple[str, tuple]]) -> Dict[int, Any]:
+        """
+        Send requests to shards, then collect the replies.
+
+        All requests go out before any reply is read, so shards work in
+        parallel. Callers must hold the lock.
+        """
+        if not self._processes:
+            raise RuntimeError("Interaction store is not started")
+
+        for shard, request in requests.items():
+            self._connections[shard].send(request)
+
+        replies = {}
+        errors = []
+        for shard in requests:
+            status, payload = self._connections[shard].recv()
+            if status == "error":
+                errors.append(f"shard {shard}: {payload}")
+            else:
+                replies[shard] = payload
+
+        if errors:
+            raise RuntimeError("; ".join(errors))
+        return replies
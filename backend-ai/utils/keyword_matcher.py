@@ -0,0 +1,73 @@
+"""Whole-word matching of many keyword groups in one pass."""
+
+from typing import Dict, FrozenSet, Iterable, Set
+import re
+
+
+class KeywordMatcher:
+    """
+    Find the keywords of several groups in a text in a single pass.
+
+    The text is split into words by one compiled regex, and the words are
+    intersected with a precomputed table of every keyword and its
+    inflections ("rooms", "cleaned", "cleanliness", "messy"). Matching is
+    therefore on whole words: "unclean" does not count as "clean" and
+    "badminton" does not count as "bad". The cost is one regex scan plus a
+    set intersection, however many keywords there are. Keywords are
+    single words; one keyword may belong to several groups.
+    """
+
+    # Endings accepted after a keyword
+    SUFFIXES = ("s", "es", "d", "ed", "ing", "er", "est", "ly", "y", "ness", "liness")
+
+    WORD_PATTERN = re.compile(r"\w+")
+
+    def __init__(self, groups: Dict[str, Iterable[str]], inflections: bool = True):
+        """
+        Build the matcher.
+
+        Args:
+            groups: Keywords of each group, e.g. {"positive": [...], "cleanliness": [...]}
+            inflections: Also match keywords followed by one of SUFFIXES
+        """
+        members: Dict[str, Set[str]] = {}
+        for group, keywords in groups.items():
+            members[group] = {keyword.lower() for keyword in keywords}
+        self.members: Dict[str, FrozenSet[str]] = {
+            group: frozenset(keywords) for group, keywords in members.items()
+        }
+
+        self.groups_of: Dict[str, FrozenSet[str]] = {}
+        for group, keywords in self.members.items():
+            for keyword in keywords:
+                self.groups_of[keyword] = self.groups_of.get(keyword, frozenset()) | {group}
+
+        # Word form -> keyword; exact keywords win over inflections of shorter ones
+        suffixes = self.SUFFIXES if inflections else ()
+        self.forms: Dict[str, str] = {}
+        for keyword in sorted(self.groups_of, key=len):
+            for suffix in suffixes:
+                self.forms.setdefault(keyword + suffix, keyword)
+        self.forms.update({keyword: keyword for keyword in self.groups_of})
+        self._form_set = frozenset(self.forms)
+
+    def keywords(self, text: str) -> Set[str]:
+        """
+        Get the distinct keywords found in a text.
+
+        Returns:
+            Lowercase keywords, as given to the constructor
+        """
+        words = self._form_set.intersection(self.WORD_PATTERN.findall(text.lower()))
+        return {self.forms[word] for word in words}
+
+    def groups(self, keywords: Iterable[str]) -> Set[str]:
+        """Get the groups that some found keywords belong to."""
+        found = set()
+        for keyword in keywords:
+            found |= self.groups_of[keyword]
+        return found
+
+    def count(self, keywords: Set[str], group: str) -> int:
+        """Count the found keywords that belong to a group."""
+        return len(self.members[group].intersection(keywords))
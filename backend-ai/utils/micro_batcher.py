@@ -0,0 +1,122 @@
+"""Coalesce concurrent single-item calls into batched calls."""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+
+
+class MicroBatcher:
+    """
+    Collect items submitted concurrently and process them as one batch.
+
+    The first item of a batch starts a timer; the batch is processed when
+    the timer fires after max_wait_ms or as soon as max_batch_size items
+    are waiting, whichever comes first. Each caller gets the result at its
+    item's position, or the batch's exception. While one batch runs, the
+    next one collects, so a longer wait trades latency for throughput.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            process: Coroutine function mapping a list of items to a list of
+                results in the same order
+            max_batch_size: Items processed together at most
+            max_wait_ms: Longest time the first item of a batch waits for
+                others; 0 processes every item on its own
+        """
+        self.process = process
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer = None
+        self._tasks = set()
+        self._counts = {"items": 0, "batches": 0, "full_batches": 0, "timed_out_batches": 0, "largest_batch": 0}
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Process an item as part of a batch.
+
+        Args:
+            item: Item to process
+
+        Returns:
+            The result for this item
+        """
+        if self.max_wait_ms <= 0:
+            self._record(1, None)
+            return (await self.process([item]))[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush("full_batches")
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush, "timed_out_batches")
+
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get batching metrics.
+
+        Returns:
+            Dictionary with item and batch counts, how batches were closed
+            and the mean batch size
+        """
+        counts = dict(self._counts)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            **counts,
+            "pending": len(self._pending),
+            "mean_batch_size": round(counts["items"] / counts["batches"], 2) if counts["batches"] else 0.0
+        }
+
+    def _flush(self, reason: str) -> None:
+        """Start processing the waiting items as one batch, counted under reason."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        self._record(len(batch), reason)
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        """Process a batch and hand each caller its result."""
+        try:
+            results = await self.process([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch of {len(batch)} items returned {len(results)} results")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            # Callers that were cancelled no longer wait for their result
+            if not future.done():
+                future.set_result(result)
+
+    def _record(self, size: int, reason: Optional[str]) -> None:
+        """Count a batch, and how it was closed unless batching is off."""
+        self._counts["items"] += size
+        self._counts["batches"] += 1
+        if reason:
+            self._counts[reason] += 1
+        self._counts["largest_batch"] = max(self._counts["largest_batch"], size)
@@ -0,0 +1,71 @@
+"""Incremental parsing of NDJSON request bodies."""
+
+from typing import Any, AsyncIterable, AsyncIterator, Optional, Tuple
+import json
+
+
+async def read_ndjson(
+    chunks: AsyncIterable[bytes],
+    max_line_bytes: int = 65536
+) -> AsyncIterator[Tuple[int, Any, Optional[str]]]:
+    """
+    Parse newline-delimited JSON as the bytes arrive.
+
+    Only the current line is buffered, so memory stays bounded by
+    max_line_bytes whatever the size of the body. A line that is not
+    valid JSON, or is longer than max_line_bytes, is reported as an error
+    and parsing continues with the next line. Blank lines are skipped but
+    still counted.
+
+    Args:
+        chunks: Body chunks, e.g. request.stream()
+        max_line_bytes: Longest line accepted
+
+    Yields:
+        Tuples of (1-based line number, parsed value or None, error message or None)
+    """
+    buffer = bytearray()
+    line_number = 0
+    # An over-long line is dropped up to its newline
+    overflow = False
+
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                if not overflow:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_bytes:
+                        overflow = True
+                        buffer.clear()
+                break
+
+            line_number += 1
+            if overflow or len(buffer) + end - start > max_line_bytes:
+                yield line_number, None, f"Line longer than {max_line_bytes} bytes"
+            else:
+                buffer += chunk[start:end]
+                record = _parse_line(line_number, buffer)
+                if record is not None:
+                    yield record
+
+            buffer.clear()
+            overflow = False
+            start = end + 1
+
+    # Last line without a trailing newline
+    if overflow:
+        yield line_number + 1, None, f"Line longer than {max_line_bytes} bytes"
+    elif buffer.strip():
+        yield _parse_line(line_number + 1, buffer)
+
+
+def _parse_line(line_number: int, line: bytearray) -> Optional[Tuple[int, Any, Optional[str]]]:
+    """Parse one line; None for a blank line."""
+    if not line.strip():
+        return None
+    try:
+        return line_number, json.loads(line), None
+    except (ValueError, UnicodeDecodeError) as e:
+        return line_number, None, f"Invalid JSON: {e}"
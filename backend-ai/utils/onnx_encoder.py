@@ -0,0 +1,262 @@
+"""ONNX Runtime backend for sentence-transformers embedding models."""
+
+from typing import Any, Dict, List, Tuple, Union
+import json
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def export_onnx(sentence_model: Any, path: str) -> str:
+    """
+    Export the transformer of a sentence-transformers model to ONNX.
+
+    Only the transformer is exported; pooling and normalization run in
+    numpy. Batch size and sequence length are dynamic.
+
+    Args:
+        sentence_model: Loaded SentenceTransformer whose first module is a Transformer
+        path: Output .onnx file
+
+    Returns:
+        The output path
+    """
+    import torch
+
+    transformer = sentence_model[0]
+    auto_model = transformer.auto_model.to("cpu").eval()
+    sample = transformer.tokenizer(["an example sentence"], return_tensors="pt")
+    input_names = list(sample.keys())
+
+    class LastHiddenState(torch.nn.Module):
+        """Return only the token embeddings, as a plain tensor."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(auto_model),
+            tuple(sample[name] for name in input_names),
+            path,
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            dynamo=False
+        )
+
+    logger.info(f"Exported {type(auto_model).__name__} to {path}")
+    return path
+
+
+def quantize_onnx(path: str, output_path: str) -> str:
+    """
+    Apply dynamic int8 quantization to an ONNX model.
+
+    Weights of the matrix multiplications are stored as int8; activations
+    are quantized on the fly, so no calibration data is needed.
+
+    Args:
+        path: float32 .onnx file
+        output_path: Quantized .onnx file
+
+    Returns:
+        The output path
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(path, output_path, weight_type=QuantType.QInt8)
+    logger.info(f"Quantized {path} to int8 at {output_path}")
+    return output_path
+
+
+def max_embedding_deviation(reference: Any, candidate: Any, texts: List[str]) -> float:
+    """
+    Compare the embeddings of two models on some texts.
+
+    Args:
+        reference: Model whose embeddings are taken as correct
+        candidate: Model being checked
+        texts: Texts to embed with both
+
+    Returns:
+        Largest cosine distance (1 - cosine similarity) over the texts
+    """
+    expected = np.asarray(reference.encode(texts, convert_to_numpy=True), dtype=np.float32)
+    actual = np.asarray(candidate.encode(texts, convert_to_numpy=True), dtype=np.float32)
+
+    cosine = (expected * actual).sum(axis=1) / (
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1) + 1e-12
+    )
+    return float(1.0 - cosine.min())
+
+
+class OnnxSentenceEncoder:
+    """
+    Sentence embeddings computed with ONNX Runtime instead of PyTorch.
+
+    Loads a sentence-transformers model directory entirely from disk:
+    the tokenizer, the pooling configuration, and the exported transformer
+    under <model_dir>/onnx/. The export (and int8 quantization) happens
+    once, on first use, from the PyTorch weights in the same directory.
+    encode() follows the sentence-transformers signature, so the encoder
+    can stand in for a SentenceTransformer.
+    """
+
+    ONNX_DIR = "onnx"
+
+    def __init__(
+        self,
+        model_dir: str,
+        quantize: bool = False,
+        max_seq_length: int = 256,
+        threads: int = 0,
+        source_model: Any = None
+    ):
+        """
+        Initialize the encoder.
+
+        Args:
+            model_dir: Local sentence-transformers model directory
+            quantize: Use the int8 dynamically quantized model
+            max_seq_length: Longer inputs are truncated
+            threads: Intra-op threads of the session (0 lets ONNX Runtime decide)
+            source_model: Already loaded SentenceTransformer of model_dir, used
+                for the export instead of loading it again
+        """
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        self.model_dir = model_dir
+        self.max_seq_length = max_seq_length
+        self.variant = "onnx-int8" if quantize else "onnx"
+
+        path = os.path.join(model_dir, self.ONNX_DIR, "model.onnx")
+        if not os.path.exists(path):
+            if source_model is None:
+                from sentence_transformers import SentenceTransformer
+                source_model = SentenceTransformer(model_dir, device="cpu")
+            export_onnx(source_model, path)
+
+        if quantize:
+            quantized_path = os.path.join(model_dir, self.ONNX_DIR, "model_int8.onnx")
+            if not os.path.exists(quantized_path):
+                quantize_onnx(path, quantized_path)
+            path = quantized_path
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir, local_files_only=True)
+        self.pooling, self.normalize = self._read_modules(model_dir)
+
+        logger.info(f"Loaded {self.variant} encoder from {path} ({self.pooling} pooling)")
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        **kwargs
+    ) -> np.ndarray:
+        """
+        Embed sentences.
+
+        Args:
+            sentences: A sentence or a list of sentences
+            batch_size: Sentences per session run
+            convert_to_numpy: Accepted for compatibility; results are numpy arrays
+            normalize_embeddings: Scale embeddings to unit length
+            **kwargs: Other sentence-transformers options, ignored
+
+        Returns:
+            float32 embedding of shape (dim,) for one sentence, (n, dim) for a list
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        batch_size = max(1, batch_size)
+
+        # Batch texts of similar length together, as sentence-transformers does, to limit padding
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        sorted_texts = [texts[i] for i in order]
+        batches = [
+            self._encode_batch(sorted_texts[start:start + batch_size])
+            for start in range(0, len(texts), batch_size)
+        ]
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        embeddings = np.empty((len(texts), batches[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.vstack(batches)
+
+        if self.normalize or normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+
+        return embeddings[0] if single else embeddings
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Run the session on one padded batch and pool the token embeddings."""
+        tokens = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np"
+        )
+        feed = {name: tokens[name].astype(np.int64) for name in self.input_names}
+        token_embeddings = self.session.run(None, feed)[0]
+
+        if self.pooling == "cls":
+            return token_embeddings[:, 0].astype(np.float32)
+
+        mask = tokens["attention_mask"][:, :, None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        return (summed / np.maximum(mask.sum(axis=1), 1e-9)).astype(np.float32)
+
+    @staticmethod
+    def _read_modules(model_dir: str) -> Tuple[str, bool]:
+        """
+        Read the pooling mode and normalization from a model directory.
+
+        Returns:
+            Tuple of (pooling mode: "mean" or "cls", whether to normalize)
+        """
+        modules_path = os.path.join(model_dir, "modules.json")
+        if not os.path.exists(modules_path):
+            return "mean", False
+
+        with open(modules_path) as f:
+            modules: List[Dict[str, Any]] = json.load(f)
+
+        pooling = "mean"
+        normalize = False
+        for module in modules:
+            if module["type"].endswith("Pooling"):
+                with open(os.path.join(model_dir, module["path"], "config.json")) as f:
+                    config = json.load(f)
+                if config.get("pooling_mode_cls_token"):
+                    pooling = "cls"
+                elif not config.get("pooling_mode_mean_tokens", True):
+                    raise ValueError(f"Unsupported pooling in {model_dir}: only mean and cls pooling are exported")
+            elif module["type"].endswith("Normalize"):
+                normalize = True
+
+        return pooling, normalize
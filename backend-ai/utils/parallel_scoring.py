@@ -0,0 +1,254 @@
+"""Chunked top-k scoring across a process pool over shared-memory arrays."""
+
+from typing import List, Dict, Any, Callable, Optional, Tuple
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Chunk function: (arrays, params, positions) -> scores for those positions
+ChunkFunction = Callable[[Dict[str, np.ndarray], Dict[str, Any], np.ndarray], np.ndarray]
+
+
+class SharedArrays:
+    """
+    Numpy arrays copied into one shared memory block.
+
+    Other processes attach to the block by name from `spec` and get
+    read-only views, so the arrays are never pickled.
+    """
+
+    ALIGNMENT = 64
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        """
+        Copy arrays into a new shared memory block.
+
+        Args:
+            arrays: Arrays to share, by name
+        """
+        layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            array = np.asarray(array)
+            layout[name] = (offset, array.shape, array.dtype.str)
+            offset += -(-array.nbytes // self.ALIGNMENT) * self.ALIGNMENT
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for name, array in arrays.items():
+            start, shape, dtype = layout[name]
+            view = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf, offset=start)
+            view[...] = array
+            del view
+
+        self.spec = (self._shm.name, layout)
+        self.nbytes = offset
+
+    def close(self) -> None:
+        """Release and remove the block."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+def attach(spec: Tuple[str, Dict[str, Any]]) -> Tuple[shared_memory.SharedMemory, Dict[str, np.ndarray]]:
+    """
+    Attach to a block created by SharedArrays.
+
+    Returns:
+        Tuple of (block, read-only array views); drop the views before
+        closing the block
+    """
+    name, layout = spec
+    shm = shared_memory.SharedMemory(name=name)
+
+    arrays = {}
+    for array_name, (offset, shape, dtype) in layout.items():
+        view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        view.flags.writeable = False
+        arrays[array_name] = view
+    return shm, arrays
+
+
+# Long-lived blocks attached by this worker process, by name
+_persistent_blocks = {}
+
+
+def _attach_persistent(spec: Tuple[str, Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Attach to a long-lived block once per worker, dropping replaced blocks."""
+    name = spec[0]
+    if name not in _persistent_blocks:
+        for old_name in list(_persistent_blocks):
+            old_shm, _ = _persistent_blocks.pop(old_name)
+            old_shm.close()
+        _persistent_blocks[name] = attach(spec)
+    return _persistent_blocks[name][1]
+
+
+def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions and scores of the k highest finite scores, best first."""
+    candidates = np.flatnonzero(np.isfinite(scores))
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order], scores[candidates[order]]
+
+
+def _score_chunk(
+    function: ChunkFunction,
+    persistent_spec: Tuple[str, Dict[str, Any]],
+    request_spec: Tuple[str, Dict[str, Any]],
+    params: Dict[str, Any],
+    start: int,
+    end: int,
+    k: Optional[int]
+) -> Any:
+    """
+    Score one chunk in a worker process.
+
+    Returns:
+        The function's result when k is None, else the chunk's top-k as
+        (positions, scores)
+    """
+    arrays = dict(_attach_persistent(persistent_spec))
+    request_shm, request_arrays = attach(request_spec)
+    try:
+        arrays.update(request_arrays)
+        result = function(arrays, params, np.arange(start, end))
+        if k is None:
+            return result
+        positions, scores = _top_k(np.asarray(result), k)
+        return positions + start, scores
+    finally:
+        del arrays, request_arrays
+        request_shm.close()
+
+
+class ParallelScorer:
+    """
+    Split scoring of large candidate sets into chunks run in worker processes.
+
+    Catalog-level arrays live in a long-lived shared block and per-request
+    arrays in a short-lived one; only the chunk bounds and a small params
+    dictionary are sent to the workers. Each chunk returns its own top-k,
+    which are merged into the overall top-k.
+    """
+
+    def __init__(
+        self,
+        workers: int = 0,
+        chunk_size: int = 50000,
+        min_rows: int = 100000,
+        start_method: str = "spawn"
+    ):
+        """
+        Initialize the scorer.
+
+        Args:
+            workers: Worker processes; 0 disables parallel scoring
+            chunk_size: Candidates per chunk
+            min_rows: Smaller inputs should be scored inline
+            start_method: multiprocessing start method
+        """
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.min_rows = min_rows
+        self.start_method = start_method
+        self._pool = None
+
+    def should_parallelize(self, num_rows: int) -> bool:
+        """Check whether an input is large enough for the process pool."""
+        return self.workers > 0 and num_rows >= self.min_rows
+
+    async def map_chunks(
+        self,
+        function: ChunkFunction,
+        persistent: SharedArrays,
+        request: SharedArrays,
+        params: Dict[str, Any],
+        num_rows: int
+    ) -> List[Any]:
+        """
+        Run a function over every chunk of [0, num_rows).
+
+        Returns:
+            The function's result for each chunk, in chunk order
+        """
+        return await self._run(function, persistent, request, params, num_rows, None)
+
+    async def top_k(
+        self,
+        function: ChunkFunction,
+        persistent: SharedArrays,
+        request: SharedArrays,
+        params: Dict[str, Any],
+        num_rows: int,
+        k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the k best positions in [0, num_rows) by the function's scores.
+
+        Non-finite scores are never returned.
+
+        Returns:
+            Tuple of (positions, scores), best first
+        """
+        partials = await self._run(function, persistent, request, params, num_rows, k)
+        positions = np.concatenate([p for p, _ in partials]) if partials else np.zeros(0, dtype=np.int64)
+        scores = np.concatenate([s for _, s in partials]) if partials else np.zeros(0)
+
+        best, best_scores = _top_k(scores, k)
+        return positions[best], best_scores
+
+    async def _run(
+        self,
+        function: ChunkFunction,
+        persistent: SharedArrays,
+        request: SharedArrays,
+        params: Dict[str, Any],
+        num_rows: int,
+        k: Optional[int]
+    ) -> List[Any]:
+        """Submit all chunks to the pool and gather their results in order."""
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        tasks = [
+            loop.run_in_executor(
+                pool,
+                functools.partial(
+                    _score_chunk,
+                    function,
+                    persistent.spec,
+                    request.spec,
+                    params,
+                    start,
+                    min(start + self.chunk_size, num_rows),
+                    k
+                )
+            )
+            for start in range(0, num_rows, self.chunk_size)
+        ]
+        return await asyncio.gather(*tasks)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Start the worker processes on first use."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method)
+            )
+            logger.info(f"Started {self.workers} scoring workers")
+        return self._pool
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
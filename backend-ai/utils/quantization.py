@@ -0,0 +1,127 @@
+"""Compact storage for embedding and factor matrices (float16 / per-row int8)."""
+
+from typing import Dict, Any, Iterable
+
+import numpy as np
+
+
+class QuantizedMatrix:
+    """
+    Row-major matrix stored as float32, float16 or per-row scaled int8.
+
+    int8 rows keep one float32 scale each (max |value| / 127), so a row
+    takes dim + 4 bytes instead of 4 * dim. Rows are dequantized on the
+    fly when read or multiplied with a query.
+    """
+
+    DTYPES = ("float32", "float16", "int8")
+
+    def __init__(self, matrix: np.ndarray, dtype: str = "float32"):
+        """
+        Quantize a matrix.
+
+        Args:
+            matrix: Matrix of shape (n, dim)
+            dtype: Storage type, one of DTYPES
+        """
+        if dtype not in self.DTYPES:
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+
+        matrix = np.asarray(matrix, dtype=np.float32)
+        self.dtype = dtype
+        self.scales = None
+
+        if dtype == "int8":
+            scales = np.abs(matrix).max(axis=1, initial=0.0) / 127.0
+            self.scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+            self.codes = np.rint(matrix / self.scales[:, None]).astype(np.int8)
+        else:
+            self.codes = np.ascontiguousarray(matrix, dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the codes and scales."""
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def rows(self, index) -> np.ndarray:
+        """
+        Get dequantized rows.
+
+        Args:
+            index: Row index, slice or index array
+
+        Returns:
+            Float32 rows
+        """
+        rows = self.codes[index].astype(np.float32)
+        if self.scales is not None:
+            rows *= self.scales[index][..., None]
+        return rows
+
+    def dot(self, index, query: np.ndarray) -> np.ndarray:
+        """
+        Get inner products of some rows with a query vector.
+
+        Args:
+            index: Row index array or slice
+            query: Float32 vector of shape (dim,)
+
+        Returns:
+            Float32 scores, one per row
+        """
+        scores = self.codes[index].astype(np.float32) @ np.asarray(query, dtype=np.float32)
+        if self.scales is not None:
+            scores *= self.scales[index]
+        return scores
+
+
+def quantization_report(
+    matrix: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    dtypes: Iterable[str] = QuantizedMatrix.DTYPES
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Measure the memory, recall and score drift of each storage type against float32.
+
+    Every query is scored exactly against all rows, so the numbers show
+    quantization error alone, without any index approximation.
+
+    Args:
+        matrix: Matrix of shape (n, dim)
+        queries: Query vectors of shape (q, dim)
+        k: Depth for recall@k
+        dtypes: Storage types to measure
+
+    Returns:
+        {dtype: {"bytes", "bytes_per_row", "recall_at_k", "mean_abs_drift",
+        "max_abs_drift"}}, drift being the change in score from float32
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    exact = matrix @ queries.T
+    exact_top = np.argsort(-exact, axis=0, kind="stable")[:k]
+
+    report = {}
+    for dtype in dtypes:
+        quantized = QuantizedMatrix(matrix, dtype)
+        scores = quantized.rows(slice(None)) @ queries.T
+        top = np.argsort(-scores, axis=0, kind="stable")[:k]
+
+        hits = sum(len(np.intersect1d(top[:, q], exact_top[:, q])) for q in range(len(queries)))
+        drift = np.abs(scores - exact)
+        report[dtype] = {
+            "bytes": quantized.nbytes,
+            "bytes_per_row": quantized.nbytes / max(len(matrix), 1),
+            "recall_at_k": hits / (k * max(len(queries), 1)),
+            "mean_abs_drift": float(drift.mean()) if drift.size else 0.0,
+            "max_abs_drift": float(drift.max()) if drift.size else 0.0
+        }
+    return report
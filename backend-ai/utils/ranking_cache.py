@@ -0,0 +1,109 @@
+"""Short-lived cache of ranked recommendation lists for cursor pagination."""
+
+from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
+import secrets
+import threading
+import time
+
+
+class RankingCache:
+    """
+    Store ranked candidate lists (item ids and scores only) under opaque
+    cursor tokens so later pages can be served without re-running the
+    recommendation pipeline.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 10000):
+        """
+        Initialize the ranking cache.
+
+        Args:
+            ttl_seconds: Time a ranked list stays valid after it is stored
+            max_entries: Maximum number of ranked lists kept in memory
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(
+        self,
+        ranking: Any,
+        context: Dict[str, Any]
+    ) -> str:
+        """
+        Store a ranked list and return its token.
+
+        Args:
+            ranking: Ranked item ids and scores, e.g. a dict of arrays in rank
+                order; stored as-is and must not be modified afterwards
+            context: Request context needed to annotate later pages
+
+        Returns:
+            Opaque token identifying the ranked list
+        """
+        token = secrets.token_urlsafe(16)
+        expires_at = time.monotonic() + self.ttl_seconds
+
+        with self._lock:
+            self._purge_expired()
+            self._entries[token] = (expires_at, ranking, context)
+
+            # Evict the oldest lists when over capacity
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return token
+
+    def get(self, token: str) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        """
+        Get a ranked list and its context by token.
+
+        Args:
+            token: Token returned by put()
+
+        Returns:
+            Tuple of (ranking, context), or None if unknown or expired
+        """
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+
+            expires_at, ranking, context = entry
+            if expires_at < time.monotonic():
+                del self._entries[token]
+                return None
+
+            return ranking, context
+
+    @staticmethod
+    def encode_cursor(token: str, offset: int) -> str:
+        """Build a page cursor from a list token and an offset."""
+        return f"{token}.{offset}"
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Optional[Tuple[str, int]]:
+        """
+        Split a page cursor into its list token and offset.
+
+        Returns:
+            Tuple of (token, offset), or None if the cursor is malformed
+        """
+        token, _, offset = cursor.rpartition(".")
+        if not token or not offset.isdigit():
+            return None
+        return token, int(offset)
+
+    def _purge_expired(self) -> None:
+        """Drop expired lists from the front of the insertion order."""
+        now = time.monotonic()
+        while self._entries:
+            token, (expires_at, _, _) = next(iter(self._entries.items()))
+            if expires_at >= now:
+                break
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,275 @@
+"""Sparse float32 user-item rating matrix."""
+
+from typing import List, Dict, Iterator, Optional, Tuple
+from collections.abc import Mapping
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import svds
+
+
+class RatingMatrix(Mapping):
+    """
+    User-item ratings as float32 CSR matrices.
+
+    Keeps the ratings, their squares and a 0/1 "rated" mask side by side so
+    co-rated cosine similarity against every user is three sparse
+    matrix-vector products instead of a Python loop over user pairs. The
+    three matrices share one set of CSR index arrays, and all of them are
+    written to snapshots, so a mapped snapshot is used without copies.
+
+    Also reads as a {user_id: {item_id: rating}} mapping; each user's
+    dictionary is built from their CSR row on access, so a memory-mapped
+    matrix is never expanded as a whole.
+    """
+
+    def __init__(
+        self,
+        user_ids: List[str],
+        item_ids: List[str],
+        ratings: sparse.csr_matrix,
+        squared_data: Optional[np.ndarray] = None,
+        rated_data: Optional[np.ndarray] = None
+    ):
+        """
+        Initialize the matrix.
+
+        Args:
+            user_ids: User id of each row
+            item_ids: Item id of each column
+            ratings: CSR matrix of shape (len(user_ids), len(item_ids))
+            squared_data: Squares of ratings.data, computed when omitted
+            rated_data: Ones in place of ratings.data, created when omitted
+        """
+        self.user_ids = user_ids
+        self.item_ids = item_ids
+        self.user_index = {user_id: idx for idx, user_id in enumerate(user_ids)}
+        self.item_index = {item_id: idx for idx, item_id in enumerate(item_ids)}
+
+        self.ratings = sparse.csr_matrix(ratings, dtype=np.float32)
+        if (self.ratings.data == 0).any():
+            self.ratings.eliminate_zeros()
+            squared_data = rated_data = None
+
+        if squared_data is None:
+            squared_data = np.square(self.ratings.data)
+        if rated_data is None:
+            rated_data = np.ones_like(self.ratings.data)
+        self.squared = self._with_data(squared_data)
+        self.rated = self._with_data(rated_data)
+
+    @classmethod
+    def from_dict(cls, user_item_matrix: Dict[str, Dict[str, float]]) -> "RatingMatrix":
+        """
+        Build the matrix from a nested {user_id: {item_id: rating}} dictionary.
+        """
+        user_ids = list(user_item_matrix)
+        item_index = {}
+        rows, cols, values = [], [], []
+
+        for row, ratings in enumerate(user_item_matrix.values()):
+            for item_id, rating in ratings.items():
+                rows.append(row)
+                cols.append(item_index.setdefault(item_id, len(item_index)))
+                values.append(rating)
+
+        ratings = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float32), (rows, cols)),
+            shape=(len(user_ids), len(item_index))
+        )
+        return cls(user_ids, list(item_index), ratings)
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], prefix: str) -> "RatingMatrix":
+        """
+        Build the matrix from arrays written by to_arrays().
+
+        Rating arrays are used as-is, so memory-mapped arrays are not copied.
+        Squares and the rated mask are computed if the arrays predate them.
+        """
+        user_ids = arrays[f"{prefix}_users"].tolist()
+        item_ids = arrays[f"{prefix}_items"].tolist()
+        ratings = sparse.csr_matrix(
+            (arrays[f"{prefix}_data"], arrays[f"{prefix}_indices"], arrays[f"{prefix}_indptr"]),
+            shape=(len(user_ids), len(item_ids))
+        )
+        return cls(user_ids, item_ids, ratings, arrays.get(f"{prefix}_squared"), arrays.get(f"{prefix}_rated"))
+
+    def fill_missing(self, other: "RatingMatrix") -> "RatingMatrix":
+        """
+        Get a matrix with this matrix's ratings, plus other's ratings for the
+        cells this one has no rating for.
+
+        Args:
+            other: Ratings to fill in, e.g. implicit feedback under explicit ratings
+
+        Returns:
+            New matrix whose users and items are the union of both
+        """
+        user_index = dict(self.user_index)
+        item_index = dict(self.item_index)
+        for user_id in other.user_ids:
+            user_index.setdefault(user_id, len(user_index))
+        for item_id in other.item_ids:
+            item_index.setdefault(item_id, len(item_index))
+        shape = (len(user_index), len(item_index))
+
+        rows = np.fromiter((user_index[user_id] for user_id in other.user_ids), dtype=np.int64, count=other.num_users)
+        columns = np.fromiter((item_index[item_id] for item_id in other.item_ids), dtype=np.int64, count=len(other.item_ids))
+        cells = other.ratings.tocoo()
+        fill = sparse.csr_matrix((cells.data, (rows[cells.row], columns[cells.col])), shape=shape)
+
+        ratings = self.ratings.copy()
+        ratings.resize(shape)
+        rated = self.rated.copy()
+        rated.resize(shape)
+
+        # Cells rated here become explicit zeros in fill, dropped by the constructor
+        fill = fill - fill.multiply(rated)
+        return RatingMatrix(list(user_index), list(item_index), (ratings + fill).tocsr())
+
+    def to_arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        """Get the ids and CSR arrays of the matrix, keyed with a name prefix."""
+        return {
+            f"{prefix}_users": np.array(self.user_ids, dtype=str),
+            f"{prefix}_items": np.array(self.item_ids, dtype=str),
+            f"{prefix}_indptr": self.ratings.indptr,
+            f"{prefix}_indices": self.ratings.indices,
+            f"{prefix}_data": self.ratings.data,
+            f"{prefix}_squared": self.squared.data,
+            f"{prefix}_rated": self.rated.data,
+        }
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        """Get the ratings as a nested {user_id: {item_id: rating}} dictionary."""
+        return {user_id: self._row_ratings(row) for row, user_id in enumerate(self.user_ids)}
+
+    def __getitem__(self, user_id: str) -> Dict[str, float]:
+        """Get a user's ratings as {item_id: rating}."""
+        return self._row_ratings(self.user_index[user_id])
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self.user_index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.user_ids)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def _with_data(self, data: np.ndarray) -> sparse.csr_matrix:
+        """Get a CSR matrix with the ratings' sparsity pattern and other values."""
+        return sparse.csr_matrix(
+            (data, self.ratings.indices, self.ratings.indptr),
+            shape=self.ratings.shape
+        )
+
+    def _row_ratings(self, row: int) -> Dict[str, float]:
+        """Get the ratings stored in one CSR row as {item_id: rating}."""
+        start, end = self.ratings.indptr[row], self.ratings.indptr[row + 1]
+        item_ids = self.item_ids
+        return {
+            item_ids[column]: rating
+            for column, rating in zip(self.ratings.indices[start:end].tolist(), self.ratings.data[start:end].tolist())
+        }
+
+    @property
+    def num_users(self) -> int:
+        return len(self.user_ids)
+
+    def user_vector(self, user_id: str) -> Optional[np.ndarray]:
+        """Get a user's dense float32 rating row, or None if unknown."""
+        row = self.user_index.get(user_id)
+        if row is None:
+            return None
+        return self.ratings[row].toarray().ravel()
+
+    def cosine_to(self, user_id: str) -> Optional[np.ndarray]:
+        """
+        Co-rated cosine similarity between a user and every user.
+
+        Only items both users rated count, in the dot product and in both
+        norms, matching a per-pair cosine over common items.
+
+        Args:
+            user_id: Target user id
+
+        Returns:
+            Float32 similarities clipped to 0-1 (0 without common items),
+            or None if the user has no ratings
+        """
+        target = self.user_vector(user_id)
+        if target is None or not target.any():
+            return None
+        return self._cosine_to_vector(target)
+
+    def cosine_to_ratings(self, item_ratings: Dict[str, float]) -> np.ndarray:
+        """
+        Co-rated cosine similarity between a rating dictionary and every user.
+
+        Items this matrix has no column for are ignored, since no user here
+        rated them.
+
+        Args:
+            item_ratings: Target ratings as {item_id: rating}
+
+        Returns:
+            Float32 similarities clipped to 0-1
+        """
+        target = np.zeros(len(self.item_ids), dtype=np.float32)
+        for item_id, rating in item_ratings.items():
+            column = self.item_index.get(item_id)
+            if column is not None:
+                target[column] = rating
+        return self._cosine_to_vector(target)
+
+    def _cosine_to_vector(self, target: np.ndarray) -> np.ndarray:
+        """Co-rated cosine between a dense target row and every user."""
+        target_rated = (target != 0).astype(np.float32)
+
+        dot = self.ratings @ target
+        other_norms = np.sqrt(self.squared @ target_rated)
+        target_norms = np.sqrt(self.rated @ (target * target))
+
+        denominator = other_norms * target_norms
+        similarities = np.divide(
+            dot,
+            denominator,
+            out=np.zeros_like(dot),
+            where=denominator > 0
+        )
+        return np.clip(similarities, 0.0, 1.0)
+
+    def weighted_item_sums(self, user_weights: np.ndarray):
+        """
+        Sum ratings and weights per item over weighted users.
+
+        Args:
+            user_weights: Weight of each user row
+
+        Returns:
+            Tuple of (weighted rating sum, weight sum) arrays per item column
+        """
+        user_weights = np.asarray(user_weights, dtype=np.float32)
+        return self.ratings.T @ user_weights, self.rated.T @ user_weights
+
+    def factors(self, rank: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Latent user and item factors from a truncated SVD of the ratings.
+
+        Ratings are approximated by user_factors @ item_factors.T, with the
+        singular values split evenly between both sides.
+
+        Args:
+            rank: Number of latent dimensions (capped by the matrix shape)
+
+        Returns:
+            Tuple of float32 (user_factors, item_factors), or None if the
+            matrix is too small to factorize
+        """
+        rank = min(rank, min(self.ratings.shape) - 1)
+        if rank < 1 or self.ratings.nnz == 0:
+            return None
+
+        u, s, vt = svds(self.ratings.astype(np.float64), k=rank, random_state=0)
+        scale = np.sqrt(s)
+        return (u * scale).astype(np.float32), (vt.T * scale).astype(np.float32)
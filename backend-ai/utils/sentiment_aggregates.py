@@ -0,0 +1,327 @@
+"""Running sentiment aggregates per hotel or tour, kept in SQLite."""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+# (item_type, item_id, topic) -> [count, total, total_squares, flagged]
+AggregateRows = Dict[Tuple[str, str, str], List[float]]
+
+
+class SentimentAggregateStore:
+    """
+    Review count, score sums and sums of squares per item and topic.
+
+    Each analyzed review adds one to the count of its item's overall row
+    and of every topic it mentions, its score to the total and the
+    squared score to total_squares, so mean and standard deviation are
+    read without touching the reviews again. Recording a review is one
+    upsert per row, whatever the number of reviews already counted.
+
+    The rows live in SQLite: in memory when no path is given, otherwise in
+    a file in WAL mode shared by all worker processes.
+
+    While a rebuild from history is running, recorded results are also
+    logged as deltas, and replace() adds the deltas logged since the
+    rebuild began to the rebuilt rows, so live reviews are not lost.
+    """
+
+    # Topic of the row holding the overall score and the flagged count
+    OVERALL = ""
+
+    UPSERT = """
+        INSERT INTO sentiment_aggregates
+            (item_type, item_id, topic, count, total, total_squares, flagged)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (item_type, item_id, topic) DO UPDATE SET
+            count = count + excluded.count,
+            total = total + excluded.total,
+            total_squares = total_squares + excluded.total_squares,
+            flagged = flagged + excluded.flagged
+    """
+
+    def __init__(self, path: str = ""):
+        """
+        Initialize the store.
+
+        Args:
+            path: SQLite file (empty keeps the aggregates in memory)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+
+    @classmethod
+    def accumulate(cls, rows: AggregateRows, item_type: str, item_id: str, result: Dict[str, Any]) -> None:
+        """
+        Add an analysis result to rows being aggregated in memory.
+
+        Args:
+            rows: Rows to add to
+            item_type: "hotel" or "tour"
+            item_id: Item the review is about
+            result: Result of SentimentAnalyzer.analyze_review
+        """
+        scores = [(cls.OVERALL, result["score"], int(result["flagged"]))]
+        scores += [(topic, score, 0) for topic, score in result["topics"].items()]
+
+        for topic, score, flagged in scores:
+            row = rows.setdefault((item_type, item_id, topic), [0, 0.0, 0.0, 0])
+            row[0] += 1
+            row[1] += score
+            row[2] += score * score
+            row[3] += flagged
+
+    def add(self, item_type: str, item_id: str, result: Dict[str, Any]) -> None:
+        """Record the analysis result of one review."""
+        self.add_many([(item_type, item_id, result)])
+
+    def add_many(self, entries: Iterable[Tuple[str, str, Dict[str, Any]]]) -> int:
+        """
+        Record analysis results in one transaction.
+
+        Args:
+            entries: Tuples of (item_type, item_id, analysis result)
+
+        Returns:
+            Number of results recorded
+        """
+        rows: AggregateRows = {}
+        count = 0
+        for item_type, item_id, result in entries:
+            self.accumulate(rows, item_type, item_id, result)
+            count += 1
+
+        if rows:
+            values = [key + tuple(row) for key, row in rows.items()]
+            with self._lock:
+                connection = self._get_connection()
+                with connection:
+                    connection.executemany(self.UPSERT, values)
+                    if connection.execute("SELECT 1 FROM sentiment_rebuilds LIMIT 1").fetchone():
+                        connection.executemany(
+                            """
+                            INSERT INTO sentiment_deltas
+                                (item_type, item_id, topic, count, total, total_squares, flagged)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)
+                            """,
+                            values
+                        )
+        return count
+
+    def begin_rebuild(self) -> int:
+        """
+        Start logging recorded results as deltas for a rebuild.
+
+        Returns:
+            Rebuild id to pass to replace() and end_rebuild()
+        """
+        with self._lock:
+            connection = self._get_connection()
+            with connection:
+                cursor = connection.execute(
+                    """
+                    INSERT INTO sentiment_rebuilds (start_seq)
+                    SELECT COALESCE(MAX(seq), 0) FROM sentiment_deltas
+                    """
+                )
+        return cursor.lastrowid
+
+    def end_rebuild(self, rebuild_id: int) -> None:
+        """Stop logging deltas for a rebuild, e.g. after it failed; does nothing if already ended."""
+        with self._lock:
+            connection = self._get_connection()
+            with connection:
+                self._end_rebuild(connection, rebuild_id)
+
+    def replace(
+        self,
+        rows: AggregateRows,
+        item_types: Optional[Iterable[str]] = None,
+        rebuild_id: Optional[int] = None
+    ) -> None:
+        """
+        Replace the aggregates of some item types at once, e.g. with rows rebuilt from history.
+
+        Readers see either the old or the new aggregates, never a mix.
+        Aggregates of other item types are kept.
+
+        Args:
+            rows: New rows
+            item_types: Item types to replace (default: the types in rows)
+            rebuild_id: Rebuild from begin_rebuild(); results recorded since
+                it began are added to the new rows, and the rebuild ends
+        """
+        item_types = sorted(set(item_types) if item_types is not None else {key[0] for key in rows})
+        placeholders = ", ".join("?" * len(item_types))
+
+        with self._lock:
+            connection = self._get_connection()
+            with connection:
+                connection.execute(
+                    f"DELETE FROM sentiment_aggregates WHERE item_type IN ({placeholders})",
+                    item_types
+                )
+                connection.executemany(self.UPSERT, [key + tuple(row) for key, row in rows.items()])
+
+                if rebuild_id is not None:
+                    connection.execute(
+                        f"""
+                        INSERT INTO sentiment_aggregates
+                            (item_type, item_id, topic, count, total, total_squares, flagged)
+                        SELECT item_type, item_id, topic, SUM(count), SUM(total), SUM(total_squares), SUM(flagged)
+                        FROM sentiment_deltas
+                        WHERE seq > (SELECT start_seq FROM sentiment_rebuilds WHERE id = ?)
+                            AND item_type IN ({placeholders})
+                        GROUP BY item_type, item_id, topic
+                        ON CONFLICT (item_type, item_id, topic) DO UPDATE SET
+                            count = count + excluded.count,
+                            total = total + excluded.total,
+                            total_squares = total_squares + excluded.total_squares,
+                            flagged = flagged + excluded.flagged
+                        """,
+                        [rebuild_id] + item_types
+                    )
+                    self._end_rebuild(connection, rebuild_id)
+
+        logger.info(f"Replaced {', '.join(item_types) or 'no'} sentiment aggregates with {len(rows)} rows")
+
+    def get(self, item_type: str, item_id: str) -> Dict[str, Any]:
+        """
+        Get the aggregates of an item.
+
+        Returns:
+            Dictionary with the review and flagged counts, and the count,
+            mean and standard deviation of the overall score and of each
+            topic's score; counts are 0 for an item without reviews
+        """
+        with self._lock:
+            rows = self._get_connection().execute(
+                """
+                SELECT topic, count, total, total_squares, flagged
+                FROM sentiment_aggregates
+                WHERE item_type = ? AND item_id = ?
+                ORDER BY topic
+                """,
+                (item_type, item_id)
+            ).fetchall()
+
+        overall = {"count": 0, "mean": 0.0, "std": 0.0}
+        flagged = 0
+        topics = {}
+        for topic, count, total, total_squares, topic_flagged in rows:
+            summary = self._summarize(count, total, total_squares)
+            if topic == self.OVERALL:
+                overall, flagged = summary, topic_flagged
+            else:
+                topics[topic] = summary
+
+        return {
+            "item_type": item_type,
+            "item_id": item_id,
+            "review_count": overall["count"],
+            "flagged_count": flagged,
+            "flagged_ratio": round(flagged / overall["count"], 4) if overall["count"] else 0.0,
+            "score": overall,
+            "topics": topics
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the size of the store.
+
+        Returns:
+            Dictionary with the number of items and of reviews recorded
+        """
+        with self._lock:
+            items, reviews = self._get_connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(count), 0) FROM sentiment_aggregates WHERE topic = ?",
+                (self.OVERALL,)
+            ).fetchone()
+
+        return {"items": items, "reviews": reviews, "path": self.path or None}
+
+    def close(self) -> None:
+        """Close the connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    @staticmethod
+    def _end_rebuild(connection: sqlite3.Connection, rebuild_id: int) -> None:
+        """Forget a rebuild and the deltas no running rebuild needs; callers hold the lock."""
+        connection.execute("DELETE FROM sentiment_rebuilds WHERE id = ?", (rebuild_id,))
+        connection.execute(
+            """
+            DELETE FROM sentiment_deltas
+            WHERE seq <= COALESCE((SELECT MIN(start_seq) FROM sentiment_rebuilds), seq)
+            """
+        )
+
+    @staticmethod
+    def _summarize(count: int, total: float, total_squares: float) -> Dict[str, Any]:
+        """Mean and standard deviation from a count, sum and sum of squares."""
+        mean = total / count
+        variance = max(total_squares / count - mean * mean, 0.0)
+        return {"count": count, "mean": round(mean, 4), "std": round(variance ** 0.5, 4)}
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Open the database in this process; callers hold the lock."""
+        # Connections must not be shared with forked children
+        if self._connection is None or self._connection_pid != os.getpid():
+            if self.path:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+
+            connection = sqlite3.connect(self.path or ":memory:", timeout=30, check_same_thread=False)
+            if self.path:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sentiment_aggregates (
+                    item_type TEXT NOT NULL,
+                    item_id TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    total REAL NOT NULL,
+                    total_squares REAL NOT NULL,
+                    flagged INTEGER NOT NULL,
+                    PRIMARY KEY (item_type, item_id, topic)
+                )
+                """
+            )
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sentiment_rebuilds (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    start_seq INTEGER NOT NULL
+                )
+                """
+            )
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sentiment_deltas (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    item_type TEXT NOT NULL,
+                    item_id TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    total REAL NOT NULL,
+                    total_squares REAL NOT NULL,
+                    flagged INTEGER NOT NULL
+                )
+                """
+            )
+            connection.commit()
+
+            self._connection = connection
+            self._connection_pid = os.getpid()
+        return self._connection
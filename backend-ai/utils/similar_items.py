@@ -0,0 +1,167 @@
+"""Precomputed nearest-neighbor table for "items like this one"."""
+
+from typing import Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SimilarItemsTable:
+    """
+    Top-N most similar rows of every row, stored as fixed-width arrays.
+
+    Similarity is the inner product of unit vectors, and only rows of the
+    same group (e.g. item type) are compared. Row i's neighbors are the
+    first counts[i] entries of neighbors[i], best first, so a lookup is
+    one slice.
+
+    When rows change, only their own lists and the lists that pointed to
+    them are recomputed in full; every other list just merges in the
+    changed rows as new candidates.
+    """
+
+    # Rows scored per block when computing lists, to bound memory
+    BLOCK = 1024
+
+    def __init__(self, top_n: int = 20):
+        """
+        Initialize an empty table.
+
+        Args:
+            top_n: Neighbors kept per row
+        """
+        self.top_n = top_n
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.groups = np.zeros(0, dtype=np.int64)
+        self.neighbors = np.full((0, top_n), -1, dtype=np.int32)
+        self.scores = np.full((0, top_n), -np.inf, dtype=np.float32)
+        self.counts = np.zeros(0, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def neighbors_of(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the most similar rows of a row.
+
+        Returns:
+            Tuple of (rows, scores), most similar first
+        """
+        if row < 0 or row >= len(self):
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        count = self.counts[row]
+        return self.neighbors[row, :count], self.scores[row, :count]
+
+    def build(self, vectors: np.ndarray, groups: np.ndarray) -> "SimilarItemsTable":
+        """
+        Compute every row's neighbors from scratch.
+
+        Args:
+            vectors: Unit vectors of shape (n, dim)
+            groups: Group of each row; rows are only compared within a group
+
+        Returns:
+            The table itself
+        """
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.groups = np.asarray(groups, dtype=np.int64)
+        self.neighbors = np.full((len(self.vectors), self.top_n), -1, dtype=np.int32)
+        self.scores = np.full((len(self.vectors), self.top_n), -np.inf, dtype=np.float32)
+        self.counts = np.zeros(len(self.vectors), dtype=np.int32)
+
+        self._recompute(np.arange(len(self.vectors)))
+        logger.info(f"Built similar-items table for {len(self)} rows")
+        return self
+
+    def update(self, rows: np.ndarray, vectors: np.ndarray, groups: np.ndarray) -> int:
+        """
+        Replace or add the vectors of some rows and repair the neighbor lists.
+
+        Args:
+            rows: Changed rows; rows past the end extend the table
+            vectors: New unit vector of each row
+            groups: New group of each row
+
+        Returns:
+            Number of lists recomputed in full
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) == 0:
+            return 0
+
+        size = max(len(self), int(rows.max()) + 1)
+        if size > len(self):
+            self._grow(size, vectors.shape[1])
+        self.vectors[rows] = vectors
+        self.groups[rows] = groups
+
+        # Lists that held a changed row may now miss a better replacement
+        changed = np.unique(rows)
+        stale = np.flatnonzero(np.isin(self.neighbors, changed).any(axis=1))
+        recompute = np.union1d(changed, stale)
+        self._recompute(recompute)
+
+        # Every other list can only gain changed rows
+        others = np.setdiff1d(np.arange(len(self)), recompute)
+        for start in range(0, len(others), self.BLOCK):
+            block = others[start:start + self.BLOCK]
+            similarity = self._similarity(block, changed)
+            self._keep_best(
+                block,
+                np.hstack([self.neighbors[block], np.broadcast_to(changed, similarity.shape)]),
+                np.hstack([self.scores[block], similarity])
+            )
+
+        logger.info(f"Updated {len(changed)} rows of the similar-items table, recomputed {len(recompute)} lists")
+        return len(recompute)
+
+    def _recompute(self, rows: np.ndarray) -> None:
+        """Compute the lists of some rows against all rows of their group."""
+        for group in np.unique(self.groups[rows]):
+            members = np.flatnonzero(self.groups == group)
+            group_rows = rows[self.groups[rows] == group]
+            member_vectors = self.vectors[members]
+
+            for start in range(0, len(group_rows), self.BLOCK):
+                block = group_rows[start:start + self.BLOCK]
+                similarity = self.vectors[block] @ member_vectors.T
+                similarity[np.arange(len(block)), np.searchsorted(members, block)] = -np.inf
+                self._keep_best(block, np.broadcast_to(members, similarity.shape), similarity)
+
+    def _similarity(self, rows: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """Similarity of rows to candidates; -inf across groups and to themselves."""
+        similarity = self.vectors[rows] @ self.vectors[candidates].T
+        excluded = (self.groups[rows][:, None] != self.groups[candidates][None, :]) | (rows[:, None] == candidates[None, :])
+        similarity[excluded] = -np.inf
+        return similarity
+
+    def _keep_best(self, rows: np.ndarray, candidates: np.ndarray, similarity: np.ndarray) -> None:
+        """Store the top_n candidates of each row, best first."""
+        top_n = min(self.top_n, similarity.shape[1])
+        if top_n == 0:
+            return
+        best = np.argpartition(similarity, similarity.shape[1] - top_n, axis=1)[:, -top_n:]
+        best_scores = np.take_along_axis(similarity, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        found = np.isfinite(best_scores)
+
+        self.neighbors[rows] = -1
+        self.scores[rows] = -np.inf
+        self.neighbors[rows, :top_n] = np.where(found, np.take_along_axis(candidates, best, axis=1), -1)
+        self.scores[rows, :top_n] = best_scores
+        self.counts[rows] = found.sum(axis=1)
+
+    def _grow(self, size: int, dim: int) -> None:
+        """Extend the arrays to a number of rows; new rows have no neighbors yet."""
+        extra = size - len(self)
+        vectors = np.zeros((extra, dim), dtype=np.float32)
+        self.vectors = np.vstack([self.vectors.reshape(-1, dim), vectors])
+        self.groups = np.concatenate([self.groups, np.full(extra, -1, dtype=np.int64)])
+        self.neighbors = np.vstack([self.neighbors, np.full((extra, self.top_n), -1, dtype=np.int32)])
+        self.scores = np.vstack([self.scores, np.full((extra, self.top_n), -np.inf, dtype=np.float32)])
+        self.counts = np.concatenate([self.counts, np.zeros(extra, dtype=np.int32)])
@@ -0,0 +1,257 @@
+"""Fixed-memory trending counters: time-bucketed count-min sketches."""
+
+from typing import List, Dict, Hashable, Iterable, Optional, Tuple
+import heapq
+import threading
+import time
+import zlib
+
+import numpy as np
+
+
+class TrendingCounter:
+    """
+    Approximate, time-decayed event counts per item in fixed memory.
+
+    Weighted events (views, bookings, ...) are added to a count-min sketch
+    for the time bucket they fall in; a ring of buckets covers the trend
+    window and the oldest bucket is cleared as time moves on. An item's
+    trend score is its count in each live bucket, halved every
+    half_life_buckets, summed over the window. Estimates can only be too
+    high, by roughly total_weight / width per bucket.
+
+    A small heap of heavy hitters per group (e.g. per city) remembers which
+    items to report as trending, since the sketch itself cannot list items.
+
+    The newest bucket follows the clock, not event timestamps: events up
+    to max_clock_skew ahead of now are counted as now, and later ones are
+    dropped, so one bad timestamp cannot clear the window.
+    """
+
+    def __init__(
+        self,
+        weights: Dict[str, float],
+        bucket_seconds: int = 3600,
+        num_buckets: int = 24,
+        half_life_buckets: float = 6.0,
+        width: int = 4096,
+        depth: int = 4,
+        heavy_hitters: int = 50,
+        max_clock_skew: float = 300.0
+    ):
+        """
+        Initialize the counter.
+
+        Args:
+            weights: Weight of each event type, e.g. {"view": 1.0}
+            bucket_seconds: Length of one time bucket
+            num_buckets: Buckets in the trend window
+            half_life_buckets: Buckets for an event's weight to halve
+            width: Counters per sketch row; more means smaller overestimates
+            depth: Sketch rows (independent hashes)
+            heavy_hitters: Items tracked per group
+            max_clock_skew: Seconds an event timestamp may be ahead of now
+        """
+        self.weights = dict(weights)
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self.half_life_buckets = half_life_buckets
+        self.width = width
+        self.depth = depth
+        self.heavy_hitters = heavy_hitters
+        self.max_clock_skew = max_clock_skew
+
+        self._sketch = np.zeros((num_buckets, depth, width), dtype=np.float32)
+        self._bucket_ids = np.full(num_buckets, -1, dtype=np.int64)
+        self._head = -1
+
+        # Heavy hitters per group: {item_id: score} plus a lazily cleaned
+        # min-heap of (score, item_id). Scores are forward-decayed relative
+        # to the landmark bucket so they stay comparable as time passes.
+        self._landmark = None
+        self._candidates = {}
+        self._heaps = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the sketches."""
+        return self._sketch.nbytes
+
+    def add_events(
+        self,
+        item_ids: List[str],
+        event_types: List[str],
+        timestamps: Iterable[float],
+        groups: Optional[List[Hashable]] = None,
+        now: Optional[float] = None
+    ) -> int:
+        """
+        Count events given as parallel columns.
+
+        Args:
+            item_ids: Item of each event
+            event_types: Type of each event; unknown types are skipped
+            timestamps: Event times in epoch seconds
+            groups: Heavy-hitter group of each event (e.g. a city); every
+                event is also tracked in the None group
+            now: Current time in epoch seconds (defaults to now)
+
+        Returns:
+            Number of events counted; events older than the window or later
+            than now + max_clock_skew are dropped
+        """
+        now = time.time() if now is None else now
+        weights = np.array([self.weights.get(t, 0.0) for t in event_types], dtype=np.float32)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        in_time = timestamps <= now + self.max_clock_skew
+        buckets = (np.where(in_time, np.minimum(timestamps, now), now) // self.bucket_seconds).astype(np.int64)
+        if groups is None:
+            groups = [None] * len(item_ids)
+
+        with self._lock:
+            self._advance(int(now // self.bucket_seconds))
+
+            accepted = np.flatnonzero((weights > 0) & in_time & (buckets > self._head - self.num_buckets))
+            if len(accepted) == 0:
+                return 0
+
+            hashes = self._hashes([item_ids[i] for i in accepted])
+            slots = buckets[accepted] % self.num_buckets
+            np.add.at(
+                self._sketch,
+                (slots[:, None], np.arange(self.depth)[None, :], hashes),
+                weights[accepted][:, None]
+            )
+
+            # Offer each distinct (item, group) once with its new estimate
+            offered = {}
+            for position, event in enumerate(accepted):
+                offered.setdefault((item_ids[event], groups[event]), position)
+            positions = np.fromiter(offered.values(), dtype=np.int64, count=len(offered))
+            estimates = self._forward_scores(hashes[positions])
+
+            for ((item_id, group), _), estimate in zip(offered.items(), estimates.tolist()):
+                self._offer(group, item_id, estimate)
+                if group is not None:
+                    self._offer(None, item_id, estimate)
+
+            return len(accepted)
+
+    def scores(self, item_ids: List[str], now: Optional[float] = None) -> np.ndarray:
+        """
+        Get trend scores decayed to `now`.
+
+        Args:
+            item_ids: Items to score
+            now: Time to decay to (epoch seconds, defaults to now)
+
+        Returns:
+            Float32 array of trend scores
+        """
+        if not item_ids or self._head < 0:
+            return np.zeros(len(item_ids), dtype=np.float32)
+
+        now_bucket = int((time.time() if now is None else now) // self.bucket_seconds)
+        hashes = self._hashes(item_ids)
+        with self._lock:
+            age = now_bucket - self._bucket_ids
+            live = (self._bucket_ids >= 0) & (age >= 0) & (age < self.num_buckets)
+            bucket_weights = np.where(live, 0.5 ** (age / self.half_life_buckets), 0.0)
+            return (bucket_weights.astype(np.float32) @ self._estimates(hashes)).astype(np.float32)
+
+    def top(
+        self,
+        group: Hashable = None,
+        limit: int = 10,
+        now: Optional[float] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Get the trending items of a group.
+
+        Args:
+            group: Heavy-hitter group, None for all events
+            limit: Maximum number of items
+            now: Time to decay to (epoch seconds, defaults to now)
+
+        Returns:
+            List of (item_id, trend_score) tuples by descending score
+        """
+        with self._lock:
+            item_ids = list(self._candidates.get(group, {}))
+
+        scores = self.scores(item_ids, now)
+        return heapq.nlargest(
+            limit,
+            (entry for entry in zip(item_ids, scores.tolist()) if entry[1] > 0),
+            key=lambda entry: entry[1]
+        )
+
+    def _hashes(self, item_ids: List[str]) -> np.ndarray:
+        """Get the sketch column of each item in every row (double hashing)."""
+        first = np.empty(len(item_ids), dtype=np.int64)
+        second = np.empty(len(item_ids), dtype=np.int64)
+        for idx, item_id in enumerate(item_ids):
+            data = item_id.encode("utf-8")
+            first[idx] = zlib.crc32(data)
+            second[idx] = zlib.adler32(data) | 1
+        return (first[:, None] + np.arange(self.depth)[None, :] * second[:, None]) % self.width
+
+    def _estimates(self, hashes: np.ndarray) -> np.ndarray:
+        """Count-min estimate of each item in every bucket; shape (buckets, items)."""
+        return self._sketch[:, np.arange(self.depth)[None, :], hashes].min(axis=2)
+
+    def _forward_scores(self, hashes: np.ndarray) -> np.ndarray:
+        """Scores weighted relative to the landmark bucket. Callers must hold the lock."""
+        live = self._bucket_ids >= 0
+        bucket_weights = np.where(
+            live,
+            2.0 ** ((self._bucket_ids - self._landmark) / self.half_life_buckets),
+            0.0
+        )
+        return bucket_weights @ self._estimates(hashes).astype(np.float64)
+
+    def _offer(self, group: Hashable, item_id: str, score: float) -> None:
+        """Track an item in a group's heavy hitters if it scores high enough."""
+        candidates = self._candidates.setdefault(group, {})
+        heap = self._heaps.setdefault(group, [])
+
+        if item_id not in candidates and len(candidates) >= self.heavy_hitters:
+            # Drop heap entries whose score has since been updated
+            while heap and candidates.get(heap[0][1]) != heap[0][0]:
+                heapq.heappop(heap)
+            if score <= heap[0][0]:
+                return
+            _, evicted = heapq.heappop(heap)
+            del candidates[evicted]
+
+        candidates[item_id] = score
+        heapq.heappush(heap, (score, item_id))
+
+        if len(heap) > 4 * self.heavy_hitters:
+            self._heaps[group] = [(value, key) for key, value in candidates.items()]
+            heapq.heapify(self._heaps[group])
+
+    def _advance(self, bucket: int) -> None:
+        """Move the window forward to a bucket. Callers must hold the lock."""
+        if self._landmark is None:
+            self._landmark = bucket
+        if bucket <= self._head:
+            return
+
+        # Clear the slots of buckets that left the window
+        for stale in range(max(self._head + 1, bucket - self.num_buckets + 1), bucket + 1):
+            slot = stale % self.num_buckets
+            self._sketch[slot] = 0.0
+            self._bucket_ids[slot] = stale
+        self._head = bucket
+
+        # Rescale heavy-hitter scores before forward weights grow too large
+        if (bucket - self._landmark) / self.half_life_buckets > 50:
+            factor = 2.0 ** (-(bucket - self._landmark) / self.half_life_buckets)
+            for group, candidates in self._candidates.items():
+                for item_id in candidates:
+                    candidates[item_id] *= factor
+                self._heaps[group] = [(value, key) for key, value in candidates.items()]
+                heapq.heapify(self._heaps[group])
+            self._landmark = bucket